@@ -0,0 +1,96 @@
+"""Dossier archive: incremental indexing and similarity recall at archive scale.
+
+Synthetic dossiers mix Chinese and English words drawn Zipf-style from a
+shared vocabulary, plus words specific to one of --topics themes. Reports
+add time per dossier as the archive grows, recall latency (p50/p95) at the
+final size, the share of recalled dossiers on the query's theme, and the
+archive's size on disk.
+
+Usage: PYTHONPATH=. python benchmarks/bench_archive.py [--docs 20000] [--queries 200] [-k 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tools import dossier_archive
+
+VOCAB = 6000
+TOPIC_WORDS = 60
+DOC_WORDS = 1200
+TOPIC_SHARE = 0.08
+
+def vocabulary(rng):
+    """VOCAB words: two-to-four character Chinese words and short English words."""
+    words = []
+    for i in range(VOCAB):
+        if i % 3:
+            words.append("".join(chr(0x4e00 + int(c)) for c in rng.integers(0, 3000, rng.integers(2, 5))))
+        else:
+            words.append("".join(chr(97 + int(c)) for c in rng.integers(0, 26, rng.integers(4, 9))))
+    return np.array(words)
+
+def make_doc(rng, words, topic, topics):
+    common = rng.zipf(1.3, DOC_WORDS) % VOCAB
+    specific = topics[topic][rng.integers(0, TOPIC_WORDS, int(DOC_WORDS * TOPIC_SHARE))]
+    picks = np.concatenate([common, specific])
+    rng.shuffle(picks)
+    # Punctuation between words, as in the reports, so CJK bigrams stay inside words.
+    return "，".join(words[picks])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--topics", type=int, default=100)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    words = vocabulary(rng)
+    topics = [rng.integers(0, VOCAB, TOPIC_WORDS) for _ in range(args.topics)]
+    with tempfile.TemporaryDirectory() as tmp:
+        dossier_archive.ARCHIVE_PATH = os.path.join(tmp, "archive.sqlite")
+        doc_topic = {}
+        checkpoints = sorted({args.docs // 10, args.docs // 2, args.docs})
+        t0 = last = time.perf_counter()
+        done = 0
+        print(f"{args.docs} dossiers, {args.topics} themes, ~{DOC_WORDS} words each")
+        for i in range(args.docs):
+            topic = int(rng.integers(args.topics))
+            doc_id = dossier_archive.add(f"T{topic:03d}", make_doc(rng, words, topic, topics), "BUY",
+                                         f"verdict {i}", run_at=1.7e9 + i * 3600)
+            doc_topic[doc_id] = topic
+            if i + 1 in checkpoints:
+                now = time.perf_counter()
+                print(f"  add  @{i + 1:>6}   {(now - last) / (i + 1 - done) * 1e3:6.2f} ms/dossier")
+                last, done = now, i + 1
+        print(f"  add  total    {time.perf_counter() - t0:8.1f} s")
+
+        latencies, on_topic = [], 0
+        for _ in range(args.queries):
+            topic = int(rng.integers(args.topics))
+            query = make_doc(rng, words, topic, topics)
+            q0 = time.perf_counter()
+            hits = dossier_archive.recall(query, args.k)
+            latencies.append(time.perf_counter() - q0)
+            on_topic += sum(doc_topic[h["id"]] == topic for h in hits)
+        lat = np.array(latencies) * 1e3
+        print(f"  recall k={args.k}    p50 {np.percentile(lat, 50):6.1f} ms, p95 {np.percentile(lat, 95):6.1f} ms, "
+              f"{on_topic / (args.queries * args.k):.0%} on theme (chance {1 / args.topics:.0%})")
+
+        q0 = time.perf_counter()
+        dossier_archive.history("T001")
+        print(f"  history       {(time.perf_counter() - q0) * 1e3:8.2f} ms")
+        s = dossier_archive.stats()
+        size = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp))
+        print(f"  on disk       {size / 2**20:8.1f} MB ({s['compressed_bytes'] / 2**20:.1f} MB compressed dossiers, "
+              f"{s['terms']} terms, {s['postings']} postings)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Signal backtest over a universe of stored candles: one batched pass vs one symbol at a time.
+
+Usage: PYTHONPATH=. python benchmarks/bench_backtest.py [--symbols 500] [--years 20]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tools import backtest, candle_store, screener
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--years", type=int, default=20)
+    args = parser.parse_args()
+
+    bars = args.years * backtest.BARS_PER_YEAR
+    rng = np.random.default_rng(0)
+    t = 1_000_000_000 + 86400 * np.arange(bars, dtype=np.int64)
+    with tempfile.TemporaryDirectory() as store:
+        tickers = [f"S{i:04d}" for i in range(args.symbols)]
+        for sym in tickers:
+            c = np.round(100 * np.cumprod(1 + rng.normal(0, 0.02, bars)), 2)
+            candle_store.append(sym, {"t": t, "o": c, "h": c * 1.01, "l": c * 0.99, "c": c, "v": c}, store)
+
+        t0 = time.perf_counter()
+        symbols, arrays = screener.load_universe(tickers, days=bars, store_dir=store)
+        t1 = time.perf_counter()
+        result = backtest.run(arrays)
+        blocks = [backtest.summarize(result, i) for i in range(len(symbols))]
+        t2 = time.perf_counter()
+        for i in range(min(50, len(symbols))):
+            backtest.run({key: arrays[key][i] for key in ("c", "h", "l")})
+        t3 = time.perf_counter()
+
+    per_symbol = (t3 - t2) / min(50, len(symbols))
+    print(f"{len(symbols)} symbols x {bars} bars ({args.years}y), {len(backtest.SIGNALS)} signals x {len(backtest.HORIZONS)} horizons")
+    print(f"  load           {(t1 - t0) * 1e3:8.0f} ms")
+    print(f"  batched run    {(t2 - t1) * 1e3:8.0f} ms (incl. {len(blocks)} market.json blocks)")
+    print(f"  per symbol     {per_symbol * len(symbols) * 1e3:8.0f} ms (est. from 50 single-symbol runs)")
+    pooled = backtest.pooled(result, 20)["golden_cross"]
+    print(f"  golden_cross 20d: {pooled[0]} events, hit rate {pooled[1]:.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Prompt tokens per agent: verbatim `cat prompt inputs` vs tools/context_builder.py.
+
+Builds one synthetic run workspace (data JSON from the get_data_finnhub
+builders over the stub server's news feed, analyst reports the size and
+shape gemini writes: tables, repeated data recaps and disclaimers) and
+counts the stdin of every agent node in the pipeline both ways.
+
+Usage: PYTHONPATH=. python benchmarks/bench_context.py [--report-paragraphs 40]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from benchmarks.stub_server import make_news
+from tools import agency_manager, context_builder, sentiment, get_data_finnhub as gdf
+
+TICKER = "AAA"
+DISCLAIMER = "*免责声明: 本报告由 AI 分析师自动生成, 不构成投资建议。Not investment advice.*"
+
+def write_data(data_dir):
+    rng = random.Random(0)
+    closes = [100 + rng.gauss(0, 2) for _ in range(250)]
+    market = {"symbol": TICKER, "current_price": closes[-1], "source": "Finnhub + Stooq",
+              "indicators": {"RSI_14": 61.2345678, "SMA_50": 101.98765, "SMA_200": 97.1234, "MACD": None,
+                             "Bollinger_Position": "Upper"},
+              "raw_candles_last_5": closes[-5:]}
+    fund = gdf.build_fund_data({"peTTM": 35.123456, "pegTTM": None, "pbAnnual": 12.3456, "psTTM": 8.9,
+                                "52WeekHigh": 120.5, "52WeekLow": 80.25, "marketCapitalization": 2.5e6, "beta": 1.1})
+    news = gdf.build_news_data(TICKER, make_news(TICKER, count=40))
+    for name, value in (("market.json", market), ("financials.json", fund), ("news.json", news)):
+        with open(os.path.join(data_dir, name), "w") as f:
+            json.dump(value, f, indent=2)
+
+def fake_report(title, paragraphs, rng):
+    recap = "| Metric | Value |\n|---|---|\n| Price | $101.23 |\n| RSI | 61.2 |\n| PE | 35.1 |"
+    body = [f"### {title}", recap]
+    for i in range(paragraphs):
+        body.append(" ".join(rng.choice(["momentum", "valuation", "margin", "guidance", "demand",
+                                         "support", "resistance", "risk", "catalyst", "cycle"])
+                             for _ in range(45)))
+    body += [recap, DISCLAIMER]
+    return "\n\n\n".join(body) + "\n"
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--report-paragraphs", type=int, default=40, help="Paragraphs per generated report")
+    args = parser.parse_args()
+
+    sentiment.DISABLED = True
+    rng = random.Random(1)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir, reports_dir = os.path.join(tmp, "data"), os.path.join(tmp, "reports")
+        os.makedirs(data_dir)
+        os.makedirs(reports_dir)
+        write_data(data_dir)
+        nodes = agency_manager.build_graph(TICKER, data_dir, reports_dir)
+        for node in nodes:
+            if node.kind == "agent":
+                with open(node.outputs[0], "w") as f:
+                    f.write(fake_report(node.label, args.report_paragraphs, rng))
+        for node in nodes:
+            if node.kind == "concat":
+                agency_manager.run_node(node, None)
+        os.chdir(ROOT)   # prompts are read from .gemini/prompts
+        t0 = time.perf_counter()
+        for node in nodes:
+            if node.kind != "agent":
+                continue
+            raw = context_builder.count_tokens(agency_manager._read(node.prompt) + "\n" +
+                                               "".join(agency_manager._read(i) for i in node.inputs))
+            agency_manager.build_agent_input(node)
+            rows.append((node.name, raw, node.tokens["final"]))
+        build_secs = time.perf_counter() - t0
+
+    print(f"{'agent':<8}{'phase':<12}{'verbatim':>10}{'budgeted':>10}{'budget':>8}")
+    for name, raw, final in rows:
+        print(f"{name:<8}{agency_manager.PHASES[name]:<12}{raw:>10}{final:>10}"
+              f"{context_builder.BUDGETS.get(name, context_builder.DEFAULT_BUDGET):>8}")
+    raw_total = sum(r for _, r, _ in rows)
+    final_total = sum(f for _, _, f in rows)
+    print(f"total prompt tokens: {raw_total} -> {final_total} (-{100 * (1 - final_total / raw_total):.0f}%), "
+          f"built in {build_secs * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
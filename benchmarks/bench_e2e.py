@@ -0,0 +1,278 @@
+"""Offline end-to-end benchmark: the real entry points against local stubs.
+
+Finnhub, Stooq (history and quotes), Finviz and Google News RSS are served
+by benchmarks/stub_server.py; Yahoo and DuckDuckGo are sent to a dead proxy
+so they fail at once and the fallbacks answer, as they would when blocked.
+A fake `gemini` (benchmarks/fake_gemini.py) is put first on PATH with a
+configurable latency and report size. Every run gets fresh stores (response
+cache, candle/news stores, agent cache, limiter and fallback state), so
+nothing is warm unless --state warm.
+
+Per scenario it reports the median wall time, the peak RSS of the process
+tree (largest single process), tickers/hour and a per-phase breakdown taken
+from the run's trace (tools/tracing.py). Results are appended to
+agency/store/bench_e2e.jsonl and compared with the last run of the same
+configuration; --history lists earlier runs.
+
+Usage: PYTHONPATH=. python benchmarks/bench_e2e.py [--scenarios all] [--tickers AAA,BBB]
+       [--runs 1] [--parallel 1] [--latency 0.05] [--gemini-latency 1.0] [--gemini-words 400]
+       [--state cold|warm] [--history]
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from benchmarks.stub_server import start_stub_server, stub_env
+from tools import tracing
+
+HISTORY_PATH = os.environ.get("AGENCY_BENCH_HISTORY", os.path.join(ROOT, "agency/store/bench_e2e.jsonl"))
+DEAD_PROXY = "http://127.0.0.1:9"
+# Span categories that make up the per-phase breakdown.
+PHASE_CATS = ("command", "phase", "tool", "step", "perceived")
+
+# name -> argv builder (ticker, run_dir)
+SCENARIOS = {
+    "get_market": lambda t, d: [sys.executable, "tools/get_market.py", t],
+    "get_financials": lambda t, d: [sys.executable, "tools/get_financials.py", t],
+    "get_news": lambda t, d: [sys.executable, "tools/get_news.py", t],
+    "get_data_finnhub": lambda t, d: [sys.executable, "tools/get_data_finnhub.py", t, "--out", os.path.join(d, "data")],
+    "orchestrator.py": lambda t, d: [sys.executable, "tools/orchestrator.py", t, "--mode", "full",
+                                     "--exec", "inprocess", "--trace", os.path.join(d, "trace")],
+    "orchestrator.sh": lambda t, d: ["bash", "orchestrator.sh", t, "--trace-dir", os.path.join(d, "trace")],
+}
+
+# -------------------------------------------------------------------------
+# Environment
+# -------------------------------------------------------------------------
+def fake_gemini_bin(tmp):
+    """Directory holding a `gemini` executable that runs fake_gemini.py."""
+    bin_dir = os.path.join(tmp, "bin")
+    os.makedirs(bin_dir, exist_ok=True)
+    path = os.path.join(bin_dir, "gemini")
+    with open(path, "w") as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.join(ROOT, "benchmarks", "fake_gemini.py")}" "$@"\n')
+    os.chmod(path, 0o755)
+    return bin_dir
+
+def store_env(state_dir):
+    """Every local store and cache redirected into state_dir."""
+    s = lambda name: os.path.join(state_dir, name)
+    return {
+        "AGENCY_HTTP_CACHE": s("http_cache.sqlite"),
+        "AGENCY_RATE_DIR": s("ratelimit"),
+        "AGENCY_AGENT_CACHE_DIR": s("agent_cache"),
+        "AGENCY_EXECUTOR_DIR": s("executor"),
+        "AGENCY_ARCHIVE_DB": s("archive.sqlite"),
+        "AGENCY_CANDLE_DIR": s("candles"),
+        "AGENCY_NEWS_DIR": s("news"),
+        "AGENCY_INDICATOR_DIR": s("indicators"),
+        "AGENCY_FALLBACK_STATE": s("fallback_health.json"),
+        "AGENCY_SENTIMENT_DB": s("sentiment.sqlite"),
+        "AGENCY_TRACE_HISTOGRAM": s("trace_histogram.json"),
+        "AGENCY_DAEMON_SOCKET": s("daemon.sock"),
+    }
+
+def base_env(base_url, bin_dir, args):
+    env = dict(os.environ, PYTHONPATH=ROOT, PATH=f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}")
+    env.update(stub_env(base_url))
+    for key in ("HTTPS_PROXY", "https_proxy", "HTTP_PROXY", "http_proxy", "ALL_PROXY", "all_proxy"):
+        env[key] = DEAD_PROXY
+    env["NO_PROXY"] = env["no_proxy"] = "127.0.0.1,localhost"
+    env.update(FAKE_GEMINI_LATENCY=str(args.gemini_latency), FAKE_GEMINI_WORDS=str(args.gemini_words))
+    if args.stream:
+        env.update(FAKE_GEMINI_STREAM="1", AGENCY_STREAM="1")
+    return env
+
+# -------------------------------------------------------------------------
+# Runs
+# -------------------------------------------------------------------------
+def run_once(scenario, ticker, env, run_dir):
+    """One process tree, output to files. Returns a sample dict."""
+    os.makedirs(os.path.join(run_dir, "data"), exist_ok=True)
+    trace_dir = os.path.join(run_dir, "trace")
+    env = dict(env, AGENCY_TRACE_DIR=trace_dir)
+    out_path, err_path = os.path.join(run_dir, "stdout.txt"), os.path.join(run_dir, "stderr.txt")
+    with open(out_path, "w") as out, open(err_path, "w") as err:
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(SCENARIOS[scenario](ticker, run_dir), cwd=ROOT, env=env, stdout=out, stderr=err)
+        # wait4: the child's rusage, whose maxrss covers every descendant it reaped
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - t0
+    proc.returncode = os.waitstatus_to_exitcode(status)
+
+    with open(out_path, "r") as f:
+        stdout = f.read()
+    workspace = re.search(r"Workspace: (\S+)", stdout)
+    if workspace:
+        shutil.rmtree(os.path.join(ROOT, workspace.group(1)), ignore_errors=True)
+
+    events = tracing.load_events(trace_dir)
+    phases = {}
+    for cat in PHASE_CATS:
+        for name, _, secs in tracing.summarize(events, cat):
+            phases[f"{cat}/{name}"] = round(secs, 3)
+    http = tracing.summarize(events, "http")
+    sample = {"wall_s": wall, "rss_mb": usage.ru_maxrss / 1024, "ok": proc.returncode == 0, "phases": phases,
+              "http_calls": sum(n for _, n, _ in http), "http_s": sum(s for _, _, s in http)}
+    if not sample["ok"]:
+        with open(err_path, "r") as f:
+            sample["error"] = f.read()[-500:]
+    return sample
+
+def run_scenario(scenario, tickers, env, tmp, args):
+    jobs = [(ticker, i) for i in range(args.runs) for ticker in tickers]
+    shared_state = os.path.join(tmp, "state", scenario)
+
+    def job(item):
+        ticker, i = item
+        run_dir = os.path.join(tmp, "runs", scenario.replace("/", "_"), f"{ticker}-{i}")
+        state = shared_state if args.state == "warm" else os.path.join(run_dir, "state")
+        return run_once(scenario, ticker, dict(env, **store_env(state)), run_dir)
+
+    if args.state == "warm":   # one untimed pass fills the shared stores
+        for ticker in tickers:
+            run_once(scenario, ticker, dict(env, **store_env(shared_state)),
+                     os.path.join(tmp, "runs", "warmup", scenario.replace("/", "_"), ticker))
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.parallel) as pool:
+        samples = list(pool.map(job, jobs))
+    elapsed = time.perf_counter() - t0
+
+    names = sorted({k for s in samples for k in s["phases"]})
+    return {
+        "runs": len(samples),
+        "ok": sum(s["ok"] for s in samples),
+        "wall_s": round(statistics.median(s["wall_s"] for s in samples), 3),
+        "wall_max_s": round(max(s["wall_s"] for s in samples), 3),
+        "rss_mb": round(max(s["rss_mb"] for s in samples), 1),
+        "tickers_per_hour": round(len(samples) * 3600 / elapsed, 1),
+        "http_calls": round(statistics.mean(s["http_calls"] for s in samples), 1),
+        "http_s": round(statistics.median(s["http_s"] for s in samples), 3),
+        "phases": {n: round(statistics.median(s["phases"].get(n, 0.0) for s in samples), 3) for n in names},
+        "errors": [s["error"] for s in samples if not s["ok"]][:2],
+    }
+
+# -------------------------------------------------------------------------
+# History
+# -------------------------------------------------------------------------
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+def load_history(path=HISTORY_PATH):
+    records = []
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    records.append(json.loads(line))
+    except FileNotFoundError:
+        pass
+    return records
+
+def append_history(record, path=HISTORY_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+def previous(records, config, scenario):
+    """The latest earlier record with the same config that ran `scenario`."""
+    for record in reversed(records):
+        if record["config"] == config and scenario in record["results"]:
+            return record
+    return None
+
+def print_history(records):
+    scenarios = sorted({s for r in records for s in r["results"]})
+    for scenario in scenarios:
+        print(f"\n{scenario}")
+        print(f"{'when':<20}{'commit':<10}{'wall s':>9}{'RSS MB':>9}{'tickers/h':>11}  config")
+        for r in records:
+            res = r["results"].get(scenario)
+            if res:
+                cfg = r["config"]
+                print(f"{r['ts']:<20}{r.get('commit') or '-':<10}{res['wall_s']:>9.2f}{res['rss_mb']:>9.0f}"
+                      f"{res['tickers_per_hour']:>11.0f}  gemini {cfg['gemini_latency']}s/{cfg['gemini_words']}w, "
+                      f"{cfg['state']}, x{cfg['parallel']}")
+
+# -------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark against stub upstreams")
+    parser.add_argument("--scenarios", default="all", help=f"Comma list of {', '.join(SCENARIOS)} (or all)")
+    parser.add_argument("--tickers", default="AAA,BBB", help="Comma-separated tickers (the stubs serve any symbol)")
+    parser.add_argument("--runs", type=int, default=1, help="Runs per ticker")
+    parser.add_argument("--parallel", type=int, default=1, help="Runs in flight at once")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub upstream seconds per request")
+    parser.add_argument("--gemini-latency", type=float, default=1.0, help="Fake gemini seconds per call")
+    parser.add_argument("--gemini-words", type=int, default=400, help="Fake gemini report size")
+    parser.add_argument("--stream", action="store_true",
+                        help="Fake gemini streams its output and orchestrator.sh streams the dossier")
+    parser.add_argument("--state", choices=["cold", "warm"], default="cold",
+                        help="cold: fresh stores per run; warm: stores filled by an untimed first pass")
+    parser.add_argument("--no-save", action="store_true", help="Don't append the results to the history")
+    parser.add_argument("--history", action="store_true", help="Print stored results and exit")
+    args = parser.parse_args()
+
+    records = load_history()
+    if args.history:
+        print_history(records)
+        return
+    scenarios = list(SCENARIOS) if args.scenarios == "all" else args.scenarios.split(",")
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
+
+    config = {"tickers": tickers, "runs": args.runs, "parallel": args.parallel, "latency": args.latency,
+              "gemini_latency": args.gemini_latency, "gemini_words": args.gemini_words, "state": args.state}
+    if args.stream:
+        config["stream"] = True
+    server, base_url = start_stub_server(args.latency)
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = base_env(base_url, fake_gemini_bin(tmp), args)
+            for scenario in scenarios:
+                print(f"⏱️  {scenario} ({len(tickers)} tickers x {args.runs})...", file=sys.stderr)
+                results[scenario] = run_scenario(scenario, tickers, env, tmp, args)
+    finally:
+        server.shutdown()
+
+    print(f"{'scenario':<18}{'ok':>6}{'wall s':>9}{'max s':>8}{'RSS MB':>8}{'tickers/h':>11}"
+          f"{'http':>6}{'http s':>8}{'vs last':>9}")
+    for scenario, res in results.items():
+        prev = previous(records, config, scenario)
+        delta = f"{100 * (res['wall_s'] / prev['results'][scenario]['wall_s'] - 1):+.0f}%" if prev else "-"
+        print(f"{scenario:<18}{res['ok']:>3}/{res['runs']:<2}{res['wall_s']:>9.2f}{res['wall_max_s']:>8.2f}"
+              f"{res['rss_mb']:>8.0f}{res['tickers_per_hour']:>11.0f}{res['http_calls']:>6.0f}"
+              f"{res['http_s']:>8.2f}{delta:>9}")
+    for scenario, res in results.items():
+        if res["phases"]:
+            print(f"\n{scenario} phases (median s): " +
+                  ", ".join(f"{name} {secs:.2f}" for name, secs in res["phases"].items()))
+        for error in res["errors"]:
+            print(f"\n⚠️ {scenario} failed:\n{error}", file=sys.stderr)
+
+    if not args.no_save:
+        append_history({"ts": time.strftime("%Y-%m-%d %H:%M:%S"), "commit": git_commit(),
+                        "config": config, "results": results})
+        print(f"\n💾 Saved to {HISTORY_PATH}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Agent executor under load: many tickers' pipelines against a quota-limited model.
+
+The simulated model serves `--capacity` calls at full speed, slows every
+call down as more run at once, and answers 429 RESOURCE_EXHAUSTED beyond
+`--quota` concurrent calls. Each ticker runs the pipeline's call pattern
+(4 analysts, bull + bear, debate + risk, trader). "uncapped" launches every
+call as soon as it is ready and retries quota errors after 1s, like the old
+backgrounded `gemini &` calls; "executor" goes through tools/agent_executor.py.
+
+Usage: PYTHONPATH=. python benchmarks/bench_executor.py [--tickers 4,16,32] [--latency 0.2]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tools import agent_executor
+
+STAGES = [("tech", "fund", "sent", "macro"), ("bull", "bear"), ("signal", "risk"), ("plan",)]
+
+class Model:
+    def __init__(self, latency, capacity, quota):
+        self.latency, self.capacity, self.quota = latency, capacity, quota
+        self.active = 0
+        self.lock = threading.Lock()
+        self.errors = 0
+
+    def __call__(self):
+        with self.lock:
+            self.active += 1
+            active = self.active
+        try:
+            if active > self.quota:
+                time.sleep(self.latency / 10)
+                with self.lock:
+                    self.errors += 1
+                raise RuntimeError("gemini exited 1: 429 RESOURCE_EXHAUSTED: Quota exceeded")
+            time.sleep(self.latency * max(1.0, active / self.capacity))
+            return "report"
+        finally:
+            with self.lock:
+                self.active -= 1
+
+def uncapped_call(model, agent, timing):
+    timing.update(queue_wait=0.0, model_time=0.0)
+    while True:
+        t0 = time.time()
+        try:
+            return model()
+        except RuntimeError:
+            time.sleep(1.0)
+        finally:
+            timing["model_time"] += time.time() - t0
+
+def executor_call(model, agent, timing):
+    return agent_executor.call(model, agent, timing=timing, retries=100)
+
+def run_ticker(call, model, pool, stats):
+    t0 = time.time()
+    for stage in STAGES:
+        timings = [{} for _ in stage]
+        list(pool.map(lambda a_t: call(model, a_t[0], a_t[1]), zip(stage, timings)))
+        for t in timings:
+            stats["queue_wait"] += t["queue_wait"]
+            stats["model_time"] += t["model_time"]
+    stats["latency"].append(time.time() - t0)
+
+def run(mode, tickers, args):
+    model = Model(args.latency, args.capacity, args.quota)
+    stats = {"queue_wait": 0.0, "model_time": 0.0, "latency": []}
+    call = executor_call if mode == "executor" else uncapped_call
+    with tempfile.TemporaryDirectory() as tmp:
+        agent_executor.STATE_DIR = tmp
+        with ThreadPoolExecutor(max_workers=tickers * 4) as agents, ThreadPoolExecutor(max_workers=tickers) as runs:
+            t0 = time.time()
+            list(runs.map(lambda _: run_ticker(call, model, agents, stats), range(tickers)))
+            wall = time.time() - t0
+    calls = tickers * sum(len(s) for s in STAGES)
+    return wall, calls, model.errors, stats
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickers", default="4,16,32", help="Concurrent tickers per load level")
+    parser.add_argument("--latency", type=float, default=0.2, help="Model seconds per call when idle")
+    parser.add_argument("--capacity", type=int, default=4, help="Calls the model serves without slowing down")
+    parser.add_argument("--quota", type=int, default=8, help="Concurrent calls before quota errors")
+    args = parser.parse_args()
+
+    agent_executor.MAX_CONCURRENCY = args.capacity
+    agent_executor.DISABLED = False
+    agent_executor.POLL = 0.01
+    agent_executor.BACKOFF_DEFAULT = args.latency
+    print(f"model: {args.latency}s/call, full speed up to {args.capacity} concurrent, 429 above {args.quota}")
+    print(f"{'tickers':>8}{'mode':>10}{'wall':>8}{'tickers/min':>13}{'p50 ticker':>12}{'429s':>7}"
+          f"{'queue wait':>12}{'model time':>12}")
+    for n in (int(x) for x in args.tickers.split(",")):
+        for mode in ("uncapped", "executor"):
+            wall, calls, errors, stats = run(mode, n, args)
+            lat = sorted(stats["latency"])[len(stats["latency"]) // 2]
+            print(f"{n:>8}{mode:>10}{wall:>7.1f}s{n * 60 / wall:>13.1f}{lat:>11.1f}s{errors:>7}"
+                  f"{stats['queue_wait'] / calls:>11.2f}s{stats['model_time'] / calls:>11.2f}s")
+
+if __name__ == "__main__":
+    main()
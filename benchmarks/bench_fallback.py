@@ -0,0 +1,90 @@
+"""Fallback chains: old serial try/except walk vs tools/fallback.py race.
+
+Three simulated news sources with the shapes seen in practice:
+  ddg        fast when it answers, but throttled a third of the time
+             (the limiter's Retry-After wait, then an error)
+  yf         steady but slow
+  google     fast and reliable
+Latencies are scaled by --scale so the run stays short. The race starts
+from an empty health file, so its first calls pay for learning the ranking.
+
+Usage: PYTHONPATH=. python benchmarks/bench_fallback.py [--calls 60] [--scale 0.1]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from tools import fallback
+
+def make_sources(scale, seed=0):
+    rng = random.Random(seed)
+
+    def ddg():
+        if rng.random() < 1 / 3:
+            time.sleep(5.0 * scale)
+            raise RuntimeError("429 Too Many Requests")
+        time.sleep(rng.uniform(0.3, 0.6) * scale)
+        return ["ddg"]
+
+    def yf():
+        time.sleep(rng.uniform(1.5, 2.5) * scale)
+        return ["yf"]
+
+    def google():
+        time.sleep(rng.uniform(0.2, 0.4) * scale)
+        return ["google"]
+
+    return [("ddg", ddg), ("yf", yf), ("google", google)]
+
+def serial(sources):
+    errors = []
+    for name, fn in sources:
+        try:
+            return name, fn()
+        except Exception as e:
+            errors.append(e)
+    raise RuntimeError(errors)
+
+def p95(samples):
+    return statistics.quantiles(samples, n=20)[-1]
+
+def timed_calls(fn, calls):
+    times = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=60)
+    parser.add_argument("--scale", type=float, default=0.1, help="Multiplier on simulated latencies")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fallback.STATE_PATH = os.path.join(tmp, "health.json")
+        chain = make_sources(args.scale)
+        old = timed_calls(lambda: serial(chain), args.calls)
+        sources = make_sources(args.scale)
+        new = timed_calls(lambda: fallback.race("news", sources, hedge_delay=1.0 * args.scale, valid=bool),
+                          args.calls)
+        best = timed_calls(lambda: dict(sources)["google"](), args.calls)
+        ranking = fallback.rank("news", [name for name, _ in sources])
+
+    print(f"{args.calls} calls, latencies x{args.scale}")
+    print(f"{'chain':<14}{'p50 (ms)':>10}{'p95 (ms)':>10}")
+    for label, times in (("serial", old), ("race", new), ("best source", best)):
+        print(f"{label:<14}{statistics.median(times) * 1000:>10.0f}{p95(times) * 1000:>10.0f}")
+    print(f"learned order: {' > '.join(ranking)}")
+    print(f"p95 speedup: {p95(old) / p95(new):.1f}x")
+
+if __name__ == "__main__":
+    main()
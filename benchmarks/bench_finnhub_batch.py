@@ -0,0 +1,67 @@
+"""Tickers/sec: sequential get_data_finnhub.py runs vs tools/finnhub_batch.py.
+
+Usage: PYTHONPATH=. python benchmarks/bench_finnhub_batch.py [--tickers 50] [--latency 0.05]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from benchmarks.stub_server import start_stub_server
+
+def bench_env(base_url):
+    env = os.environ.copy()
+    env.update({
+        "PYTHONPATH": ROOT,
+        "FINNHUB_API_KEY": "stub",
+        "FINNHUB_BASE_URL": f"{base_url}/api/v1",
+        "STOOQ_BASE_URL": base_url,
+        # Measure fetching, not the response cache
+        "AGENCY_HTTP_CACHE_DISABLE": "1",
+        # ... nor the shared cross-process rate limiter
+        "AGENCY_RATE_LIMIT_DISABLE": "1",
+    })
+    return env
+
+def run_sequential(tickers, env, workdir):
+    t0 = time.time()
+    for t in tickers:
+        subprocess.run([sys.executable, os.path.join(ROOT, "tools/get_data_finnhub.py"), t],
+                       cwd=workdir, env=env, check=True, capture_output=True)
+    return time.time() - t0
+
+def run_batch(tickers, env, workdir):
+    t0 = time.time()
+    subprocess.run([sys.executable, os.path.join(ROOT, "tools/finnhub_batch.py"), *tickers,
+                    "--out", os.path.join(workdir, "batch"), "--finnhub-rate", "0",
+                    "--finnhub-concurrency", "32", "--stooq-concurrency", "32"],
+                   cwd=workdir, env=env, check=True, capture_output=True)
+    return time.time() - t0
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickers", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub per-request latency (s)")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(latency=args.latency)
+    env = bench_env(base_url)
+    tickers = [f"T{i:03d}" for i in range(args.tickers)]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        seq = run_sequential(tickers, env, workdir)
+        batch = run_batch(tickers, env, workdir)
+    server.shutdown()
+
+    print(f"{'mode':<12}{'seconds':>10}{'tickers/sec':>14}")
+    print(f"{'sequential':<12}{seq:>10.2f}{len(tickers) / seq:>14.2f}")
+    print(f"{'batch':<12}{batch:>10.2f}{len(tickers) / batch:>14.2f}")
+    print(f"speedup: {seq / batch:.1f}x")
+
+if __name__ == "__main__":
+    main()
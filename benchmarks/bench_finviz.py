@@ -0,0 +1,74 @@
+"""Finviz snapshot parsing: the old seven lazy DOTALL regexes vs tools/finviz.py.
+
+Pages are the saved quote pages in tests/fixtures/finviz, repeated to
+--pages. "regex" is the old data_fetcher loop (7 metrics per page);
+"parser" is parse_snapshot (every metric, ~72 per page); "batch" is
+parse_many over processes.
+
+Usage: PYTHONPATH=. python benchmarks/bench_finviz.py [--pages 500] [--workers 4]
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from tools import finviz
+
+OLD_PATTERNS = {
+    "P/E": r">P/E</td>.*?<b>([\d\.]+)</b>",
+    "Fwd P/E": r">Forward P/E</td>.*?<b>([\d\.]+)</b>",
+    "PEG": r">PEG</td>.*?<b>([\d\.]+)</b>",
+    "RSI": r">RSI \(14\)</td>.*?<b>([\d\.]+)</b>",
+    "SMA50": r">SMA50</td>.*?<b>([-\d\.]+)%</b>",
+    "SMA200": r">SMA200</td>.*?<b>([-\d\.]+)%</b>",
+    "Price": r">Price</td>.*?<b>([\d\.]+)</b>",
+}
+
+def old_parse(html):
+    data = {}
+    for key, pat in OLD_PATTERNS.items():
+        m = re.search(pat, html, re.DOTALL)
+        if m:
+            try:
+                data[key] = float(m.group(1))
+            except ValueError:
+                data[key] = m.group(1)
+    return data
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - t0, out
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "tests", "fixtures", "finviz", "*.html"))):
+        with open(path, "r") as f:
+            fixtures.append(f.read())
+    pages = [fixtures[i % len(fixtures)] for i in range(args.pages)]
+    size = sum(len(p) for p in fixtures) / len(fixtures)
+
+    t_old, old = timed(lambda: [old_parse(p) for p in pages])
+    t_new, new = timed(lambda: [finviz.parse_snapshot(p) for p in pages])
+    t_batch, batch = timed(lambda: finviz.parse_many(pages, workers=args.workers))
+    assert batch == new
+
+    print(f"{args.pages} pages (~{size / 1024:.0f} KB each, {len(fixtures)} fixtures)")
+    print(f"{'mode':<10}{'seconds':>10}{'pages/sec':>12}{'metrics/page':>14}")
+    for label, secs, out in (("regex", t_old, old), ("parser", t_new, new),
+                             (f"batch x{args.workers}", t_batch, batch)):
+        print(f"{label:<10}{secs:>10.3f}{args.pages / secs:>12.0f}{sum(map(len, out)) / len(out):>14.0f}")
+    print(f"speedup: {t_old / t_new:.1f}x single, {t_old / t_batch:.1f}x batch")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Back-to-back tool runs on one ticker: response cache off vs on.
+
+Runs get_data_finnhub.py --runs times against the stub server (as /agent:tech,
+/agent:fund and /agency would) and reports wall time and upstream requests.
+
+Usage: PYTHONPATH=. python benchmarks/bench_http_cache.py [--runs 3] [--latency 0.2]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from benchmarks.stub_server import StubHandler, start_stub_server
+from benchmarks.bench_finnhub_batch import bench_env
+
+def run(env, runs, workdir):
+    StubHandler.requests = 0
+    t0 = time.time()
+    for _ in range(runs):
+        subprocess.run([sys.executable, os.path.join(ROOT, "tools/get_data_finnhub.py"), "AAA"],
+                       cwd=workdir, env=env, check=True, capture_output=True)
+    return time.time() - t0, StubHandler.requests
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub per-request latency (s)")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(latency=args.latency)
+    results = {}
+    for label, disabled in (("no cache", "1"), ("cache", "")):
+        env = dict(bench_env(base_url), AGENCY_HTTP_CACHE_DISABLE=disabled)
+        with tempfile.TemporaryDirectory() as workdir:
+            os.makedirs(os.path.join(workdir, "agency", "data"))
+            results[label] = run(env, args.runs, workdir)
+    server.shutdown()
+
+    print(f"{args.runs} back-to-back runs, {args.latency * 1e3:.0f} ms upstream latency")
+    print(f"{'mode':<10}{'seconds':>10}{'requests':>10}")
+    for label, (secs, reqs) in results.items():
+        print(f"{label:<10}{secs:>10.2f}{reqs:>10}")
+    print(f"speedup: {results['no cache'][0] / results['cache'][0]:.1f}x")
+
+if __name__ == "__main__":
+    main()
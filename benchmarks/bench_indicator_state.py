@@ -0,0 +1,60 @@
+"""Per-update cost: incremental IndicatorState vs a full calculate_technicals recompute.
+
+Usage: PYTHONPATH=. python benchmarks/bench_indicator_state.py [--symbols 2000] [--bars 1500]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tools import indicator_state
+from tools.get_data_finnhub import calculate_technicals
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--bars", type=int, default=1500)
+    parser.add_argument("--full-sample", type=int, default=100, help="Symbols timed for the full recompute")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    closes = np.round(100 * np.cumprod(1 + rng.normal(0, 0.02, (args.symbols, args.bars + 1)), axis=1), 2)
+    t = 1_600_000_000 + 86400 * np.arange(args.bars + 1, dtype=np.int64)
+
+    # Bootstrap states on all but the last two bars.
+    states = [indicator_state.bootstrap(t[:-1], row[:-1]) for row in closes]
+
+    t0 = time.perf_counter()
+    for st, row in zip(states, closes):
+        st.update(t[-2], row[-2])
+        st.technicals(row[-1])
+    incr = (time.perf_counter() - t0) / args.symbols
+
+    with tempfile.TemporaryDirectory() as d:
+        t0 = time.perf_counter()
+        for i, st in enumerate(states):
+            indicator_state.save_state(f"S{i}", st, d)
+            indicator_state.load_state(f"S{i}", d)
+        persist = (time.perf_counter() - t0) / args.symbols
+
+    sample = closes[:args.full_sample]
+    t0 = time.perf_counter()
+    for row in sample:
+        cols = {"t": t, "o": row, "h": row, "l": row, "c": row, "v": row}
+        calculate_technicals(cols)
+    full = (time.perf_counter() - t0) / len(sample)
+
+    print(f"{args.symbols} symbols x {args.bars} bars")
+    print(f"{'path':<28}{'us/symbol':>12}{'total (s)':>12}")
+    print(f"{'full recompute':<28}{full * 1e6:>12.1f}{full * args.symbols:>12.2f}")
+    print(f"{'incremental update':<28}{incr * 1e6:>12.1f}{incr * args.symbols:>12.2f}")
+    print(f"{'  + state save/load':<28}{(incr + persist) * 1e6:>12.1f}{(incr + persist) * args.symbols:>12.2f}")
+    print(f"speedup (in-memory): {full / incr:.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""NumPy indicator kernels vs the pandas implementation they replaced.
+
+Reports per-call latency (single series and a symbols x bars batch), peak
+traced memory, and cold import time of the fetcher.
+
+Usage: PYTHONPATH=. python benchmarks/bench_indicators.py [--symbols 500] [--bars 1500]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tools import indicators
+from tools.get_data_finnhub import calculate_technicals
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+def pandas_technicals(cols):
+    """The pandas calculate_technicals path (frame, sort, grown columns)."""
+    df = pd.DataFrame({col: np.asarray(arr) for col, arr in cols.items()})
+    df["date"] = pd.to_datetime(df["t"], unit="s")
+    df = df.sort_values("date")
+    close = df["c"]
+    df["SMA_50"] = close.rolling(window=50).mean()
+    df["SMA_200"] = close.rolling(window=200).mean()
+    delta = close.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    df["RSI_14"] = 100 - (100 / (1 + gain / loss))
+    df["BB_Mid"] = close.rolling(window=20).mean()
+    df["BB_Std"] = close.rolling(window=20).std()
+    df["BB_Upper"] = df["BB_Mid"] + (df["BB_Std"] * 2)
+    df["BB_Lower"] = df["BB_Mid"] - (df["BB_Std"] * 2)
+    df["MACD_Line"] = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    df["MACD_Signal"] = df["MACD_Line"].ewm(span=9, adjust=False).mean()
+    df["MACD_Hist"] = df["MACD_Line"] - df["MACD_Signal"]
+    return df.iloc[-1]
+
+def timed(fn, repeat):
+    fn()  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+def peak_mib(fn):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2**20
+
+def import_seconds(stmt, repeat=5):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", stmt], check=True, env=env, cwd=ROOT)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--bars", type=int, default=1500)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    batch = np.round(100 * np.cumprod(1 + rng.normal(0, 0.02, (args.symbols, args.bars)), axis=1), 2)
+    t = 1_600_000_000 + 86400 * np.arange(args.bars, dtype=np.int64)
+    ohlcv = [{"t": t, "o": row, "h": row, "l": row, "c": row, "v": row} for row in batch]
+    one = ohlcv[0]
+
+    def pandas_batch():
+        for cols in ohlcv:
+            pandas_technicals(cols)
+
+    print(f"{args.bars} bars per symbol")
+    print(f"{'calculate_technicals':<22}{'pandas':>12}{'numpy':>12}{'ratio':>10}")
+    pd_t = timed(lambda: pandas_technicals(one), args.repeat)
+    np_t = timed(lambda: calculate_technicals(one), args.repeat)
+    print(f"{'  latency (ms)':<22}{pd_t * 1e3:>12.2f}{np_t * 1e3:>12.2f}{pd_t / np_t:>9.1f}x")
+    pd_m = peak_mib(lambda: pandas_technicals(one))
+    np_m = peak_mib(lambda: calculate_technicals(one))
+    print(f"{'  peak traced (KiB)':<22}{pd_m * 1024:>12.0f}{np_m * 1024:>12.0f}{pd_m / np_m:>9.1f}x")
+
+    # 2-D batch: one kernel call for every symbol vs a pandas loop.
+    pd_t = timed(pandas_batch, 1)
+    np_t = timed(lambda: indicators.technicals(batch), 3)
+    print(f"{f'{args.symbols} symbols (ms)':<22}{pd_t * 1e3:>12.1f}{np_t * 1e3:>12.1f}{pd_t / np_t:>9.1f}x")
+
+    print("\ncold import (best of 5)")
+    for label, stmt in (("python", "pass"),
+                        ("numpy + tools.indicators", "import tools.indicators"),
+                        ("pandas", "import pandas"),
+                        ("tools.get_data_finnhub", "import tools.get_data_finnhub")):
+        print(f"{label:<28}{import_seconds(stmt) * 1e3:>10.0f} ms")
+
+if __name__ == "__main__":
+    main()
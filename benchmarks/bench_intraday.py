@@ -0,0 +1,74 @@
+"""Intraday store: a month of 1-minute bars for a universe, resampled per timeframe.
+
+Reports disk size, the resident-memory growth of reading one day vs the
+whole month for every symbol, and resample time per timeframe.
+
+Usage: PYTHONPATH=. python benchmarks/bench_intraday.py [--symbols 200] [--days 21]
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tools import intraday_store
+
+SESSION_MINUTES = 390
+TIMEFRAMES = ("5m", "15m", "1h", "1d")
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+def session_times(days):
+    """Minute timestamps of `days` weekday sessions from 2024-03-04 09:30 New York."""
+    first = 1709562600  # 2024-03-04 14:30 UTC
+    day = np.arange(days * 7 // 5 + 2)
+    day = day[(day % 7) < 5][:days]
+    return (first + day[:, None] * 86400 + 60 * np.arange(SESSION_MINUTES)).ravel()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--days", type=int, default=21)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    t = session_times(args.days)
+    tickers = [f"S{i:04d}" for i in range(args.symbols)]
+    with tempfile.TemporaryDirectory() as store:
+        t0 = time.perf_counter()
+        for sym in tickers:
+            c = 100 * np.cumprod(1 + rng.normal(0, 0.0005, len(t)))
+            intraday_store.append(sym, {"t": t, "o": c, "h": c * 1.001, "l": c * 0.999, "c": c,
+                                        "v": rng.integers(100, 10_000, len(t))}, store)
+        t1 = time.perf_counter()
+        bars, size = intraday_store.disk_usage(store_dir=store)
+        print(f"{args.symbols} symbols x {len(t)} 1m bars ({args.days} sessions)")
+        print(f"  append        {(t1 - t0) * 1e3:8.0f} ms, {bars} bars, {size / 2**20:.1f} MB on disk")
+
+        base = rss_mb()
+        last_day = int(t[-SESSION_MINUTES])
+        t0 = time.perf_counter()
+        for sym in tickers:
+            intraday_store.resample(intraday_store.load(sym, last_day, store_dir=store), "15m")
+        t1 = time.perf_counter()
+        print(f"  last day 15m  {(t1 - t0) * 1e3:8.0f} ms, RSS +{rss_mb() - base:.1f} MB")
+
+        for tf in TIMEFRAMES:
+            base = rss_mb()
+            t0 = time.perf_counter()
+            n = 0
+            for sym in tickers:
+                n += len(intraday_store.bars(sym, tf, store_dir=store)["t"])
+            t1 = time.perf_counter()
+            print(f"  month {tf:<4}    {(t1 - t0) * 1e3:8.0f} ms, {n} bars, RSS +{rss_mb() - base:.1f} MB")
+        print(f"  peak RSS      {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:8.0f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""tools/orchestrator.py --mode full: one interpreter per tool vs in-process vs daemon.
+
+cold: empty response cache (every tool goes upstream; offline this measures
+      the failure/fallback paths).
+warm: response cache pre-seeded for the ticker, so no tool touches the
+      network and what remains is interpreter start-up, imports and the
+      stdout JSON round trip.
+
+Each run is a fresh `python tools/orchestrator.py` process; the median of
+--runs is reported. The daemon row is the thin client talking to an already
+running tools/data_daemon.py (warm only).
+
+Usage: PYTHONPATH=. python benchmarks/bench_orchestrator.py [--runs 3]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from tools import data_daemon, http_cache
+
+TICKER = "AAA"
+
+def seed_cache(path, ticker=TICKER):
+    """Entries under the exact keys get_market/get_financials/get_news look up."""
+    http_cache.CACHE_PATH = path
+    idx = pd.date_range(end=pd.Timestamp.today().normalize(), periods=22, freq="B")
+    close = 100 + np.cumsum(np.random.default_rng(0).normal(0, 1, len(idx)))
+    hist = pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                         "Volume": 1e6}, index=idx)
+    http_cache.put("yf_history", {"symbol": ticker, "period": "1mo"}, hist,
+                   encode=lambda df: df.to_json(orient="split", date_format="iso"))
+    http_cache.put("yf_info", {"symbol": ticker},
+                   {"trailingPE": 25.0, "marketCap": 1e12, "revenueGrowth": 0.1,
+                    "shortName": ticker, "currency": "USD"})
+    http_cache.put("news", {"source": "ddg", "q": f"{ticker} stock news"},
+                   [{"title": f"{ticker} beats estimates", "body": "", "href": "https://example.com/1"},
+                    {"title": f"{ticker} guidance cut", "body": "", "href": "https://example.com/2"}])
+
+def run_once(exec_mode, env):
+    t0 = time.time()
+    out = subprocess.run([sys.executable, os.path.join(ROOT, "tools/orchestrator.py"), TICKER,
+                          "--mode", "full", "--exec", exec_mode],
+                         cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return time.time() - t0, out.stdout
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    results = {}
+    outputs = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        base = dict(os.environ, PYTHONPATH=ROOT, AGENCY_RATE_DIR=os.path.join(tmp, "ratelimit"))
+        warm_cache = os.path.join(tmp, "warm.sqlite")
+        seed_cache(warm_cache)
+        for exec_mode in ("subprocess", "inprocess"):
+            for state in ("cold", "warm"):
+                times = []
+                for i in range(args.runs):
+                    if state == "cold":
+                        cache = os.path.join(tmp, f"cold-{exec_mode}-{i}.sqlite")
+                        env = dict(base, AGENCY_HTTP_CACHE=cache, AGENCY_RATE_LIMIT_DISABLE="1")
+                    else:
+                        env = dict(base, AGENCY_HTTP_CACHE=warm_cache)
+                    secs, stdout = run_once(exec_mode, env)
+                    times.append(secs)
+                results[(exec_mode, state)] = statistics.median(times)
+                outputs[(exec_mode, state)] = stdout
+
+        sock = os.path.join(tmp, "daemon.sock")
+        env = dict(base, AGENCY_HTTP_CACHE=warm_cache, AGENCY_DAEMON_SOCKET=sock)
+        daemon = subprocess.Popen([sys.executable, os.path.join(ROOT, "tools/data_daemon.py"), "serve"],
+                                  cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+        try:
+            while data_daemon.ping(sock) is None:
+                time.sleep(0.05)
+            times = [run_once("daemon", env)[0] for _ in range(args.runs)]
+            results[("daemon", "warm")] = statistics.median(times)
+            outputs[("daemon", "warm")] = run_once("daemon", env)[1]
+        finally:
+            data_daemon.stop(sock)
+            daemon.wait()
+
+    print(f"orchestrator.py {TICKER} --mode full, median of {args.runs} runs")
+    print(f"{'exec':<12}{'cold (s)':>10}{'warm (s)':>10}")
+    for exec_mode in ("subprocess", "inprocess"):
+        print(f"{exec_mode:<12}{results[(exec_mode, 'cold')]:>10.2f}{results[(exec_mode, 'warm')]:>10.2f}")
+    print(f"{'daemon':<12}{'-':>10}{results[('daemon', 'warm')]:>10.3f}")
+    for state in ("cold", "warm"):
+        print(f"{state} speedup (in-process): {results[('subprocess', state)] / results[('inprocess', state)]:.1f}x")
+    print(f"warm speedup (daemon): {results[('subprocess', 'warm')] / results[('daemon', 'warm')]:.1f}x")
+    same = outputs[("subprocess", "warm")] == outputs[("inprocess", "warm")] == outputs[("daemon", "warm")]
+    print(f"warm outputs identical: {same}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Universe screen latency on local candles (load + one vectorized pass).
+
+Usage: PYTHONPATH=. python benchmarks/bench_screener.py [--symbols 500] [--history 1500]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tools import candle_store, screener
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--history", type=int, default=1500, help="Stored bars per symbol")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    t = 1_600_000_000 + 86400 * np.arange(args.history, dtype=np.int64)
+    with tempfile.TemporaryDirectory() as store:
+        tickers = [f"S{i:04d}" for i in range(args.symbols)]
+        for sym in tickers:
+            c = np.round(100 * np.cumprod(1 + rng.normal(0, 0.02, args.history)), 2)
+            candle_store.append(sym, {"t": t, "o": c, "h": c * 1.01, "l": c * 0.99, "c": c, "v": c}, store)
+
+        load = rank = 0.0
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            symbols, arrays = screener.load_universe(tickers, store_dir=store)
+            t1 = time.perf_counter()
+            results = screener.screen(symbols, arrays, top=20)
+            t2 = time.perf_counter()
+            load += t1 - t0
+            rank += t2 - t1
+
+    load, rank = load / args.repeat, rank / args.repeat
+    print(f"{args.symbols} symbols x {screener.DAYS} days (from {args.history} stored bars)")
+    print(f"  load   {load * 1e3:8.1f} ms")
+    print(f"  screen {rank * 1e3:8.1f} ms")
+    print(f"  total  {(load + rank) * 1e3:8.1f} ms, top pick {results[0]['ticker'] if results else '-'}")
+
+if __name__ == "__main__":
+    main()
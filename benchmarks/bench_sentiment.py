@@ -0,0 +1,81 @@
+"""Headline sentiment: per-item TextBlob loop vs tools/sentiment.py.
+
+A synthetic week of company news for --tickers tickers (headline + summary,
+with the syndicated duplicates real feeds have) is scored three ways:
+  textblob  the old loop, TextBlob(text).sentiment.polarity per text
+  cold      score_texts with an empty memo
+  warm      score_texts in a fresh process memory, memo on disk
+and every label is checked against the TextBlob one (±0.1 thresholds).
+
+Usage: PYTHONPATH=. python benchmarks/bench_sentiment.py [--tickers 20] [--per-ticker 250]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from textblob import TextBlob
+from tools import sentiment
+
+SUBJECTS = ["{t} stock", "Shares of {t}", "{t}", "{t} CEO", "Analysts on {t}"]
+VERBS = ["surges after", "plunges on", "holds steady despite", "beats estimates with", "misses on",
+         "rallies following", "slips after", "is not worried about"]
+OBJECTS = ["strong earnings", "weak guidance", "a terrible quarter", "record revenue", "new product launch",
+           "regulatory probe", "excellent margins", "disappointing demand", "a quarterly dividend"]
+WIRE = ["Markets wrap: stocks close higher on upbeat data", "Fed holds rates, signals patience",
+        "Oil falls as supply worries ease", "Tech selloff deepens amid bad breadth"]
+
+def corpus(tickers, per_ticker, seed=0):
+    rng = random.Random(seed)
+    texts = []
+    for i in range(tickers):
+        t = f"T{i:03d}"
+        for _ in range(per_ticker):
+            if rng.random() < 0.3:   # wire stories repeated across every ticker's feed
+                head = rng.choice(WIRE)
+            else:
+                head = f"{rng.choice(SUBJECTS).format(t=t)} {rng.choice(VERBS)} {rng.choice(OBJECTS)}"
+            body = f"{rng.choice(OBJECTS).capitalize()} and {rng.choice(OBJECTS)} weigh on the outlook."
+            texts += [head, body]
+    return texts
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - t0, out
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickers", type=int, default=20)
+    parser.add_argument("--per-ticker", type=int, default=250, help="News items per ticker")
+    args = parser.parse_args()
+
+    texts = corpus(args.tickers, args.per_ticker)
+    with tempfile.TemporaryDirectory() as tmp:
+        sentiment.MEMO_PATH = os.path.join(tmp, "sentiment.sqlite")
+        sentiment.lexicon()   # both sides start with the lexicon loaded
+        TextBlob("warm up").sentiment
+
+        t_blob, expected = timed(lambda: [TextBlob(x).sentiment.polarity for x in texts])
+        t_cold, cold = timed(lambda: sentiment.score_texts(texts))
+        sentiment._memo.clear()
+        t_warm, warm = timed(lambda: sentiment.score_texts(texts))
+
+    mismatched = sum(sentiment.label(a) != sentiment.label(b) for a, b in zip(expected, cold))
+    assert cold == warm
+    n = len(texts)
+    print(f"{n} texts ({args.tickers} tickers x {args.per_ticker} items, headline + summary), "
+          f"{len(set(texts))} distinct")
+    print(f"{'mode':<10}{'seconds':>10}{'texts/sec':>12}")
+    for label, secs in (("textblob", t_blob), ("cold", t_cold), ("warm", t_warm)):
+        print(f"{label:<10}{secs:>10.3f}{n / secs:>12.0f}")
+    print(f"speedup: {t_blob / t_cold:.1f}x cold, {t_blob / t_warm:.1f}x warm")
+    print(f"label mismatches vs TextBlob: {mismatched}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Stand-in for the `gemini` CLI used by the end-to-end benchmark.
+
+Reads the prompt from stdin like the real CLI, sleeps to mimic model
+latency and prints a markdown report of a configurable size. The report is
+derived from a hash of the prompt, so identical calls give identical output.
+Flags (-m, --allowed-tools, ...) are accepted and ignored.
+
+  FAKE_GEMINI_LATENCY   seconds per call (default 1.0)
+  FAKE_GEMINI_JITTER    +/- fraction of the latency (default 0.2)
+  FAKE_GEMINI_WORDS     words in the report (default 400)
+  FAKE_GEMINI_STREAM    if set, the first line comes after a third of the
+                        latency and the rest is written line by line over
+                        the remainder, like a model streaming tokens
+  FAKE_GEMINI_LOG       if set, one JSON line per call is appended here
+
+Usage: echo PROMPT | python benchmarks/fake_gemini.py [gemini flags]
+"""
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+
+WORDS = ["momentum", "valuation", "margin", "guidance", "demand", "support", "resistance",
+         "risk", "catalyst", "cycle", "breakout", "multiple", "free cash flow", "consensus"]
+VERDICTS = ["BUY", "HOLD", "SELL"]
+
+def report(prompt, words, rng):
+    lines = [f"### Report {hashlib.sha1(prompt.encode()).hexdigest()[:8]}",
+             "", "| Metric | Value |", "|---|---|",
+             f"| Signal | {rng.choice(VERDICTS)} |", f"| Confidence | {rng.randint(40, 90)}% |", ""]
+    left = words
+    while left > 0:
+        n = min(left, 60)
+        lines.append(" ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + ".")
+        lines.append("")
+        left -= n
+    return "\n".join(lines)
+
+def main():
+    prompt = sys.stdin.read()
+    latency = float(os.environ.get("FAKE_GEMINI_LATENCY", "1.0"))
+    jitter = float(os.environ.get("FAKE_GEMINI_JITTER", "0.2"))
+    words = int(os.environ.get("FAKE_GEMINI_WORDS", "400"))
+
+    rng = random.Random(hashlib.sha1(prompt.encode()).hexdigest())
+    delay = max(0.0, latency * (1 + rng.uniform(-jitter, jitter)))
+    text = report(prompt, words, rng) + "\n"
+    if os.environ.get("FAKE_GEMINI_STREAM"):
+        lines = text.splitlines(keepends=True)
+        time.sleep(delay / 3)
+        for line in lines:
+            sys.stdout.write(line)
+            sys.stdout.flush()
+            time.sleep(delay * 2 / 3 / len(lines))
+    else:
+        time.sleep(delay)
+        sys.stdout.write(text)
+
+    log_path = os.environ.get("FAKE_GEMINI_LOG")
+    if log_path:
+        with open(log_path, "a") as f:
+            f.write(json.dumps({"t": time.time(), "prompt_chars": len(prompt), "delay": round(delay, 3),
+                                "argv": sys.argv[1:]}) + "\n")
+
+if __name__ == "__main__":
+    main()
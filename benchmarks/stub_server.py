@@ -0,0 +1,182 @@
+"""Local stand-in for Finnhub, Stooq, Finviz and Google News RSS used by the benchmarks.
+
+Responses are generated deterministically per ticker (Finviz pages are
+replayed from tests/fixtures/finviz), and every request sleeps for
+`latency` seconds to approximate a network round-trip. stub_env() gives
+the environment that points the tools at it.
+
+Usage: PYTHONPATH=. python benchmarks/stub_server.py [--port 8765] [--latency 0.05]
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from xml.sax.saxutils import escape
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests", "fixtures", "finviz")
+
+def make_candles_csv(symbol, bars=1500):
+    rng = random.Random(symbol)
+    price = 50 + rng.random() * 200
+    day = date(2019, 1, 2)
+    lines = ["Date,Open,High,Low,Close,Volume"]
+    for _ in range(bars):
+        o = price
+        price = max(1.0, price * (1 + rng.gauss(0, 0.02)))
+        h = max(o, price) * (1 + rng.random() * 0.01)
+        l = min(o, price) * (1 - rng.random() * 0.01)
+        lines.append(f"{day.isoformat()},{o:.2f},{h:.2f},{l:.2f},{price:.2f},{rng.randint(10**5, 10**7)}")
+        day += timedelta(days=1)
+    return "\n".join(lines) + "\n"
+
+NEWS_VERBS = ["rallies on", "slides after", "unveils", "faces questions over", "raises outlook on",
+              "cuts jobs amid", "wins contract for", "delays"]
+NEWS_TOPICS = ["cloud growth", "chip supply", "quarterly results", "new product line", "regulatory probe",
+               "buyback plan", "China demand", "AI spending", "dividend hike", "CEO succession"]
+
+def make_news(symbol, count=40, since=None):
+    """Hourly items, newest first. Every 4th is a syndicated copy of the one
+    before it (different id/url, "UPDATE 1-" headline), as wire feeds do."""
+    now = int(time.time())
+    items = []
+    for i in range(count):
+        if i % 4 == 3:
+            headline = f"UPDATE 1-{items[-1]['headline']}"
+        else:
+            headline = f"{symbol} {NEWS_VERBS[i % len(NEWS_VERBS)]} {NEWS_TOPICS[i % len(NEWS_TOPICS)]}"
+        items.append({
+            "id": i,
+            "headline": headline,
+            "source": "Stub Wire",
+            "datetime": now - i * 3600,
+            "summary": f"Summary for {symbol} item {i}.",
+            "url": f"https://example.com/{symbol}/{i}",
+        })
+    if since:
+        items = [item for item in items if item["datetime"] >= since]
+    return items
+
+def make_quote_csv(symbol, fields="sd2t2ohlc"):
+    """Stooq /q/l/ answer: the last bar of the symbol's daily history."""
+    last = make_candles_csv(symbol).splitlines()[-1].split(",")
+    header = ["Symbol", "Date", "Time", "Open", "High", "Low", "Close"]
+    row = [f"{symbol}.US", last[0], "22:00:09", *last[1:5]]
+    if "v" in fields:
+        header.append("Volume")
+        row.append(last[5])
+    return ",".join(header) + "\n" + ",".join(row) + "\n"
+
+def make_rss(symbol, count=20):
+    """Google News search feed for the symbol, from the same items as make_news."""
+    items = []
+    for item in make_news(symbol, count=count):
+        items.append(f"<item><title>{escape(item['headline'])}</title><link>{escape(item['url'])}</link>"
+                     f"<pubDate>{formatdate(item['datetime'], usegmt=True)}</pubDate></item>")
+    return ('<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+            f"<title>{symbol} stock - Google News</title>{''.join(items)}</channel></rss>")
+
+def load_finviz_pages():
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "*.html"))):
+        with open(path, "r") as f:
+            pages.append(f.read())
+    return pages
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    requests = 0    # served so far (benchmarks reset it)
+    _csv_cache = {}
+    _finviz_pages = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body, content_type):
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        StubHandler.requests += 1
+        time.sleep(self.latency)
+        url = urlparse(self.path)
+        q = {k: v[0] for k, v in parse_qs(url.query).items()}
+        symbol = q.get("symbol", q.get("s", q.get("t", q.get("q", "XXX").split()[0]))).upper().replace(".US", "")
+
+        if url.path.endswith("/quote"):
+            rng = random.Random(symbol)
+            return self._send(json.dumps({"c": round(50 + rng.random() * 200, 2), "dp": round(rng.gauss(0, 2), 2)}), "application/json")
+        if url.path.endswith("/stock/metric"):
+            return self._send(json.dumps({"metric": {"peTTM": 25.0, "beta": 1.1, "52WeekHigh": 250.0, "52WeekLow": 60.0}}), "application/json")
+        if url.path.endswith("/company-news"):
+            since = None
+            if "from" in q:
+                since = datetime.strptime(q["from"], "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+            return self._send(json.dumps(make_news(symbol, since=since)), "application/json")
+        if url.path.startswith("/q/l"):
+            return self._send(make_quote_csv(symbol, q.get("f", "")), "text/csv")
+        if url.path == "/quote.ashx":
+            if StubHandler._finviz_pages is None:
+                StubHandler._finviz_pages = load_finviz_pages()
+            pages = StubHandler._finviz_pages
+            return self._send(pages[sum(map(ord, symbol)) % len(pages)], "text/html")
+        if url.path == "/rss/search":
+            return self._send(make_rss(symbol), "application/rss+xml")
+        if url.path.startswith("/q/d/l"):
+            if symbol not in self._csv_cache:
+                self._csv_cache[symbol] = make_candles_csv(symbol)
+            body = self._csv_cache[symbol]
+            if "d1" in q:
+                d1 = f"{q['d1'][:4]}-{q['d1'][4:6]}-{q['d1'][6:]}"
+                header, *rows = body.splitlines()
+                body = "\n".join([header] + [r for r in rows if r[:10] >= d1]) + "\n"
+            return self._send(body, "text/csv")
+
+        self.send_response(404)
+        self.end_headers()
+
+def start_stub_server(latency=0.0, port=0):
+    """Start the stub in a daemon thread. Returns (server, base_url)."""
+    handler = type("Handler", (StubHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def stub_env(base_url):
+    """Environment pointing every stubbed upstream at base_url."""
+    return {
+        "FINNHUB_BASE_URL": f"{base_url}/api/v1",
+        "FINNHUB_API_KEY": "stub",
+        "STOOQ_BASE_URL": base_url,
+        "FINVIZ_BASE_URL": base_url,
+        "GOOGLE_NEWS_BASE_URL": base_url,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the stub upstreams until interrupted")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds slept per request")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(args.latency, args.port)
+    for key, value in stub_env(base_url).items():
+        print(f"export {key}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
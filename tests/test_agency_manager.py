@@ -0,0 +1,132 @@
+import sys
+import os
+import time
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import agency_manager
+from tools.agency_manager import Node, run_graph, critical_path, build_graph
+
+def fake_runner(delays):
+    """Write every output after sleeping for the node's configured delay."""
+    def runner(node, model):
+        time.sleep(delays.get(node.name, 0))
+        for out in node.outputs:
+            with open(out, "w") as f:
+                f.write(node.name)
+    return runner
+
+class TestScheduler:
+    def test_node_starts_when_inputs_exist(self, tmp_path):
+        a, b, c = (str(tmp_path / x) for x in ("a", "b", "c"))
+        nodes = [
+            Node("slow", "command", [], [a]),
+            Node("fast", "command", [], [b]),
+            Node("after_fast", "command", [b], [c]),
+        ]
+        assert run_graph(nodes, runner=fake_runner({"slow": 0.3, "fast": 0.0}))
+        by_name = {n.name: n for n in nodes}
+        # No phase barrier: the dependent of "fast" does not wait for "slow".
+        assert by_name["after_fast"].start < by_name["slow"].end
+
+    def test_failure_blocks_dependents(self, tmp_path):
+        a, b = str(tmp_path / "a"), str(tmp_path / "b")
+
+        def runner(node, model):
+            raise RuntimeError("boom")
+
+        nodes = [Node("x", "command", [], [a]), Node("y", "concat", [a], [b])]
+        assert not run_graph(nodes, runner=runner)
+        assert [n.status for n in nodes] == ["failed", "blocked"]
+
+    def test_duplicate_producer_rejected(self, tmp_path):
+        a = str(tmp_path / "a")
+        with pytest.raises(ValueError):
+            run_graph([Node("x", "command", [], [a]), Node("y", "command", [], [a])])
+
+    def test_critical_path(self, tmp_path):
+        a, b, c = (str(tmp_path / x) for x in ("a", "b", "c"))
+        nodes = [
+            Node("long", "command", [], [a]),
+            Node("short", "command", [], [b]),
+            Node("join", "command", [a, b], [c]),
+        ]
+        run_graph(nodes, runner=fake_runner({"long": 0.2}))
+        assert [n.name for n in critical_path(nodes)] == ["long", "join"]
+
+class TestPipelineGraph:
+    def test_risk_only_depends_on_tech_and_market(self):
+        nodes = {n.name: n for n in build_graph("NVDA")}
+        producers = agency_manager.validate_graph(nodes.values())
+        deps = {d.name for d in agency_manager.upstream(nodes["risk"], producers)}
+        assert deps == {"tech", "fetch"}
+
+    def test_rerun_selects_downstream_and_missing(self, tmp_path):
+        data, reports = str(tmp_path / "data"), str(tmp_path / "reports")
+        nodes = build_graph("NVDA", data, reports)
+        for node in nodes:
+            for out in node.outputs:
+                os.makedirs(os.path.dirname(out), exist_ok=True)
+                open(out, "w").close()
+        names = lambda sel: {n.name for n in sel}
+        assert names(agency_manager.affected(nodes, ["tech"])) == {
+            "tech", "risk", "analyst_reports", "bull", "bear", "prior", "debate_context", "signal", "plan"}
+        os.remove(os.path.join(reports, "sent.md"))
+        assert "sent" in names(agency_manager.affected(nodes, ["tech"]))
+        assert "fund" not in names(agency_manager.affected(nodes, ["tech"]))
+        with pytest.raises(ValueError):
+            agency_manager.affected(nodes, ["nope"])
+
+    def test_every_analyst_report_gets_a_share_of_the_bull_budget(self, tmp_path):
+        nodes = {n.name: n for n in build_graph("NVDA", str(tmp_path / "data"), str(tmp_path / "reports"))}
+        os.makedirs(tmp_path / "reports")
+        for path in nodes["bull"].inputs:
+            name = os.path.basename(path)
+            with open(path, "w") as f:
+                f.write("\n\n".join(f"{name} finding {i}: " + " ".join(["detail"] * 40) for i in range(200)))
+        prompt = tmp_path / "bull.md"
+        prompt.write_text("PROMPT\n")
+        nodes["bull"].prompt = str(prompt)
+        stdin = agency_manager.build_agent_input(nodes["bull"])
+        # the last report (macro) is trimmed like the others, not cut off by the earlier ones
+        for name in ("tech.md", "fund.md", "sent.md", "macro.md"):
+            assert f"{name} finding 0:" in stdin
+        assert [p["final"] > 1000 for p in nodes["bull"].tokens["inputs"]] == [True] * 4
+        assert nodes["signal"].inputs[:2] == [str(tmp_path / "reports" / "bull_memo.md"),
+                                              str(tmp_path / "reports" / "bear_memo.md")]
+
+    def test_agent_input_is_compacted(self, tmp_path):
+        prompt, data = tmp_path / "p.md", tmp_path / "d.json"
+        prompt.write_text("PROMPT\n")
+        data.write_text('{\n  "a": 1.0,\n  "b": null\n}')
+        node = Node("t", "agent", [str(data)], [str(tmp_path / "o.md")], prompt=str(prompt))
+        assert agency_manager.build_agent_input(node) == 'PROMPT\n\n### d.json\n{"a":1.0}\n'
+        assert node.tokens["final"] < node.tokens["raw"]
+
+    def test_token_totals_by_phase(self):
+        nodes = [Node(name, "agent", [], []) for name in ("tech", "fund", "bull", "plan")]
+        for n, node in enumerate(nodes):
+            node.tokens = {"raw": 100 * (n + 1), "final": 10 * (n + 1)}
+        assert agency_manager.token_totals(nodes) == {"analysts": (300, 30), "research": (300, 30),
+                                                      "trade plan": (400, 40)}
+
+class TestWorkspaces:
+    def test_new_workspace_is_unique(self, tmp_path):
+        a = agency_manager.new_workspace("NVDA", str(tmp_path))
+        b = agency_manager.new_workspace("NVDA", str(tmp_path))
+        assert a != b
+        assert os.path.basename(a).startswith("NVDA-")
+        for ws in (a, b):
+            assert os.path.isdir(os.path.join(ws, "data")) and os.path.isdir(os.path.join(ws, "reports"))
+
+    def test_graph_stays_inside_workspace(self, tmp_path):
+        ws = agency_manager.new_workspace("NVDA", str(tmp_path))
+        data_dir, reports_dir = agency_manager.workspace_dirs(ws)
+        nodes = build_graph("NVDA", data_dir, reports_dir)
+        fetch = nodes[0]
+        assert fetch.command[-2:] == ["--out", data_dir]
+        for node in nodes:
+            for path in node.inputs + node.outputs:
+                if not path.startswith(agency_manager.PROMPTS_DIR):
+                    assert path.startswith(ws)
@@ -0,0 +1,99 @@
+import sys
+import os
+import subprocess
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import agent_cache, agent_executor, agency_manager
+from tools.agency_manager import Node
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    path = str(tmp_path / "agent_cache")
+    monkeypatch.setattr(agent_cache, "CACHE_DIR", path)
+    monkeypatch.setattr(agent_cache, "DISABLED", False)
+    monkeypatch.setattr(agent_cache, "FORCE_REFRESH", False)
+    monkeypatch.setattr(agent_cache, "TTL", 3600)
+    monkeypatch.setattr(agent_cache, "STATS", {"hit": 0, "miss": 0, "seconds_saved": 0.0})
+    monkeypatch.setattr(agent_executor, "STATE_DIR", str(tmp_path / "executor"))
+    monkeypatch.setattr(agent_executor, "BACKOFF_DEFAULT", 0)
+    return path
+
+class FakeGemini:
+    """Stands in for subprocess.run(["gemini", ...]); echoes a numbered report."""
+    def __init__(self, returncode=0):
+        self.calls = []
+        self.returncode = returncode
+
+    def __call__(self, argv, input=None, **kwargs):
+        self.calls.append((argv, input))
+        return subprocess.CompletedProcess(argv, self.returncode, stdout=f"report {len(self.calls)}",
+                                           stderr="quota exceeded")
+
+class TestCachedCall:
+    def test_identical_call_is_served_from_cache(self):
+        calls = []
+        call = lambda: calls.append(1) or "out"
+        assert agent_cache.cached_call(["gemini", "-m", "flash"], "prompt", call) == ("out", False)
+        assert agent_cache.cached_call(["gemini", "-m", "flash"], "prompt", call) == ("out", True)
+        assert len(calls) == 1
+        assert "1 of 2 LLM calls avoided" in agent_cache.summary()
+
+    def test_model_flags_and_input_are_part_of_the_key(self):
+        calls = []
+        call = lambda: calls.append(1) or "out"
+        agent_cache.cached_call(["gemini", "-m", "flash"], "prompt", call)
+        agent_cache.cached_call(["gemini", "-m", "pro"], "prompt", call)
+        agent_cache.cached_call(["gemini", "-m", "flash"], "prompt2", call)
+        assert len(calls) == 3
+
+    def test_expiry_and_force_refresh(self, monkeypatch):
+        outputs = iter(["old", "new", "newer"])
+        call = lambda: next(outputs)
+        agent_cache.cached_call(["g"], "x", call)
+        assert agent_cache.cached_call(["g"], "x", call, force=True) == ("new", False)
+        assert agent_cache.cached_call(["g"], "x", call) == ("new", True)
+        monkeypatch.setattr(agent_cache, "TTL", -1)   # never expires
+        assert agent_cache.cached_call(["g"], "x", call) == ("new", True)
+        monkeypatch.setattr(agent_cache, "TTL", 1e-9)
+        assert agent_cache.cached_call(["g"], "x", call) == ("newer", False)
+
+    def test_failures_are_not_cached(self):
+        def boom():
+            raise RuntimeError("gemini exited 1")
+        with pytest.raises(RuntimeError):
+            agent_cache.cached_call(["g"], "x", boom)
+        assert agent_cache.cached_call(["g"], "x", lambda: "ok") == ("ok", False)
+
+    def test_clear(self):
+        agent_cache.cached_call(["g"], "x", lambda: "ok")
+        assert agent_cache.clear() == 1
+        assert agent_cache.get(agent_cache.make_key(["g"], "x")) is None
+
+class TestRunAgent:
+    def node(self, tmp_path):
+        prompt, data = tmp_path / "p.md", tmp_path / "d.json"
+        prompt.write_text("PROMPT")
+        data.write_text("{}")
+        return Node("t", "agent", [str(data)], [str(tmp_path / "o.md")], prompt=str(prompt))
+
+    def test_unchanged_inputs_skip_gemini(self, tmp_path, monkeypatch):
+        gemini = FakeGemini()
+        monkeypatch.setattr(agency_manager.subprocess, "run", gemini)
+        node = self.node(tmp_path)
+        agency_manager.run_agent(node, "flash")
+        agency_manager.run_agent(node, "flash")
+        assert len(gemini.calls) == 1 and node.cached
+        assert (tmp_path / "o.md").read_text() == "report 1"
+
+        (tmp_path / "d.json").write_text('{"changed": true}')
+        agency_manager.run_agent(node, "flash")
+        assert len(gemini.calls) == 2 and not node.cached
+        assert (tmp_path / "o.md").read_text() == "report 2"
+
+    def test_gemini_error_raises(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(agency_manager.subprocess, "run", FakeGemini(returncode=1))
+        with pytest.raises(RuntimeError, match="quota exceeded"):
+            agency_manager.run_agent(self.node(tmp_path), "flash")
+        assert agent_cache.STATS["miss"] == 0
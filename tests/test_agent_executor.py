@@ -0,0 +1,126 @@
+import sys
+import os
+import threading
+import time
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import agent_executor
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(agent_executor, "STATE_DIR", str(tmp_path / "executor"))
+    monkeypatch.setattr(agent_executor, "MAX_CONCURRENCY", 2)
+    monkeypatch.setattr(agent_executor, "DISABLED", False)
+    monkeypatch.setattr(agent_executor, "POLL", 0.005)
+    monkeypatch.setattr(agent_executor, "BACKOFF_DEFAULT", 0)
+    return tmp_path
+
+class QuotaError(Exception):
+    def __init__(self):
+        super().__init__("gemini exited 1: 429 RESOURCE_EXHAUSTED")
+
+class TestAdmission:
+    def test_concurrency_capped(self):
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def model():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.03)
+            with lock:
+                active[0] -= 1
+            return "ok"
+
+        threads = [threading.Thread(target=agent_executor.call, args=(model, "tech")) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert peak[0] == 2
+        stats = agent_executor.status()["stats"]
+        assert stats["admitted"] == 6 and stats["queue_wait"] > 0
+
+    def test_late_stages_admitted_first(self):
+        held = [agent_executor.acquire("tech")[0] for _ in range(2)]
+        order = []
+
+        def run(agent):
+            ticket, _ = agent_executor.acquire(agent)
+            order.append(agent)
+            agent_executor.release(ticket, 0.0)
+
+        waiters = [threading.Thread(target=run, args=(a,)) for a in ("fund", "bull", "plan")]
+        for t in waiters:
+            t.start()
+            time.sleep(0.02)   # all queued before a slot frees
+        agent_executor.release(held[0], 0.0)
+        for t in waiters:
+            t.join()
+        agent_executor.release(held[1], 0.0)
+        assert order == ["plan", "bull", "fund"]
+
+    def test_dead_process_tickets_are_dropped(self):
+        with agent_executor._state() as st:
+            st["running"]["x"] = {"pid": 2 ** 22 + 12345, "agent": "tech", "label": "tech", "stage": 0,
+                                  "run_started": 0, "since": 0}
+            st["running"]["y"] = dict(st["running"]["x"])
+        ticket, _ = agent_executor.acquire("tech")
+        assert list(agent_executor.status()["running"]) == [ticket]
+
+class TestAdaptiveLimit:
+    def test_quota_halves_once_per_round_then_grows(self):
+        tickets = [agent_executor.acquire("tech")[0] for _ in range(2)]
+        assert agent_executor.release(tickets[0], 1.0, throttled=True, retry_after=0.0) == 0.0
+        agent_executor.release(tickets[1], 1.0, throttled=True, retry_after=0.0)
+        st = agent_executor.status()
+        assert st["limit"] == 1.0 and st["stats"]["throttled"] == 2
+        for _ in range(2):
+            agent_executor.release(agent_executor.acquire("tech")[0], 1.0)
+        assert agent_executor.status()["limit"] == 2.0
+
+    def test_retry_after_pauses_admissions(self):
+        ticket, _ = agent_executor.acquire("tech")
+        agent_executor.release(ticket, 0.1, throttled=True, retry_after=0.1)
+        _, waited = agent_executor.acquire("tech")
+        assert waited >= 0.08
+
+class TestCall:
+    def test_quota_errors_retried_and_timed(self):
+        errors = [QuotaError(), QuotaError()]
+
+        def model():
+            if errors:
+                raise errors.pop()
+            return "report"
+
+        timing = {}
+        assert agent_executor.call(model, "tech", timing=timing) == "report"
+        assert timing["throttles"] == 2 and timing["queue_wait"] >= 0 and timing["model_time"] >= 0
+
+    def test_other_errors_raise_at_once(self):
+        calls = []
+
+        def model():
+            calls.append(1)
+            raise RuntimeError("gemini exited 2: bad flag")
+
+        with pytest.raises(RuntimeError, match="bad flag"):
+            agent_executor.call(model, "tech")
+        assert len(calls) == 1 and agent_executor.status()["running"] == {}
+
+    def test_interrupt_frees_the_slot(self):
+        def model():
+            raise KeyboardInterrupt
+        with pytest.raises(KeyboardInterrupt):
+            agent_executor.call(model, "tech")
+        st = agent_executor.status()
+        assert st["running"] == {} and st["limit"] == 2
+
+    def test_quota_exhausted_after_retries(self):
+        def model():
+            raise QuotaError()
+        with pytest.raises(agent_executor.QuotaExceeded):
+            agent_executor.call(model, "tech", retries=1)
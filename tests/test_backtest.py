@@ -0,0 +1,85 @@
+import sys
+import os
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import backtest, indicators, get_data_finnhub as gdf
+
+def random_walk(n, seed=0, rows=None):
+    rng = np.random.default_rng(seed)
+    shape = (rows, n) if rows else n
+    return np.round(100 * np.cumprod(1 + rng.normal(0, 0.02, shape), axis=-1), 2)
+
+def loop_events(rsi, low):
+    """Bars where RSI drops below `low`, one at a time."""
+    return [t for t in range(1, len(rsi)) if rsi[t] < low and rsi[t - 1] >= low]
+
+class TestSignals:
+    def test_rsi_events_match_loop(self):
+        c = random_walk(600, seed=1)
+        tech = indicators.technicals(c[None])
+        events = backtest.signal_events(tech)
+        assert list(np.nonzero(events["rsi_oversold"][0])[0]) == loop_events(tech["RSI_14"][0], 30.0)
+
+    def test_crosses_are_single_bars(self):
+        c = np.concatenate([np.linspace(100, 50, 250), np.linspace(50, 150, 250)])
+        events = backtest.signal_events(indicators.technicals(c[None]))
+        assert events["golden_cross"].sum() == 1 and events["death_cross"].sum() == 0
+
+class TestOutcomes:
+    def test_forward_return_and_drawdown(self):
+        c = random_walk(300, seed=2)
+        s = pd.Series(c)
+        np.testing.assert_allclose(backtest.forward_return(c, 5), s.shift(-5) / s - 1)
+        low = c * 0.99
+        ref = pd.Series(low).rolling(5).min().shift(-5) / s - 1
+        np.testing.assert_allclose(backtest.forward_drawdown(c, c * 1.01, low, 5, 1), np.minimum(ref, 0))
+        assert np.isnan(backtest.forward_return(c, 5)[-5:]).all()
+
+    def test_stats_match_loop(self):
+        c = random_walk(1500, seed=3)
+        result = backtest.run({"c": c, "h": c, "l": c}, horizons=(20,))
+        tech = indicators.technicals(c)
+        starts = [t for t in loop_events(tech["RSI_14"], 30.0) if t + 20 < len(c)]
+        rets = [c[t + 20] / c[t] - 1 for t in starts]
+        dds = [min(0, c[t + 1:t + 21].min() / c[t] - 1) for t in starts]
+        n, hit, avg, avg_dd, worst = (a[0] for a in result["stats"]["rsi_oversold"][20])
+        assert n == len(starts)
+        assert hit == pytest.approx(np.mean([r > 0 for r in rets]))
+        assert avg == pytest.approx(np.mean(rets))
+        assert avg_dd == pytest.approx(np.mean(dds)) and worst == pytest.approx(min(dds))
+
+    def test_padded_rows_match_single_symbols(self):
+        long, short = random_walk(1200, seed=4), random_walk(700, seed=5)
+        padded = np.full((2, 1200), np.nan)
+        padded[0], padded[1, 500:] = long, short
+        batch = backtest.run({"c": padded})
+        alone = backtest.run({"c": short})
+        for name in backtest.SIGNALS:
+            assert batch["events"][name][1] == alone["events"][name][0]
+            np.testing.assert_allclose(batch["stats"][name][20][1][1], alone["stats"][name][20][1][0])
+
+class TestMarketBlock:
+    def test_block_in_market_json(self):
+        c = random_walk(2000, seed=6)
+        block = gdf.compute_backtest("AAA", {"c": c, "h": c * 1.01, "l": c * 0.99})
+        row = block["signals"]["golden_cross"]
+        assert len(row) == len(block["columns"]) and row[0] == "up"
+        assert block["bars"] == 2000 and set(block["active_signals"]) <= set(backtest.SIGNALS)
+        market = gdf.build_market_data("AAA", {"c": 1.0}, c, {}, block)
+        assert json.loads(json.dumps(market))["backtest"]["columns"][3] == "hit_rate_5d"
+        assert "backtest" not in gdf.build_market_data("AAA", {"c": 1.0}, c, {})
+
+    def test_too_short(self):
+        assert backtest.for_symbol({"c": np.ones(3), "h": np.ones(3), "l": np.ones(3)}) is None
+        assert backtest.for_symbol(None) is None
+
+    def test_write_market(self, tmp_path):
+        path = tmp_path / "market.json"
+        path.write_text(json.dumps({"symbol": "AAA"}))
+        backtest.write_market(str(path), {"bars": 10})
+        assert json.loads(path.read_text()) == {"symbol": "AAA", "backtest": {"bars": 10}}
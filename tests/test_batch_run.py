@@ -0,0 +1,41 @@
+import sys
+import os
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import batch_run
+
+def fake_runner(ticker, delay=0.2, **kwargs):
+    time.sleep(delay)
+    return {"ticker": ticker, "workspace": f"runs/{ticker}", "ok": ticker != "BAD", "seconds": delay}
+
+class TestBatchRun:
+    def test_runs_concurrently_and_keeps_order(self):
+        tickers = ["AAA", "BBB", "CCC", "DDD"]
+        results, wall = batch_run.run_batch(tickers, workers=4, runner=fake_runner)
+        assert [r["ticker"] for r in results] == tickers
+        assert wall < 0.6   # 4 x 0.2s serially
+
+    def test_throughput(self):
+        results = [{"ticker": t, "ok": True, "seconds": 60.0} for t in ("A", "B", "C", "D")]
+        batch_tph, serial_tph = batch_run.throughput(results, wall=60.0)
+        assert serial_tph == 60.0
+        assert batch_tph == 240.0
+
+    def test_failures_reported(self, capsys):
+        results, wall = batch_run.run_batch(["AAA", "BAD"], workers=2, runner=fake_runner, delay=0)
+        batch_run.print_summary(results, wall, 2)
+        assert "Failed: BAD" in capsys.readouterr().out
+
+    def test_runner_exception_fails_only_its_ticker(self, capsys):
+        def runner(ticker, **kwargs):
+            if ticker == "BAD":
+                raise OSError("No space left on device")
+            return fake_runner(ticker, delay=0)
+        results, wall = batch_run.run_batch(["AAA", "BAD", "CCC"], workers=2, runner=runner)
+        assert [(r["ticker"], r["ok"]) for r in results] == [("AAA", True), ("BAD", False), ("CCC", True)]
+        assert results[1]["workspace"] is None
+        batch_run.print_summary(results, wall, 2)
+        out = capsys.readouterr().out
+        assert "OSError: No space left on device" in out and "Failed: BAD" in out
@@ -0,0 +1,51 @@
+import sys
+import os
+import subprocess
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import data_fetcher, finviz, get_market, get_news, http_cache
+from benchmarks.stub_server import start_stub_server
+from benchmarks import bench_e2e
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+@pytest.fixture
+def stub(tmp_path, monkeypatch):
+    server, base_url = start_stub_server()
+    monkeypatch.setattr(http_cache, "CACHE_PATH", str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(finviz, "URL", base_url + "/quote.ashx?t={ticker}")
+    monkeypatch.setattr(get_news, "GOOGLE_NEWS_BASE_URL", base_url)
+    monkeypatch.setattr(get_market, "STOOQ_BASE_URL", base_url)
+    monkeypatch.setattr(data_fetcher, "STOOQ_BASE_URL", base_url)
+    yield base_url
+    server.shutdown()
+
+class TestStubUpstreams:
+    def test_fallback_sources_parse_stub_responses(self, stub):
+        rss = get_news._download_google_rss("AAA")
+        assert len(rss) == get_news.MAX_ITEMS and rss[0]["title"].startswith("AAA ")
+        assert get_market._market_from_stooq("AAA")["current_price"] > 0
+        assert data_fetcher.get_stooq_price("AAA")["volume"] > 0
+        assert len(finviz.snapshot("AAA")) > 60
+
+class TestFakeGemini:
+    def test_deterministic_and_sized(self):
+        env = dict(os.environ, FAKE_GEMINI_LATENCY="0", FAKE_GEMINI_WORDS="120")
+        run = lambda prompt: subprocess.run([sys.executable, os.path.join(ROOT, "benchmarks", "fake_gemini.py"),
+                                             "-m", "flash"], input=prompt, capture_output=True, text=True,
+                                            env=env, check=True).stdout
+        first = run("PROMPT A")
+        assert first == run("PROMPT A") != run("PROMPT B")
+        assert first.startswith("### Report") and 120 <= len(first.split()) < 160
+
+class TestHistory:
+    def test_previous_matches_config(self, tmp_path):
+        path = str(tmp_path / "history.jsonl")
+        cfg = {"tickers": ["AAA"], "gemini_latency": 1.0}
+        bench_e2e.append_history({"config": cfg, "results": {"get_market": {"wall_s": 1.0}}}, path)
+        bench_e2e.append_history({"config": dict(cfg, gemini_latency=0.1), "results": {}}, path)
+        records = bench_e2e.load_history(path)
+        assert bench_e2e.previous(records, cfg, "get_market")["results"]["get_market"]["wall_s"] == 1.0
+        assert bench_e2e.previous(records, cfg, "orchestrator.sh") is None
@@ -0,0 +1,92 @@
+import sys
+import os
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import candle_store
+
+CSV = """Date,Open,High,Low,Close,Volume
+2024-01-02,10,11,9,10.5,1000
+2024-01-03,10.5,12,10,11.5,2000
+2024-01-04,11.5,12,11,11.0,1500
+"""
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(candle_store, "STORE_DIR", str(tmp_path))
+    return tmp_path
+
+class TestCandleStore:
+    def test_roundtrip_is_memory_mapped(self, store):
+        assert candle_store.append_stooq_csv("aapl", CSV) == 3
+        cols = candle_store.load("AAPL")
+        assert isinstance(cols["c"], np.memmap)
+        assert cols["c"].tolist() == [10.5, 11.5, 11.0]
+        # Re-fetches OVERLAP_DAYS before the watermark bar to catch restated history.
+        assert candle_store.stooq_since_param(candle_store.watermark("AAPL")) == "20231225"
+
+    def test_append_only_newer_bars(self, store):
+        candle_store.append_stooq_csv("AAPL", CSV)
+        update = "Date,Open,High,Low,Close,Volume\n2024-01-03,0,0,0,0,0\n2024-01-05,11,12,10,11.8,900\n"
+        assert candle_store.append_stooq_csv("AAPL", update) == 1
+        assert candle_store.load("AAPL")["c"].tolist() == [10.5, 11.5, 11.0, 11.8]
+
+    def test_watermark_bar_is_replaced(self, store):
+        candle_store.append_stooq_csv("AAPL", CSV)
+        partial = "Date,Open,High,Low,Close,Volume\n2024-01-04,11.5,12.5,11,12.2,3000\n"
+        assert candle_store.append_stooq_csv("AAPL", partial) == 0
+        cols = candle_store.load("AAPL")
+        assert len(cols["t"]) == 3
+        assert cols["c"][-1] == 12.2
+
+    def test_appends_never_shrink_mapped_columns(self, store):
+        candle_store.append_stooq_csv("AAPL", CSV)
+        mapped = candle_store.load("AAPL")
+        size = os.path.getsize(store / "AAPL" / "c.bin")
+        candle_store.append_stooq_csv("AAPL", "Date,Open,High,Low,Close,Volume\n2024-01-04,11.5,12.5,11,12.2,3000\n")
+        assert os.path.getsize(store / "AAPL" / "c.bin") == size
+        assert mapped["c"].tolist() == [10.5, 11.5, 12.2]   # rewritten in place under the live map
+        candle_store.append_stooq_csv("AAPL", "Date,Open,High,Low,Close,Volume\n2024-01-04,5,6,4,5.5,10\n",
+                                      replace=True)
+        assert mapped["c"].tolist() == [10.5, 11.5, 12.2]   # old map keeps the replaced file
+        assert candle_store.load("AAPL")["c"].tolist() == [5.5]
+
+    def test_no_data_and_malformed_rows(self, store):
+        assert candle_store.append_stooq_csv("ZZZZ", "No data") == 0
+        assert candle_store.load("ZZZZ") is None
+        bad = CSV + "2024-01-05,oops,1,1,1,1\n"
+        assert candle_store.append_stooq_csv("AAPL", bad) == 3
+
+    def test_refresh_requests_only_since_watermark(self, store):
+        urls = []
+
+        def fetch(url):
+            urls.append(url)
+            return CSV
+
+        url_for = lambda sym, since: f"{sym}?d1={since}"
+        candle_store.refresh_from_stooq("AAPL", fetch, url_for)
+        candle_store.refresh_from_stooq("AAPL", fetch, url_for)
+        assert urls == ["AAPL?d1=None", "AAPL?d1=20231225"]
+
+    def test_restated_history_is_redownloaded(self, store):
+        # A 2:1 split: Stooq re-adjusts every earlier bar.
+        split = CSV.replace("10.5,1000", "5.25,1000").replace("11.5,2000", "5.75,2000") \
+            .replace("11.0,1500", "5.5,1500") + "2024-01-05,5.6,6,5.5,5.9,4000\n"
+        urls, pages = [], {"None": split}
+
+        def fetch(url):
+            urls.append(url)
+            return pages.get(url.split("=")[1], split)
+
+        url_for = lambda sym, since: f"{sym}?d1={since}"
+        candle_store.append_stooq_csv("AAPL", CSV)
+        assert not candle_store.restated_csv("AAPL", CSV)
+        # Only the watermark bar differing is a partial day, not a restatement.
+        assert not candle_store.restated_csv("AAPL", CSV.replace("11.0,1500", "5.5,1500"))
+        assert candle_store.restated_csv("AAPL", split)
+        assert candle_store.refresh_from_stooq("AAPL", fetch, url_for) == 4
+        assert urls == ["AAPL?d1=20231225", "AAPL?d1=None"]
+        assert candle_store.load("AAPL")["c"].tolist() == [5.25, 5.75, 5.5, 5.9]
@@ -0,0 +1,89 @@
+import sys
+import os
+import json
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import context_builder as cb, orchestrator
+
+NEWS = {"count": 3, "sentiment_label": "Bullish", "overall_sentiment_score": 0.21234567, "missing": None,
+        "top_news": [{"title": f"Story {i} " + "word " * 40, "summary": "", "url": None} for i in range(30)]}
+
+def report(title, body):
+    return f"### {title}\n\n{body}\n\n\n\n*Disclaimer: generated by an automated analyst; not investment advice, do your own research.*   \n"
+
+class TestCompaction:
+    def test_count_tokens(self):
+        assert cb.count_tokens("") == 0
+        assert cb.count_tokens("RSI is 71.5!") == 6
+        assert cb.count_tokens('{\n  "a": 1\n}') > cb.count_tokens('{"a":1}')
+
+    def test_json_is_pruned_and_minified(self):
+        data = cb.compact_json(json.dumps(NEWS, indent=2))
+        assert "missing" not in data and "url" not in data["top_news"][0] and "summary" not in data["top_news"][0]
+        assert data["overall_sentiment_score"] == 0.2123
+        assert cb.compact_json("not json") is None
+        # table rows keep their positions
+        assert cb.compact_json('{"row": ["up", 3, null, 52.1], "empty": [[], {}]}') == {"row": ["up", 3, None, 52.1]}
+
+    def test_repeated_paragraphs_dropped_across_inputs(self):
+        a = report("Tech", "RSI 71, overbought.")
+        b = report("Fund", "PE 35, rich.")
+        context, stats = cb.build("PROMPT", [("tech.md", a), ("fund.md", b)], budget=1000)
+        assert context.count("Disclaimer") == 1
+        assert "PE 35, rich." in context and "\n\n\n" not in context
+        assert stats["final"] < stats["raw"]
+
+    def test_short_repeats_kept_long_repeats_marked(self):
+        a = report("Bull", "Thesis A.\n\n**结论**: 看多")
+        b = report("Bear", "Thesis B.\n\n**结论**: 看多")
+        context, _ = cb.build("PROMPT", [("bull_memo.md", a), ("bear_memo.md", b)], budget=1000)
+        assert context.count("**结论**: 看多") == 2
+        assert context.count("Disclaimer") == 1 and "(same as bull_memo.md)" in context
+
+class TestBudget:
+    def test_fair_shares(self):
+        assert cb.fair_shares([10, 500, 1000], 600) == [10, 295, 295]
+        assert cb.fair_shares([10, 20], 600) == [10, 20]
+        assert sum(cb.fair_shares([400, 400, 400], 1000)) <= 1000
+
+    def test_budget_enforced_and_deterministic(self):
+        long_md = "\n\n".join(f"Paragraph {i}: " + "analysis " * 30 for i in range(50))
+        inputs = [("news.json", json.dumps(NEWS, indent=2)), ("all_analyst_reports.md", long_md)]
+        first, stats = cb.build("PROMPT", inputs, budget=600)
+        again, _ = cb.build("PROMPT", inputs, budget=600)
+        assert first == again
+        assert sum(p["final"] for p in stats["inputs"]) <= 600 + 20   # markers
+        assert "truncated" in first and "list items dropped" in first
+        assert "Paragraph 0:" in first and "Paragraph 49:" not in first
+        news = json.loads(first.split("### news.json\n")[1].split("\n")[0])
+        assert news["sentiment_label"] == "Bullish" and 0 < len(news["top_news"]) < 30
+
+    def test_json_without_lists_keeps_top_level_scalars(self):
+        data = {"symbol": "NVDA", "price": 120.5, "detail": {f"k{i}": "value " * 5 for i in range(40)},
+                "rating": "BUY"}
+        out = cb.truncate_json(data, 40)
+        kept = json.loads(out.split("\n")[0])
+        assert kept == {"symbol": "NVDA", "price": 120.5, "rating": "BUY"}
+        assert out.endswith("…[dropped: detail]") and cb.count_tokens(out) <= 40
+
+    def test_under_budget_is_untouched(self):
+        context, stats = cb.build("P", [("a.md", "Short report.")], budget=100)
+        assert context == "P\n\n### a.md\nShort report.\n"
+        assert stats["inputs"][0]["final"] == stats["inputs"][0]["compact"]
+
+    def test_truncate_text_cuts_inside_paragraph_by_lines(self):
+        text = "\n".join(f"line {i} " + "x " * 10 for i in range(20))
+        out = cb.truncate_text(text, 60)
+        assert out.startswith("line 0") and "line 19" not in out
+        assert cb.count_tokens(out) <= 60
+
+class TestOrchestratorContext:
+    def test_each_block_printed_once(self):
+        results = {"tech": {"current_price": 10, "indicators": {"RSI_14": 55}},
+                   "fund": {"valuation": {}}, "news": {"overall_sentiment_score": 0.1, "top_news": [{"title": "T"}]}}
+        context = orchestrator.build_context("AAA", results)
+        assert context.count("RSI: 55") == 1 and context.count("- T") == 1
+        assert "<data_source type='risk_metrics' same_as='technical'/>" in context
+        assert "<data_source type='macro' same_as='sentiment'/>" in context
@@ -0,0 +1,83 @@
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import pytest
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import data_daemon, orchestrator
+
+@pytest.fixture
+def sock_path():
+    # Unix socket paths are limited to ~100 bytes; pytest's tmp_path can exceed that.
+    d = tempfile.mkdtemp(prefix="dd")
+    yield os.path.join(d, "d.sock")
+    shutil.rmtree(d, ignore_errors=True)
+
+@pytest.fixture
+def daemon(sock_path):
+    calls = []
+
+    def fetch(ticker, mode):
+        calls.append((ticker, mode))
+        if ticker == "BOOM":
+            raise RuntimeError("upstream exploded")
+        return {"tech": {"symbol": ticker, "current_price": 1.0}}
+
+    server = data_daemon.DataDaemon(sock_path, fetch)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, calls
+    server.shutdown()
+    server.server_close()
+
+class TestDaemon:
+    def test_fetch_and_ping(self, daemon, sock_path):
+        server, calls = daemon
+        assert data_daemon.request("NVDA", "tech", sock_path) == {"tech": {"symbol": "NVDA", "current_price": 1.0}}
+        assert calls == [("NVDA", "tech")]
+        info = data_daemon.ping(sock_path)
+        assert info["pid"] == os.getpid() and info["served"] == 1
+        assert oct(os.stat(sock_path).st_mode & 0o777) == oct(0o600)
+
+    def test_errors_are_reported_not_fatal(self, daemon, sock_path):
+        with pytest.raises(RuntimeError, match="upstream exploded"):
+            data_daemon.request("BOOM", "tech", sock_path)
+        with pytest.raises(RuntimeError, match="Unknown command"):
+            data_daemon._send({"cmd": "nope"}, sock_path)
+        assert data_daemon.ping(sock_path) is not None
+
+    def test_no_daemon(self, sock_path):
+        assert data_daemon.ping(sock_path) is None
+        with pytest.raises(data_daemon.DaemonUnavailable):
+            data_daemon.request("NVDA", "tech", sock_path)
+
+class TestOrchestratorClient:
+    def test_auto_uses_daemon(self, daemon, sock_path, monkeypatch):
+        monkeypatch.setattr(data_daemon, "SOCKET_PATH", sock_path)
+        with patch('tools.orchestrator.run_inprocess') as inprocess:
+            results = orchestrator.fetch_all("NVDA", "tech", "auto")
+        inprocess.assert_not_called()
+        assert results["tech"]["symbol"] == "NVDA"
+
+    def test_auto_falls_back_in_process(self, sock_path, monkeypatch):
+        monkeypatch.setattr(data_daemon, "SOCKET_PATH", sock_path)
+        with patch('tools.orchestrator.run_inprocess', return_value={"symbol": "NVDA"}) as inprocess:
+            assert orchestrator.fetch_all("NVDA", "tech", "auto") == {"tech": {"symbol": "NVDA"}}
+        inprocess.assert_called_once_with("get_market.py", "NVDA")
+        with pytest.raises(data_daemon.DaemonUnavailable):
+            orchestrator.fetch_all("NVDA", "tech", "daemon")
+
+    @pytest.mark.parametrize("error", [RuntimeError("fetch failed"), TimeoutError("timed out"),
+                                       ValueError("truncated reply")])
+    def test_auto_falls_back_when_the_daemon_fails(self, monkeypatch, error):
+        def broken(ticker, mode):
+            raise error
+        monkeypatch.setattr(data_daemon, "request", broken)
+        with patch('tools.orchestrator.run_inprocess', return_value={"symbol": "NVDA"}):
+            assert orchestrator.fetch_all("NVDA", "tech", "auto") == {"tech": {"symbol": "NVDA"}}
+        with pytest.raises(type(error)):
+            orchestrator.fetch_all("NVDA", "tech", "daemon")
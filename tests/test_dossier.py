@@ -0,0 +1,116 @@
+import sys
+import os
+import io
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import agency_manager, dossier
+
+def live(t0=None):
+    out = io.StringIO()
+    return dossier.Dossier("NVDA", out, t0), out
+
+class TestStreaming:
+    def test_live_section_owns_the_terminal(self):
+        d, out = live()
+        d.chunk("fund", "fund part 1 ")
+        d.chunk("tech", "tech all")          # buffered: fund is live
+        d.log("▶️  bull")                     # held until fund's section ends
+        d.finish("tech")
+        d.chunk("fund", "fund part 2")
+        d.finish("fund")
+        text = out.getvalue()
+        assert text.index("FUNDAMENTAL") < text.index("fund part 2") < text.index("▶️  bull") < \
+            text.index("TECHNICAL") < text.index("tech all")
+        assert d.owner is None and set(d.marks) == {"first_output", "first_section"}
+
+    def test_finished_sections_flush_in_dossier_order(self):
+        d, out = live()
+        d.chunk("plan", "P")
+        d.chunk("signal", "S")
+        d.chunk("risk", "R")
+        d.finish("risk")
+        d.finish("signal")
+        d.finish("plan")
+        text = out.getvalue()
+        assert text.index("TRADE PLAN") < text.index("BULL VS BEAR") < text.index("RISK")
+        assert "decision" in d.marks
+
+    def test_failed_section_and_non_section_agents(self):
+        d, out = live()
+        d.chunk("tech", "half")
+        d.chunk("bull", "memo")                # researchers are not in the dossier
+        d.finish("tech", ok=False)
+        assert "TECHNICAL REPORT failed" in out.getvalue() and "memo" not in out.getvalue()
+        assert "first_section" not in d.marks
+
+    def test_restart_discards_partial_output(self):
+        d, out = live()
+        d.chunk("tech", "partial")
+        d.chunk("fund", "fund partial")
+        d.restart("tech")
+        d.restart("fund")
+        d.chunk("tech", "full tech")
+        d.finish("tech")
+        d.chunk("fund", "full fund")
+        d.finish("fund")
+        text = out.getvalue()
+        assert text.index("partial") < text.index("interrupted") < text.rindex("TECHNICAL") < text.index("full tech")
+        assert "fund partial" not in text and text.count("FUNDAMENTAL") == 1
+
+    def test_silent_mode_only_marks(self, capsys):
+        d = dossier.Dossier("NVDA")
+        d.chunk("tech", "x")
+        d.finish("signal")
+        d.log("hello")
+        assert capsys.readouterr().out == "hello\n"
+        assert set(d.marks) == {"first_section", "decision"}
+
+class TestSavedDossier:
+    def test_fixed_order_and_missing_sections(self, tmp_path):
+        for name in ("plan", "tech", "risk"):
+            (tmp_path / f"{name}.md").write_text(f"{name} body\n")
+        text = open(dossier.save(str(tmp_path), "NVDA")).read()
+        assert "GEMINI CAPITAL DOSSIER: NVDA" in text
+        assert text.index("tech body") < text.index("risk body") < text.index("plan body")
+        assert "FUNDAMENTAL" not in text
+
+class TestRunStreaming:
+    def test_quota_retry_restarts_the_section(self, tmp_path, monkeypatch):
+        from tools import agent_cache, agent_executor
+        monkeypatch.setattr(agent_executor, "STATE_DIR", str(tmp_path / "executor"))
+        monkeypatch.setattr(agent_executor, "DISABLED", False)
+        monkeypatch.setattr(agent_executor, "BACKOFF_DEFAULT", 0)
+        monkeypatch.setattr(agent_cache, "cached_call", lambda argv, stdin, call, label=None: (call(), False))
+        attempts = []
+
+        def fake_streaming(argv, stdin, on_chunk):
+            attempts.append(1)
+            on_chunk("half ")
+            if len(attempts) == 1:
+                raise RuntimeError("gemini exited 1: 429 RESOURCE_EXHAUSTED")
+            on_chunk("whole")
+            return "half whole"
+
+        monkeypatch.setattr(agency_manager, "run_streaming", fake_streaming)
+        d, out = live()
+        monkeypatch.setattr(agency_manager, "DOSSIER", d)
+        prompt = tmp_path / "p.md"
+        prompt.write_text("P")
+        node = agency_manager.Node("tech", "agent", [], [str(tmp_path / "tech.md")], prompt=str(prompt))
+        agency_manager.run_agent(node, "flash")
+        text = out.getvalue()
+        assert text.split("interrupted; restarting")[1].count("half whole") == 1
+        assert (tmp_path / "tech.md").read_text() == "half whole"
+
+    def test_chunks_arrive_before_exit(self):
+        code = "import sys, time; d = sys.stdin.read(); print('a:' + d, flush=True); time.sleep(0.2); print('b')"
+        chunks = []
+        out = agency_manager.run_streaming([sys.executable, "-c", code], "in", chunks.append)
+        assert out == "a:in\nb\n" and chunks[0].startswith("a:in") and len(chunks) >= 2
+
+    def test_nonzero_exit_raises_with_stderr(self):
+        code = "import sys; sys.stderr.write('quota exceeded'); sys.exit(1)"
+        with pytest.raises(RuntimeError, match="quota exceeded"):
+            agency_manager.run_streaming([sys.executable, "-c", code], "", lambda t: None)
@@ -0,0 +1,107 @@
+import sys
+import os
+import subprocess
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import dossier_archive
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+VERDICT = """### ⚖️ 投资辩论裁决
+*   **多方核心论点**: 数据中心需求强劲
+*   **空方核心论点**: 估值过高
+*   **胜负手**: 多方
+*   **最终信号**: **[买入]**
+"""
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    monkeypatch.setattr(dossier_archive, "ARCHIVE_PATH", str(tmp_path / "archive.sqlite"))
+    return dossier_archive
+
+class TestDecision:
+    def test_final_signal_line(self):
+        assert dossier_archive.extract_decision(VERDICT) == "BUY"
+        assert dossier_archive.extract_decision("*   **最终信号**: **[强力卖出]**") == "STRONG_SELL"
+        assert dossier_archive.extract_decision("卖出压力大\n最终信号: 观望") == "HOLD"
+        assert dossier_archive.extract_decision("| Signal | Strong Buy |") == "STRONG_BUY"
+        assert dossier_archive.extract_decision("no verdict; buyback announced") is None
+
+    def test_tokenize_mixes_words_and_bigrams(self):
+        assert dossier_archive.tokenize("The GPU 数据中心") == ["gpu", "数据", "据中", "中心"]
+
+class TestArchive:
+    def test_add_history_and_show(self, archive):
+        a = archive.add("nvda", "body one", "BUY", "verdict one", run_at=100)
+        archive.add("AMD", "body two", "SELL", "verdict two", run_at=200)
+        b = archive.add("NVDA", "body three", "HOLD", "verdict three", run_at=300)
+        assert [d["id"] for d in archive.history("NVDA")] == [b, a]
+        assert [d["ticker"] for d in archive.history(decision="sell")] == ["AMD"]
+        assert archive.get(a) == "body one" and archive.get(999) is None
+        assert archive.stats()["dossiers"] == 3
+
+    def test_recall_ranks_by_similarity(self, archive):
+        chips = archive.add("NVDA", "gpu datacenter demand accelerators hyperscaler capex gpu", "BUY", "chips")
+        archive.add("XOM", "oil refining margins crude opec barrels", "SELL", "oil")
+        archive.add("JPM", "bank deposits net interest margin loans", "HOLD", "bank")
+        hits = archive.recall("hyperscaler gpu capex surge", k=2)
+        assert hits[0]["id"] == chips and hits[0]["score"] > 0
+        assert len(hits) == 1   # documents sharing no query term are not candidates
+        assert archive.recall("gpu", ticker="XOM") == []
+        assert archive.recall("gpu", exclude_ticker="NVDA") == []
+        assert archive.recall("unseen words only") == []
+
+    def test_index_updates_incrementally(self, archive):
+        archive.add("AAA", "alpha beta gamma", "BUY", "a")
+        assert archive.recall("delta") == []
+        new = archive.add("BBB", "delta epsilon", "SELL", "b")
+        assert [d["id"] for d in archive.recall("delta")] == [new]
+
+    def test_archive_run_and_prior_markdown(self, archive, tmp_path):
+        reports = tmp_path / "reports"
+        reports.mkdir()
+        (reports / "signal.md").write_text(VERDICT)
+        (reports / "tech.md").write_text("RSI overbought, 数据中心 momentum")
+        doc_id, decision = archive.archive_run(str(reports), "NVDA")
+        assert decision == "BUY"
+        assert "TECHNICAL REPORT" in archive.get(doc_id)   # dossier rebuilt from the reports
+        assert archive.history("NVDA")[0]["conclusion"].startswith("*   **多方核心论点**")
+        archive.add("AMD", "数据中心 momentum overbought", "SELL", "AMD verdict")
+        text, _ = archive.prior_markdown("NVDA", "数据中心 momentum")
+        assert "NVDA verdict history" in text and "BUY — 多方核心论点" in text
+        assert "AMD" in text and "> AMD verdict" in text
+
+    def test_cli_recall_writes_prior(self, tmp_path):
+        query, out = tmp_path / "q.md", tmp_path / "prior.md"
+        query.write_text("anything")
+        env = dict(os.environ, AGENCY_ARCHIVE_DB=str(tmp_path / "a.sqlite"), PYTHONPATH=ROOT)
+        subprocess.run([sys.executable, os.path.join(ROOT, "tools/dossier_archive.py"), "recall", "NVDA",
+                        "--query-file", str(query), "--out", str(out)], check=True, env=env, capture_output=True)
+        assert "No archived dossiers yet." in out.read_text()
+
+    def test_rerun_of_same_reports_is_stable(self, archive, tmp_path):
+        reports = tmp_path / "reports"
+        reports.mkdir()
+        (reports / "all_analyst_reports.md").write_text("RSI overbought, 数据中心 momentum")
+        (reports / "signal.md").write_text(VERDICT)
+        archive.add("NVDA", "older run", "SELL", "older verdict")
+        query = (reports / "all_analyst_reports.md").read_text() + "\n"
+        before, _ = archive.prior_markdown("NVDA", query)
+        first, _ = archive.archive_run(str(reports), "NVDA")
+        # the run's own archived verdict does not feed back into its prior.md
+        assert archive.prior_markdown("NVDA", query)[0] == before
+        # an identical (cached) re-run is not archived twice
+        assert archive.archive_run(str(reports), "NVDA")[0] == first
+        assert archive.stats()["dossiers"] == 2
+        # new analyst reports see the earlier run
+        assert "BUY" in archive.prior_markdown("NVDA", "fresh reports")[0]
+
+    def test_cli_recall_survives_a_broken_archive(self, tmp_path):
+        db, out = tmp_path / "a.sqlite", tmp_path / "prior.md"
+        db.write_bytes(b"not a database" * 100)
+        env = dict(os.environ, AGENCY_ARCHIVE_DB=str(db), PYTHONPATH=ROOT)
+        subprocess.run([sys.executable, os.path.join(ROOT, "tools/dossier_archive.py"), "recall", "NVDA",
+                        "--out", str(out)], check=True, env=env, capture_output=True)
+        assert out.read_text() == dossier_archive.NO_PRIOR
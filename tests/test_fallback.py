@@ -0,0 +1,116 @@
+import sys
+import os
+import time
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import fallback, get_news, get_market
+
+@pytest.fixture(autouse=True)
+def health(tmp_path, monkeypatch):
+    path = str(tmp_path / "fallback_health.json")
+    monkeypatch.setattr(fallback, "STATE_PATH", path)
+    return path
+
+def slow(value, seconds, calls=None):
+    def fn():
+        if calls is not None:
+            calls.append(value)
+        time.sleep(seconds)
+        return value
+    return fn
+
+def failing(calls=None, name="x"):
+    def fn():
+        if calls is not None:
+            calls.append(name)
+        raise ValueError("boom")
+    return fn
+
+class TestRace:
+    def test_failure_starts_next_source_at_once(self):
+        t0 = time.time()
+        name, result = fallback.race("g", [("a", failing()), ("b", slow("B", 0))], hedge_delay=5)
+        assert (name, result) == ("b", "B")
+        assert time.time() - t0 < 1
+
+    def test_hedge_takes_first_answer(self):
+        calls = []
+        t0 = time.time()
+        name, result = fallback.race("g", [("a", slow("A", 2, calls)), ("b", slow("B", 0.05, calls))],
+                                     hedge_delay=0.1)
+        assert (name, result) == ("b", "B")
+        assert calls == ["A", "B"]
+        assert time.time() - t0 < 1
+
+    def test_no_hedge_when_first_answers_in_time(self):
+        calls = []
+        name, _ = fallback.race("g", [("a", slow("A", 0, calls)), ("b", slow("B", 0, calls))], hedge_delay=1)
+        assert name == "a" and calls == ["A"]
+
+    def test_invalid_results_fall_through(self):
+        name, result = fallback.race("g", [("a", lambda: []), ("b", lambda: [1])], valid=bool)
+        assert (name, result) == ("b", [1])
+
+    def test_all_failed_reports_every_source(self):
+        with pytest.raises(fallback.AllSourcesFailed) as exc:
+            fallback.race("g", [("a", failing()), ("b", lambda: None)])
+        assert set(exc.value.errors) == {"a", "b"}
+        assert "a:boom" in str(exc.value)
+
+    def test_timeout(self):
+        with pytest.raises(fallback.AllSourcesFailed):
+            fallback.race("g", [("a", slow("A", 1))], timeout=0.1)
+
+class TestHealth:
+    def test_fastest_healthy_source_goes_first(self):
+        for _ in range(3):
+            fallback.record("news/slow", True, 2.0)
+            fallback.record("news/fast", True, 0.1)
+        assert fallback.rank("news", ["slow", "fast", "new"]) == ["fast", "new", "slow"]
+
+    def test_failing_source_is_demoted(self):
+        for _ in range(5):
+            fallback.record("news/fast", False, 0.01)
+        fallback.record("news/slow", True, 3.0)
+        assert fallback.rank("news", ["fast", "slow"]) == ["slow", "fast"]
+
+    def test_ordered_keeps_preference_among_healthy(self):
+        fallback.record("market/yahoo", True, 2.0)
+        fallback.record("market/stooq", True, 0.1)
+        assert fallback.rank("market", ["yahoo", "stooq"], ordered=True) == ["yahoo", "stooq"]
+        for _ in range(5):
+            fallback.record("market/yahoo", False, 0.1)
+        assert fallback.rank("market", ["yahoo", "stooq"], ordered=True) == ["stooq", "yahoo"]
+
+    def test_race_persists_outcomes(self):
+        calls = []
+        fallback.race("g", [("a", failing(calls, "a")), ("b", slow("B", 0, calls))])
+        h = fallback.health()
+        assert h["g/a"]["success"] < 1.0 and h["g/b"]["calls"] == 1
+        for _ in range(3):
+            fallback.race("g", [("a", failing(calls, "a")), ("b", slow("B", 0, calls))])
+        calls.clear()
+        fallback.race("g", [("a", failing(calls, "a")), ("b", slow("B", 0, calls))])
+        assert calls == ["B"]
+
+class TestToolChains:
+    def test_news_skips_throttled_source_without_waiting(self, monkeypatch):
+        monkeypatch.setattr(get_news, "_fetch_ddg_news", lambda q: time.sleep(5))
+        monkeypatch.setattr(get_news, "_fetch_yf_news", failing())
+        monkeypatch.setattr(get_news, "_fetch_google_rss",
+                            lambda t: [{"title": f"{t} beats estimates", "body": "", "href": "u"}])
+        monkeypatch.setattr(fallback, "HEDGE_DELAY", 0.1)
+        t0 = time.time()
+        out = get_news.get_news_sentiment("AAA")
+        assert out["source"] == "GoogleRSS" and out["top_news"][0]["title"] == "AAA beats estimates"
+        assert time.time() - t0 < 2
+
+    def test_market_falls_back_to_stooq(self, monkeypatch):
+        monkeypatch.setattr(get_market, "_market_from_yf", failing())
+        monkeypatch.setattr(get_market, "_market_from_stooq",
+                            lambda t: {"symbol": t, "current_price": 1.0, "source": "Stooq (Fallback)"})
+        assert get_market.get_market_data("AAA")["source"] == "Stooq (Fallback)"
+        monkeypatch.setattr(get_market, "_market_from_stooq", failing())
+        assert "error" in get_market.get_market_data("AAA")
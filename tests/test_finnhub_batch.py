@@ -0,0 +1,45 @@
+import sys
+import os
+import json
+import asyncio
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import finnhub_batch, candle_store, http_cache, news_store, get_data_finnhub as gdf
+from benchmarks.stub_server import start_stub_server
+
+class TestFinnhubBatch:
+    def test_read_tickers_file(self, tmp_path):
+        path = tmp_path / "watchlist.txt"
+        path.write_text("aapl, msft  # megacaps\n\nnvda\nAAPL\n")
+        assert finnhub_batch.read_tickers(["tsla"], str(path)) == ["TSLA", "AAPL", "MSFT", "NVDA"]
+
+    def test_host_limiter_rate(self):
+        async def burst():
+            lim = finnhub_batch.HostLimiter(concurrency=10, rate=20, burst=1)
+            t0 = time.monotonic()
+            for _ in range(5):
+                async with lim:
+                    pass
+            return time.monotonic() - t0
+        # 1 token up front, then 4 more at 20/sec
+        assert asyncio.run(burst()) >= 0.18
+
+    def test_batch_writes_per_ticker_outputs(self, tmp_path, monkeypatch):
+        server, base_url = start_stub_server()
+        monkeypatch.setattr(gdf, "API_KEY", "stub")
+        monkeypatch.setattr(gdf, "BASE_URL", f"{base_url}/api/v1")
+        monkeypatch.setattr(gdf, "STOOQ_BASE_URL", base_url)
+        monkeypatch.setattr(candle_store, "STORE_DIR", str(tmp_path / "candles"))
+        monkeypatch.setattr(news_store, "STORE_DIR", str(tmp_path / "news"))
+        monkeypatch.setattr(http_cache, "CACHE_PATH", str(tmp_path / "http_cache.sqlite"))
+        try:
+            status = asyncio.run(finnhub_batch.run_batch(["AAA", "BBB"], str(tmp_path), finnhub_rate=0))
+        finally:
+            server.shutdown()
+        assert status == {"AAA": True, "BBB": True}
+        market = json.loads((tmp_path / "AAA" / "market.json").read_text())
+        assert market["symbol"] == "AAA"
+        assert market["indicators"]["SMA_200"] is not None
+        assert json.loads((tmp_path / "BBB" / "news.json").read_text())["count"] == 10
@@ -0,0 +1,103 @@
+import sys
+import os
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import finviz, data_fetcher, get_financials
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "finviz")
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), "r") as f:
+        return f.read()
+
+def table(cells, cls="snapshot-table2"):
+    tds = "".join(f"<td>{c}</td>" for c in cells)
+    return f'<html><body><table class="{cls}"><tr>{tds}</tr></table></body></html>'
+
+class TestParseValue:
+    @pytest.mark.parametrize("text,expected", [
+        ("35.20", 35.2),
+        ("-1.37%", -1.37),
+        ("2842.43B", 2842430000000.0),
+        ("108.53M", 108530000.0),
+        ("1.2K", 1200.0),
+        ("46,623,336", 46623336),
+        ("161000", 161000),
+        ("164.08 - 199.62", [164.08, 199.62]),
+        ("1.30% 1.14%", [1.3, 1.14]),
+        ("0.96 (0.52%)", [0.96, 0.52]),
+        ("Yes", True),
+        ("-", None),
+        ("", None),
+        ("Oct 31 AMC", "Oct 31 AMC"),
+        ("S&P 500", "S&P 500"),
+    ])
+    def test_typing(self, text, expected):
+        assert finviz.parse_value(text) == expected
+
+class TestSnapshot:
+    @pytest.mark.parametrize("name", ["AAPL.html", "MSFT.html"])
+    def test_fixture_pages_yield_full_table(self, name):
+        data = finviz.parse_snapshot(fixture(name))
+        assert len(data) == 72
+        assert isinstance(data["P/E"], float)
+        assert isinstance(data["Market Cap"], float) and data["Market Cap"] > 1e9
+        assert isinstance(data["52W Range"], list) and len(data["52W Range"]) == 2
+        assert "S&P 500" in data["Index"]
+        assert data["EPS next Y (2)"] == 11.85
+        assert data["Optionable"] is True
+
+    def test_matches_old_regex_fields(self):
+        import re
+        html = fixture("AAPL.html")
+        data = finviz.parse_snapshot(html)
+        for label, key in (("P/E", "P/E"), ("Forward P/E", "Forward P/E"), ("RSI \\(14\\)", "RSI (14)")):
+            m = re.search(f">{label}</td>.*?<b>.*?([-\\d\\.]+)%?</span></b>", html, re.DOTALL)
+            assert float(m.group(1)) == data[key]
+
+    def test_missing_table(self):
+        assert finviz.parse_snapshot("<html><body><p>Access denied</p></body></html>") == {}
+        assert finviz.parse_snapshot("") == {}
+
+    def test_marker_outside_table_tag_is_ignored(self):
+        html = '<style>.snapshot-table2 { color: red }</style><table class="header"><tr><td>Home</td><td>x</td></tr></table>'
+        assert finviz.parse_snapshot(html) == {}
+        assert finviz.parse_snapshot(html + table(["P/E", "<b>12.5</b>"])) == {"P/E": 12.5}
+
+    def test_unclosed_cells_and_rows(self):
+        html = '<table class="snapshot-table2"><tr><td>P/E<td><b>12.5</b><td>PEG<td><b>1.1</b><tr><td>Beta<td>0.9</table>'
+        assert finviz.parse_snapshot(html) == {"P/E": 12.5, "PEG": 1.1, "Beta": 0.9}
+
+    def test_truncated_page(self):
+        html = fixture("AAPL.html")
+        cut = html[:html.index(">Perf YTD<")]
+        data = finviz.parse_snapshot(cut)
+        assert data["P/E"] == finviz.parse_snapshot(html)["P/E"]
+        assert "52W Range" in data and "Dividend" not in data
+
+    def test_odd_cell_count_and_entities(self):
+        html = table(["Index", "S&amp;P&nbsp;500", "<span>P/E</span>", "<b><span>&#45;</span></b>", "Dangling"])
+        assert finviz.parse_snapshot(html) == {"Index": "S&P 500", "P/E": None}
+
+    def test_parse_many_keeps_order(self):
+        pages = [fixture("AAPL.html"), "", fixture("MSFT.html")] * 3
+        out = finviz.parse_many(pages, workers=2)
+        assert [len(d) for d in out] == [72, 0, 72] * 3
+        assert out == finviz.parse_many(pages)
+
+class TestConsumers:
+    def test_tools_share_the_parser(self, monkeypatch):
+        monkeypatch.setattr(finviz, "fetch_html", lambda t: fixture("AAPL.html"))
+        snap = finviz.parse_snapshot(fixture("AAPL.html"))
+        assert data_fetcher.get_finviz_data("AAPL") == snap
+        fin = get_financials._financials_from_finviz("AAPL")
+        assert fin["valuation"]["Trailing_PE"] == snap["P/E"]
+        assert fin["financials"]["Revenue_Growth"] == pytest.approx(snap["Sales Q/Q"] / 100)
+
+    def test_blocked_page_fails(self, monkeypatch):
+        monkeypatch.setattr(finviz, "fetch_html", lambda t: "<html>blocked</html>")
+        with pytest.raises(ValueError):
+            finviz.snapshot("AAPL")
+        assert data_fetcher.get_finviz_data("AAPL") == {}
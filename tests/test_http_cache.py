@@ -0,0 +1,169 @@
+import sys
+import os
+import sqlite3
+import subprocess
+import threading
+import time
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import http_cache, get_data_finnhub as gdf
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.sqlite")
+    monkeypatch.setattr(http_cache, "CACHE_PATH", path)
+    monkeypatch.setattr(http_cache, "DISABLED", False)
+    monkeypatch.setattr(http_cache, "STATS", dict.fromkeys(http_cache.COUNTERS, 0))
+    monkeypatch.setitem(http_cache.TTLS, "fast", (60, 60))
+    return path
+
+class Counter:
+    def __init__(self, value=None, fail=False):
+        self.calls = 0
+        self.value = value
+        self.fail = fail
+
+    def __call__(self):
+        self.calls += 1
+        if self.fail:
+            raise IOError("upstream down")
+        return self.value if self.value is not None else {"n": self.calls}
+
+def age_entries(seconds):
+    conn = http_cache._conn()
+    conn.execute("UPDATE entries SET fetched_at = fetched_at - ?", (seconds,))
+
+class TestCached:
+    def test_fresh_hit(self):
+        fetch = Counter()
+        assert http_cache.cached("fast", {"symbol": "AAA"}, fetch) == {"n": 1}
+        assert http_cache.cached("fast", {"symbol": "AAA"}, fetch) == {"n": 1}
+        assert http_cache.cached("fast", {"symbol": "BBB"}, fetch) == {"n": 2}
+        assert fetch.calls == 2
+        assert http_cache.STATS["hit"] == 1 and http_cache.STATS["miss"] == 2
+
+    def test_param_order_does_not_matter(self):
+        fetch = Counter()
+        http_cache.cached("fast", {"a": 1, "b": 2}, fetch)
+        http_cache.cached("fast", {"b": 2, "a": 1}, fetch)
+        assert fetch.calls == 1
+
+    def test_stale_while_revalidate_does_not_block(self):
+        http_cache.cached("fast", {"s": 1}, lambda: {"v": "old"})
+        age_entries(90)  # past fresh (60), inside the stale window (60 + 60)
+        release = threading.Event()
+
+        def slow():
+            release.wait(5)
+            return {"v": "new"}
+
+        t0 = time.monotonic()
+        assert http_cache.cached("fast", {"s": 1}, slow) == {"v": "old"}
+        assert time.monotonic() - t0 < 1
+        release.set()
+        http_cache._drain(5)
+        assert http_cache.cached("fast", {"s": 1}, Counter(fail=True)) == {"v": "new"}
+        assert http_cache.STATS["stale"] == 1 and http_cache.STATS["revalidated"] == 1
+
+    def test_only_one_revalidation_per_lease(self):
+        http_cache.cached("fast", {"s": 1}, lambda: {"v": "old"})
+        age_entries(90)
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            release.wait(5)
+            return {"v": "new"}
+
+        for _ in range(3):
+            http_cache.cached("fast", {"s": 1}, slow)
+        release.set()
+        http_cache._drain(5)
+        assert len(calls) == 1
+
+    def test_expired_fetches_inline_and_serves_stale_on_error(self):
+        http_cache.cached("fast", {"s": 1}, lambda: {"v": "old"})
+        age_entries(1000)
+        assert http_cache.cached("fast", {"s": 1}, Counter(fail=True)) == {"v": "old"}
+        assert http_cache.STATS["stale_on_error"] == 1
+        assert http_cache.cached("fast", {"s": 1}, lambda: {"v": "new"}) == {"v": "new"}
+
+    def test_failures_are_not_cached(self):
+        with pytest.raises(IOError):
+            http_cache.cached("fast", {"s": 1}, Counter(fail=True))
+        assert http_cache.cached("fast", {"s": 1}, lambda: None) is None
+        assert http_cache.stats()["entries"] == 0
+
+    def test_locked_cache_still_returns_the_value(self, monkeypatch):
+        http_cache.cached("fast", {"s": 1}, Counter())
+        def locked(*args):
+            raise sqlite3.OperationalError("database is locked")
+        for name in ("_store", "_bump", "_touch", "_claim"):
+            monkeypatch.setattr(http_cache, name, locked)
+        assert http_cache.cached("fast", {"s": 2}, Counter(value={"ok": 1})) == {"ok": 1}
+        assert http_cache.cached("fast", {"s": 1}, Counter(fail=True)) == {"n": 1}
+        age_entries(90)   # stale: the revalidation claim fails quietly too
+        assert http_cache.cached("fast", {"s": 1}, Counter(fail=True)) == {"n": 1}
+        http_cache.put("fast", {"s": 3}, {"n": 3})
+
+    def test_custom_codec(self):
+        enc = lambda v: ",".join(map(str, v))
+        dec = lambda s: [int(x) for x in s.split(",")]
+        http_cache.cached("fast", {}, lambda: [1, 2, 3], encode=enc, decode=dec)
+        assert http_cache.cached("fast", {}, Counter(fail=True), encode=enc, decode=dec) == [1, 2, 3]
+
+    def test_disabled_bypasses(self, monkeypatch):
+        monkeypatch.setattr(http_cache, "DISABLED", True)
+        fetch = Counter()
+        http_cache.cached("fast", {}, fetch)
+        http_cache.cached("fast", {}, fetch)
+        assert fetch.calls == 2
+
+class TestEviction:
+    def test_lru_size_limit(self, monkeypatch):
+        monkeypatch.setattr(http_cache, "MAX_BYTES", 1000)
+        for i in range(3):
+            http_cache.cached("fast", {"i": i}, lambda: "x" * 300)
+        http_cache.cached("fast", {"i": 0}, Counter(fail=True))  # touch 0: now most recent
+        http_cache.cached("fast", {"i": 3}, lambda: "x" * 300)   # 1200 bytes -> evict LRU
+        keys = {k for (k,) in http_cache._conn().execute("SELECT key FROM entries")}
+        assert http_cache.make_key("fast", {"i": 1}) not in keys
+        assert http_cache.make_key("fast", {"i": 0}) in keys
+        assert http_cache.stats()["bytes"] <= 1000
+        assert http_cache.STATS["evicted"] >= 1
+
+class TestSharing:
+    def test_cross_process(self, cache):
+        code = (
+            "from tools import http_cache\n"
+            f"http_cache.CACHE_PATH = {cache!r}\n"
+            "def boom(): raise IOError('should be cached')\n"
+            "print(http_cache.cached('/stock/metric', {'s': 'X'}, boom)['from'])\n"
+        )
+        http_cache.put("/stock/metric", {"s": "X"}, {"from": "parent"})
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                             env=dict(os.environ, PYTHONPATH=ROOT))
+        assert out.stdout.strip() == "parent", out.stderr
+
+    def test_fetch_json_uses_cache(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(gdf, "_get_json", lambda url, params: calls.append(params) or {"c": 1.0})
+        assert gdf.fetch_json("/quote", {"symbol": "AAA"}) == {"c": 1.0}
+        assert gdf.fetch_json("/quote", {"symbol": "AAA"}) == {"c": 1.0}
+        assert len(calls) == 1
+        # The API token never becomes part of a cache key
+        (key,) = http_cache._conn().execute("SELECT key FROM entries").fetchone()
+        assert "token" not in key
+
+    def test_get_put(self):
+        assert http_cache.get("fast", {"s": 1}) is None
+        http_cache.put("fast", {"s": 1}, {"v": 1})
+        assert http_cache.get("fast", {"s": 1}) == {"v": 1}
+        age_entries(90)
+        assert http_cache.get("fast", {"s": 1}) is None
+        assert http_cache.get("fast", {"s": 1}, allow_stale=True) == {"v": 1}
@@ -0,0 +1,111 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import indicator_state, candle_store
+from tools.indicator_state import IndicatorState, format_technicals, technicals_for
+
+def make_cols(closes, start=1_600_000_000):
+    closes = np.asarray(closes, dtype=float)
+    t = start + 86400 * np.arange(len(closes), dtype=np.int64)
+    return {"t": t, "o": closes, "h": closes, "l": closes, "c": closes, "v": np.ones(len(closes))}
+
+def pandas_technicals(df):
+    """The original pandas calculate_technicals, kept as the parity reference."""
+    df = df.sort_values('t')
+    close = df['c']
+    delta = close.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    bb_mid = close.rolling(window=20).mean()
+    bb_std = close.rolling(window=20).std()
+    macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    signal = macd.ewm(span=9, adjust=False).mean()
+    latest = pd.DataFrame({
+        'c': close,
+        'SMA_50': close.rolling(window=50).mean(),
+        'SMA_200': close.rolling(window=200).mean(),
+        'RSI_14': 100 - (100 / (1 + gain / loss)),
+        'BB_Upper': bb_mid + (bb_std * 2),
+        'BB_Lower': bb_mid - (bb_std * 2),
+        'MACD_Line': macd,
+        'MACD_Signal': signal,
+        'MACD_Hist': macd - signal,
+    }).iloc[-1]
+    return format_technicals(latest)
+
+def pandas_reference(cols):
+    return pandas_technicals(candle_store.to_frame(cols))
+
+def random_walk(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.round(100 * np.cumprod(1 + rng.normal(0, 0.02, n)), 2)
+
+@pytest.fixture
+def state_dir(tmp_path):
+    return str(tmp_path)
+
+class TestParity:
+    @pytest.mark.parametrize("n", [1, 2, 13, 14, 15, 20, 26, 50, 199, 200, 201, 1500])
+    def test_random_walk(self, n, state_dir):
+        cols = make_cols(random_walk(n, seed=n))
+        assert technicals_for("X", cols, state_dir) == pandas_reference(cols)
+
+    def test_flat_series_has_no_rsi(self, state_dir):
+        cols = make_cols([50.0] * 60)
+        out = technicals_for("X", cols, state_dir)
+        assert out == pandas_reference(cols)
+        assert out["RSI_14"] is None
+
+    def test_monotonic_series_rsi_100(self, state_dir):
+        cols = make_cols(np.arange(1, 40, dtype=float))
+        out = technicals_for("X", cols, state_dir)
+        assert out == pandas_reference(cols)
+        assert out["RSI_14"] == 100.0
+
+    def test_rounding_ties_match_bitwise(self, state_dir):
+        # Two-decimal closes put SMA/Bollinger values on exact .xx5 ties often,
+        # so only bit-identical accumulators agree on every seed.
+        for seed in range(100):
+            cols = make_cols(random_walk(320, seed=seed))
+            assert technicals_for(f"S{seed}", cols, state_dir) == pandas_reference(cols)
+
+class TestIncremental:
+    def test_runs_only_apply_new_bars(self, state_dir):
+        closes = random_walk(700, seed=7)
+        for end in (300, 301, 450, 700):
+            cols = make_cols(closes[:end])
+            assert technicals_for("X", cols, state_dir) == pandas_reference(cols)
+        assert indicator_state.load_state("X", state_dir).n == 699
+
+    def test_revised_last_bar(self, state_dir):
+        closes = random_walk(300, seed=3)
+        technicals_for("X", make_cols(closes), state_dir)
+        revised = closes.copy()
+        revised[-1] *= 1.05
+        cols = make_cols(revised)
+        assert technicals_for("X", cols, state_dir) == pandas_reference(cols)
+
+    def test_misaligned_state_bootstraps(self, state_dir):
+        technicals_for("X", make_cols(random_walk(300, seed=1)), state_dir)
+        cols = make_cols(random_walk(250, seed=2), start=1_000_000_000)
+        assert technicals_for("X", cols, state_dir) == pandas_reference(cols)
+
+    def test_restated_history_bootstraps(self, state_dir):
+        closes = random_walk(300, seed=5)
+        technicals_for("X", make_cols(closes), state_dir)
+        cols = make_cols(np.append(closes / 2, closes[-1] / 2 * 1.01))   # 2:1 split adjustment, one new bar
+        assert technicals_for("X", cols, state_dir) == pandas_reference(cols)
+
+    def test_state_roundtrip(self):
+        closes = random_walk(2500, seed=11)
+        st = IndicatorState()
+        for i, c in enumerate(closes[:-1]):
+            st.update(i, c)
+        clone = IndicatorState.from_dict(st.to_dict())
+        assert clone.technicals(closes[-1]) == st.technicals(closes[-1])
+        assert clone.technicals(closes[-1]) == pandas_reference(make_cols(closes))
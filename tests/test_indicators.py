@@ -0,0 +1,171 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import indicators
+from tools.get_data_finnhub import calculate_technicals
+from tools.get_market import calculate_rsi
+from tools.indicator_state import technicals_for
+
+def random_walk(n, seed=0, rows=None):
+    rng = np.random.default_rng(seed)
+    shape = (rows, n) if rows else n
+    return np.round(100 * np.cumprod(1 + rng.normal(0, 0.02, shape), axis=-1), 2)
+
+def pandas_rsi(s, window=14):
+    delta = s.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
+    return 100 - (100 / (1 + gain / loss))
+
+def pandas_technicals(close):
+    """The latest-bar values of the original pandas calculate_technicals()."""
+    s = pd.Series(close)
+    mid, std = s.rolling(20).mean(), s.rolling(20).std()
+    line = s.ewm(span=12, adjust=False).mean() - s.ewm(span=26, adjust=False).mean()
+    sig = line.ewm(span=9, adjust=False).mean()
+    return {"RSI_14": pandas_rsi(s).iloc[-1], "SMA_50": s.rolling(50).mean().iloc[-1],
+            "SMA_200": s.rolling(200).mean().iloc[-1], "Upper": (mid + 2 * std).iloc[-1],
+            "Lower": (mid - 2 * std).iloc[-1], "Line": line.iloc[-1], "Signal": sig.iloc[-1],
+            "Hist": (line - sig).iloc[-1]}
+
+def assert_close(got, ref):
+    np.testing.assert_allclose(got, ref, rtol=1e-9, atol=1e-9)
+
+class TestKernelsVsPandas:
+    @pytest.mark.parametrize("n", [1, 13, 14, 20, 64, 65, 200, 1500])
+    def test_series(self, n):
+        x = random_walk(n, seed=n)
+        s = pd.Series(x)
+        assert_close(indicators.sma(x, 50), s.rolling(50).mean())
+        assert_close(indicators.sma(x, 200), s.rolling(200).mean())
+        assert_close(indicators.rolling_std(x, 20), s.rolling(20).std())
+        assert_close(indicators.ema(x, 12), s.ewm(span=12, adjust=False).mean())
+        assert_close(indicators.rsi(x, 14), pandas_rsi(s))
+        assert_close(indicators.rolling_min(x, 20), s.rolling(20).min())
+        assert_close(indicators.rolling_max(x, 7), s.rolling(7).max())
+
+    def test_long_ewm_stays_accurate(self):
+        x = random_walk(100_000, seed=5)
+        for span in (2, 9, 26, 400):
+            ref = pd.Series(x).ewm(span=span, adjust=False).mean()
+            assert_close(indicators.ema(x, span), ref)
+
+    def test_flat_series(self):
+        x = np.full(60, 50.0)
+        assert np.all(np.isnan(indicators.rsi(x)))
+        assert indicators.rolling_std(x, 20)[-1] == 0.0
+        assert indicators.sma(x, 50)[-1] == 50.0
+
+class TestBatch:
+    def test_rows_match_single_series(self):
+        batch = random_walk(700, seed=1, rows=6)
+        out = indicators.technicals(batch)
+        for i, row in enumerate(batch):
+            single = indicators.technicals(row)
+            for key, arr in single.items():
+                assert_close(out[key][i], arr)
+
+    def test_latest_matches_full_series(self):
+        for n in (1, 14, 15, 50, 250):
+            batch = random_walk(n, seed=n, rows=3)
+            full = indicators.technicals(batch)
+            last = indicators.latest(batch)
+            for key, arr in last.items():
+                np.testing.assert_array_equal(arr, full[key][..., -1])
+            assert indicators.latest(batch[0])["SMA_50"] == last["SMA_50"][0] or n < 50
+
+    def test_nan_padding_only_poisons_its_windows(self):
+        batch = random_walk(400, seed=2, rows=2)
+        padded = batch.copy()
+        padded[1, :150] = np.nan
+        tail = batch[1, 150:]
+        assert_close(indicators.sma(padded, 50)[1, 150:], indicators.sma(tail, 50))
+        assert_close(indicators.ema(padded, 12)[1, 150:], indicators.ema(tail, 12))
+        assert np.all(np.isnan(indicators.ema(padded, 12)[1, :150]))
+        assert_close(indicators.rsi(padded)[1, 164:], indicators.rsi(tail)[14:])
+        # The unpadded row is untouched.
+        assert_close(indicators.macd(padded)[0][0], indicators.macd(batch[0])[0])
+
+class TestWilder:
+    def test_rsi_wilder_matches_loop(self):
+        x = random_walk(300, seed=3)
+        d = np.diff(x)
+        gains, losses = np.maximum(d, 0), np.maximum(-d, 0)
+        avg_g, avg_l = gains[:14].mean(), losses[:14].mean()
+        ref = [100 - 100 / (1 + avg_g / avg_l)]
+        for g, l in zip(gains[14:], losses[14:]):
+            avg_g = (avg_g * 13 + g) / 14
+            avg_l = (avg_l * 13 + l) / 14
+            ref.append(100 - 100 / (1 + avg_g / avg_l))
+        out = indicators.rsi(x, 14, method="wilder")
+        assert np.all(np.isnan(out[:14]))
+        assert_close(out[14:], ref)
+
+    def test_atr_matches_loop(self):
+        rng = np.random.default_rng(4)
+        close = random_walk(120, seed=4)
+        high = close * (1 + rng.uniform(0, 0.02, 120))
+        low = close * (1 - rng.uniform(0, 0.02, 120))
+        tr = [high[0] - low[0]] + [max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+                                   for i in range(1, 120)]
+        ref = [np.mean(tr[:14])]
+        for v in tr[14:]:
+            ref.append((ref[-1] * 13 + v) / 14)
+        out = indicators.atr(high, low, close, 14)
+        assert np.all(np.isnan(out[:13]))
+        assert_close(out[13:], ref)
+
+    def test_unknown_method(self):
+        with pytest.raises(ValueError):
+            indicators.rsi(random_walk(30), method="ema")
+
+class TestCallers:
+    def test_calculate_technicals_matches_engine(self, tmp_path):
+        # The engine is bit-identical to pandas; the kernels agree to within
+        # one unit of the last rounded digit (exact .xx5 ties may round apart).
+        for seed in range(20):
+            closes = random_walk(320, seed=seed)
+            t = 1_600_000_000 + 86400 * np.arange(len(closes), dtype=np.int64)
+            cols = {"t": t, "c": closes}
+            got = calculate_technicals({"t": t[::-1], "c": closes[::-1]})
+            ref = technicals_for(f"S{seed}", cols, str(tmp_path))
+            assert got["SMA_50_Status"] == ref["SMA_50_Status"]
+            for key, nd in (("RSI_14", 2), ("SMA_50", 2), ("SMA_200", 2)):
+                assert abs(got[key] - ref[key]) <= 10 ** -nd
+            for key in ("Upper", "Lower"):
+                assert abs(got["Bollinger"][key] - ref["Bollinger"][key]) <= 0.01
+            for key in ("Line", "Signal", "Hist"):
+                assert abs(got["MACD"][key] - ref["MACD"][key]) <= 0.001
+
+    def test_calculate_technicals_parity_with_pandas(self):
+        # Same definitions as the pandas path, different summation order: raw
+        # values agree to ~1e-12, so a rounded output may differ from pandas'
+        # by one unit in its last digit at an exact tie (seed 48: SMA_50
+        # 86.84500000000001 -> 86.85 here, 86.845 -> 86.84 in pandas), never by more.
+        digits = {"RSI_14": 2, "SMA_50": 2, "SMA_200": 2, "Upper": 2, "Lower": 2,
+                  "Line": 3, "Signal": 3, "Hist": 3}
+        for seed in range(300):
+            closes = random_walk(320, seed=seed)
+            ref = pandas_technicals(closes)
+            raw = indicators.latest(closes)
+            got = calculate_technicals({"c": closes})
+            flat = dict(got, **got["Bollinger"], **got["MACD"])
+            for key, nd in digits.items():
+                name = {"Upper": "BB_Upper", "Lower": "BB_Lower", "Line": "MACD_Line",
+                        "Signal": "MACD_Signal", "Hist": "MACD_Hist"}.get(key, key)
+                assert raw[name] == pytest.approx(ref[key], rel=1e-12, abs=1e-12)
+                assert abs(flat[key] - round(ref[key], nd)) <= 10 ** -nd * 1.0001
+
+    def test_calculate_technicals_empty(self):
+        assert calculate_technicals(None) == {}
+        assert calculate_technicals(pd.DataFrame()) == {}
+
+    def test_get_market_rsi(self):
+        hist = pd.DataFrame({"Close": random_walk(22, seed=9)})
+        assert_close(calculate_rsi(hist), pandas_rsi(hist["Close"]))
+        assert calculate_rsi(hist.iloc[:5]) is None
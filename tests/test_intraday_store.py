@@ -0,0 +1,117 @@
+import sys
+import os
+from datetime import datetime, timezone
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import intraday_store, rate_limit
+
+# 2024-01-31 09:30 America/New_York (14:30 UTC)
+OPEN = int(datetime(2024, 1, 31, 14, 30, tzinfo=timezone.utc).timestamp())
+
+def minute_bars(start, n, price=100.0):
+    t = start + 60 * np.arange(n, dtype=np.int64)
+    c = price + np.arange(n, dtype=np.float64)
+    return {"t": t, "o": c - 0.5, "h": c + 1, "l": c - 1, "c": c, "v": np.full(n, 10.0)}
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(intraday_store, "STORE_DIR", str(tmp_path))
+    return tmp_path
+
+class TestIntradayStore:
+    def test_roundtrip_and_month_partitions(self, store):
+        # 09:30 Jan 31 through 14:30 UTC Feb 1 crosses the month boundary
+        assert intraday_store.append("aapl", minute_bars(OPEN, 1440)) == 1440
+        assert intraday_store.partitions("AAPL") == ["2024-01", "2024-02"]
+        cols = intraday_store.load("AAPL")
+        assert cols["t"].dtype == np.int64 and cols["t"][0] == OPEN and len(cols["t"]) == 1440
+        assert intraday_store.watermark("AAPL") == OPEN + 1439 * 60
+        assert intraday_store.disk_usage("AAPL") == (1440, 1440 * intraday_store.BAR_BYTES)
+
+    def test_range_inside_one_month_is_memory_mapped(self, store):
+        intraday_store.append("AAPL", minute_bars(OPEN, 1440))
+        cols = intraday_store.load("AAPL", OPEN + 60, OPEN + 120 * 60)
+        assert isinstance(cols["c"], np.memmap)
+        assert len(cols["c"]) == 119 and cols["c"][0] == 101.0
+        assert intraday_store.load("AAPL", OPEN - 86400, OPEN) is None
+
+    def test_append_only_newer_and_watermark_replaced(self, store):
+        intraday_store.append("AAPL", minute_bars(OPEN, 10))
+        update = minute_bars(OPEN + 9 * 60, 3, price=500.0)
+        assert intraday_store.append("AAPL", update) == 2
+        assert intraday_store.append("AAPL", minute_bars(OPEN, 5)) == 0
+        cols = intraday_store.load("AAPL")
+        assert cols["c"].tolist()[8:] == [108.0, 500.0, 501.0, 502.0]
+
+    def test_resample_ohlcv(self, store):
+        intraday_store.append("AAPL", minute_bars(OPEN, 45))
+        bars = intraday_store.bars("AAPL", "15m")
+        assert (bars["t"] - OPEN).tolist() == [0, 900, 1800]
+        assert bars["o"].tolist() == [99.5, 114.5, 129.5]
+        assert bars["h"].tolist() == [115.0, 130.0, 145.0]
+        assert bars["l"].tolist() == [99.0, 114.0, 129.0]
+        assert bars["c"].tolist() == [114.0, 129.0, 144.0]
+        assert bars["v"].tolist() == [150.0] * 3
+        # hourly buckets open on the half hour
+        assert (intraday_store.bars("AAPL", "1h")["t"] - OPEN).tolist() == [0]
+
+    def test_hour_buckets_start_at_the_session_open(self, store):
+        # 4h bars open at 09:30 and 13:30 New York time in winter (UTC-5) ...
+        intraday_store.append("AAPL", minute_bars(OPEN, 390))
+        assert (intraday_store.bars("AAPL", "4h")["t"] - OPEN).tolist() == [0, 4 * 3600]
+        # ... and in summer (UTC-4), when the open is 13:30 UTC
+        summer = int(datetime(2024, 7, 1, 13, 30, tzinfo=timezone.utc).timestamp())
+        intraday_store.append("MSFT", minute_bars(summer - 3600, 390))
+        assert (intraday_store.bars("MSFT", "2h")["t"] - summer).tolist() == [-2 * 3600, 0, 2 * 3600, 4 * 3600]
+
+    def test_daily_bars_follow_exchange_day(self, store):
+        # 18:00-23:59 and 00:00-01:00 UTC are the same New York trading day
+        evening = OPEN + 3.5 * 3600
+        intraday_store.append("AAPL", minute_bars(int(evening), 7 * 60))
+        daily = intraday_store.bars("AAPL", "1d")
+        assert len(daily["t"]) == 1
+        assert daily["t"][0] == OPEN - (9 * 60 + 30) * 60
+        assert daily["v"][0] == 7 * 60 * 10.0
+
+    def test_technicals_on_any_timeframe(self, store):
+        intraday_store.append("AAPL", minute_bars(OPEN, 300))
+        assert intraday_store.technicals("AAPL", "5m")["RSI_14"] == 100.0
+        assert intraday_store.technicals("MSFT", "1h") == {}
+        with pytest.raises(ValueError):
+            intraday_store.timeframe_minutes("2w")
+
+    def test_parse_twelvedata(self):
+        payload = {"values": [
+            {"datetime": "2024-01-31 09:31:00", "open": "2", "high": "3", "low": "1", "close": "2.5", "volume": "7"},
+            {"datetime": "2024-01-31 09:30:00", "open": "1", "high": "2", "low": "1", "close": "1.5", "volume": "5"},
+        ]}
+        cols = intraday_store.parse_twelvedata(payload)
+        assert cols["t"].tolist() == [OPEN, OPEN + 60]
+        assert cols["c"].tolist() == [1.5, 2.5]
+
+    def test_twelvedata_pages_back_to_the_watermark(self, monkeypatch):
+        monkeypatch.setattr(rate_limit, "DISABLED", True)
+        monkeypatch.setattr(intraday_store, "TWELVE_DATA_OUTPUTSIZE", 100)
+        served = minute_bars(OPEN, 250)
+        requests = []
+
+        def fake_download(symbol, start=None, end=None):
+            requests.append(end)
+            t = served["t"]
+            keep = np.flatnonzero((t >= start) & (t <= (end or t[-1])))[-100:]
+            return {"values": [{"datetime": datetime.fromtimestamp(int(t[i]), tz=intraday_store.EXCHANGE_TZ)
+                                .strftime("%Y-%m-%d %H:%M:%S"), "open": "1", "high": "1", "low": "1",
+                                "close": str(served["c"][i]), "volume": "1"} for i in reversed(keep)]}
+
+        monkeypatch.setattr(intraday_store, "_download_twelvedata", fake_download)
+        cols = intraday_store.fetch_twelvedata("AAPL", OPEN + 20 * 60)
+        assert len(requests) == 3
+        assert cols["t"].tolist() == served["t"][20:].tolist()
+
+        requests.clear()
+        monkeypatch.setattr(intraday_store, "TWELVE_DATA_MAX_PAGES", 1)
+        assert len(intraday_store.fetch_twelvedata("AAPL", OPEN)["t"]) == 100
+        assert len(requests) == 1
@@ -0,0 +1,80 @@
+import sys
+import os
+import time
+from datetime import datetime, timezone
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import news_store, sentiment, get_data_finnhub as gdf
+from benchmarks.stub_server import make_news
+
+NOW = int(time.time())
+
+def article(i, headline, hours_ago=0):
+    return {"id": i, "headline": headline, "summary": "", "source": "Wire",
+            "datetime": NOW - hours_ago * 3600, "url": f"https://example.com/{i}"}
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(news_store, "STORE_DIR", str(tmp_path / "news"))
+    monkeypatch.setattr(sentiment, "MEMO_PATH", str(tmp_path / "sentiment.sqlite"))
+    return tmp_path
+
+class TestNewsStore:
+    def test_merge_dedupes_by_id_and_sets_watermark(self):
+        assert news_store.merge("aapl", [article(1, "A", 2), article(2, "B", 1)]) == 2
+        assert news_store.merge("AAPL", [article(2, "B again", 1), article(3, "C", 0)]) == 1
+        stored = news_store.load("AAPL")
+        assert [a["id"] for a in stored] == [3, 2, 1]
+        assert stored[1]["headline"] == "B"
+        assert news_store.watermark("AAPL") == NOW
+
+    def test_retention_drops_old_articles(self):
+        old = article(1, "Ancient", 24 * (news_store.RETENTION_DAYS + 1))
+        news_store.merge("AAPL", [old, article(2, "Fresh")])
+        assert [a["id"] for a in news_store.load("AAPL")] == [2]
+
+    def test_since_param_uses_watermark_within_window(self):
+        assert news_store.since_param(None, days=7) == datetime.fromtimestamp(
+            NOW - 7 * 86400, tz=timezone.utc).strftime("%Y-%m-%d")
+        assert news_store.since_param(NOW, days=7) == datetime.fromtimestamp(
+            NOW, tz=timezone.utc).strftime("%Y-%m-%d")
+        assert news_store.since_param(NOW - 30 * 86400, days=7) == news_store.since_param(None, days=7)
+
+    def test_refresh_only_asks_for_new_items(self):
+        asked = []
+        def fetch(since):
+            asked.append(since)
+            return [article(1, "First")] if len(asked) == 1 else None
+        assert len(news_store.refresh("AAPL", fetch)) == 1
+        assert len(news_store.refresh("AAPL", fetch)) == 1   # failed fetch keeps the stored window
+        assert asked[0] == news_store.since_param(None)
+        assert asked[1] == news_store.since_param(NOW)
+
+class TestNearDuplicates:
+    def test_syndicated_copies_collapse(self):
+        texts = ["Nvidia beats estimates as AI demand soars",
+                 "Apple unveils new iPhone lineup",
+                 "UPDATE 1-Nvidia beats estimates as AI demand soars",
+                 "Nvidia beats estimates as AI demand soars - Reuters",
+                 "Nvidia misses estimates as AI demand cools",
+                 ""]
+        assert news_store.clusters(texts) == [[0, 2, 3], [1], [4], [5]]
+
+    def test_distinct_keeps_first_of_each_story(self):
+        items = [{"headline": "AAA rallies on cloud growth"}, {"headline": "UPDATE 1-AAA rallies on cloud growth"},
+                 {"headline": "AAA slides after chip supply"}]
+        out = news_store.distinct(items, limit=5)
+        assert [(item["headline"], dup) for item, dup in out] == [
+            ("AAA rallies on cloud growth", 1), ("AAA slides after chip supply", 0)]
+
+    def test_build_news_data_fills_slots_with_distinct_stories(self):
+        raw = make_news("AAA", count=40)
+        data = gdf.build_news_data("AAA", raw)
+        titles = [n["title"] for n in data["top_news"]]
+        assert data["count"] == 10 and data["article_count"] == 40 and data["story_count"] == 30
+        assert not any(t.startswith("UPDATE 1-") for t in titles)
+        assert len(set(titles)) == 10
+        assert "duplicates" not in data["top_news"][0]
+        assert data["top_news"][2]["duplicates"] == 1
@@ -0,0 +1,151 @@
+import sys
+import os
+import subprocess
+import time
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import rate_limit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    path = str(tmp_path / "ratelimit")
+    monkeypatch.setattr(rate_limit, "STATE_DIR", path)
+    monkeypatch.setattr(rate_limit, "DISABLED", False)
+    monkeypatch.setitem(rate_limit.LIMITS, "fast", (20.0, 2))
+    return path
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+class HTTPError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"{status_code} Client Error")
+        self.response = FakeResponse(status_code, headers)
+
+class Flaky:
+    """Raises the queued errors in order, then succeeds."""
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+class TestBucket:
+    def test_burst_then_rate(self):
+        t0 = time.monotonic()
+        for _ in range(4):
+            rate_limit.acquire("fast")
+        # 2 tokens up front, then 2 more at 20/sec
+        assert time.monotonic() - t0 >= 0.09
+
+    def test_shared_across_processes(self, state_dir):
+        code = (
+            "from tools import rate_limit\n"
+            f"rate_limit.STATE_DIR = {state_dir!r}\n"
+            "rate_limit.LIMITS['slow'] = (0.01, 1)\n"
+            "rate_limit.acquire('slow')\n"
+        )
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                             env=dict(os.environ, PYTHONPATH=ROOT))
+        assert out.returncode == 0, out.stderr
+        # The child spent the only token; the next one is 100s away.
+        with pytest.raises(rate_limit.RateLimited):
+            rate_limit.acquire("slow", limit=(0.01, 1))
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(rate_limit, "DISABLED", True)
+        monkeypatch.setitem(rate_limit.LIMITS, "slow", (0.01, 1))
+        for _ in range(5):
+            assert rate_limit.acquire("slow") == 0.0
+
+class TestRetryAfter:
+    def test_header_parsing(self):
+        assert rate_limit.retry_after(HTTPError(429, {"Retry-After": "7"})) == 7.0
+        date = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 60))
+        assert 55 < rate_limit.retry_after(HTTPError(429, {"Retry-After": date})) <= 60
+        assert rate_limit.retry_after(HTTPError(429)) is None
+
+    def test_throttle_detection(self):
+        assert rate_limit.is_throttled(HTTPError(429))
+        assert rate_limit.is_throttled(ValueError("Too Many Requests. Rate limited. Try after a while."))
+        assert not rate_limit.is_throttled(HTTPError(500))
+        assert not rate_limit.is_throttled(ValueError("YF returned empty history"))
+
+    def test_waits_out_retry_after(self):
+        func = Flaky(HTTPError(429, {"Retry-After": "0.3"}))
+        t0 = time.monotonic()
+        assert rate_limit.call("fast", func) == "ok"
+        assert time.monotonic() - t0 >= 0.3
+        assert func.calls == 2
+
+    def test_long_retry_after_fails_fast(self):
+        func = Flaky(HTTPError(429, {"Retry-After": "3600"}))
+        t0 = time.monotonic()
+        with pytest.raises(rate_limit.RateLimited):
+            rate_limit.call("fast", func)
+        assert time.monotonic() - t0 < 1
+        assert func.calls == 1
+
+    def test_other_errors_are_not_retried(self):
+        func = Flaky(HTTPError(500))
+        with pytest.raises(HTTPError):
+            rate_limit.call("fast", func)
+        assert func.calls == 1
+
+class TestCircuit:
+    def test_opens_after_threshold_and_probes_once(self, monkeypatch):
+        for _ in range(rate_limit.FAIL_THRESHOLD):
+            with pytest.raises(IOError):
+                rate_limit.call("fast", Flaky(IOError("down")))
+        func = Flaky()
+        with pytest.raises(rate_limit.CircuitOpen):
+            rate_limit.call("fast", func)
+        assert func.calls == 0
+
+        # Cooldown over: one probe goes through, a concurrent caller still fails fast
+        monkeypatch.setattr(rate_limit, "COOLDOWN", 0)
+        rate_limit.record_failure("fast")
+        rate_limit.acquire("fast")
+        with pytest.raises(rate_limit.CircuitOpen):
+            rate_limit.acquire("fast")
+        rate_limit.record_success("fast")
+        assert rate_limit.call("fast", func) == "ok"
+        assert rate_limit.status("fast")["circuit"] == "closed"
+
+    def test_failed_probe_reopens(self, monkeypatch):
+        monkeypatch.setattr(rate_limit, "FAIL_THRESHOLD", 1)
+        monkeypatch.setattr(rate_limit, "COOLDOWN", 0)
+        rate_limit.record_failure("fast")
+        monkeypatch.setattr(rate_limit, "FAIL_THRESHOLD", 100)
+        with pytest.raises(IOError):
+            rate_limit.call("fast", Flaky(IOError("still down")))
+        assert rate_limit.status("fast")["circuit"] == "open"
+
+    def test_only_upstream_failures_open_it(self):
+        for exc in (ValueError("YF News returned no items"), HTTPError(403), HTTPError(404)):
+            for _ in range(rate_limit.FAIL_THRESHOLD):
+                with pytest.raises(type(exc)):
+                    rate_limit.call("fast", Flaky(exc))
+        assert rate_limit.status("fast")["circuit"] == "closed"
+        assert rate_limit.call("fast", Flaky()) == "ok"
+        for exc in (HTTPError(503), TimeoutError("read timed out"), ConnectionError("reset")):
+            assert rate_limit.is_upstream_failure(exc)
+        for _ in range(rate_limit.FAIL_THRESHOLD):
+            with pytest.raises(HTTPError):
+                rate_limit.call("fast", Flaky(HTTPError(502)))
+        assert rate_limit.status("fast")["circuit"] == "open"
+
+    def test_source_for(self):
+        assert rate_limit.source_for("https://finnhub.io/api/v1/quote") == "finnhub"
+        assert rate_limit.source_for("https://stooq.com/q/d/l/?s=AAPL.US") == "stooq"
+        assert rate_limit.source_for("http://127.0.0.1:8080/api/v1") == "127.0.0.1:8080"
@@ -0,0 +1,115 @@
+import sys
+import os
+import json
+import time
+import numpy as np
+import pytest
+from unittest.mock import patch, MagicMock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import candle_store, screener
+
+def store_series(store_dir, symbol, closes, end_day=299):
+    closes = np.asarray(closes, dtype=float)
+    t = 1_600_000_000 + 86400 * np.arange(end_day + 1 - len(closes), end_day + 1, dtype=np.int64)
+    candle_store.append(symbol, {"t": t, "o": closes, "h": closes * 1.01, "l": closes * 0.99,
+                                 "c": closes, "v": np.ones(len(closes))}, store_dir)
+
+@pytest.fixture
+def universe(tmp_path):
+    store = str(tmp_path / "candles")
+    rng = np.random.default_rng(0)
+    store_series(store, "UP", 50 * np.cumprod(np.full(300, 1.01)))
+    store_series(store, "DOWN", 50 * np.cumprod(np.full(300, 0.99)))
+    # Mean-reverting noise around 100: no extremes, far from the 52w range edges
+    noise = 100 + 20 * np.sin(np.arange(300) / 7) + rng.normal(0, 0.2, 300)
+    noise[-1] = 100.0
+    store_series(store, "CHOP", noise)
+    store_series(store, "NEW", 20 * np.cumprod(np.full(30, 1.01)))
+    return store
+
+class TestUniverse:
+    def test_right_aligned_with_padding(self, universe):
+        symbols, arrays = screener.load_universe(["UP", "NEW", "MISSING"], days=100, store_dir=universe)
+        assert symbols == ["UP", "NEW"]
+        assert arrays["c"].shape == (2, 100)
+        assert np.isnan(arrays["c"][1, :70]).all()
+        assert not np.isnan(arrays["c"][1, 70:]).any()
+        assert arrays["c"][0, -1] == candle_store.load("UP", universe)["c"][-1]
+
+    def test_stale_symbols_skipped(self, universe):
+        store_series(universe, "HALTED", np.full(100, 10.0), end_day=280)
+        symbols, arrays = screener.load_universe(["UP", "HALTED"], store_dir=universe)
+        assert symbols == ["UP"] and len(arrays["t_last"]) == 1
+        symbols, _ = screener.load_universe(["UP", "HALTED"], store_dir=universe, stale_days=None)
+        assert symbols == ["UP", "HALTED"]
+
+    def test_store_symbols(self, universe):
+        assert candle_store.symbols(universe) == ["CHOP", "DOWN", "NEW", "UP"]
+
+class TestRules:
+    def test_crossed(self):
+        diff = np.array([[-2, -1, -0.5, 0.5, 1.0],     # crossed up 2 bars ago
+                         [1, 1, 1, 1, 1],              # always above
+                         [-1, 1, 2, -1, -2]], float)   # up then back down
+        assert list(screener._crossed(diff, 3, up=True)) == [1.0, 0.0, 0.0]
+        assert list(screener._crossed(diff, 3, up=False)) == [0.0, 0.0, 1.0]
+        assert list(screener._crossed(diff, 1, up=True)) == [0.0, 0.0, 0.0]
+
+    def test_ranking(self, universe):
+        symbols, arrays = screener.load_universe(["UP", "DOWN", "CHOP"], store_dir=universe)
+        results = screener.screen(symbols, arrays, top=5)
+        by_ticker = {r["ticker"]: r for r in results}
+        assert set(by_ticker) == {"UP", "DOWN"}
+        assert {"rsi_overbought", "near_52w_high"} <= set(by_ticker["UP"]["rules"])
+        assert {"rsi_oversold", "near_52w_low"} <= set(by_ticker["DOWN"]["rules"])
+
+    def test_weights_and_top(self, universe):
+        symbols, arrays = screener.load_universe(["UP", "DOWN", "CHOP"], store_dir=universe)
+        weights = {"rsi_overbought": 0, "near_52w_high": 0, "bb_break_upper": 0, "rsi_oversold": 3}
+        results = screener.screen(symbols, arrays, weights=weights, top=1)
+        assert [r["ticker"] for r in results] == ["DOWN"]
+        with pytest.raises(ValueError):
+            screener.screen(symbols, arrays, weights={"moon_phase": 1})
+
+    def test_metrics_52w_overrides_candles(self, universe, tmp_path):
+        metrics = tmp_path / "batch"
+        (metrics / "UP").mkdir(parents=True)
+        (metrics / "UP" / "financials.json").write_text(json.dumps({"financials": {"52WeekHigh": 10_000, "52WeekLow": 1}}))
+        symbols, arrays = screener.load_universe(["UP", "DOWN"], store_dir=universe)
+        high, low = screener.load_52w(symbols, str(metrics))
+        assert high[0] == 10_000 and np.isnan(high[1])
+        results = {r["ticker"]: r for r in screener.screen(symbols, arrays, high, low)}
+        assert "near_52w_high" not in results["UP"]["rules"]
+        assert "near_52w_low" in results["DOWN"]["rules"]
+
+class TestDispatch:
+    def test_parse_weights(self):
+        assert screener.parse_weights(["golden_cross=2.5", "bb_break_lower"]) == {"golden_cross": 2.5, "bb_break_lower": 1.0}
+
+    @patch('tools.screener.subprocess.run')
+    def test_dispatch_runs_each_ticker(self, mock_run):
+        mock_run.side_effect = [MagicMock(returncode=0), MagicMock(returncode=1)]
+        failed = screener.dispatch([{"ticker": "AAA", "score": 2}, {"ticker": "BBB", "score": 1}],
+                                   "python3 tools/agency_manager.py {ticker} --model flash", workers=1)
+        assert [c.args[0] for c in mock_run.call_args_list] == [
+            ["python3", "tools/agency_manager.py", "AAA", "--model", "flash"],
+            ["python3", "tools/agency_manager.py", "BBB", "--model", "flash"],
+        ]
+        assert failed == ["BBB"]
+
+    def test_concurrent_dispatch_logs_per_ticker(self, tmp_path):
+        rows = [{"ticker": t, "score": 1} for t in ("AAA", "BBB", "CCC")]
+        cmd = f"{sys.executable} -c \"import sys, time; time.sleep(0.2); print('{{ticker}}'); sys.exit('{{ticker}}' == 'BBB')\""
+        t0 = time.time()
+        failed = screener.dispatch(rows, cmd, workers=3, log_dir=str(tmp_path))
+        assert time.time() - t0 < 0.55   # 3 x 0.2s serially
+        assert failed == ["BBB"] and (tmp_path / "CCC.log").read_text() == "CCC\n"
+
+    def test_run_cmd_reports_its_log_not_a_workspace(self, tmp_path, capsys):
+        res = screener._run_cmd("AAA", f"{sys.executable} -c pass", 1, str(tmp_path))
+        assert res["log"] == str(tmp_path / "AAA.log") and res["workspace"] is None and res["ok"]
+        screener.dispatch([{"ticker": "AAA", "score": 1}], f"{sys.executable} -c pass", workers=2,
+                          log_dir=str(tmp_path))
+        assert str(tmp_path / "AAA.log") in capsys.readouterr().out
@@ -0,0 +1,84 @@
+import sys
+import os
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from textblob import TextBlob
+from tools import sentiment, get_data_finnhub as gdf
+
+HEADLINES = [
+    "NVDA stock surges on record earnings, analysts upbeat",
+    "Shares plunge after terrible guidance and weak demand",
+    "Company announces quarterly dividend",
+    "Not a good quarter: revenue misses badly",
+    "Regulators open probe into accounting practices",
+    "Excellent   results,\tbest   year ever!",
+    "CEO says outlook is very strong despite headwinds",
+    "",
+]
+
+@pytest.fixture(autouse=True)
+def memo(tmp_path, monkeypatch):
+    path = str(tmp_path / "sentiment.sqlite")
+    monkeypatch.setattr(sentiment, "MEMO_PATH", path)
+    monkeypatch.setattr(sentiment, "DISABLED", False)
+    monkeypatch.setattr(sentiment, "_memo", {})
+    monkeypatch.setattr(sentiment, "STATS", {"scored": 0, "memo_hits": 0})
+    return path
+
+class TestScoring:
+    def test_parity_with_textblob(self):
+        scores = sentiment.score_texts(HEADLINES)
+        for text, score in zip(HEADLINES, scores):
+            expected = TextBlob(text).sentiment.polarity
+            assert score == pytest.approx(expected, abs=1e-9)
+            assert sentiment.label(score) == sentiment.label(expected)
+
+    def test_label_thresholds(self):
+        assert sentiment.label(0.1) == "Neutral"
+        assert sentiment.label(0.1001) == "Bullish"
+        assert sentiment.label(-0.1) == "Neutral"
+        assert sentiment.label(-0.1001) == "Bearish"
+        assert sentiment.aggregate([]) == (0.0, "Neutral")
+
+    def test_duplicates_scored_once(self):
+        texts = ["Great results"] * 50 + ["Great   results"] + ["Awful results"]
+        scores = sentiment.score_texts(texts)
+        assert len(scores) == 52 and len(set(scores[:51])) == 1
+        assert sentiment.STATS["scored"] == 2
+
+    def test_memo_persists_across_processes(self, monkeypatch):
+        first = sentiment.score_texts(HEADLINES)
+        monkeypatch.setattr(sentiment, "_memo", {})   # as in a new process
+        monkeypatch.setattr(sentiment, "lexicon", lambda: pytest.fail("rescored a memoized text"))
+        assert sentiment.score_texts(HEADLINES) == first
+        assert sentiment.STATS["memo_hits"] == len([h for h in HEADLINES if h])
+
+    def test_in_process_memo_is_bounded(self, monkeypatch):
+        monkeypatch.setattr(sentiment, "MEMO_MAX", 3)
+        monkeypatch.setattr(sentiment, "DISABLED", True)
+        sentiment.score_texts(["Great results", "Awful results"])
+        sentiment.score_texts(["Flat day", "Great results", "Record profit", "Weak guidance"])
+        assert len(sentiment._memo) == 3
+        # the batch's own texts are still all scored, and the most recent ones are kept
+        assert sentiment.text_hash("Weak guidance") in sentiment._memo
+        assert sentiment.text_hash("Awful results") not in sentiment._memo
+        assert sentiment.score_texts(["Great results"]) == [sentiment.lexicon()("Great results")[0]]
+
+    def test_score_items(self):
+        items = [{"title": "Great results", "summary": "Terrible outlook"}, {"title": "Flat day", "summary": " "}]
+        scores = sentiment.score_items(items)
+        assert scores[0]["title"] > 0.1 and scores[0]["body"] < -0.1
+        assert scores[1]["body"] is None
+
+class TestNewsIntegration:
+    def test_build_news_data_scores_whole_window(self):
+        raw = [{"headline": f"Great results {i}" if i % 2 else f"Awful loss {i}", "summary": "",
+                "datetime": 1700000000 + i, "source": "x", "url": "u"} for i in range(300)]
+        raw.append({"headline": "", "summary": "ignored", "datetime": 1700000000})
+        data = gdf.build_news_data("AAA", raw)
+        assert data["count"] == 10
+        assert data["scored_count"] == 300
+        assert data["top_news"][1]["sentiment"] > 0.1 and data["top_news"][0]["sentiment"] < -0.1
+        assert data["sentiment_label"] in ("Bullish", "Bearish", "Neutral")
@@ -36,4 +36,24 @@ class TestOrchestrator:
     def test_orchestrator_logic(self, mock_run):
         from tools import orchestrator
         mock_run.return_value.stdout = json.dumps({"test": "data"})
-        mock_run.return_value.returncode = 0
\ No newline at end of file
+        mock_run.return_value.returncode = 0
+
+    @patch('tools.get_news.get_news_sentiment', return_value={"overall_sentiment_score": 0.1})
+    @patch('tools.get_financials.get_financial_data', side_effect=RuntimeError("blocked"))
+    @patch('tools.get_market.get_market_data', return_value={"symbol": "NVDA", "current_price": 1.5})
+    def test_inprocess_mode(self, mock_market, mock_fin, mock_news):
+        from tools import orchestrator
+        with patch('tools.orchestrator.subprocess.run') as mock_run:
+            results = orchestrator.fetch_all("NVDA", "full", "inprocess")
+        mock_run.assert_not_called()
+        assert results["tech"] == {"symbol": "NVDA", "current_price": 1.5}
+        assert "blocked" in results["fund"]["error"]
+        assert results["news"]["overall_sentiment_score"] == 0.1
+        assert orchestrator.fetch_all("NVDA", "tech", "inprocess").keys() == {"tech"}
+
+    @patch('tools.orchestrator.subprocess.run')
+    def test_subprocess_mode(self, mock_run):
+        from tools import orchestrator
+        mock_run.return_value.stdout = json.dumps({"test": "data"})
+        assert orchestrator.fetch_all("NVDA", "news", "subprocess") == {"news": {"test": "data"}}
+        assert mock_run.call_args[0][0][1] == "tools/get_news.py"
@@ -0,0 +1,113 @@
+import sys
+import os
+import json
+import time
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import tracing, rate_limit, agency_manager
+from tools.agency_manager import Node, run_graph
+
+@pytest.fixture
+def trace_dir(tmp_path, monkeypatch):
+    path = str(tmp_path / "trace")
+    monkeypatch.setattr(tracing, "TRACE_DIR", path)
+    monkeypatch.setattr(tracing, "HISTOGRAM_PATH", str(tmp_path / "hist.json"))
+    monkeypatch.setattr(tracing, "_exit_hooks", [])
+    return path
+
+class Throttled(Exception):
+    def __init__(self):
+        super().__init__("429 Too Many Requests")
+        self.response = type("R", (), {"status_code": 429, "headers": {"Retry-After": "0"}})()
+
+class TestSpans:
+    def test_nothing_written_when_disabled(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(tracing, "TRACE_DIR", None)
+        with tracing.span("x", "step") as ev:
+            ev["n"] = 1
+        tracing.counter("c", {"v": 1})
+        assert os.listdir(tmp_path) == []
+
+    def test_span_and_error(self, trace_dir):
+        with tracing.span("quote", "step", ticker="AAA") as ev:
+            ev["rows"] = 3
+        with pytest.raises(ValueError):
+            with tracing.span("candles", "step"):
+                raise ValueError("bad")
+        events = tracing.load_events(trace_dir)
+        assert [(e["name"], e["ph"]) for e in events] == [("quote", "X"), ("candles", "X")]
+        assert events[0]["args"] == {"ticker": "AAA", "rows": 3}
+        assert "bad" in events[1]["args"]["error"]
+        assert events[0]["pid"] == os.getpid()
+
+    def test_rate_limited_call_is_an_http_span(self, trace_dir, tmp_path, monkeypatch):
+        monkeypatch.setattr(rate_limit, "STATE_DIR", str(tmp_path / "ratelimit"))
+        monkeypatch.setattr(rate_limit, "DISABLED", False)
+        errors = [Throttled()]
+
+        def fetch():
+            if errors:
+                raise errors.pop()
+            return b"x" * 100
+
+        assert rate_limit.call("yfinance", fetch) == b"x" * 100
+        (event,) = tracing.load_events(trace_dir)
+        assert event["cat"] == "http" and event["name"] == "yfinance"
+        assert event["args"]["retries"] == 1 and event["args"]["bytes"] == 100
+        assert event["args"]["call"] == "fetch" and event["args"]["waited"] >= 0
+
+    def test_exit_hooks_run_once(self, trace_dir):
+        tracing.at_exit(lambda: tracing.counter("cache", {"hit_ratio": 0.5}))
+        tracing.run_exit_hooks()
+        tracing.run_exit_hooks()
+        events = tracing.load_events(trace_dir)
+        assert [(e["name"], e["ph"], e["args"]) for e in events] == [("cache", "C", {"hit_ratio": 0.5})]
+
+    def test_profiled_writes_stats(self, trace_dir, monkeypatch):
+        monkeypatch.setattr(tracing, "PROFILE", True)
+        with tracing.profiled("tool"):
+            sum(range(1000))
+        assert os.path.exists(os.path.join(trace_dir, f"profile-tool-{os.getpid()}.prof"))
+
+class TestExport:
+    def test_trace_json_and_histogram(self, trace_dir):
+        t = time.time()
+        tracing.record("finnhub", "http", t, t + 0.003)
+        tracing.record("finnhub", "http", t + 0.01, t + 0.5)
+        with open(os.path.join(trace_dir, "events.jsonl"), "a") as f:
+            f.write('{"name": "cut sh')   # killed writer
+        path = tracing.export(trace_dir)
+        with open(path) as f:
+            trace = json.load(f)
+        assert len(trace["traceEvents"]) == 2 and trace["displayTimeUnit"] == "ms"
+        assert tracing.summarize(trace["traceEvents"], "http")[0][:2] == ("finnhub", 2)
+
+        tracing.export(trace_dir)   # a second run folds into the same histogram
+        with open(tracing.HISTOGRAM_PATH) as f:
+            h = json.load(f)["http/finnhub"]
+        assert h["count"] == 4
+        assert tracing.percentile(h, 0.5) == 4 and tracing.percentile(h, 0.95) == 512
+
+class TestAgencyManager:
+    def test_nodes_and_phases_recorded(self, trace_dir, tmp_path):
+        a, b, c = (str(tmp_path / x) for x in ("a", "b", "c"))
+
+        def runner(node, model):
+            time.sleep(0.01)
+            with open(node.outputs[0], "w") as f:
+                f.write(node.name)
+
+        nodes = [Node("data", "command", [], [a]), Node("tech", "agent", [a], [b]),
+                 Node("fund", "agent", [a], [c])]
+        t0 = time.time()
+        assert run_graph(nodes, runner=runner)
+        agency_manager.finish_trace(trace_dir, nodes, t0, "AAA")
+        events = {(e["cat"], e["name"]): e for e in tracing.load_events(trace_dir)}
+        assert events[("agent", "tech")]["args"]["phase"] == "analysts"
+        assert events[("command", "data")]["args"]["status"] == "done"
+        phase = events[("phase", "analysts")]
+        assert phase["dur"] >= events[("agent", "tech")]["dur"]
+        assert events[("run", "run")]["args"]["ticker"] == "AAA"
+        assert os.path.exists(os.path.join(trace_dir, "trace.json"))
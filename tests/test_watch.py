@@ -0,0 +1,112 @@
+import sys
+import os
+import json
+import threading
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools import indicator_state, watch
+
+DAY = 86400
+T0 = 19000 * DAY
+
+def live_symbol(n=60, symbol="AAA"):
+    # Flat history with a tiny wiggle: every indicator defined, price ~100
+    t = T0 + DAY * np.arange(n, dtype=np.int64)
+    c = 100 + 0.1 * np.sin(np.arange(n))
+    return watch.LiveSymbol(symbol, indicator_state.bootstrap(t, c), t, c), t, c
+
+def trade(sym, price, t):
+    return {"s": sym, "p": price, "t": int(t * 1000), "v": 1}
+
+class TestLiveSymbol:
+    def test_tick_peeks_on_top_of_history(self):
+        live, t, c = live_symbol()
+        latest = live.tick(t[-1] + 3600, 101.0)
+        expected = indicator_state.bootstrap(t, c).peek(101.0)
+        assert latest["RSI_14"] == expected["RSI_14"] and latest["SMA_50"] == expected["SMA_50"]
+        assert live.tick(t[-1] - DAY, 50.0) is None
+
+    def test_new_day_commits_the_formed_bar(self):
+        live, t, c = live_symbol()
+        live.tick(t[-1] + 3600, 101.0)
+        live.tick(t[-1] + DAY + 3600, 102.0)
+        assert live.state.last_t == t[-1] and live.state.closes[-1] == 101.0
+        assert live.closes[-2:] == [101.0, 102.0]
+
+    def test_crossing_fires_once_per_zone_change(self):
+        live, t, c = live_symbol()
+        live.tick(t[-1] + 60, 99.0)
+        assert live.crossings() == []
+        live.tick(t[-1] + 120, 110.0)
+        fired = live.crossings()
+        assert "bb_break:lower->upper" in fired and "sma50_cross:below->above" in fired
+        live.tick(t[-1] + 180, 111.0)
+        assert live.crossings() == []
+
+class TestWatcher:
+    def test_frame_coalesced_and_cooldown(self, tmp_path):
+        live, t, c = live_symbol()
+        calls = []
+        watcher = watch.Watcher({"AAA": live}, lambda *a: calls.append(a), cooldown=600, root=str(tmp_path))
+        now = t[-1] + 60
+        # Only the last AAA price in a frame is applied; unknown symbols are ignored.
+        assert watcher.on_frame([trade("AAA", 110.0, now), trade("AAA", 100.0, now), trade("ZZZ", 1.0, now)]) == []
+        assert watcher.stats["peeks"] == 1 and watcher.stats["ticks"] == 3
+        assert watcher.on_frame([trade("AAA", 110.0, now + 1)]) == ["AAA"]
+        assert [c[:3] for c in calls] == [("AAA", str(tmp_path / "AAA"), ["tech"])]
+        # market.json is written when the re-run starts, not by the trigger.
+        assert not (tmp_path / "AAA").exists()
+        # Falling back inside the band within the cooldown does not re-run.
+        watcher.on_frame([trade("AAA", 100.0, now + 2)])
+        assert len(calls) == 1 and watcher.stats["suppressed"] == 1
+        older = dict(calls[0][3], fired=["rsi_band:neutral->overbought"])
+        watch.write_market("AAA", [older, calls[0][3]], str(tmp_path / "AAA"))
+        market = json.loads((tmp_path / "AAA" / "data" / "market.json").read_text())
+        assert market["current_price"] == 110.0 and market["indicators"]["SMA_50_Status"] == "ABOVE"
+        assert market["live"]["triggers"][0] == "rsi_band:neutral->overbought"
+        assert "bb_break:inside->upper" in market["live"]["triggers"]
+
+    def test_dispatcher_merges_triggers_while_running(self):
+        release, done = threading.Event(), []
+
+        def runner(sym, ws, agents, snaps):
+            release.wait(5)
+            done.append((agents, snaps))
+            return True
+
+        d = watch.Dispatcher(runner, max_runs=2)
+        assert d.submit("AAA", "ws", ["tech"], "s1")
+        assert not d.submit("AAA", "ws", ["tech"], "s2")
+        assert not d.submit("AAA", "ws", ["fund"], "s3")
+        release.set()
+        d.close()
+        assert done == [(["tech"], ["s1"]), (["fund", "tech"], ["s2", "s3"])] and d.started == 2
+
+    def test_first_rerun_seeds_the_workspace(self, tmp_path, monkeypatch):
+        from tools import agency_manager
+        ws = str(tmp_path / "AAA")
+        fetched = []
+
+        def fake_run_node(node, model):
+            fetched.append(node.name)
+            for out in node.outputs:
+                os.makedirs(os.path.dirname(out), exist_ok=True)
+                with open(out, "w") as f:
+                    f.write("{}")
+
+        monkeypatch.setattr(agency_manager, "run_node", fake_run_node)
+        watch.seed_workspace("AAA", ws)
+        watch.seed_workspace("AAA", ws)
+        assert fetched == ["fetch"]
+        nodes = agency_manager.build_graph("AAA", *agency_manager.workspace_dirs(ws))
+        assert "fetch" not in {n.name for n in agency_manager.affected(nodes, ["tech"])}
+
+    def test_replay_parses_finnhub_and_bare_ticks(self, tmp_path):
+        feed = tmp_path / "feed.jsonl"
+        feed.write_text(json.dumps({"type": "trade", "data": [trade("AAA", 1.0, T0), trade("BBB", 2.0, T0)]}) + "\n"
+                        + json.dumps({"type": "ping"}) + "\n" + json.dumps(trade("AAA", 3.0, T0 + 1)) + "\n")
+        frames = list(watch.replay(str(feed)))
+        assert [len(f) for f in frames] == [2, 1] and frames[1][0]["p"] == 3.0
@@ -0,0 +1,504 @@
+import argparse
+import codecs
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from tools import agent_cache, agent_executor, context_builder, dossier, dossier_archive, tracing
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+PROMPTS_DIR = ".gemini/prompts"
+RUNS_DIR = "agency/runs"
+DEFAULT_MODEL = "flash"
+AGENT_TOOLS = ["google_web_search", "web_fetch"]
+
+# Agent -> phase, for the per-phase token totals in the run summary.
+PHASES = {
+    "tech": "analysts", "fund": "analysts", "sent": "analysts", "macro": "analysts",
+    "bull": "research", "bear": "research", "signal": "debate",
+    "risk": "risk", "plan": "trade plan",
+}
+
+DOSSIER = None   # dossier.Dossier of the current run (set by main)
+
+_print_lock = threading.Lock()
+
+def log(msg):
+    if DOSSIER is not None:
+        DOSSIER.log(msg)
+        return
+    with _print_lock:
+        print(msg, flush=True)
+
+# -------------------------------------------------------------------------
+# Graph Definition
+# -------------------------------------------------------------------------
+class Node:
+    """A unit of work with declared file inputs and outputs.
+
+    kind is one of:
+      "command" - run `command` (argv list); it writes its own outputs.
+      "agent"   - pipe `prompt` + inputs into gemini, stdout -> outputs[0].
+      "concat"  - cat inputs -> outputs[0].
+    """
+
+    def __init__(self, name, kind, inputs, outputs, prompt=None, command=None, label=None):
+        self.name = name
+        self.kind = kind
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.prompt = prompt
+        self.command = command
+        self.label = label or name
+        self.start = None
+        self.end = None
+        self.status = "pending"
+        self.error = None
+        self.cached = False
+        self.tokens = None   # agent nodes: context_builder stats for the prompt sent
+        self.timing = {}     # agent nodes: queue_wait / model_time from tools/agent_executor.py
+
+    @property
+    def duration(self):
+        if self.start is None or self.end is None:
+            return 0.0
+        return self.end - self.start
+
+def new_workspace(ticker, root=RUNS_DIR):
+    """Create a fresh `<root>/<TICKER>-<YYYYmmdd-HHMMSS>` run directory and return it.
+
+    Everything a run reads or writes lives under it (data/ and reports/), so
+    any number of tickers can run side by side.
+    """
+    base = os.path.join(root, f"{ticker}-{time.strftime('%Y%m%d-%H%M%S')}")
+    path, n = base, 1
+    while True:
+        try:
+            os.makedirs(path)
+            break
+        except FileExistsError:
+            n += 1
+            path = f"{base}-{n}"
+    for sub in ("data", "reports"):
+        os.makedirs(os.path.join(path, sub))
+    return path
+
+def workspace_dirs(workspace):
+    """(data_dir, reports_dir) inside a run workspace."""
+    return os.path.join(workspace, "data"), os.path.join(workspace, "reports")
+
+def build_graph(ticker, data_dir="agency/data", reports_dir="agency/reports"):
+    """Mirror of the orchestrator.sh pipeline, expressed as file dependencies."""
+    d = lambda name: os.path.join(data_dir, name)
+    r = lambda name: os.path.join(reports_dir, name)
+    p = lambda name: os.path.join(PROMPTS_DIR, name)
+
+    market, financials, news = d("market.json"), d("financials.json"), d("news.json")
+    analyst_reports = [r("tech.md"), r("fund.md"), r("sent.md"), r("macro.md")]
+
+    return [
+        Node("fetch", "command", [], [market, financials, news],
+             command=[sys.executable, "tools/get_data_finnhub.py", ticker, "--out", data_dir],
+             label="📊 Data Ingestion (Finnhub + Stooq)"),
+
+        Node("tech", "agent", [market], [r("tech.md")], prompt=p("tech.md"), label="📈 Tech Analyst"),
+        Node("fund", "agent", [financials], [r("fund.md")], prompt=p("fund.md"), label="🏢 Fund Analyst"),
+        Node("sent", "agent", [news], [r("sent.md")], prompt=p("sent.md"), label="📰 Sent Analyst"),
+        Node("macro", "agent", [news], [r("macro.md")], prompt=p("macro.md"), label="🌍 Macro Analyst"),
+
+        # Agents get the reports as separate inputs so each keeps a fair share of
+        # the token budget; the concatenation is the archive's recall query.
+        Node("analyst_reports", "concat", analyst_reports, [r("all_analyst_reports.md")]),
+        Node("bull", "agent", analyst_reports, [r("bull_memo.md")], prompt=p("bull.md"), label="🐂 Dr. Bull"),
+        Node("bear", "agent", analyst_reports, [r("bear_memo.md")], prompt=p("bear.md"), label="🐻 Dr. Bear"),
+
+        Node("prior", "command", [r("all_analyst_reports.md")], [r("prior.md")],
+             command=[sys.executable, "tools/dossier_archive.py", "recall", ticker,
+                      "--query-file", r("all_analyst_reports.md"), "--out", r("prior.md")],
+             label="🗂️ Prior Dossiers"),
+        Node("debate_context", "concat", [r("bull_memo.md"), r("bear_memo.md")], [r("debate_context.md")]),
+        Node("signal", "agent", [r("bull_memo.md"), r("bear_memo.md"), r("prior.md")], [r("signal.md")], prompt=p("debate.md"),
+             label="⚔️ CIO Debate"),
+        Node("risk", "agent", [r("tech.md"), market], [r("risk.md")], prompt=p("risk.md"), label="🛡️ Risk Manager"),
+
+        Node("plan", "agent", [r("signal.md"), r("risk.md")], [r("plan.md")], prompt=p("trader.md"), label="📝 Trader"),
+    ]
+
+# -------------------------------------------------------------------------
+# Node Execution
+# -------------------------------------------------------------------------
+def _read(path):
+    with open(path, "r") as f:
+        return f.read()
+
+def _write_atomic(path, text):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.part"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def gemini_flags(model):
+    return ["-m", model, "--allowed-tools", *AGENT_TOOLS, "--approval-mode", "auto_edit"]
+
+def build_agent_input(node):
+    """Prompt + inputs, compacted and held to the agent's token budget (tools/context_builder.py)."""
+    budget = context_builder.BUDGETS.get(node.name, context_builder.DEFAULT_BUDGET)
+    stdin, node.tokens = context_builder.build_files(node.prompt, node.inputs, budget)
+    return stdin
+
+def run_agent(node, model):
+    """gemini on prompt + inputs; identical calls are served from tools/agent_cache.py,
+    the rest wait for a slot in the shared pool (tools/agent_executor.py)."""
+    argv = ["gemini", *gemini_flags(model)]
+    stdin = build_agent_input(node)
+
+    streaming = DOSSIER is not None and DOSSIER.streams(node.name)
+    streamed = []   # chunks shown by the current attempt
+
+    def on_chunk(text):
+        streamed.append(text)
+        DOSSIER.chunk(node.name, text)
+
+    def gemini():
+        if streaming:
+            # A quota retry starts the output over; drop what the failed attempt showed.
+            if streamed:
+                DOSSIER.restart(node.name)
+                streamed.clear()
+            return run_streaming(argv, stdin, on_chunk)
+        result = subprocess.run(argv, input=stdin, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"gemini exited {result.returncode}: {result.stderr.strip()[-500:]}")
+        return result.stdout
+
+    def call():
+        return agent_executor.call(gemini, node.name, timing=node.timing)
+
+    try:
+        output, node.cached = agent_cache.cached_call(argv, stdin, call, label=node.name)
+        if node.cached and streaming:
+            DOSSIER.chunk(node.name, output)
+        _write_atomic(node.outputs[0], output)
+    except Exception:
+        if DOSSIER is not None:
+            DOSSIER.finish(node.name, ok=False)
+        raise
+    if DOSSIER is not None:
+        DOSSIER.finish(node.name)
+
+def run_streaming(argv, stdin, on_chunk):
+    """subprocess.run for gemini with stdout handed to on_chunk as it arrives.
+    Returns the full stdout; raises like the buffered path on a non-zero exit."""
+    proc = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    err = []
+
+    def feed():
+        try:
+            proc.stdin.write(stdin.encode())
+        except BrokenPipeError:
+            pass
+        finally:
+            proc.stdin.close()
+
+    threads = [threading.Thread(target=feed), threading.Thread(target=lambda: err.append(proc.stderr.read()))]
+    for t in threads:
+        t.start()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    out = []
+    while True:
+        data = proc.stdout.read1(65536)
+        text = decoder.decode(data, final=not data)
+        if text:
+            out.append(text)
+            on_chunk(text)
+        if not data:
+            break
+    for t in threads:
+        t.join()
+    if proc.wait() != 0:
+        stderr = b"".join(err).decode(errors="replace")
+        raise RuntimeError(f"gemini exited {proc.returncode}: {stderr.strip()[-500:]}")
+    return "".join(out)
+
+def run_node(node, model):
+    if node.kind == "command":
+        env = os.environ.copy()
+        env["PYTHONPATH"] = f"{os.getcwd()}:{env.get('PYTHONPATH', '')}"
+        result = subprocess.run(node.command, capture_output=True, text=True, env=env)
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(node.command)} failed: {result.stderr.strip()[-500:]}")
+        if result.stdout.strip():
+            log(result.stdout.rstrip())
+        missing = [o for o in node.outputs if not os.path.exists(o)]
+        if missing:
+            raise RuntimeError(f"command did not produce {missing}")
+    elif node.kind == "agent":
+        run_agent(node, model)
+    elif node.kind == "concat":
+        _write_atomic(node.outputs[0], "".join(_read(i) for i in node.inputs))
+    else:
+        raise ValueError(f"Unknown node kind: {node.kind}")
+
+# -------------------------------------------------------------------------
+# Scheduler
+# -------------------------------------------------------------------------
+def validate_graph(nodes):
+    producers = {}
+    for node in nodes:
+        for out in node.outputs:
+            if out in producers:
+                raise ValueError(f"{out} is produced by both {producers[out].name} and {node.name}")
+            producers[out] = node
+    return producers
+
+def upstream(node, producers):
+    """Nodes whose outputs feed this node."""
+    seen = []
+    for i in node.inputs:
+        dep = producers.get(i)
+        if dep is not None and dep not in seen:
+            seen.append(dep)
+    return seen
+
+def affected(nodes, names):
+    """The subgraph to re-run when `names` change: those nodes, every node
+    whose outputs are missing, and everything downstream of either.
+
+    The remaining nodes are left out; their outputs are read from disk.
+    """
+    producers = validate_graph(nodes)
+    unknown = set(names) - {n.name for n in nodes}
+    if unknown:
+        raise ValueError(f"Unknown node(s): {', '.join(sorted(unknown))}")
+    selected = {n.name for n in nodes
+                if n.name in names or not all(os.path.exists(o) for o in n.outputs)}
+    grew = True
+    while grew:
+        grew = False
+        for node in nodes:
+            if node.name not in selected and any(d.name in selected for d in upstream(node, producers)):
+                selected.add(node.name)
+                grew = True
+    return [n for n in nodes if n.name in selected]
+
+def run_graph(nodes, model=DEFAULT_MODEL, runner=run_node):
+    """Start every node as soon as its inputs exist. Returns True if all succeeded."""
+    producers = validate_graph(nodes)
+    pending = list(nodes)
+    running = {}
+    t0 = time.time()
+
+    def is_ready(node):
+        for i in node.inputs:
+            dep = producers.get(i)
+            if dep is not None:
+                if dep.status != "done":
+                    return False
+            elif not os.path.exists(i):
+                return False
+        return True
+
+    with ThreadPoolExecutor(max_workers=max(1, len(nodes))) as pool:
+        while pending or running:
+            for node in [n for n in pending if is_ready(n)]:
+                pending.remove(node)
+                node.status = "running"
+                node.start = time.time()
+                if node.kind != "concat":
+                    log(f"▶️  [{node.start - t0:6.1f}s] {node.label}")
+                running[pool.submit(runner, node, model)] = node
+
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                node = running.pop(fut)
+                node.end = time.time()
+                try:
+                    fut.result()
+                    node.status = "done"
+                    trace_node(node)
+                    if node.kind != "concat":
+                        note = f", {context_builder.format_tokens(node.tokens['final'])} tok" if node.tokens else ""
+                        note += ", cached" if node.cached else ""
+                        log(f"✅ [{node.end - t0:6.1f}s] {node.label} ({node.duration:.1f}s{note})")
+                except Exception as e:
+                    node.status = "failed"
+                    node.error = str(e)
+                    trace_node(node)
+                    log(f"❌ [{node.end - t0:6.1f}s] {node.label}: {e}")
+
+    for node in pending:
+        node.status = "blocked"
+        log(f"⏭️  Skipped {node.label}: inputs never became available")
+
+    return all(n.status == "done" for n in nodes)
+
+def trace_node(node):
+    args = {"kind": node.kind, "status": node.status, "phase": PHASES.get(node.name)}
+    if node.kind == "agent":
+        args.update(cached=node.cached, tokens=node.tokens["final"] if node.tokens else None)
+        args.update({k: round(v, 3) for k, v in node.timing.items()})
+    if node.error:
+        args["error"] = node.error[:200]
+    tracing.record(node.name, node.kind, node.start, node.end, **args)
+
+def trace_phases(nodes):
+    """One span per phase, from its first agent's start to its last agent's end."""
+    spans = {}
+    for node in nodes:
+        phase = PHASES.get(node.name)
+        if phase and node.start is not None and node.end is not None:
+            start, end = spans.get(phase, (node.start, node.end))
+            spans[phase] = (min(start, node.start), max(end, node.end))
+    for phase, (start, end) in spans.items():
+        tracing.record(phase, "phase", start, end)
+    return spans
+
+def critical_path(nodes):
+    """Chain of nodes that determined total wall time (by actual timings)."""
+    producers = validate_graph(nodes)
+    finished = [n for n in nodes if n.end is not None]
+    if not finished:
+        return []
+    node = max(finished, key=lambda n: n.end)
+    path = [node]
+    while True:
+        deps = [d for d in upstream(node, producers) if d.end is not None]
+        if not deps:
+            break
+        node = max(deps, key=lambda n: n.end)
+        path.append(node)
+    return list(reversed(path))
+
+def token_totals(nodes):
+    """{phase: (raw, final)} prompt tokens over the agent nodes that ran, in pipeline order."""
+    totals = {}
+    for node in nodes:
+        if node.tokens:
+            raw, final = totals.get(PHASES.get(node.name, node.name), (0, 0))
+            totals[PHASES.get(node.name, node.name)] = (raw + node.tokens["raw"], final + node.tokens["final"])
+    return totals
+
+def print_summary(nodes, wall):
+    path = critical_path(nodes)
+    chain = " → ".join(f"{n.name} ({n.duration:.1f}s)" for n in path)
+    serial = sum(n.duration for n in nodes)
+    print(f"⏱️  Wall time {wall:.1f}s (serial sum {serial:.1f}s)", file=sys.stderr)
+    print(f"🧭 Critical path: {chain}", file=sys.stderr)
+    totals = token_totals(nodes)
+    if totals:
+        fmt = context_builder.format_tokens
+        phases = ", ".join(f"{phase} {fmt(final)}" for phase, (_, final) in totals.items())
+        raw = sum(r for r, _ in totals.values())
+        final = sum(f for _, f in totals.values())
+        print(f"🔢 Prompt tokens: {phases}; total {fmt(final)} (raw inputs {fmt(raw)}, "
+              f"-{100 * (1 - final / raw) if raw else 0:.0f}%)", file=sys.stderr)
+    timed = [n for n in nodes if n.timing]
+    if timed:
+        wait = sum(n.timing["queue_wait"] for n in timed)
+        model = sum(n.timing["model_time"] for n in timed)
+        worst = max(timed, key=lambda n: n.timing["queue_wait"])
+        throttles = sum(n.timing["throttles"] for n in timed)
+        print(f"⏳ Agent queue wait {wait:.1f}s (max {worst.timing['queue_wait']:.1f}s on {worst.name}), "
+              f"model time {model:.1f}s over {len(timed)} calls"
+              + (f", {throttles} quota retries" if throttles else ""), file=sys.stderr)
+    print(agent_cache.summary(), file=sys.stderr)
+
+def finish_trace(trace_dir, nodes, t0, ticker):
+    """Phase/run spans, cache counters, then trace.json and the cross-run histogram."""
+    trace_phases(nodes)
+    tracing.record("run", "run", t0, time.time(), ticker=ticker)
+    calls = agent_cache.STATS["hit"] + agent_cache.STATS["miss"]
+    if calls:
+        tracing.counter("agent_cache", {"hit": agent_cache.STATS["hit"], "miss": agent_cache.STATS["miss"],
+                                        "hit_ratio": round(agent_cache.STATS["hit"] / calls, 3)})
+    tracing.run_exit_hooks()
+    path = tracing.export(trace_dir)
+    events = tracing.load_events(trace_dir)
+    slowest = ", ".join(f"{name} {n}x {secs:.1f}s" for name, n, secs in tracing.summarize(events, "http")[:3])
+    print(f"🧵 Trace: {path} (chrome://tracing or ui.perfetto.dev)", file=sys.stderr)
+    if slowest:
+        print(f"🌐 HTTP time by source: {slowest}", file=sys.stderr)
+
+# -------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="TradingAgents dependency-driven agent scheduler")
+    parser.add_argument("ticker", help="Stock Ticker Symbol")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Gemini model alias")
+    parser.add_argument("--data-dir", default="agency/data")
+    parser.add_argument("--reports-dir", default="agency/reports")
+    parser.add_argument("--workspace", help="Run directory holding data/ and reports/ (overrides "
+                        "--data-dir/--reports-dir); 'new' creates agency/runs/<TICKER>-<timestamp>")
+    parser.add_argument("--force-refresh", action="store_true",
+                        help="Re-run every agent even if an identical call is cached")
+    parser.add_argument("--cache-ttl", type=float, default=agent_cache.TTL,
+                        help="Max age (seconds) of reusable agent outputs; <= 0 never expires")
+    parser.add_argument("--trace-dir", help="Where events.jsonl/trace.json go (default: <workspace>/trace, "
+                        "else agency/logs/trace-<TICKER>)")
+    parser.add_argument("--rerun", help="Comma-separated nodes (e.g. tech) to re-run with everything "
+                        "downstream; other nodes' outputs are reused from the workspace")
+    parser.add_argument("--stream", action="store_true",
+                        help="Print each dossier section as soon as its agent finishes, tee-ing gemini output live")
+    parser.add_argument("--profile", action="store_true",
+                        help="Also cProfile the Python tools (profile-*.prof next to the trace)")
+    args = parser.parse_args()
+
+    agent_cache.FORCE_REFRESH = agent_cache.FORCE_REFRESH or args.force_refresh
+    agent_cache.TTL = args.cache_ttl
+
+    ticker = args.ticker.upper()
+    data_dir, reports_dir = args.data_dir, args.reports_dir
+    if args.workspace:
+        workspace = new_workspace(ticker) if args.workspace == "new" else args.workspace
+        data_dir, reports_dir = workspace_dirs(workspace)
+        log(f"📁 Workspace: {workspace}")
+    nodes = build_graph(ticker, data_dir, reports_dir)
+    if args.rerun:
+        try:
+            nodes = affected(nodes, [n.strip() for n in args.rerun.split(",") if n.strip()])
+        except ValueError as e:
+            parser.error(str(e))
+        log(f"🔁 Re-running: {', '.join(n.name for n in nodes)}")
+
+    trace_dir = args.trace_dir or (os.path.join(workspace, "trace") if args.workspace
+                                   else os.path.join("agency/logs", f"trace-{ticker}"))
+    tracing.enable(trace_dir)
+    # Without a fresh workspace the directory is reused; start its event log over.
+    if os.path.exists(os.path.join(trace_dir, "events.jsonl")):
+        os.remove(os.path.join(trace_dir, "events.jsonl"))
+    if args.profile:
+        os.environ["AGENCY_PROFILE"] = "1"
+
+    global DOSSIER
+    t0 = time.time()
+    DOSSIER = dossier.Dossier(ticker, sys.stdout if args.stream else None, t0)
+    DOSSIER.start()
+    ok = run_graph(nodes, model=args.model)
+    wall = time.time() - t0
+    print_summary(nodes, wall)
+    print(DOSSIER.summary(wall), file=sys.stderr)
+    for key, secs in DOSSIER.marks.items():
+        tracing.record(key, "perceived", t0, t0 + secs)
+    finish_trace(trace_dir, nodes, t0, ticker)
+    print(f"💾 Dossier: {dossier.save(reports_dir, ticker)}", file=sys.stderr)
+    if ok:
+        try:
+            doc_id, decision = dossier_archive.archive_run(reports_dir, ticker, workspace if args.workspace else None)
+            print(f"🗄️ Archived as #{doc_id} ({decision or 'no decision found'})", file=sys.stderr)
+        except Exception as e:
+            print(f"⚠️ Dossier not archived: {e}", file=sys.stderr)
+
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
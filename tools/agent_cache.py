@@ -0,0 +1,143 @@
+"""Content-addressed cache for gemini agent calls.
+
+An agent call is keyed by the sha256 of its full command line (model and
+flags included) and its stdin (prompt text + input documents). A call whose
+key is already stored and younger than TTL returns the stored report instead
+of invoking gemini again, so agents whose inputs did not change finish
+instantly on a re-run.
+
+Usage: python tools/agent_cache.py [stats|clear|prune]
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+CACHE_DIR = os.environ.get("AGENCY_AGENT_CACHE_DIR", "agency/store/agent_cache")
+TTL = float(os.environ.get("AGENCY_AGENT_CACHE_TTL", 7 * 86400))   # seconds; <= 0 never expires
+DISABLED = os.environ.get("AGENCY_AGENT_CACHE_DISABLE", "") not in ("", "0")
+FORCE_REFRESH = os.environ.get("AGENCY_AGENT_CACHE_REFRESH", "") not in ("", "0")
+
+STATS = {"hit": 0, "miss": 0, "seconds_saved": 0.0}
+_stats_lock = threading.Lock()
+
+# -------------------------------------------------------------------------
+# Storage
+# -------------------------------------------------------------------------
+def make_key(argv, stdin):
+    h = hashlib.sha256()
+    h.update(json.dumps(list(argv)).encode())
+    h.update(b"\0")
+    h.update(stdin.encode())
+    return h.hexdigest()
+
+def _path(key):
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.json")
+
+def get(key, ttl=None):
+    """Stored entry ({"output", "created", "seconds", "label"}) if present and unexpired."""
+    ttl = TTL if ttl is None else ttl
+    try:
+        with open(_path(key), "r") as f:
+            entry = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if ttl > 0 and time.time() - entry["created"] > ttl:
+        return None
+    return entry
+
+def put(key, output, seconds=0.0, label=None):
+    path = _path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+    with open(tmp, "w") as f:
+        json.dump({"output": output, "created": time.time(), "seconds": seconds, "label": label}, f)
+    os.replace(tmp, path)
+
+def _bump(name, seconds=0.0):
+    with _stats_lock:
+        STATS[name] += 1
+        STATS["seconds_saved"] += seconds
+
+# -------------------------------------------------------------------------
+# Public API
+# -------------------------------------------------------------------------
+def cached_call(argv, stdin, call, label=None, force=None):
+    """call() -> stdout, unless the same argv + stdin is already cached.
+
+    Returns (output, hit). force (default FORCE_REFRESH) skips the lookup but
+    still stores the fresh output. Failures raise from call() and are never
+    stored.
+    """
+    if DISABLED:
+        return call(), False
+    force = FORCE_REFRESH if force is None else force
+    key = make_key(argv, stdin)
+    if not force:
+        entry = get(key)
+        if entry is not None:
+            _bump("hit", entry.get("seconds", 0.0))
+            return entry["output"], True
+    t0 = time.time()
+    output = call()
+    put(key, output, time.time() - t0, label)
+    _bump("miss")
+    return output, False
+
+def summary():
+    """One-line count of LLM calls avoided in this process."""
+    calls = STATS["hit"] + STATS["miss"]
+    return (f"🧠 Agent cache: {STATS['hit']} of {calls} LLM calls avoided "
+            f"(~{STATS['seconds_saved']:.0f}s saved)")
+
+def _entries():
+    if not os.path.isdir(CACHE_DIR):
+        return
+    for shard in os.listdir(CACHE_DIR):
+        shard_dir = os.path.join(CACHE_DIR, shard)
+        if os.path.isdir(shard_dir):
+            for name in os.listdir(shard_dir):
+                if name.endswith(".json"):
+                    yield os.path.join(shard_dir, name)
+
+def prune(ttl=None):
+    """Delete expired entries. Returns the number removed."""
+    ttl = TTL if ttl is None else ttl
+    removed = 0
+    for path in _entries():
+        if ttl > 0 and time.time() - os.path.getmtime(path) > ttl:
+            os.remove(path)
+            removed += 1
+    return removed
+
+def clear():
+    removed = 0
+    for path in _entries():
+        os.remove(path)
+        removed += 1
+    return removed
+
+# -------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if cmd == "stats":
+        paths = list(_entries())
+        size = sum(os.path.getsize(p) for p in paths)
+        print(f"{len(paths)} agent outputs, {size / 2**20:.1f} MiB in {CACHE_DIR} (TTL {TTL / 3600:.0f}h)")
+    elif cmd == "clear":
+        print(f"🧹 Removed {clear()} entries")
+    elif cmd == "prune":
+        print(f"🧹 Removed {prune()} expired entries")
+    else:
+        print(__doc__.strip().splitlines()[-1], file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""Cross-process admission controller for gemini agent calls.
+
+Every agency_manager process (one per ticker under batch_run.py, watch.py
+or parallel orchestrator.sh runs) draws model calls from one shared pool,
+whose state lives in a JSON file guarded by an fcntl lock like
+tools/rate_limit.py:
+
+  - at most `limit` calls run at once. The limit starts at
+    AGENCY_AGENT_CONCURRENCY and adapts AIMD-style: halved on a quota/429
+    error from the model (at most once per round of in-flight calls), then
+    grown back by 1/limit per successful call;
+  - a quota error also pauses admissions for the Retry-After (or an
+    exponential backoff) before the call is retried;
+  - waiting calls are admitted by pipeline stage first (trader > debate/risk
+    > researchers > analysts), then by how long their ticker's run has
+    been going, so tickers that are nearly done finish before new ones
+    start.
+
+Time spent queued is reported separately from model time.
+
+Usage: python tools/agent_executor.py [status|reset]
+"""
+import fcntl
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from tools import rate_limit, tracing
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+STATE_DIR = os.environ.get("AGENCY_EXECUTOR_DIR", "agency/store/executor")
+MAX_CONCURRENCY = int(os.environ.get("AGENCY_AGENT_CONCURRENCY", "4"))
+DISABLED = MAX_CONCURRENCY <= 0
+MIN_CONCURRENCY = 1
+POLL = 0.05               # seconds between admission checks while queued
+BACKOFF_DEFAULT = 5       # quota error without Retry-After (doubles per repeat)
+BACKOFF_CAP = 120
+RETRIES = 3
+
+# Agent -> pipeline stage; later stages are admitted first.
+STAGES = {
+    "tech": 0, "fund": 0, "sent": 0, "macro": 0,
+    "bull": 1, "bear": 1,
+    "signal": 2, "risk": 2,
+    "plan": 3,
+}
+
+RUN_STARTED = time.time()   # this process's run; older runs go first within a stage
+
+class QuotaExceeded(RuntimeError):
+    """The model kept returning quota errors after every retry."""
+
+_tickets = itertools.count()
+
+# -------------------------------------------------------------------------
+# Shared State
+# -------------------------------------------------------------------------
+def _new_state():
+    return {"limit": float(max(MAX_CONCURRENCY, MIN_CONCURRENCY)), "running": {}, "waiting": {},
+            "blocked_until": 0.0, "throttles": 0, "decreased_at": 0.0,
+            "stats": {"admitted": 0, "queue_wait": 0.0, "model_time": 0.0, "throttled": 0}}
+
+@contextmanager
+def _state():
+    """Locked read-modify-write of the shared pool."""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    path = os.path.join(STATE_DIR, "state.json")
+    with open(f"{path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            try:
+                with open(path, "r") as f:
+                    text = f.read()
+                state = json.loads(text)
+            except (FileNotFoundError, json.JSONDecodeError):
+                text, state = None, _new_state()
+            yield state
+            # Queued callers poll; most polls change nothing and skip the write.
+            new = json.dumps(state)
+            if new != text:
+                tmp = f"{path}.tmp"
+                with open(tmp, "w") as f:
+                    f.write(new)
+                os.replace(tmp, path)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _prune(st):
+    """Forget tickets of processes that died without releasing them."""
+    for table in ("running", "waiting"):
+        pids = {e["pid"] for e in st[table].values()}
+        dead = {pid for pid in pids if pid != os.getpid() and not _alive(pid)}
+        if dead:
+            st[table] = {k: e for k, e in st[table].items() if e["pid"] not in dead}
+
+def _rank(entry):
+    return (-entry["stage"], entry["run_started"], entry["since"])
+
+def is_quota_error(exc):
+    """429 / quota exhaustion from the model (gemini CLI stderr or an HTTP client)."""
+    if rate_limit.is_throttled(exc):
+        return True
+    msg = str(exc).lower()
+    return any(x in msg for x in ("resource_exhausted", "quota"))
+
+# -------------------------------------------------------------------------
+# Admission
+# -------------------------------------------------------------------------
+def acquire(agent, label=None):
+    """Block until a model call for `agent` is admitted. Returns (ticket, seconds queued)."""
+    ticket = f"{os.getpid()}-{threading.get_ident()}-{next(_tickets)}"
+    t0 = time.time()
+    entry = {"pid": os.getpid(), "agent": agent, "label": label or agent, "stage": STAGES.get(agent, 0),
+             "run_started": RUN_STARTED, "since": t0}
+    try:
+        while True:
+            with _state() as st:
+                now = time.time()
+                _prune(st)
+                st["waiting"].setdefault(ticket, entry)
+                head = min(st["waiting"], key=lambda k: _rank(st["waiting"][k]))
+                if head == ticket and now >= st["blocked_until"] and len(st["running"]) < int(st["limit"]):
+                    del st["waiting"][ticket]
+                    st["running"][ticket] = dict(entry, since=now)
+                    st["stats"]["admitted"] += 1
+                    st["stats"]["queue_wait"] += now - t0
+                    return ticket, now - t0
+            # Only the head of the queue can be admitted next; the rest check less often.
+            time.sleep(POLL if head == ticket else 4 * POLL)
+    except BaseException:
+        with _state() as st:
+            st["waiting"].pop(ticket, None)
+        raise
+
+def release(ticket, model_time, throttled=False, retry_after=None):
+    """Free the slot. A throttled call halves the limit (once per round of
+    in-flight calls) and pauses admissions; a successful one grows it."""
+    with _state() as st:
+        now = time.time()
+        entry = st["running"].pop(ticket, None)
+        st["stats"]["model_time"] += model_time
+        if throttled:
+            st["throttles"] += 1
+            st["stats"]["throttled"] += 1
+            if entry is None or entry["since"] >= st["decreased_at"]:
+                st["limit"] = max(MIN_CONCURRENCY, st["limit"] / 2)
+                st["decreased_at"] = now
+            if retry_after is None:
+                retry_after = min(BACKOFF_CAP, BACKOFF_DEFAULT * 2 ** (st["throttles"] - 1))
+            st["blocked_until"] = max(st["blocked_until"], now + retry_after)
+            return retry_after
+        st["throttles"] = 0
+        st["limit"] = min(float(max(MAX_CONCURRENCY, MIN_CONCURRENCY)), st["limit"] + 1 / st["limit"])
+        return 0.0
+
+def _drop(ticket):
+    with _state() as st:
+        st["running"].pop(ticket, None)
+
+# -------------------------------------------------------------------------
+# Public API
+# -------------------------------------------------------------------------
+def call(func, agent, label=None, timing=None, retries=RETRIES):
+    """func() once admitted; quota errors are retried after the pool's backoff.
+
+    `timing` (a dict, optional) receives queue_wait, model_time and
+    throttles, also when the call fails. Other errors are re-raised at once.
+    """
+    timing = {} if timing is None else timing
+    timing.update(queue_wait=0.0, model_time=0.0, throttles=0)
+    if DISABLED:
+        t0 = time.time()
+        try:
+            return func()
+        finally:
+            timing["model_time"] = time.time() - t0
+    for attempt in range(retries + 1):
+        with tracing.span(agent, "queue", label=label):
+            ticket, waited = acquire(agent, label)
+        timing["queue_wait"] += waited
+        t0 = time.time()
+        result = error = None
+        finished = False
+        try:
+            result = func()
+            finished = True
+        except Exception as e:
+            error = e
+            finished = True
+        finally:
+            if not finished:
+                # KeyboardInterrupt / SystemExit: free the slot, leave the limit alone.
+                _drop(ticket)
+        elapsed = time.time() - t0
+        timing["model_time"] += elapsed
+        if error is None:
+            release(ticket, elapsed)
+            return result
+        throttled = is_quota_error(error)
+        backoff = release(ticket, elapsed, throttled, rate_limit.retry_after(error) if throttled else None)
+        if not throttled:
+            raise error
+        timing["throttles"] += 1
+        if attempt == retries:
+            raise QuotaExceeded(f"{agent}: model quota still exhausted after {retries} retries: {error}") from error
+        print(f"[Retry {attempt + 1}/{retries}] {agent} hit the model quota; admissions paused "
+              f"{backoff:.0f}s", file=sys.stderr)
+
+def status():
+    with _state() as st:
+        _prune(st)
+        return json.loads(json.dumps(st))
+
+def reset():
+    for name in ("state.json", "state.json.lock"):
+        path = os.path.join(STATE_DIR, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+# -------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if cmd == "status":
+        st = status()
+        now = time.time()
+        stats = st["stats"]
+        blocked = max(0.0, st["blocked_until"] - now)
+        print(f"🚦 Limit {st['limit']:.2f} (max {MAX_CONCURRENCY}), {len(st['running'])} running, "
+              f"{len(st['waiting'])} queued" + (f", paused {blocked:.0f}s" if blocked else ""))
+        for table in ("running", "waiting"):
+            for entry in sorted(st[table].values(), key=_rank):
+                print(f"  {table:<8}{entry['label']:<24}stage {entry['stage']}  {now - entry['since']:>6.1f}s  "
+                      f"pid {entry['pid']}")
+        if stats["admitted"]:
+            print(f"⏳ {stats['admitted']} calls: queue wait {stats['queue_wait']:.1f}s "
+                  f"(avg {stats['queue_wait'] / stats['admitted']:.1f}s), model time {stats['model_time']:.1f}s "
+                  f"(avg {stats['model_time'] / stats['admitted']:.1f}s), {stats['throttled']} quota errors")
+    elif cmd == "reset":
+        reset()
+        print("🧹 Agent executor state cleared")
+    else:
+        print("Usage: python tools/agent_executor.py [status|reset]", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
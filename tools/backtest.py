@@ -0,0 +1,284 @@
+"""Vectorized backtest of the technical signals over the stored daily history.
+
+Computes the calculate_technicals indicator series over every bar for one
+or many symbols at once ((symbols x bars) arrays, tools/indicators.py),
+marks the bars where each signal rule fires, and measures what followed:
+hit rate (share of events where price moved the way the rule predicts),
+average forward return and the drawdown against the position over each
+horizon. No loop runs per bar or per event: events are gathered with
+nonzero() and summed per symbol with bincount; the only Python loops are
+over signals and horizons.
+
+The per-symbol summary goes into market.json as "backtest", so the Tech
+Analyst can see how the current readings have played out for this symbol.
+
+Usage: python tools/backtest.py [TICKER ...] [--file UNIVERSE] [--years 20] [--horizons 5,20,60]
+       [--market-dir DIR] [--json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from tools import candle_store, indicators
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+HORIZONS = (5, 20, 60)      # trading days forward
+YEARS = 20
+BARS_PER_YEAR = 252
+RECENT = 5                  # an event this many bars old still counts as active
+MIN_EVENTS = 5              # fewer events than this are flagged as thin
+
+DEFAULT_PARAMS = {
+    "rsi_low": 30.0,
+    "rsi_high": 70.0,
+}
+
+# signal -> direction it predicts (+1 up, -1 down)
+SIGNALS = {
+    "rsi_oversold": 1,
+    "rsi_overbought": -1,
+    "golden_cross": 1,
+    "death_cross": -1,
+    "macd_bull_cross": 1,
+    "macd_bear_cross": -1,
+    "bb_break_upper": -1,   # close back above the band: stretched, mean reversion
+    "bb_break_lower": 1,
+}
+
+# -------------------------------------------------------------------------
+# Signals
+# -------------------------------------------------------------------------
+def _prev(x):
+    out = np.full(x.shape, np.nan)
+    out[..., 1:] = x[..., :-1]
+    return out
+
+def _cross_up(x, level):
+    """x moves above level on this bar (level may be a series)."""
+    prev_level = _prev(level) if isinstance(level, np.ndarray) else level
+    return (x > level) & (_prev(x) <= prev_level)
+
+def _cross_down(x, level):
+    prev_level = _prev(level) if isinstance(level, np.ndarray) else level
+    return (x < level) & (_prev(x) >= prev_level)
+
+def signal_events(tech, params=None):
+    """{signal: bool (symbols x bars)}, True on the bar the rule fires."""
+    p = dict(DEFAULT_PARAMS, **(params or {}))
+    close, rsi = tech["c"], tech["RSI_14"]
+    trend = tech["SMA_50"] - tech["SMA_200"]
+    with np.errstate(invalid="ignore"):
+        return {
+            "rsi_oversold": _cross_down(rsi, p["rsi_low"]),
+            "rsi_overbought": _cross_up(rsi, p["rsi_high"]),
+            "golden_cross": _cross_up(trend, 0.0),
+            "death_cross": _cross_down(trend, 0.0),
+            "macd_bull_cross": _cross_up(tech["MACD_Hist"], 0.0),
+            "macd_bear_cross": _cross_down(tech["MACD_Hist"], 0.0),
+            "bb_break_upper": _cross_up(close, tech["BB_Upper"]),
+            "bb_break_lower": _cross_down(close, tech["BB_Lower"]),
+        }
+
+# -------------------------------------------------------------------------
+# Outcomes
+# -------------------------------------------------------------------------
+def forward_return(close, horizon):
+    """close[t + horizon] / close[t] - 1 (NaN where the future is not known yet)."""
+    out = np.full(close.shape, np.nan)
+    if horizon < close.shape[-1]:
+        out[..., :-horizon] = close[..., horizon:] / close[..., :-horizon] - 1
+    return out
+
+def forward_drawdown(close, high, low, horizon, direction):
+    """Worst move against a position opened at close[t] over the next `horizon` bars (<= 0)."""
+    out = np.full(close.shape, np.nan)
+    if horizon >= close.shape[-1]:
+        return out
+    if direction > 0:
+        worst = indicators.rolling_min(low, horizon)[..., horizon:]
+        out[..., :-horizon] = worst / close[..., :-horizon] - 1
+    else:
+        worst = indicators.rolling_max(high, horizon)[..., horizon:]
+        out[..., :-horizon] = 1 - worst / close[..., :-horizon]
+    return np.minimum(out, 0.0)
+
+def _stats(rows, cols, n_symbols, ret, dd, direction):
+    """Per-symbol (n, hit_rate, avg_return, avg_drawdown, worst_drawdown) over the
+    events at (rows, cols). Events are sparse, so only their outcomes are
+    gathered and summed per symbol with bincount."""
+    r = ret[rows, cols]
+    valid = ~np.isnan(r)
+    rows, r, d = rows[valid], r[valid], dd[rows, cols][valid]
+    n = np.bincount(rows, minlength=n_symbols)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        hits = np.bincount(rows, weights=direction * r > 0, minlength=n_symbols) / n
+        avg = np.bincount(rows, weights=r, minlength=n_symbols) / n
+        avg_dd = np.bincount(rows, weights=d, minlength=n_symbols) / n
+    worst = np.full(n_symbols, np.inf)
+    np.minimum.at(worst, rows, d)
+    worst[n == 0] = np.nan
+    return n, hits, avg, avg_dd, worst
+
+# -------------------------------------------------------------------------
+# Public API
+# -------------------------------------------------------------------------
+def run(arrays, horizons=HORIZONS, params=None):
+    """Backtest every signal on (symbols x bars) "c"/"h"/"l" arrays (NaN-padded rows are fine).
+
+    Returns {"events": {signal: (S,)}, "bars_since": {signal: (S,)},
+    "stats": {signal: {horizon: (n, hit_rate, avg_return, avg_drawdown, worst)}},
+    "baseline": {horizon: (up_rate, avg_return)}}, all per-symbol arrays.
+    """
+    close = indicators.as_array(arrays["c"])
+    high = indicators.as_array(arrays.get("h", close))
+    low = indicators.as_array(arrays.get("l", close))
+    if close.ndim == 1:
+        close, high, low = close[None], high[None], low[None]
+    events = signal_events(indicators.technicals(close), params)
+
+    returns = {h: forward_return(close, h) for h in horizons}
+    drawdowns = {(h, d): forward_drawdown(close, high, low, h, d) for h in horizons for d in (1, -1)}
+    out = {"events": {}, "bars_since": {}, "stats": {}, "baseline": {}}
+    for name, direction in SIGNALS.items():
+        ev = events[name]
+        out["events"][name] = ev.sum(axis=-1)
+        out["bars_since"][name] = np.where(ev.any(axis=-1), np.argmax(ev[..., ::-1], axis=-1), -1)
+        rows, cols = np.nonzero(ev)
+        out["stats"][name] = {h: _stats(rows, cols, len(ev), returns[h], drawdowns[(h, direction)], direction)
+                              for h in horizons}
+    for h in horizons:
+        known = ~np.isnan(returns[h])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out["baseline"][h] = ((known & (returns[h] > 0)).sum(axis=-1) / known.sum(axis=-1),
+                                  np.nansum(returns[h], axis=-1) / known.sum(axis=-1))
+    return out
+
+METRICS = ("hit_rate", "avg_return", "avg_drawdown", "worst_drawdown")
+
+def _pct(x):
+    x = float(x)
+    return None if np.isnan(x) or np.isinf(x) else round(100 * x, 1)
+
+def summarize(result, i=0, bars=None):
+    """market.json "backtest" block for row i of run().
+
+    One row per signal under "columns" (percentages), rather than nested
+    objects, so the block stays small in the Tech Analyst's token budget.
+    """
+    horizons = list(result["baseline"])
+    block = {} if bars is None else {"bars": int(bars)}
+    block.update({
+        "units": "percent",
+        "baseline": {f"{h}d": {"up_rate": _pct(result["baseline"][h][0][i]),
+                               "avg_return": _pct(result["baseline"][h][1][i])} for h in horizons},
+        "columns": ["predicts", "events", "bars_since_last"] + [f"{m}_{h}d" for h in horizons for m in METRICS],
+        "signals": {},
+    })
+    active, thin = [], []
+    for name, direction in SIGNALS.items():
+        n_events = int(result["events"][name][i])
+        since = int(result["bars_since"][name][i])
+        row = ["up" if direction > 0 else "down", n_events, since if n_events else None]
+        for h in horizons:
+            row += [_pct(a[i]) for a in result["stats"][name][h][1:]]
+        block["signals"][name] = row
+        if n_events and since < RECENT:
+            active.append(name)
+        if n_events < MIN_EVENTS:
+            thin.append(name)
+    block["active_signals"] = active
+    block["thin_samples"] = thin
+    return block
+
+def for_symbol(cols, horizons=HORIZONS, years=YEARS, params=None):
+    """Backtest block for one symbol's stored candle columns (None if too short)."""
+    if cols is None or len(cols["c"]) <= min(horizons):
+        return None
+    k = min(len(cols["c"]), years * BARS_PER_YEAR)
+    arrays = {key: np.asarray(cols[key][-k:], dtype=np.float64) for key in ("c", "h", "l")}
+    return summarize(run(arrays, horizons, params), 0, bars=k)
+
+def pooled(result, horizon):
+    """{signal: (events, hit_rate, avg_return, avg_drawdown)} summed over every symbol."""
+    table = {}
+    for name in SIGNALS:
+        n, hit, avg, avg_dd, _ = result["stats"][name][horizon]
+        total = n.sum()
+        w = lambda a: float(np.nansum(a * n) / total) if total else float("nan")
+        table[name] = (int(total), w(hit), w(avg), w(avg_dd))
+    return table
+
+def write_market(path, block):
+    """Merge the block into an existing market.json."""
+    with open(path, "r") as f:
+        market = json.load(f)
+    market["backtest"] = block
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(market, f, indent=2)
+    os.replace(tmp, path)
+
+# -------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------
+def main():
+    # screener -> finnhub_batch -> get_data_finnhub imports this module
+    from tools.screener import load_universe
+    from tools.finnhub_batch import read_tickers
+
+    parser = argparse.ArgumentParser(description="Backtest the technical signals on stored daily candles")
+    parser.add_argument("tickers", nargs="*", help="Ticker symbols (default: every symbol in the candle store)")
+    parser.add_argument("--file", help="Universe file (one or more tickers per line, # comments)")
+    parser.add_argument("--years", type=int, default=YEARS, help="Years of history per symbol")
+    parser.add_argument("--horizons", default=",".join(map(str, HORIZONS)), help="Forward horizons in bars")
+    parser.add_argument("--rsi-low", type=float, default=DEFAULT_PARAMS["rsi_low"])
+    parser.add_argument("--rsi-high", type=float, default=DEFAULT_PARAMS["rsi_high"])
+    parser.add_argument("--market-dir", help="Write each symbol's block into DIR/<TICKER>/market.json "
+                        "(finnhub_batch layout), or DIR/market.json for a single ticker")
+    parser.add_argument("--json", action="store_true", help="Print the per-symbol blocks as JSON")
+    args = parser.parse_args()
+
+    tickers = read_tickers(args.tickers, args.file) or candle_store.symbols()
+    if not tickers:
+        parser.error("no tickers given and the candle store is empty")
+    horizons = tuple(int(h) for h in args.horizons.split(","))
+    params = {"rsi_low": args.rsi_low, "rsi_high": args.rsi_high}
+
+    t0 = time.perf_counter()
+    # Delisted symbols' history still counts for signal statistics.
+    symbols, arrays = load_universe(tickers, days=args.years * BARS_PER_YEAR, stale_days=None)
+    t1 = time.perf_counter()
+    result = run(arrays, horizons, params)
+    t2 = time.perf_counter()
+    bars = (~np.isnan(arrays["c"])).sum(axis=-1)
+    print(f"🧪 Backtested {len(symbols)} symbols x {arrays['c'].shape[-1]} bars: load {(t1 - t0) * 1e3:.0f} ms, "
+          f"backtest {(t2 - t1) * 1e3:.0f} ms", file=sys.stderr)
+
+    blocks = {sym: summarize(result, i, bars[i]) for i, sym in enumerate(symbols)}
+    if args.market_dir:
+        for sym, block in blocks.items():
+            path = os.path.join(args.market_dir, sym, "market.json")
+            if len(symbols) == 1 and not os.path.exists(path):
+                path = os.path.join(args.market_dir, "market.json")
+            try:
+                write_market(path, block)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not update {path}: {e}", file=sys.stderr)
+
+    if args.json:
+        print(json.dumps(blocks, indent=2))
+        return
+    for h in horizons:
+        print(f"\n{h}-day horizon, pooled over {len(symbols)} symbols")
+        print(f"{'signal':<18}{'events':>8}{'hit rate':>10}{'avg ret':>10}{'avg dd':>10}")
+        for name, (n, hit, avg, dd) in pooled(result, h).items():
+            print(f"{name:<18}{n:>8}{hit:>10.1%}{avg:>10.2%}{dd:>10.2%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Run the full agent pipeline for many tickers concurrently.
+
+Each ticker gets its own workspace (agency/runs/<TICKER>-<timestamp>/) and
+its own tools/agency_manager.py process, so runs never touch each other's
+files. The summary compares the batch's throughput with an estimate of
+running the same tickers one after another.
+
+Usage: python tools/batch_run.py NVDA AAPL --workers 4
+       python tools/batch_run.py --file watchlist.txt
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from tools import agency_manager
+from tools.finnhub_batch import read_tickers
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+DEFAULT_WORKERS = 4
+
+# -------------------------------------------------------------------------
+# Main Logic
+# -------------------------------------------------------------------------
+def run_ticker(ticker, model=agency_manager.DEFAULT_MODEL, root=agency_manager.RUNS_DIR, extra_args=()):
+    """Run the pipeline for one ticker in a fresh workspace.
+
+    Returns {"ticker", "workspace", "ok", "seconds"}; the scheduler's output
+    goes to <workspace>/run.log.
+    """
+    workspace = agency_manager.new_workspace(ticker, root)
+    env = os.environ.copy()
+    env["PYTHONPATH"] = f"{os.getcwd()}:{env.get('PYTHONPATH', '')}"
+    cmd = [sys.executable, "tools/agency_manager.py", ticker, "--model", model,
+           "--workspace", workspace, *extra_args]
+    t0 = time.time()
+    with open(os.path.join(workspace, "run.log"), "w") as log:
+        result = subprocess.run(cmd, stdout=log, stderr=subprocess.STDOUT, env=env)
+    return {"ticker": ticker, "workspace": workspace, "ok": result.returncode == 0,
+            "seconds": time.time() - t0}
+
+def _guarded(runner, ticker, **kwargs):
+    """runner() for one ticker; an exception (e.g. the workspace or run.log
+    could not be created) becomes a failed result instead of ending the batch."""
+    t0 = time.time()
+    try:
+        return runner(ticker, **kwargs)
+    except Exception as e:
+        return {"ticker": ticker, "workspace": None, "ok": False, "seconds": time.time() - t0,
+                "error": f"{type(e).__name__}: {e}"}
+
+def run_batch(tickers, workers=DEFAULT_WORKERS, runner=run_ticker, **kwargs):
+    """Run tickers on `workers` concurrent pipelines. Returns (results, wall seconds)."""
+    results = []
+    t0 = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(_guarded, runner, t, **kwargs) for t in tickers]
+        for fut in as_completed(futures):
+            res = fut.result()
+            mark = "✅" if res["ok"] else "❌"
+            where = res["workspace"] or res.get("log") or res.get("error", "")
+            print(f"{mark} {res['ticker']:<8}{res['seconds']:>8.1f}s  {where}", flush=True)
+            results.append(res)
+    order = {t: i for i, t in enumerate(tickers)}
+    results.sort(key=lambda r: order[r["ticker"]])
+    return results, time.time() - t0
+
+def throughput(results, wall):
+    """(batch tickers/hour, estimated serial tickers/hour).
+
+    The serial figure is the sum of the individual run times, i.e. the same
+    runs executed back to back. Those times were measured while the runs
+    contended with each other, so it overstates serial time (and the speedup).
+    """
+    serial = sum(r["seconds"] for r in results)
+    n = len(results)
+    return (n * 3600 / wall if wall else 0.0), (n * 3600 / serial if serial else 0.0)
+
+def print_summary(results, wall, workers):
+    batch_tph, serial_tph = throughput(results, wall)
+    failed = [r["ticker"] for r in results if not r["ok"]]
+    print(f"\n⏱️  {len(results)} tickers in {wall:.1f}s with {workers} workers "
+          f"(sum of run times {sum(r['seconds'] for r in results):.1f}s)")
+    if workers > 1:
+        print(f"🚀 Throughput: {batch_tph:.1f} tickers/hour vs ~{serial_tph:.1f} serial "
+              f"(~{batch_tph / serial_tph if serial_tph else 0.0:.1f}x; serial estimated from run times "
+              f"measured under contention, so the speedup is an upper bound)")
+    else:
+        print(f"🚀 Throughput: {batch_tph:.1f} tickers/hour")
+    if failed:
+        print(f"❌ Failed: {', '.join(failed)} (see run.log in their workspaces)")
+
+# -------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent multi-ticker pipeline runner")
+    parser.add_argument("tickers", nargs="*", help="Ticker symbols")
+    parser.add_argument("--file", help="Watchlist file (one ticker per line or comma separated)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent pipelines")
+    parser.add_argument("--model", default=agency_manager.DEFAULT_MODEL, help="Gemini model alias")
+    parser.add_argument("--root", default=agency_manager.RUNS_DIR, help="Directory for run workspaces")
+    parser.add_argument("--force-refresh", action="store_true", help="Bypass the agent output cache")
+    args = parser.parse_args()
+
+    tickers = read_tickers(args.tickers, args.file)
+    if not tickers:
+        parser.error("no tickers given")
+
+    extra = ["--force-refresh"] if args.force_refresh else []
+    results, wall = run_batch(tickers, args.workers, model=args.model, root=args.root, extra_args=extra)
+    print_summary(results, wall, args.workers)
+    sys.exit(0 if all(r["ok"] for r in results) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import csv
+import fcntl
+import io
+import json
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+# One directory per symbol, one raw little-endian file per column, plus
+# meta.json holding the row count and the last-bar watermark. Columns are
+# read back with np.memmap, so loading a series does no parsing at all.
+# Column files never shrink while mapped: the replaced watermark bar is
+# rewritten in place, and a full re-download swaps in new files.
+STORE_DIR = os.environ.get("AGENCY_CANDLE_DIR", "agency/store/candles")
+
+# Stooq bars are split/dividend adjusted, so an adjustment restates history.
+# Refreshes re-fetch this many days before the watermark and compare them.
+OVERLAP_DAYS = 10
+RESTATE_RTOL = 1e-4
+
+COLUMNS = {
+    "t": np.dtype("<i8"),   # bar open, unix seconds (UTC midnight for daily bars)
+    "o": np.dtype("<f8"),
+    "h": np.dtype("<f8"),
+    "l": np.dtype("<f8"),
+    "c": np.dtype("<f8"),
+    "v": np.dtype("<f8"),
+}
+
+def _symbol_dir(symbol, store_dir=None):
+    return os.path.join(store_dir or STORE_DIR, symbol.upper())
+
+def _col_path(sdir, col):
+    return os.path.join(sdir, f"{col}.bin")
+
+@contextmanager
+def _locked(sdir, shared=False):
+    """Per-symbol lock: exclusive so concurrent runs don't interleave appends,
+    shared for readers taking a consistent meta + columns snapshot."""
+    os.makedirs(sdir, exist_ok=True)
+    with open(os.path.join(sdir, ".lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def _read_meta(sdir):
+    try:
+        with open(os.path.join(sdir, "meta.json"), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"count": 0, "last_t": None}
+
+def _write_meta(sdir, meta):
+    path = os.path.join(sdir, "meta.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, path)
+
+def _write_at(path, offset, data):
+    """Write bytes at `offset` without truncating: live memory maps of the
+    file stay backed, so readers never fault past a shrunken EOF."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    with os.fdopen(fd, "r+b") as f:
+        f.seek(offset)
+        f.write(data)
+
+def _replace_file(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+# -------------------------------------------------------------------------
+# Read / Write
+# -------------------------------------------------------------------------
+def watermark(symbol, store_dir=None):
+    """Unix time of the newest stored bar, or None if the symbol is empty."""
+    return _read_meta(_symbol_dir(symbol, store_dir)).get("last_t")
+
+def symbols(store_dir=None):
+    """Sorted symbols that have at least one stored bar."""
+    root = store_dir or STORE_DIR
+    if not os.path.isdir(root):
+        return []
+    return sorted(s for s in os.listdir(root) if _read_meta(os.path.join(root, s)).get("count"))
+
+def load(symbol, store_dir=None):
+    """Memory-mapped columns {t, o, h, l, c, v} (read-only), or None if empty."""
+    sdir = _symbol_dir(symbol, store_dir)
+    if not os.path.isdir(sdir):
+        return None
+    with _locked(sdir, shared=True):
+        count = _read_meta(sdir).get("count", 0)
+        if not count:
+            return None
+        return {
+            col: np.memmap(_col_path(sdir, col), dtype=dt, mode="r", shape=(count,))
+            for col, dt in COLUMNS.items()
+        }
+
+def append(symbol, columns, store_dir=None, replace=False):
+    """Append bars after the watermark. Returns the number of new bars.
+
+    `columns` maps each name in COLUMNS to an equal-length sequence, sorted by t.
+    A bar at exactly the watermark replaces the stored last bar, so a partial
+    (intraday) daily bar is corrected on the next refresh. replace=True
+    drops the stored history first (re-bootstrap after a restatement).
+    """
+    sdir = _symbol_dir(symbol, store_dir)
+    with _locked(sdir):
+        meta = {"count": 0, "last_t": None} if replace else _read_meta(sdir)
+        last_t = meta["last_t"]
+        t = np.asarray(columns["t"], dtype=COLUMNS["t"])
+        keep = np.ones(len(t), dtype=bool) if last_t is None else t >= last_t
+        t = t[keep]
+        if len(t) == 0:
+            return 0
+
+        count = meta["count"]
+        if last_t is not None and t[0] == last_t:
+            count -= 1
+        for col, dt in COLUMNS.items():
+            values = t if col == "t" else np.asarray(columns[col], dtype=dt)[keep]
+            data = np.ascontiguousarray(values, dtype=dt).tobytes()
+            if replace:
+                _replace_file(_col_path(sdir, col), data)
+            else:
+                # Overwrites the bar being replaced and any tail left by an interrupted append.
+                _write_at(_col_path(sdir, col), count * dt.itemsize, data)
+
+        _write_meta(sdir, {"count": count + len(t), "last_t": int(t[-1])})
+        return count + len(t) - meta["count"]
+
+def restated(symbol, columns, store_dir=None):
+    """True if bars before the watermark have different closes than the
+    stored ones: the source re-adjusted its history (split, dividend)."""
+    stored = load(symbol, store_dir)
+    if stored is None:
+        return False
+    t = np.asarray(columns["t"], dtype=COLUMNS["t"])
+    # The watermark bar itself may have been a partial day; it is replaced anyway.
+    overlap = t < stored["t"][-1]
+    i = np.searchsorted(stored["t"], t[overlap])
+    i = np.minimum(i, len(stored["t"]) - 1)
+    found = stored["t"][i] == t[overlap]
+    new_c = np.asarray(columns["c"], dtype=COLUMNS["c"])[overlap][found]
+    return not np.allclose(new_c, stored["c"][i[found]], rtol=RESTATE_RTOL, atol=0)
+
+def to_frame(columns):
+    """DataFrame view for code that still expects Stooq-shaped frames."""
+    import pandas as pd
+    return pd.DataFrame({col: np.asarray(arr) for col, arr in columns.items()})
+
+# -------------------------------------------------------------------------
+# Stooq Ingestion
+# -------------------------------------------------------------------------
+def _date_to_unix(s):
+    return int(datetime.strptime(s, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+
+def parse_stooq_csv(text):
+    """Parse a Stooq daily CSV into column arrays (empty dict on 'No data')."""
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or "Date" not in reader.fieldnames:
+        return {}
+    cols = {name: [] for name in COLUMNS}
+    for row in reader:
+        try:
+            vol = row.get("Volume")
+            parsed = {
+                "t": _date_to_unix(row["Date"]),
+                "o": float(row["Open"]),
+                "h": float(row["High"]),
+                "l": float(row["Low"]),
+                "c": float(row["Close"]),
+                "v": float(vol) if vol not in (None, "") else np.nan,
+            }
+        except (ValueError, KeyError, TypeError):
+            continue
+        for name, val in parsed.items():
+            cols[name].append(val)
+    order = np.argsort(cols["t"], kind="stable")
+    return {name: np.asarray(vals)[order] for name, vals in cols.items()}
+
+def stooq_since_param(last_t):
+    """Stooq `d1` date (YYYYMMDD) OVERLAP_DAYS before the watermark bar; the
+    overlap is re-fetched to detect restated history."""
+    if last_t is None:
+        return None
+    return datetime.fromtimestamp(last_t - OVERLAP_DAYS * 86400, tz=timezone.utc).strftime("%Y%m%d")
+
+def append_stooq_csv(symbol, text, store_dir=None, replace=False):
+    cols = parse_stooq_csv(text)
+    if not cols or len(cols["t"]) == 0:
+        return 0
+    return append(symbol, cols, store_dir, replace)
+
+def refresh_from_stooq(symbol, fetch_text, url_for, store_dir=None):
+    """Fetch only bars from shortly before the watermark on and append them;
+    if the overlap was restated, re-download the whole history instead.
+
+    fetch_text(url) -> CSV text; url_for(symbol, since) -> Stooq URL, where
+    since is a YYYYMMDD string or None for a full bootstrap download.
+    """
+    since = stooq_since_param(watermark(symbol, store_dir))
+    text = fetch_text(url_for(symbol, since))
+    if since is not None and restated_csv(symbol, text, store_dir):
+        print(f"🔁 Stooq restated {symbol} history (split/dividend adjustment); re-downloading it",
+              file=sys.stderr)
+        return append_stooq_csv(symbol, fetch_text(url_for(symbol, None)), store_dir, replace=True)
+    added = append_stooq_csv(symbol, text, store_dir)
+    if since is None and added == 0:
+        print(f"⚠️ Stooq returned no history for {symbol}", file=sys.stderr)
+    return added
+
+def restated_csv(symbol, text, store_dir=None):
+    """restated() for a Stooq CSV."""
+    cols = parse_stooq_csv(text)
+    return bool(cols) and len(cols["t"]) > 0 and restated(symbol, cols, store_dir)
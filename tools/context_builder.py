@@ -0,0 +1,254 @@
+"""Token-budgeted agent context: compact inputs, drop repeats, truncate to fit.
+
+Every agent prompt used to be the prompt file followed by its input files
+verbatim: pretty-printed JSON, and whole reports that often repeat each
+other. build() compacts each input (JSON pruned of empty values and
+minified; markdown with blank-line runs and trailing spaces removed),
+replaces paragraphs an earlier input already carried with a "(same as
+<file>)" marker (short lines such as conclusions are always kept: two
+reports agreeing is signal), and, if the inputs still
+exceed the agent's budget, gives each input a fair share and truncates the
+tail of those over it. Truncation is deterministic (same inputs, same
+output), so the agent cache keeps hitting.
+
+Token counts are estimates (words, punctuation and line breaks, long words
+counted per 8 characters); Gemini's tokenizer isn't available offline.
+
+Usage: python tools/context_builder.py PROMPT INPUT [INPUT ...] [--budget N]
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+# Input tokens per agent (the prompt itself is not counted against it).
+BUDGETS = {
+    "tech": 2500,
+    "fund": 1500,
+    "sent": 2500,
+    "macro": 2500,
+    "bull": 5000,
+    "bear": 5000,
+    "signal": 5000,
+    "risk": 3000,
+    "plan": 3000,
+}
+DEFAULT_BUDGET = 4000
+FLOAT_DIGITS = 4
+EMPTY = (None, "", "N/A", [], {})
+TRUNCATED = "…[truncated {n} tokens]"
+SAME_AS = "(same as {name})"
+MIN_DEDUPE_TOKENS = 12    # shorter repeated paragraphs are kept verbatim
+
+_PIECE = re.compile(r"\w+|[^\w\s]|\n\s*")
+_BLANKS = re.compile(r"\n{3,}")
+
+# -------------------------------------------------------------------------
+# Token Counting
+# -------------------------------------------------------------------------
+def count_tokens(text):
+    """Approximate LLM tokens: one per word, punctuation mark or line break (with its
+    indent), plus one per further 8 characters of long words."""
+    return sum(1 + (len(p) - 1) // 8 for p in _PIECE.findall(text or ""))
+
+# -------------------------------------------------------------------------
+# Compaction
+# -------------------------------------------------------------------------
+def _prune(value):
+    if isinstance(value, dict):
+        out = {k: _prune(v) for k, v in value.items()}
+        return {k: v for k, v in out.items() if v not in EMPTY}
+    if isinstance(value, list):
+        # Positions in a list of scalars can carry meaning (table rows), so only
+        # emptied containers are dropped.
+        return [v for v in (_prune(v) for v in value) if not (isinstance(v, (dict, list)) and not v)]
+    if isinstance(value, float):
+        return round(value, FLOAT_DIGITS)
+    return value
+
+def _dump(value):
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+def compact_json(text):
+    """Minified JSON without nulls/empties/"N/A", floats rounded; None if not JSON."""
+    try:
+        return _prune(json.loads(text))
+    except (json.JSONDecodeError, TypeError):
+        return None
+
+def compact_text(text):
+    lines = [line.rstrip() for line in (text or "").strip().splitlines()]
+    return _BLANKS.sub("\n\n", "\n".join(lines))
+
+def _paragraphs(text):
+    return [p for p in text.split("\n\n") if p.strip()]
+
+def _key(paragraph):
+    return hashlib.sha1(" ".join(paragraph.split()).lower().encode()).hexdigest()
+
+# -------------------------------------------------------------------------
+# Truncation
+# -------------------------------------------------------------------------
+def _largest_list(value):
+    """(container, size) of the list with the most tokens, or (None, 0)."""
+    best, best_size = None, 0
+    stack = [value]
+    while stack:
+        v = stack.pop()
+        items = v.values() if isinstance(v, dict) else v if isinstance(v, list) else ()
+        if isinstance(v, list) and len(v) > 1:
+            size = count_tokens(_dump(v))
+            if size > best_size:
+                best, best_size = v, size
+        stack.extend(i for i in items if isinstance(i, (dict, list)))
+    return best, best_size
+
+def _fit_keys(value, budget):
+    """Top-level scalars of a dict first, then nested values, each kept if it still fits."""
+    if not isinstance(value, dict):
+        return truncate_text(_dump(value), budget)
+    room = budget - count_tokens("…[dropped: ]")
+    kept, dropped = {}, []
+    for nested in (False, True):
+        for k, v in value.items():
+            if isinstance(v, (dict, list)) != nested:
+                continue
+            trial = dict(kept, **{k: v})
+            if count_tokens(_dump(trial)) + count_tokens(", ".join(dropped + [k])) <= room:
+                kept = trial
+            else:
+                dropped.append(k)
+    text = _dump(kept) if kept else ""
+    return text + (f"\n…[dropped: {', '.join(dropped)}]" if dropped else "")
+
+def truncate_json(value, budget):
+    """Drop trailing elements of the largest list until the JSON fits; as a
+    last resort keep the top-level scalars and drop whole keys."""
+    dropped = 0
+    while count_tokens(_dump(value)) > budget:
+        lst, _ = _largest_list(value)
+        if lst is None:
+            return _fit_keys(value, budget)
+        lst.pop()
+        dropped += 1
+    text = _dump(value)
+    return text + (f"\n…[{dropped} list items dropped]" if dropped else "")
+
+def truncate_text(text, budget):
+    """Whole paragraphs, then whole lines, from the top until `budget` is used."""
+    total = count_tokens(text)
+    if total <= budget:
+        return text
+    marker_cost = count_tokens(TRUNCATED.format(n=total))
+    room = max(0, budget - marker_cost)
+    kept, used = [], 0
+    for para in _paragraphs(text):
+        cost = count_tokens(para)
+        if used + cost <= room:
+            kept.append(para)
+            used += cost
+            continue
+        lines = []
+        for line in para.splitlines():
+            cost = count_tokens(line)
+            if used + cost > room:
+                break
+            lines.append(line)
+            used += cost
+        if lines:
+            kept.append("\n".join(lines))
+        break
+    out = "\n\n".join(kept)
+    return f"{out}\n{TRUNCATED.format(n=total - used)}" if out else TRUNCATED.format(n=total)
+
+def fair_shares(sizes, budget):
+    """Max-min fair split: inputs under an equal share keep their size, the rest split what's left."""
+    shares = [0] * len(sizes)
+    left = budget
+    order = sorted(range(len(sizes)), key=lambda i: (sizes[i], i))
+    for n, i in enumerate(order):
+        share = left // (len(sizes) - n)
+        shares[i] = min(sizes[i], share)
+        left -= shares[i]
+    return shares
+
+# -------------------------------------------------------------------------
+# Public API
+# -------------------------------------------------------------------------
+def build(prompt_text, inputs, budget=DEFAULT_BUDGET):
+    """Prompt + compacted, de-duplicated, budgeted inputs.
+
+    inputs: [(name, text)]. Returns (context, stats) where stats has
+    "raw"/"final" token totals, "prompt" tokens and per-input
+    {"name", "raw", "compact", "final"}.
+    """
+    seen = {}   # paragraph key -> input that carried it first
+    parts = []
+    for name, text in inputs:
+        data = compact_json(text) if name.endswith(".json") else None
+        if data is not None:
+            parts.append({"name": name, "raw": count_tokens(text), "json": data,
+                          "compact": count_tokens(_dump(data))})
+            continue
+        kept = []
+        for para in _paragraphs(compact_text(text)):
+            if count_tokens(para) < MIN_DEDUPE_TOKENS:
+                kept.append(para)
+                continue
+            key = _key(para)
+            if key in seen:
+                kept.append(SAME_AS.format(name=os.path.basename(seen[key])))
+            else:
+                seen[key] = name
+                kept.append(para)
+        body = "\n\n".join(kept)
+        parts.append({"name": name, "raw": count_tokens(text), "text": body, "compact": count_tokens(body)})
+
+    shares = fair_shares([p["compact"] for p in parts], budget)
+    sections = [prompt_text.rstrip()]
+    stats = {"prompt": count_tokens(prompt_text), "inputs": []}
+    for part, share in zip(parts, shares):
+        if "json" in part:
+            body = truncate_json(part["json"], share) if part["compact"] > share else _dump(part["json"])
+        else:
+            body = truncate_text(part["text"], share)
+        final = count_tokens(body)
+        sections.append(f"### {os.path.basename(part['name'])}\n{body}")
+        stats["inputs"].append({"name": part["name"], "raw": part["raw"], "compact": part["compact"], "final": final})
+    stats["raw"] = stats["prompt"] + sum(p["raw"] for p in stats["inputs"])
+    stats["final"] = count_tokens("\n\n".join(sections))
+    return "\n\n".join(sections) + "\n", stats
+
+def build_files(prompt_path, input_paths, budget=DEFAULT_BUDGET):
+    """build() on files."""
+    def read(path):
+        with open(path, "r") as f:
+            return f.read()
+    return build(read(prompt_path), [(p, read(p)) for p in input_paths], budget)
+
+def format_tokens(n):
+    return f"{n / 1000:.1f}k" if n >= 1000 else str(n)
+
+# -------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Assemble a token-budgeted agent prompt")
+    parser.add_argument("prompt")
+    parser.add_argument("inputs", nargs="+")
+    parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET)
+    args = parser.parse_args()
+
+    context, stats = build_files(args.prompt, args.inputs, args.budget)
+    sys.stdout.write(context)
+    for p in stats["inputs"]:
+        print(f"{p['name']}: {p['raw']} -> {p['compact']} -> {p['final']} tokens", file=sys.stderr)
+    print(f"total: {stats['raw']} -> {stats['final']} tokens", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
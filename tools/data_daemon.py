@@ -0,0 +1,204 @@
+"""Long-lived data daemon for the slash commands.
+
+Keeps the data tools imported, the HTTP session and connection pools open and
+the caches hot, and answers tech/fund/news context requests over a local Unix
+socket. tools/orchestrator.py asks it first and falls back to in-process
+execution when no daemon is running.
+
+Protocol: one JSON request per connection, one JSON line back.
+  {"cmd": "fetch", "ticker": "NVDA", "mode": "tech"} -> {"ok": true, "results": {...}}
+  {"cmd": "ping"} / {"cmd": "shutdown"}
+
+Usage: python tools/data_daemon.py [start|stop|status|serve]
+"""
+import importlib
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+SOCKET_PATH = os.environ.get("AGENCY_DAEMON_SOCKET", "agency/store/data_daemon.sock")
+LOG_PATH = "agency/logs/data_daemon.log"
+CONNECT_TIMEOUT = 0.2     # a missing/stuck daemon must not slow the fallback down
+REQUEST_TIMEOUT = 120
+START_TIMEOUT = 15
+
+class DaemonUnavailable(Exception):
+    """No daemon is listening on the socket."""
+
+# -------------------------------------------------------------------------
+# Client
+# -------------------------------------------------------------------------
+def _send(msg, path=None, timeout=REQUEST_TIMEOUT):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+        try:
+            sock.connect(path or SOCKET_PATH)
+        except OSError as e:
+            raise DaemonUnavailable(str(e))
+        sock.settimeout(timeout)
+        buf = b""
+        try:
+            sock.sendall(json.dumps(msg).encode() + b"\n")
+            while not buf.endswith(b"\n"):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                buf += chunk
+        except ConnectionError as e:
+            # Daemon went away mid-request (e.g. while shutting down)
+            raise DaemonUnavailable(str(e))
+    finally:
+        sock.close()
+    if not buf:
+        raise DaemonUnavailable("daemon closed the connection")
+    reply = json.loads(buf)
+    if not reply.get("ok"):
+        raise RuntimeError(f"data daemon: {reply.get('error')}")
+    return reply
+
+def request(ticker, mode="full", path=None):
+    """{"tech"|"fund"|"news": dict} from the daemon. Raises DaemonUnavailable if none is running."""
+    return _send({"cmd": "fetch", "ticker": ticker, "mode": mode}, path)["results"]
+
+def ping(path=None):
+    """Daemon info dict, or None when no daemon answers."""
+    try:
+        return _send({"cmd": "ping"}, path, timeout=CONNECT_TIMEOUT * 5)
+    except (DaemonUnavailable, OSError, ValueError):
+        return None
+
+# -------------------------------------------------------------------------
+# Server
+# -------------------------------------------------------------------------
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            reply = self.server.dispatch(json.loads(self.rfile.readline()))
+        except Exception as e:
+            reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        self.wfile.write(json.dumps(reply).encode() + b"\n")
+
+class DataDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """fetch(ticker, mode) -> results, served over a Unix socket (owner-only)."""
+    daemon_threads = True
+
+    def __init__(self, path, fetch):
+        self.path = path
+        self.fetch = fetch
+        self.started = time.time()
+        self.served = 0
+        super().__init__(path, Handler)
+        os.chmod(path, 0o600)
+
+    def dispatch(self, msg):
+        cmd = msg.get("cmd", "fetch")
+        if cmd == "fetch":
+            results = self.fetch(msg["ticker"], msg.get("mode", "full"))
+            self.served += 1
+            return {"ok": True, "results": results}
+        if cmd == "ping":
+            return {"ok": True, "pid": os.getpid(), "served": self.served,
+                    "uptime": time.time() - self.started}
+        if cmd == "shutdown":
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"ok": True}
+        raise ValueError(f"Unknown command: {cmd}")
+
+def _warm_up():
+    """Import the data tools and open the shared session once, up front."""
+    from tools import orchestrator
+    from tools.utils import get_session
+    for module_name, _ in orchestrator.ENTRY_POINTS.values():
+        importlib.import_module(module_name)
+    get_session()
+    return orchestrator
+
+def serve(path=None):
+    path = path or SOCKET_PATH
+    if os.path.exists(path):
+        if ping(path):
+            print(f"⚠️ A data daemon is already listening on {path}", file=sys.stderr)
+            sys.exit(1)
+        os.unlink(path)   # left behind by a daemon that died
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    orchestrator = _warm_up()
+    server = DataDaemon(path, lambda ticker, mode: orchestrator.fetch_all(ticker, mode, "inprocess"))
+    print(f"🟢 Data daemon {os.getpid()} listening on {path}", flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+        print("🔴 Data daemon stopped", flush=True)
+
+def start(path=None):
+    """Launch `serve` detached and wait until it answers. Returns its ping info."""
+    path = path or SOCKET_PATH
+    info = ping(path)
+    if info:
+        return info
+    os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
+    env = os.environ.copy()
+    env["PYTHONPATH"] = f"{os.getcwd()}:{env.get('PYTHONPATH', '')}"
+    env["AGENCY_DAEMON_SOCKET"] = path
+    with open(LOG_PATH, "a") as log:
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "serve"], stdout=log,
+                         stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, env=env,
+                         start_new_session=True)
+    deadline = time.time() + START_TIMEOUT
+    while time.time() < deadline:
+        info = ping(path)
+        if info:
+            return info
+        time.sleep(0.1)
+    raise RuntimeError(f"data daemon did not come up, see {LOG_PATH}")
+
+def stop(path=None):
+    """Ask the daemon to exit and wait for its socket to go away."""
+    path = path or SOCKET_PATH
+    try:
+        _send({"cmd": "shutdown"}, path, timeout=CONNECT_TIMEOUT * 5)
+    except DaemonUnavailable:
+        return False
+    deadline = time.time() + START_TIMEOUT
+    while os.path.exists(path) and time.time() < deadline:
+        time.sleep(0.05)
+    return True
+
+# -------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if cmd == "serve":
+        serve()
+    elif cmd == "start":
+        info = start()
+        print(f"🟢 Data daemon {info['pid']} running on {SOCKET_PATH}")
+    elif cmd == "stop":
+        print("🔴 Data daemon stopped" if stop() else "Data daemon not running")
+    elif cmd == "status":
+        info = ping()
+        if info:
+            print(f"🟢 Data daemon {info['pid']} on {SOCKET_PATH}: up {info['uptime']:.0f}s, "
+                  f"{info['served']} requests served")
+        else:
+            print("Data daemon not running")
+            sys.exit(1)
+    else:
+        print(__doc__.strip().splitlines()[-1], file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
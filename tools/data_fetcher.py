@@ -1,22 +1,30 @@
 import json
+import os
 import sys
 import requests
 import csv
 import io
-import re
+from tools import finviz, http_cache, rate_limit
+
+STOOQ_BASE_URL = os.environ.get("STOOQ_BASE_URL", "https://stooq.com")
 
 def get_stooq_price(ticker):
     """Fetches Price and Volume from Stooq (No Key, CSV)."""
     # Stooq uses .US for US stocks
     symbol = f"{ticker}.US"
-    url = f"https://stooq.com/q/l/?s={symbol}&f=sd2t2ohlcv&h&e=csv"
+    url = f"{STOOQ_BASE_URL}/q/l/?s={symbol}&f=sd2t2ohlcv&h&e=csv"
     
-    try:
+    def fetch():
         r = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
         r.raise_for_status()
+        return r.text
+
+    try:
+        text = http_cache.cached("stooq_quote", {"symbol": ticker, "f": "sd2t2ohlcv"},
+                                 lambda: rate_limit.call("stooq", fetch))
         
         # Parse CSV
-        f = io.StringIO(r.text)
+        f = io.StringIO(text)
         reader = csv.DictReader(f)
         row = next(reader, None)
         
@@ -31,47 +39,21 @@ def get_stooq_price(ticker):
     return None
 
 def get_finviz_data(ticker):
-    """Fetches Fundamentals from Finviz (HTML Scraping)."""
-    url = f"https://finviz.com/quote.ashx?t={ticker}"
-    headers = {"User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)"}
-    
-    data = {}
+    """Fetches Fundamentals from Finviz: the whole snapshot table, typed ({} on failure)."""
     try:
-        r = requests.get(url, headers=headers, timeout=10)
-        r.raise_for_status()
-        html = r.text
-        
-        # Regex for key metrics in Finviz table
-        # Format: <td ...>P/E</td><td ...><b>35.20</b></td>
-        patterns = {
-            "P/E": r">P/E</td>.*?<b>([\d\.]+)</b>",
-            "Fwd P/E": r">Forward P/E</td>.*?<b>([\d\.]+)</b>",
-            "PEG": r">PEG</td>.*?<b>([\d\.]+)</b>",
-            "RSI": r">RSI \(14\)</td>.*?<b>([\d\.]+)</b>",
-            "SMA50": r">SMA50</td>.*?<b>([-\d\.]+)%</b>",
-            "SMA200": r">SMA200</td>.*?<b>([-\d\.]+)%</b>",
-            "Price": r">Price</td>.*?<b>([\d\.]+)</b>" # Backup price
-        }
-        
-        for key, pat in patterns.items():
-            m = re.search(pat, html, re.DOTALL)
-            if m:
-                try:
-                    data[key] = float(m.group(1))
-                except:
-                    data[key] = m.group(1)
-                    
+        # Shared with get_financials' Finviz fallback
+        return finviz.snapshot(ticker)
     except Exception as e:
         print(f"Error fetching Finviz: {e}", file=sys.stderr)
-        
-    return data
+        return {}
 
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python data_fetcher.py <TICKER>")
+        print("Usage: python data_fetcher.py <TICKER> [OUT_DIR]")
         sys.exit(1)
         
     ticker = sys.argv[1]
+    out_dir = sys.argv[2] if len(sys.argv) > 2 else "agency/data"
     print(f"Fetching data for {ticker}...")
     
     # 1. Get Price (Stooq preferred)
@@ -87,7 +69,7 @@ def main():
         "current_price": final_price,
         "source": "Stooq/Finviz",
         "indicators": {
-            "RSI_14": finviz_data.get('RSI'),
+            "RSI_14": finviz_data.get('RSI (14)'),
             "SMA_50_Change_Percent": finviz_data.get('SMA50'),
             "SMA_200_Change_Percent": finviz_data.get('SMA200')
         }
@@ -97,22 +79,32 @@ def main():
     financials_json = {
         "valuation": {
             "Trailing_PE": finviz_data.get('P/E'),
-            "Forward_PE": finviz_data.get('Fwd P/E'),
-            "PEG_Ratio": finviz_data.get('PEG')
+            "Forward_PE": finviz_data.get('Forward P/E'),
+            "PEG_Ratio": finviz_data.get('PEG'),
+            "Price_to_Sales": finviz_data.get('P/S'),
+            "Price_to_Book": finviz_data.get('P/B'),
+            "Market_Cap": finviz_data.get('Market Cap')
         },
         "financials": {
+            "EPS_TTM": finviz_data.get('EPS (ttm)'),
+            "Sales_QoQ_Percent": finviz_data.get('Sales Q/Q'),
+            "Profit_Margin_Percent": finviz_data.get('Profit Margin'),
+            "ROE_Percent": finviz_data.get('ROE'),
+            "Debt_to_Equity": finviz_data.get('Debt/Eq'),
+            "Beta": finviz_data.get('Beta'),
             "Note": "Data scraped from Finviz"
         }
     }
     
     # Write files
-    with open("agency/data/market.json", "w") as f:
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "market.json"), "w") as f:
         json.dump(market_json, f, indent=2)
         
-    with open("agency/data/financials.json", "w") as f:
+    with open(os.path.join(out_dir, "financials.json"), "w") as f:
         json.dump(financials_json, f, indent=2)
         
-    print("✅ Data fetched and saved to agency/data/")
+    print(f"✅ Data fetched and saved to {out_dir}/")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,210 @@
+"""Streaming dossier for agency_manager runs.
+
+Sections are shown as soon as their agent finishes, instead of after the
+trader plan: the agent whose output is being generated owns the terminal
+and its gemini stdout is tee'd there live; sections that finish meanwhile
+are buffered and shown next (in dossier order), and scheduler log lines
+wait until the live section ends so they never split it. The saved
+<reports>/dossier.md always has the fixed section order.
+
+Perceived latency is tracked next to total runtime: seconds from run start
+to the first byte shown, the first complete section and the CIO decision.
+Without a terminal (out=None) nothing is printed and the marks are taken
+when the agents finish.
+
+Usage: python tools/dossier.py REPORTS_DIR [--ticker TICKER]   (rebuild dossier.md)
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+# (agent, heading) in dossier order; the report file is <reports>/<agent>.md
+SECTIONS = [
+    ("tech", "📈 TECHNICAL REPORT"),
+    ("fund", "🏢 FUNDAMENTAL REPORT"),
+    ("sent", "📰 SENTIMENT REPORT"),
+    ("macro", "🌍 MACRO REPORT"),
+    ("signal", "⚔️ BULL VS BEAR DEBATE"),
+    ("risk", "🛡️ RISK ASSESSMENT"),
+    ("plan", "📝 PROPOSED TRADE PLAN"),
+]
+TITLES = dict(SECTIONS)
+ORDER = {name: i for i, (name, _) in enumerate(SECTIONS)}
+DECISION = "signal"
+RULE = "=" * 82
+
+def banner(ticker):
+    return f"{RULE}\n{'🏛️  GEMINI CAPITAL DOSSIER: ' + ticker:^82}\n{RULE}\n"
+
+def heading(name):
+    return f"\n--- {TITLES[name]} ---\n\n"
+
+# -------------------------------------------------------------------------
+# Live Rendering
+# -------------------------------------------------------------------------
+class Dossier:
+    def __init__(self, ticker, out=None, t0=None):
+        self.ticker = ticker
+        self.out = out
+        self.t0 = t0 or time.time()
+        self.lock = threading.RLock()
+        self.owner = None       # section streaming live
+        self.buffers = {}       # section -> text generated while another owned the terminal
+        self.done = set()
+        self.held_logs = []
+        self.marks = {}         # first_output / first_section / decision -> seconds since t0
+
+    @property
+    def live(self):
+        return self.out is not None
+
+    def streams(self, name):
+        return self.live and name in TITLES
+
+    def start(self):
+        if self.live:
+            self._write("\n" + banner(self.ticker), mark=False)
+
+    def chunk(self, name, text):
+        """Agent output as it is generated."""
+        if not text or not self.streams(name):
+            return
+        with self.lock:
+            if self.owner is None:
+                self._take(name)
+            if self.owner == name:
+                self._write(text)
+            else:
+                self.buffers.setdefault(name, []).append(text)
+
+    def restart(self, name):
+        """The agent's call is retried: discard what it generated so far."""
+        if not self.streams(name):
+            return
+        with self.lock:
+            self.buffers.pop(name, None)
+            if self.owner == name:
+                self._write(f"\n⚠️ {TITLES[name]} interrupted; restarting\n" + heading(name), mark=False)
+
+    def finish(self, name, ok=True):
+        """The agent's output is complete (ok) or it failed."""
+        if name not in TITLES:
+            return
+        with self.lock:
+            self.done.add(name)
+            if not self.live:
+                if ok:
+                    self._section_shown(name)
+                return
+            if not ok:
+                self.buffers.pop(name, None)
+                if self.owner == name:
+                    self._write(f"\n⚠️ {TITLES[name]} failed\n")
+                    self._release()
+            elif self.owner == name:
+                self._end(name)
+            elif self.owner is None:
+                self._take(name)
+                self._end(name)
+            else:
+                self.buffers.setdefault(name, [])
+            self._handoff()
+
+    def log(self, msg):
+        """Scheduler log line; held back while a section streams."""
+        with self.lock:
+            if self.owner is not None:
+                self.held_logs.append(msg)
+            elif self.live:
+                self._write(msg + "\n", mark=False)
+            else:
+                print(msg, flush=True)
+
+    # --- internals ---------------------------------------------------------
+    def _write(self, text, mark=True):
+        self.out.write(text)
+        self.out.flush()
+        if mark:
+            self._mark("first_output")
+
+    def _mark(self, key):
+        self.marks.setdefault(key, time.time() - self.t0)
+
+    def _section_shown(self, name):
+        self._mark("first_section")
+        if name == DECISION:
+            self._mark("decision")
+
+    def _take(self, name):
+        self.owner = name
+        self._write(heading(name) + "".join(self.buffers.pop(name, [])))
+
+    def _release(self):
+        self.owner = None
+        logs, self.held_logs = self.held_logs, []
+        for msg in logs:
+            self._write(msg + "\n", mark=False)
+
+    def _end(self, name):
+        self._write("\n")
+        self._section_shown(name)
+        self._release()
+
+    def _handoff(self):
+        """Give the terminal to the next section: finished ones first, in
+        dossier order, then one still generating."""
+        while self.owner is None:
+            waiting = sorted(self.buffers, key=ORDER.get)
+            finished = [n for n in waiting if n in self.done]
+            if finished:
+                self._take(finished[0])
+                self._end(finished[0])
+            elif waiting:
+                self._take(waiting[0])
+            else:
+                return
+
+    def summary(self, wall):
+        fmt = lambda key: f"{self.marks[key]:.1f}s" if key in self.marks else "-"
+        return (f"👁️  First output {fmt('first_output')}, first section {fmt('first_section')}, "
+                f"decision {fmt('decision')} (total {wall:.1f}s)")
+
+# -------------------------------------------------------------------------
+# Saved Dossier
+# -------------------------------------------------------------------------
+def render(reports_dir, ticker):
+    """The full dossier text in section order (missing reports are skipped)."""
+    parts = [banner(ticker)]
+    for name, _ in SECTIONS:
+        path = os.path.join(reports_dir, f"{name}.md")
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                parts.append(heading(name) + f.read().rstrip("\n") + "\n")
+    return "".join(parts)
+
+def save(reports_dir, ticker):
+    path = os.path.join(reports_dir, "dossier.md")
+    tmp = f"{path}.part"
+    with open(tmp, "w") as f:
+        f.write(render(reports_dir, ticker))
+    os.replace(tmp, path)
+    return path
+
+# -------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild dossier.md from a run's reports")
+    parser.add_argument("reports_dir")
+    parser.add_argument("--ticker", help="Ticker for the banner (default: from the workspace name)")
+    args = parser.parse_args()
+    ticker = args.ticker or os.path.basename(os.path.dirname(os.path.abspath(args.reports_dir))).split("-")[0]
+    print(f"💾 {save(args.reports_dir, ticker.upper())}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
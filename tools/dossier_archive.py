@@ -0,0 +1,421 @@
+"""Archive of past dossiers with a local similarity index (SQLite).
+
+Every completed run's dossier is kept zlib-compressed and indexed by ticker,
+date and decision (the CIO's final signal), so verdicts survive later runs.
+Report text is also indexed for similarity recall, with no external
+service: each dossier contributes its most informative terms (English
+words, Chinese character bigrams) to an inverted index, weighted BM25-style
+when it is added. Document frequencies are kept as counters and IDF is
+taken at query time, so adding a dossier touches only its own postings and
+never rebuilds the index. A query scores only the postings of its most
+informative terms, which keeps recall in milliseconds at tens of thousands
+of dossiers.
+
+The pipeline's `prior` step writes reports/prior.md for the CIO debate:
+the ticker's latest archived verdicts plus the k past conclusions most
+similar to the current analyst reports. Each dossier records a digest of
+the analyst reports it was built from; runs from the same reports are left
+out of prior.md and archived only once per verdict, so re-running an
+unchanged ticker feeds the debate the same prior.md and can hit the agent
+cache.
+
+Usage: python tools/dossier_archive.py [add REPORTS_DIR --ticker T | recall TICKER [--query-file F] [-k 5] [--out F] |
+       list [--ticker T] [--decision D] | show ID | stats]
+"""
+import argparse
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+ARCHIVE_PATH = os.environ.get("AGENCY_ARCHIVE_DB", "agency/store/archive.sqlite")
+DOC_TERMS = 160           # terms with postings per dossier (highest tf-idf when added)
+QUERY_TERMS = 32          # query terms whose postings are scored
+BM25_K1, BM25_B = 1.2, 0.75
+CONCLUSION_CHARS = 600
+HISTORY = 5               # latest verdicts of the same ticker in prior.md
+K = 5
+
+# Final-signal wording (debate prompt, then English) -> decision; longest first.
+DECISIONS = [
+    ("强力买入", "STRONG_BUY"), ("强力卖出", "STRONG_SELL"), ("买入", "BUY"), ("卖出", "SELL"), ("观望", "HOLD"),
+    ("strong buy", "STRONG_BUY"), ("strong sell", "STRONG_SELL"), ("buy", "BUY"), ("sell", "SELL"), ("hold", "HOLD"),
+]
+_DECISION_WORDS = [(re.compile(word if word[0] >= "一" else rf"\b{word}\b", re.IGNORECASE), decision)
+                   for word, decision in DECISIONS]
+_SIGNAL_LINE = re.compile(r"(最终信号|final signal|signal)[^\n]*", re.IGNORECASE)
+
+_TOKEN = re.compile(r"[a-z][a-z0-9]+|[一-鿿]+")
+STOPWORDS = frozenset(
+    "the and for with that this from are was were has have had not but its into than then over under "
+    "will would can could should our their there which while what when who how all any more most".split())
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dossiers (
+    id INTEGER PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    run_at REAL NOT NULL,
+    decision TEXT,
+    workspace TEXT,
+    conclusion TEXT NOT NULL,
+    body BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dossiers_ticker ON dossiers (ticker, run_at);
+CREATE INDEX IF NOT EXISTS dossiers_decision ON dossiers (decision, run_at);
+CREATE TABLE IF NOT EXISTS terms (id INTEGER PRIMARY KEY, term TEXT UNIQUE NOT NULL, df INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS postings (
+    term_id INTEGER NOT NULL,
+    doc_id INTEGER NOT NULL,
+    weight REAL NOT NULL,
+    PRIMARY KEY (term_id, doc_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, n REAL NOT NULL);
+"""
+NO_PRIOR = "### 🗂️ Prior Dossiers\n\nNo archived dossiers yet.\n"
+
+_local = threading.local()
+
+# -------------------------------------------------------------------------
+# Storage
+# -------------------------------------------------------------------------
+def _conn():
+    """Per-thread connection (sqlite3 connections are not shared across threads)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != ARCHIVE_PATH:
+        parent = os.path.dirname(ARCHIVE_PATH)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        conn = sqlite3.connect(ARCHIVE_PATH, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        # Archives created before the digest column get it added in place.
+        if "digest" not in {r[1] for r in conn.execute("PRAGMA table_info(dossiers)")}:
+            conn.execute("ALTER TABLE dossiers ADD COLUMN digest TEXT")
+        _local.conn, _local.path = conn, ARCHIVE_PATH
+    return conn
+
+def _counter(conn, name):
+    row = conn.execute("SELECT n FROM counters WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else 0
+
+def _bump(conn, name, by):
+    conn.execute("INSERT INTO counters (name, n) VALUES (?, ?) "
+                 "ON CONFLICT(name) DO UPDATE SET n = n + excluded.n", (name, by))
+
+def _chunks(items, n=500):
+    for i in range(0, len(items), n):
+        yield items[i:i + n]
+
+# -------------------------------------------------------------------------
+# Text
+# -------------------------------------------------------------------------
+def tokenize(text):
+    """English words and Chinese character bigrams, lowercased."""
+    tokens = []
+    for run in _TOKEN.findall(text.lower()):
+        if run[0] >= "一":
+            tokens.extend(run[i:i + 2] for i in range(max(1, len(run) - 1)))
+        elif run not in STOPWORDS:
+            tokens.append(run)
+    return tokens
+
+def extract_decision(text):
+    """The final signal in a CIO debate report (BUY/SELL/HOLD/STRONG_*), or None."""
+    if not text:
+        return None
+    lines = [m.group(0) for m in _SIGNAL_LINE.finditer(text)]
+    # The last signal line is the verdict; fall back to the whole report.
+    for scope in lines[::-1] + [text]:
+        hits = [(m.start(), decision) for word, decision in _DECISION_WORDS
+                for m in [word.search(scope)] if m]
+        if hits:
+            return min(hits)[1]
+    return None
+
+def conclusion(text, limit=CONCLUSION_CHARS):
+    """Leading lines of the verdict, cut at a line boundary."""
+    out, used = [], 0
+    for line in (text or "").splitlines():
+        line = line.strip()
+        if not line or line.startswith(("#", "|---")):
+            continue
+        if used + len(line) > limit and out:
+            break
+        out.append(line[:limit])
+        used += len(line) + 1
+    return "\n".join(out)
+
+def digest(text):
+    """Identity of a run's analyst reports (whitespace at the ends ignored), or None."""
+    text = (text or "").strip()
+    return hashlib.sha1(text.encode()).hexdigest() if text else None
+
+def _idf(df, n):
+    return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+# -------------------------------------------------------------------------
+# Write
+# -------------------------------------------------------------------------
+def add(ticker, text, decision=None, verdict="", workspace=None, run_at=None, source=None):
+    """Archive one dossier and index it. Returns its id.
+
+    `source` is the digest() of the analyst reports behind the dossier.
+    """
+    conn = _conn()
+    counts = Counter(tokenize(text))
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        n = _counter(conn, "docs") + 1
+        df = {}
+        for chunk in _chunks(list(counts)):
+            q = f"SELECT term, df FROM terms WHERE term IN ({','.join('?' * len(chunk))})"
+            df.update(conn.execute(q, chunk))
+        # Keep the dossier's most informative terms, weighted BM25-style for its length.
+        ranked = sorted(counts, key=lambda t: -counts[t] * _idf(df.get(t, 0) + 1, n))[:DOC_TERMS]
+        length = sum(counts[t] for t in ranked)
+        avg = (_counter(conn, "length") + length) / n
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * length / max(avg, 1))
+
+        cur = conn.execute(
+            "INSERT INTO dossiers (ticker, run_at, decision, workspace, conclusion, body, digest) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (ticker.upper(), run_at or time.time(), decision, workspace, verdict,
+             zlib.compress(text.encode(), 9), source))
+        doc_id = cur.lastrowid
+        conn.executemany("INSERT INTO terms (term, df) VALUES (?, 1) "
+                         "ON CONFLICT(term) DO UPDATE SET df = df + 1", [(t,) for t in counts])
+        ids = {}
+        for chunk in _chunks(ranked):
+            q = f"SELECT term, id FROM terms WHERE term IN ({','.join('?' * len(chunk))})"
+            ids.update(conn.execute(q, chunk))
+        conn.executemany("INSERT INTO postings (term_id, doc_id, weight) VALUES (?, ?, ?)",
+                         [(ids[t], doc_id, counts[t] * (BM25_K1 + 1) / (counts[t] + norm)) for t in ranked])
+        _bump(conn, "docs", 1)
+        _bump(conn, "length", length)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return doc_id
+
+def archive_run(reports_dir, ticker, workspace=None):
+    """Archive a finished run from its reports (dossier.md + signal.md). Returns (id, decision).
+
+    A run whose analyst reports and verdict are already archived for the
+    ticker (a cached re-run) returns the existing id instead of a duplicate.
+    """
+    def read(name):
+        path = os.path.join(reports_dir, name)
+        if not os.path.exists(path):
+            return ""
+        with open(path, "r") as f:
+            return f.read()
+
+    text = read("dossier.md")
+    if not text:
+        from tools import dossier
+        text = dossier.render(reports_dir, ticker)
+    verdict = read("signal.md")
+    decision = extract_decision(verdict)
+    source, summary = digest(read("all_analyst_reports.md")), conclusion(verdict)
+    if source:
+        row = _conn().execute("SELECT id FROM dossiers WHERE ticker = ? AND digest = ? AND conclusion = ?",
+                              (ticker.upper(), source, summary)).fetchone()
+        if row:
+            return row[0], decision
+    return add(ticker, text, decision, summary, workspace, source=source), decision
+
+# -------------------------------------------------------------------------
+# Read
+# -------------------------------------------------------------------------
+def _row(r):
+    return {"id": r[0], "ticker": r[1], "run_at": r[2], "decision": r[3], "workspace": r[4], "conclusion": r[5]}
+
+_COLS = "id, ticker, run_at, decision, workspace, conclusion"
+
+def history(ticker=None, decision=None, limit=HISTORY, exclude_digest=None):
+    """Latest archived dossiers, newest first (ticker/decision filters use the index).
+    `exclude_digest` leaves out runs built from those analyst reports."""
+    where, args = [], []
+    if ticker:
+        where.append("ticker = ?")
+        args.append(ticker.upper())
+    if decision:
+        where.append("decision = ?")
+        args.append(decision.upper())
+    if exclude_digest:
+        where.append("digest IS NOT ?")
+        args.append(exclude_digest)
+    q = f"SELECT {_COLS} FROM dossiers" + (f" WHERE {' AND '.join(where)}" if where else "")
+    return [_row(r) for r in _conn().execute(q + " ORDER BY run_at DESC LIMIT ?", (*args, limit))]
+
+def get(doc_id):
+    """Full archived dossier text, or None."""
+    row = _conn().execute("SELECT body FROM dossiers WHERE id = ?", (doc_id,)).fetchone()
+    return zlib.decompress(row[0]).decode() if row else None
+
+def recall(query, k=K, ticker=None, exclude_ticker=None, exclude_digest=None):
+    """The k archived dossiers most similar to `query` text, best first, each
+    with a "score". `ticker` limits the search to one symbol; `exclude_ticker`
+    leaves one out (its history is listed separately); `exclude_digest` leaves
+    out runs built from those analyst reports."""
+    conn = _conn()
+    n = _counter(conn, "docs")
+    counts = Counter(tokenize(query))
+    if not n or not counts:
+        return []
+    found = []
+    for chunk in _chunks(list(counts)):
+        q = f"SELECT id, term, df FROM terms WHERE term IN ({','.join('?' * len(chunk))})"
+        found.extend(conn.execute(q, chunk))
+    weights = {tid: (1 + math.log(counts[term])) * _idf(df, n) for tid, term, df in found}
+    top = sorted(weights, key=weights.get, reverse=True)[:QUERY_TERMS]
+    if not top:
+        return []
+    q = "SELECT p.term_id, p.doc_id, p.weight FROM postings p"
+    args = list(top)
+    where = f"p.term_id IN ({','.join('?' * len(top))})"
+    if ticker or exclude_ticker or exclude_digest:
+        q += " JOIN dossiers d ON d.id = p.doc_id"
+    if ticker or exclude_ticker:
+        where += " AND d.ticker = ?" if ticker else " AND d.ticker != ?"
+        args.append((ticker or exclude_ticker).upper())
+    if exclude_digest:
+        where += " AND d.digest IS NOT ?"
+        args.append(exclude_digest)
+    rows = conn.execute(f"{q} WHERE {where}", args).fetchall()
+    if not rows:
+        return []
+    term_ids, doc_ids, w = (np.array(col) for col in zip(*rows))
+    qw = np.array([weights[t] for t in term_ids.tolist()])
+    docs, inverse = np.unique(doc_ids, return_inverse=True)
+    scores = np.bincount(inverse, weights=qw * w)
+    best = np.argsort(-scores, kind="stable")[:k]
+    meta = {r[0]: _row(r) for r in conn.execute(
+        f"SELECT {_COLS} FROM dossiers WHERE id IN ({','.join('?' * len(best))})", docs[best].tolist())}
+    return [dict(meta[int(docs[i])], score=round(float(scores[i]), 3)) for i in best]
+
+def _date(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+
+def _first_line(text):
+    for line in text.splitlines():
+        line = line.strip("#*- ").strip()
+        if line:
+            return line
+    return ""
+
+def prior_markdown(ticker, query, k=K, history_n=HISTORY):
+    """reports/prior.md: the ticker's latest verdicts and the k most similar past conclusions.
+
+    Runs built from the same analyst reports as `query` (earlier runs of this
+    one) are left out, so the text only changes when the archive does.
+    """
+    t0 = time.perf_counter()
+    own = digest(query)
+    past = history(ticker, limit=history_n, exclude_digest=own)
+    similar = recall(query, k, exclude_ticker=ticker, exclude_digest=own) if query else []
+    if not past and not similar:
+        return NO_PRIOR, time.perf_counter() - t0
+    lines = ["### 🗂️ Prior Dossiers", ""]
+    if past:
+        lines += [f"#### {ticker.upper()} verdict history", ""]
+        lines += [f"- {_date(d['run_at'])}: {d['decision'] or 'N/A'} — {_first_line(d['conclusion'])}" for d in past]
+        lines.append("")
+    if similar:
+        lines += ["#### Similar past conclusions", ""]
+        for d in similar:
+            lines.append(f"- {d['ticker']} {_date(d['run_at'])} ({d['decision'] or 'N/A'}, similarity {d['score']:.1f}):")
+            lines += [f"  > {line}" for line in d["conclusion"].splitlines()]
+        lines.append("")
+    return "\n".join(lines) + "\n", time.perf_counter() - t0
+
+def stats():
+    conn = _conn()
+    docs, body = conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM dossiers").fetchone()
+    terms = conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+    postings = conn.execute("SELECT COUNT(*) FROM postings").fetchone()[0]
+    by_decision = dict(conn.execute("SELECT COALESCE(decision, 'N/A'), COUNT(*) FROM dossiers GROUP BY 1"))
+    return {"dossiers": docs, "compressed_bytes": body, "terms": terms, "postings": postings,
+            "decisions": by_decision}
+
+# -------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Archive and recall past dossiers")
+    sub = parser.add_subparsers(dest="cmd")
+    p = sub.add_parser("add", help="Archive a finished run's reports")
+    p.add_argument("reports_dir")
+    p.add_argument("--ticker", required=True)
+    p = sub.add_parser("recall", help="Prior verdicts + most similar past conclusions (prior.md)")
+    p.add_argument("ticker")
+    p.add_argument("--query-file", action="append", default=[], help="Text to match (repeatable)")
+    p.add_argument("-k", type=int, default=K)
+    p.add_argument("--out", help="Write the markdown here instead of stdout")
+    p = sub.add_parser("list")
+    p.add_argument("--ticker")
+    p.add_argument("--decision")
+    p.add_argument("--limit", type=int, default=20)
+    p = sub.add_parser("show")
+    p.add_argument("id", type=int)
+    sub.add_parser("stats")
+    args = parser.parse_args()
+
+    if args.cmd == "add":
+        doc_id, decision = archive_run(args.reports_dir, args.ticker)
+        print(f"🗄️ Archived {args.ticker.upper()} as #{doc_id} ({decision or 'no decision found'})")
+    elif args.cmd == "recall":
+        query = ""
+        for path in args.query_file:
+            if os.path.exists(path):
+                with open(path, "r") as f:
+                    query += f.read() + "\n"
+        try:
+            text, secs = prior_markdown(args.ticker, query, args.k)
+        except (sqlite3.Error, OSError) as e:
+            # Prior dossiers are optional context; never block the debate on them.
+            print(f"⚠️ Archive recall failed ({e}); continuing without prior dossiers", file=sys.stderr)
+            text, secs = NO_PRIOR, 0.0
+        if args.out:
+            tmp = f"{args.out}.part"
+            with open(tmp, "w") as f:
+                f.write(text)
+            os.replace(tmp, args.out)
+            print(f"🗂️ Prior dossiers for {args.ticker.upper()} recalled in {secs * 1e3:.0f}ms")
+        else:
+            print(text, end="")
+    elif args.cmd == "list":
+        for d in history(args.ticker, args.decision, args.limit):
+            print(f"#{d['id']:<7}{d['ticker']:<8}{_date(d['run_at'])}  {d['decision'] or 'N/A':<12}"
+                  f"{_first_line(d['conclusion'])[:60]}")
+    elif args.cmd == "show":
+        text = get(args.id)
+        if text is None:
+            print(f"❌ No archived dossier #{args.id}", file=sys.stderr)
+            sys.exit(1)
+        print(text, end="")
+    elif args.cmd == "stats":
+        s = stats()
+        print(f"🗄️ {s['dossiers']} dossiers, {s['compressed_bytes'] / 2**20:.1f} MB compressed, "
+              f"{s['terms']} terms, {s['postings']} postings")
+        print("   " + ", ".join(f"{k} {v}" for k, v in sorted(s["decisions"].items())))
+    else:
+        print(__doc__.strip().splitlines()[-2], file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
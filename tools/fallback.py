@@ -0,0 +1,176 @@
+"""Hedged fallback chains with persisted per-source health.
+
+race() starts the best-ranked source, starts the next one whenever the
+running ones have failed or HEDGE_DELAY has passed without an answer, and
+returns the first valid result. Sources still running at that point are
+abandoned (their threads are daemonic; late results only update health).
+Each source's latency and success rate are kept as moving averages in a
+small JSON file shared by every tool process, so the historically fastest
+healthy source goes first.
+
+Usage: python tools/fallback.py [status|reset]
+"""
+import fcntl
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+STATE_PATH = os.environ.get("AGENCY_FALLBACK_STATE", "agency/store/fallback_health.json")
+HEDGE_DELAY = float(os.environ.get("AGENCY_HEDGE_DELAY", "1.0"))   # seconds before the next source starts
+TIMEOUT = 30            # give up on the whole chain after this
+ALPHA = 0.3             # weight of the newest sample in the moving averages
+PRIOR_LATENCY = 1.0     # assumed latency (s) of a source never seen before
+HEALTHY = 0.5           # success rate below which a source is ranked last
+
+class AllSourcesFailed(Exception):
+    """Every source failed, returned nothing valid, or the chain timed out."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(" ".join(f"{name}:{err}" for name, err in errors.items()))
+
+# -------------------------------------------------------------------------
+# Health State
+# -------------------------------------------------------------------------
+@contextmanager
+def _state():
+    """Locked read-modify-write of every source's health."""
+    parent = os.path.dirname(STATE_PATH)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    with open(f"{STATE_PATH}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            state = health()
+            yield state
+            tmp = f"{STATE_PATH}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp, STATE_PATH)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def health():
+    """{"group/source": {"latency", "success", "calls"}} as last persisted."""
+    try:
+        with open(STATE_PATH, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def record(key, ok, seconds):
+    """Fold one outcome into the source's averages. Latency only counts successes."""
+    try:
+        with _state() as state:
+            h = state.setdefault(key, {"latency": PRIOR_LATENCY, "success": 1.0, "calls": 0})
+            h["success"] = (1 - ALPHA) * h["success"] + ALPHA * (1.0 if ok else 0.0)
+            if ok:
+                h["latency"] = seconds if h["calls"] == 0 else (1 - ALPHA) * h["latency"] + ALPHA * seconds
+            h["calls"] += 1
+    except OSError as e:
+        print(f"⚠️ Fallback health not saved ({e})", file=sys.stderr)
+
+def rank(group, names, ordered=False):
+    """Names in the order race() tries them.
+
+    Unhealthy sources always go last. Otherwise the fastest expected source
+    leads, unless `ordered` (later sources return less data), in which case
+    the given preference order is kept.
+    """
+    state = health()
+
+    def key(item):
+        index, name = item
+        h = state.get(f"{group}/{name}", {"latency": PRIOR_LATENCY, "success": 1.0})
+        unhealthy = h["success"] < HEALTHY
+        if ordered:
+            return (unhealthy, index)
+        return (unhealthy, h["latency"] / max(h["success"], 0.05), index)
+
+    return [name for _, name in sorted(enumerate(names), key=key)]
+
+# -------------------------------------------------------------------------
+# Public API
+# -------------------------------------------------------------------------
+def race(group, sources, hedge_delay=None, valid=None, ordered=False, timeout=TIMEOUT):
+    """First valid result of a fallback chain. Returns (name, result).
+
+    sources: [(name, func)], func() -> result (raise on failure).
+    valid(result) -> bool rejects empty answers (default: not None).
+    Raises AllSourcesFailed with each source's error.
+    """
+    hedge_delay = HEDGE_DELAY if hedge_delay is None else hedge_delay
+    valid = valid or (lambda result: result is not None)
+    funcs = dict(sources)
+    pending = rank(group, [name for name, _ in sources], ordered)
+    done = queue.Queue()
+    errors = {}
+
+    def run(name):
+        t0 = time.time()
+        try:
+            result = funcs[name]()
+            ok = valid(result)
+            error = None if ok else "no valid result"
+        except Exception as e:
+            result, ok, error = None, False, e
+        record(f"{group}/{name}", ok, time.time() - t0)
+        done.put((name, ok, result, error))
+
+    deadline = time.time() + timeout
+    running = 0
+    while pending or running:
+        if pending and (running == 0 or time.time() >= next_hedge):
+            name = pending.pop(0)
+            threading.Thread(target=run, args=(name,), daemon=True).start()
+            running += 1
+            next_hedge = time.time() + hedge_delay
+        wait = deadline - time.time()
+        if pending:
+            wait = min(wait, next_hedge - time.time())
+        if wait <= 0 and time.time() >= deadline:
+            break
+        try:
+            name, ok, result, error = done.get(timeout=max(0.0, wait))
+        except queue.Empty:
+            continue
+        running -= 1
+        if ok:
+            return name, result
+        errors[name] = error
+    for name in pending:
+        errors.setdefault(name, "not tried")
+    if running:
+        errors["timeout"] = f"no answer after {timeout}s"
+    raise AllSourcesFailed(errors)
+
+def reset():
+    for path in (STATE_PATH, f"{STATE_PATH}.lock"):
+        if os.path.exists(path):
+            os.remove(path)
+
+# -------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if cmd == "status":
+        print(f"{'source':<24}{'latency':>10}{'success':>10}{'calls':>8}")
+        for key, h in sorted(health().items()):
+            print(f"{key:<24}{h['latency']:>9.2f}s{h['success']:>10.2f}{h['calls']:>8}")
+    elif cmd == "reset":
+        reset()
+        print("🧹 Fallback health cleared")
+    else:
+        print(__doc__.strip().splitlines()[-1], file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
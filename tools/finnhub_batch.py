@@ -0,0 +1,260 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from urllib.parse import urlparse
+
+import aiohttp
+
+from tools import candle_store, http_cache, news_store, rate_limit, tracing, get_data_finnhub as gdf
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+# Finnhub free tier allows 60 calls/minute. Stay just under it by default.
+FINNHUB_RATE = 55 / 60
+FINNHUB_BURST = 5
+FINNHUB_CONCURRENCY = 4
+STOOQ_CONCURRENCY = 8
+REQUEST_TIMEOUT = 10
+NEWS_DAYS = 7
+
+# -------------------------------------------------------------------------
+# Per-host Limits
+# -------------------------------------------------------------------------
+class HostLimiter:
+    """Concurrency cap plus token bucket (requests/sec) for a single host.
+
+    rate <= 0 disables the token bucket and only the concurrency cap applies.
+    """
+
+    def __init__(self, concurrency, rate=0, burst=1):
+        self.sem = asyncio.Semaphore(concurrency)
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def _take_token(self):
+        if self.rate <= 0:
+            return
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    async def __aenter__(self):
+        await self.sem.acquire()
+        try:
+            await self._take_token()
+        except BaseException:
+            self.sem.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        self.sem.release()
+
+class BatchClient:
+    """One pooled aiohttp session shared by every ticker in the batch.
+
+    Hosts in `shared` ({netloc: (source, (rate, burst))}) also draw from the
+    cross-process quota in tools/rate_limit.py, so a batch and single-ticker
+    fetchers running alongside it stay under the same limit.
+    """
+
+    def __init__(self, session, limits, shared=None):
+        self.session = session
+        self.limits = limits
+        self.shared = shared or {}
+        self.default = HostLimiter(STOOQ_CONCURRENCY)
+
+    def _limiter(self, url):
+        return self.limits.get(urlparse(url).netloc, self.default)
+
+    async def _request(self, url, params, as_text):
+        start = time.time()
+        size = error = None
+        try:
+            async with self.session.get(url, params=params) as r:
+                r.raise_for_status()
+                body = await r.read()
+                size = len(body)
+                text = body.decode(r.charset or "utf-8", errors="replace")
+                if as_text:
+                    return text
+                return json.loads(text) if text.strip() else None
+        except Exception as e:
+            error = repr(e)[:200]
+            raise
+        finally:
+            tracing.record(urlparse(url).netloc, "http", start, time.time(),
+                           path=urlparse(url).path, bytes=size, error=error)
+
+    async def get(self, url, params=None, as_text=False, label=None):
+        shared = self.shared.get(urlparse(url).netloc)
+        try:
+            async with self._limiter(url):
+                if shared is None:
+                    return await self._request(url, params, as_text)
+                source, limit = shared
+                await asyncio.to_thread(rate_limit.acquire, source, limit)
+                try:
+                    value = await self._request(url, params, as_text)
+                except Exception as e:
+                    await asyncio.to_thread(rate_limit.record_error, source, e)
+                    raise
+                await asyncio.to_thread(rate_limit.record_success, source)
+                return value
+        except Exception as e:
+            print(f"⚠️ API Error [{label or url}]: {e!r}", file=sys.stderr)
+            return None
+
+    async def finnhub(self, endpoint, params):
+        """Finnhub GET via the shared response cache (same keys as gdf.fetch_json)."""
+        url = f"{gdf.BASE_URL}{endpoint}"
+        key = dict(params, url=url)
+        value = await asyncio.to_thread(http_cache.get, endpoint, key)
+        if value is not None:
+            return value
+        value = await self.get(url, params=dict(params, token=gdf.API_KEY), label=endpoint)
+        if value is None:
+            # Upstream failed: an entry inside the stale window beats nothing.
+            return await asyncio.to_thread(http_cache.get, endpoint, key, allow_stale=True)
+        await asyncio.to_thread(http_cache.put, endpoint, key, value)
+        return value
+
+# -------------------------------------------------------------------------
+# Per-ticker Pipeline
+# -------------------------------------------------------------------------
+def _build_outputs(ticker, quote_raw, csv_text, metrics_raw, news_raw, replace_candles=False):
+    if csv_text:
+        try:
+            candle_store.append_stooq_csv(ticker, csv_text, replace=replace_candles)
+        except Exception as e:
+            print(f"⚠️ Stooq Parse Error [{ticker}]: {e}", file=sys.stderr)
+    cols = candle_store.load(ticker)
+    tech_indicators = gdf.compute_technicals(ticker, cols)
+    metrics = metrics_raw.get('metric', {}) if metrics_raw else {}
+    if isinstance(news_raw, list):
+        news_store.merge(ticker, news_raw)
+    recent_news = news_store.load(ticker, since=time.time() - NEWS_DAYS * 86400)
+    return (
+        gdf.build_market_data(ticker, quote_raw, cols["c"] if cols is not None else None, tech_indicators,
+                              gdf.compute_backtest(ticker, cols)),
+        gdf.build_fund_data(metrics),
+        gdf.build_news_data(ticker, recent_news),
+    )
+
+async def fetch_ticker(client, ticker, out_root):
+    news_from = news_store.since_param(news_store.watermark(ticker), NEWS_DAYS)
+    news_to = gdf.news_window(NEWS_DAYS)[1]
+    since = candle_store.stooq_since_param(candle_store.watermark(ticker))
+    quote_raw, csv_text, metrics_raw, news_raw = await asyncio.gather(
+        client.finnhub("/quote", {"symbol": ticker}),
+        client.get(gdf.stooq_history_url(ticker, since), as_text=True, label=f"stooq {ticker}"),
+        client.finnhub("/stock/metric", {"symbol": ticker, "metric": "all"}),
+        client.finnhub("/company-news", {"symbol": ticker, "from": news_from, "to": news_to}),
+    )
+    restated = bool(since and csv_text) and await asyncio.to_thread(candle_store.restated_csv, ticker, csv_text)
+    if restated:
+        print(f"🔁 Stooq restated {ticker} history (split/dividend adjustment); re-downloading it",
+              file=sys.stderr)
+        csv_text = await client.get(gdf.stooq_history_url(ticker, None), as_text=True, label=f"stooq {ticker}")
+    # Indicator math is CPU-bound; keep it off the event loop.
+    market, fund, news = await asyncio.to_thread(
+        _build_outputs, ticker, quote_raw, csv_text, metrics_raw, news_raw, restated
+    )
+    await asyncio.to_thread(gdf.write_outputs, os.path.join(out_root, ticker), market, fund, news)
+    return quote_raw is not None
+
+async def run_batch(tickers, out_root, finnhub_rate=FINNHUB_RATE, finnhub_burst=FINNHUB_BURST,
+                    finnhub_concurrency=FINNHUB_CONCURRENCY, stooq_concurrency=STOOQ_CONCURRENCY):
+    """Fetch every ticker concurrently. Returns {ticker: ok}.
+
+    With finnhub_rate > 0 the Finnhub quota is the shared cross-process one
+    (unless AGENCY_RATE_LIMIT_DISABLE is set) and the per-host limiter only
+    caps concurrency.
+    """
+    finnhub_host = urlparse(gdf.BASE_URL).netloc
+    finnhub_limiter = HostLimiter(finnhub_concurrency, finnhub_rate, finnhub_burst)
+    shared = {}
+    if finnhub_rate > 0 and not rate_limit.DISABLED:
+        shared[finnhub_host] = (rate_limit.source_for(gdf.BASE_URL), (finnhub_rate, finnhub_burst))
+        finnhub_limiter = HostLimiter(finnhub_concurrency)
+    limits = {
+        finnhub_host: finnhub_limiter,
+        urlparse(gdf.STOOQ_BASE_URL).netloc: HostLimiter(stooq_concurrency),
+    }
+    connector = aiohttp.TCPConnector(limit=finnhub_concurrency + stooq_concurrency, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    headers = {"User-Agent": "Mozilla/5.0"}
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+        client = BatchClient(session, limits, shared)
+        results = await asyncio.gather(
+            *(fetch_ticker(client, t, out_root) for t in tickers), return_exceptions=True
+        )
+    status = {}
+    for ticker, res in zip(tickers, results):
+        if isinstance(res, Exception):
+            print(f"❌ {ticker}: {res!r}", file=sys.stderr)
+        status[ticker] = res is True
+    return status
+
+def read_tickers(args_tickers, path=None):
+    tickers = [t.upper() for t in args_tickers]
+    if path:
+        with open(path, "r") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    tickers.extend(t.upper() for t in line.replace(",", " ").split())
+    # Preserve order, drop duplicates
+    return list(dict.fromkeys(tickers))
+
+# -------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent multi-ticker Finnhub + Stooq fetcher")
+    parser.add_argument("tickers", nargs="*", help="Ticker symbols")
+    parser.add_argument("--file", help="Watchlist file (one or more tickers per line, # comments)")
+    parser.add_argument("--out", default="agency/data/batch", help="Output root; writes <out>/<TICKER>/*.json")
+    parser.add_argument("--finnhub-rate", type=float, default=FINNHUB_RATE, help="Finnhub requests/sec (<=0 = unlimited)")
+    parser.add_argument("--finnhub-burst", type=int, default=FINNHUB_BURST)
+    parser.add_argument("--finnhub-concurrency", type=int, default=FINNHUB_CONCURRENCY)
+    parser.add_argument("--stooq-concurrency", type=int, default=STOOQ_CONCURRENCY)
+    args = parser.parse_args()
+
+    gdf.check_key()
+    tickers = read_tickers(args.tickers, args.file)
+    if not tickers:
+        parser.error("no tickers given")
+
+    print(f"📡 Fetching {len(tickers)} tickers via Finnhub + Stooq (batch)...")
+    t0 = time.time()
+    status = asyncio.run(run_batch(
+        tickers, args.out,
+        finnhub_rate=args.finnhub_rate,
+        finnhub_burst=args.finnhub_burst,
+        finnhub_concurrency=args.finnhub_concurrency,
+        stooq_concurrency=args.stooq_concurrency,
+    ))
+    elapsed = time.time() - t0
+    ok = sum(status.values())
+    print(f"✅ {ok}/{len(tickers)} tickers in {elapsed:.1f}s ({len(tickers) / elapsed:.2f} tickers/sec)")
+    print(f"💾 Saved to {args.out}/<TICKER>/")
+    print(http_cache.summary(), file=sys.stderr)
+    sys.exit(0 if ok == len(tickers) else 1)
+
+if __name__ == "__main__":
+    with tracing.profiled("finnhub_batch"):
+        main()
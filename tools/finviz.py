@@ -0,0 +1,200 @@
+"""Finviz quote page snapshot: every label/value pair of the metrics table.
+
+The page is searched once for the snapshot table, and only that slice is fed
+to an HTMLParser that walks its cells in order. Cells alternate label and
+value, so one pass yields all ~70 metrics with no per-metric regex scans.
+Values are typed: "35.20" -> 35.2, "-1.37%" -> -1.37, "2842.43B" ->
+2.84243e12, "164.08 - 199.62" -> [164.08, 199.62], "Yes" -> True, "-" -> None.
+
+Usage: python tools/finviz.py TICKER | --file PAGE.html [PAGE.html ...]
+"""
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+
+import requests
+
+from tools import http_cache, rate_limit
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+BASE_URL = os.environ.get("FINVIZ_BASE_URL", "https://finviz.com")
+URL = BASE_URL + "/quote.ashx?t={ticker}"
+HEADERS = {"User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)"}
+TABLE_MARKER = "snapshot-table2"
+
+SUFFIXES = {"K": 1e3, "M": 1e6, "B": 1e9, "T": 1e12}
+BOOLEANS = {"Yes": True, "No": False}
+_NUMBER = re.compile(r"^([-+]?\d[\d,]*(?:\.\d+)?|[-+]?\.\d+)([KMBT%])?$")
+_SPLIT = re.compile(r"\s+-\s+|[\s()]+")
+
+# -------------------------------------------------------------------------
+# Value Typing
+# -------------------------------------------------------------------------
+def _number(token):
+    m = _NUMBER.match(token)
+    if not m:
+        return None
+    value = float(m.group(1).replace(",", ""))
+    suffix = m.group(2)
+    if suffix in SUFFIXES:
+        value = round(value * SUFFIXES[suffix], 2)
+    elif suffix is None and "." not in m.group(1) and abs(value) < 2**53:
+        value = int(value)
+    return value
+
+def parse_value(text):
+    """Typed metric value; percentages stay in percent units (5.1% -> 5.1)."""
+    text = " ".join(text.split())
+    if text in ("", "-", "N/A"):
+        return None
+    if text in BOOLEANS:
+        return BOOLEANS[text]
+    value = _number(text)
+    if value is not None:
+        return value
+    # Ranges and pairs: "164.08 - 199.62", "1.30% 1.14%", "0.96 (0.52%)"
+    tokens = [t for t in _SPLIT.split(text) if t]
+    if len(tokens) > 1:
+        values = [_number(t) for t in tokens]
+        if all(v is not None for v in values):
+            return values
+    return text
+
+# -------------------------------------------------------------------------
+# Parser
+# -------------------------------------------------------------------------
+class _SnapshotParser(HTMLParser):
+    """Collects the text of each <td> of the snapshot table, in order."""
+
+    def __init__(self, whole_page):
+        super().__init__(convert_charrefs=True)
+        # Given just the table slice, every cell counts; given a whole page,
+        # wait for the snapshot table's opening tag.
+        self.depth = 0 if whole_page else 1
+        self.cells = []
+        self.cell = None
+
+    def _close_cell(self):
+        if self.cell is not None:
+            self.cells.append("".join(self.cell))
+            self.cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            if self.depth:
+                self.depth += 1
+            elif TABLE_MARKER in (dict(attrs).get("class") or ""):
+                self.depth = 1
+        elif self.depth and tag == "td":
+            self._close_cell()   # tolerate a missing </td>
+            self.cell = []
+        elif self.depth and tag == "tr":
+            self._close_cell()
+
+    def handle_endtag(self, tag):
+        if not self.depth:
+            return
+        if tag in ("td", "tr"):
+            self._close_cell()
+        elif tag == "table":
+            self._close_cell()
+            self.depth -= 1
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            self.cell.append(data)
+
+def _table_slice(html):
+    """The snapshot table's markup, or None if no <table> tag carries the marker."""
+    mark = html.find(TABLE_MARKER)
+    while mark >= 0:
+        start = html.rfind("<", 0, mark)
+        # Only a marker inside the <table ...> tag itself (not CSS or scripts) counts.
+        if html.startswith("<table", start) and html.find(">", start) > mark:
+            end = html.find("</table>", mark)
+            return html[html.find(">", start) + 1:end] if end >= 0 else None
+        mark = html.find(TABLE_MARKER, mark + len(TABLE_MARKER))
+    return None
+
+def parse_snapshot(html):
+    """{label: typed value} for every pair in the snapshot table ({} if absent).
+
+    A label seen twice (Finviz lists "EPS next Y" as both value and growth)
+    keeps the first value; later ones get " (2)", " (3)" ... appended.
+    """
+    if not html:
+        return {}
+    table = _table_slice(html)
+    parser = _SnapshotParser(whole_page=table is None)
+    parser.feed(table if table is not None else html)
+    parser.close()
+    parser._close_cell()
+
+    data = {}
+    cells = parser.cells
+    for i in range(0, len(cells) - 1, 2):
+        label = " ".join(cells[i].split())
+        if not label:
+            continue
+        key, n = label, 1
+        while key in data:
+            n += 1
+            key = f"{label} ({n})"
+        data[key] = parse_value(cells[i + 1])
+    return data
+
+def parse_many(pages, workers=1):
+    """parse_snapshot over a batch of pages, in order; workers > 1 uses processes."""
+    pages = list(pages)
+    if workers <= 1 or len(pages) < 2 * workers:
+        return [parse_snapshot(page) for page in pages]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(parse_snapshot, pages, chunksize=max(1, len(pages) // (workers * 4))))
+
+# -------------------------------------------------------------------------
+# Fetch
+# -------------------------------------------------------------------------
+def _download(ticker):
+    r = requests.get(URL.format(ticker=ticker), headers=HEADERS, timeout=10)
+    r.raise_for_status()
+    return r.text
+
+def fetch_html(ticker):
+    """Quote page through the response cache and the finviz rate limiter."""
+    return http_cache.cached("finviz", {"t": ticker}, lambda: rate_limit.call("finviz", _download, ticker))
+
+def snapshot(ticker):
+    """Parsed snapshot table for a ticker. Raises on fetch errors; ValueError if the table is missing."""
+    data = parse_snapshot(fetch_html(ticker))
+    if not data:
+        raise ValueError(f"Finviz snapshot table not found for {ticker}")
+    return data
+
+def percent_to_ratio(value):
+    return round(value / 100, 6) if isinstance(value, (int, float)) else None
+
+# -------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------
+def main():
+    args = sys.argv[1:]
+    if not args:
+        print(__doc__.strip().splitlines()[-1], file=sys.stderr)
+        sys.exit(1)
+    if args[0] == "--file":
+        pages = []
+        for path in args[1:]:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                pages.append(f.read())
+        out = dict(zip((os.path.basename(p) for p in args[1:]), parse_many(pages, workers=os.cpu_count() or 1)))
+    else:
+        out = snapshot(args[0].upper())
+    print(json.dumps(out, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,23 @@
+import argparse
 import os
 import sys
 import json
 import time
 import requests
-import pandas as pd
 import numpy as np
-import io
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
+from tools import backtest
+from tools import candle_store
+from tools import http_cache
+from tools import indicator_state
+from tools import indicators
+from tools import intraday_store
+from tools import news_store
+from tools import rate_limit
+from tools import sentiment
+from tools import tracing
+from tools.indicator_state import format_technicals
 
 # Load environment variables from .env file
 load_dotenv()
@@ -16,7 +26,8 @@ load_dotenv()
 # Configuration
 # -------------------------------------------------------------------------
 API_KEY = os.environ.get("FINNHUB_API_KEY")
-BASE_URL = "https://finnhub.io/api/v1"
+BASE_URL = os.environ.get("FINNHUB_BASE_URL", "https://finnhub.io/api/v1")
+STOOQ_BASE_URL = os.environ.get("STOOQ_BASE_URL", "https://stooq.com")
 
 def check_key():
     if not API_KEY:
@@ -24,191 +35,148 @@ def check_key():
         print("   Usage: export FINNHUB_API_KEY='your_key' && python tools/get_data_finnhub.py <TICKER>", file=sys.stderr)
         sys.exit(1)
 
+def _request(url, **kwargs):
+    """GET under the host's shared rate limit; 429s wait out Retry-After and retry."""
+    def get():
+        r = requests.get(url, timeout=10, **kwargs)
+        r.raise_for_status()
+        return r
+    return rate_limit.call(rate_limit.source_for(url), get)
+
+def _get_json(url, params):
+    return _request(url, params=dict(params, token=API_KEY)).json()
+
 def fetch_json(endpoint, params={}):
-    params['token'] = API_KEY
+    """GET a Finnhub endpoint through the shared response cache (None on error)."""
     url = f"{BASE_URL}{endpoint}"
     try:
-        r = requests.get(url, params=params, timeout=10)
-        r.raise_for_status()
-        return r.json()
+        # The key omits the token; the URL keeps stub and live data apart.
+        return http_cache.cached(endpoint, dict(params, url=url), lambda: _get_json(url, params))
     except Exception as e:
         print(f"⚠️ API Error [{endpoint}]: {e}", file=sys.stderr)
         return None
 
 # -------------------------------------------------------------------------
-# Technical Analysis (Using Pandas)
+# Technical Analysis (NumPy kernels, see tools/indicators.py)
 # -------------------------------------------------------------------------
 def calculate_technicals(df):
-    if df is None or len(df) < 1:
+    """Latest-bar indicators for a candle table (DataFrame or column dict).
+
+    Matches the former pandas computation to within one unit of each value's
+    last rounded digit (see tools/indicators.py).
+    """
+    if df is None or 'c' not in df or len(df['c']) < 1:
         return {}
 
-    # Standardize column 't' to datetime
-    if 't' in df.columns:
-        # Check if it's numeric (Unix TS) or string
-        if pd.api.types.is_numeric_dtype(df['t']):
-            df['date'] = pd.to_datetime(df['t'], unit='s')
-        else:
-            df['date'] = pd.to_datetime(df['t'])
-    
-    df = df.sort_values('date')
-    close = df['c']
-
-    # 1. SMA
-    df['SMA_50'] = close.rolling(window=50).mean()
-    df['SMA_200'] = close.rolling(window=200).mean()
-
-    # 2. RSI (14)
-    delta = close.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-    rs = gain / loss
-    df['RSI_14'] = 100 - (100 / (1 + rs))
-
-    # 3. Bollinger Bands (20, 2)
-    df['BB_Mid'] = close.rolling(window=20).mean()
-    df['BB_Std'] = close.rolling(window=20).std()
-    df['BB_Upper'] = df['BB_Mid'] + (df['BB_Std'] * 2)
-    df['BB_Lower'] = df['BB_Mid'] - (df['BB_Std'] * 2)
-
-    # 4. MACD (12, 26, 9)
-    # EMA 12
-    k_12 = 2 / (12 + 1)
-    ema_12 = close.ewm(span=12, adjust=False).mean()
-    # EMA 26
-    k_26 = 2 / (26 + 1)
-    ema_26 = close.ewm(span=26, adjust=False).mean()
-    
-    df['MACD_Line'] = ema_12 - ema_26
-    df['MACD_Signal'] = df['MACD_Line'].ewm(span=9, adjust=False).mean()
-    df['MACD_Hist'] = df['MACD_Line'] - df['MACD_Signal']
+    close = np.asarray(df['c'], dtype=np.float64)
+    # Order by 't' (Unix TS or ISO date string) when present
+    if 't' in df:
+        close = close[np.argsort(np.asarray(df['t']), kind='stable')]
 
-    # Get latest values (last row)
-    latest = df.iloc[-1]
-    
-    # Determine position relative to SMAs
-    sma_50_status = "ABOVE" if latest['c'] > latest['SMA_50'] else "BELOW"
-    if pd.isna(latest['SMA_50']): sma_50_status = "N/A"
-    
-    return {
-        "RSI_14": round(latest['RSI_14'], 2) if not pd.isna(latest['RSI_14']) else None,
-        "SMA_50": round(latest['SMA_50'], 2) if not pd.isna(latest['SMA_50']) else None,
-        "SMA_200": round(latest['SMA_200'], 2) if not pd.isna(latest['SMA_200']) else None,
-        "SMA_50_Status": sma_50_status,
-        "Bollinger": {
-            "Upper": round(latest['BB_Upper'], 2) if not pd.isna(latest['BB_Upper']) else None,
-            "Lower": round(latest['BB_Lower'], 2) if not pd.isna(latest['BB_Lower']) else None
-        },
-        "MACD": {
-            "Line": round(latest['MACD_Line'], 3) if not pd.isna(latest['MACD_Line']) else None,
-            "Signal": round(latest['MACD_Signal'], 3) if not pd.isna(latest['MACD_Signal']) else None,
-            "Hist": round(latest['MACD_Hist'], 3) if not pd.isna(latest['MACD_Hist']) else None
-        }
-    }
+    return format_technicals(indicators.latest(close))
 
 # -------------------------------------------------------------------------
 # Main Logic
 # -------------------------------------------------------------------------
-def get_historical_candles_stooq(ticker):
-    """Fallback: Fetch historical candles from Stooq CSV (No Key required)."""
-    symbol = f"{ticker}.US"
-    url = f"https://stooq.com/q/l/?s={symbol}&f=sd2t2ohlcv&h&e=csv"
+def stooq_history_url(ticker, since=None):
+    """Daily history URL; `since` (YYYYMMDD) limits it to bars from that date on."""
+    url = f"{STOOQ_BASE_URL}/q/d/l/?s={ticker}.US&i=d"
+    if since:
+        url += f"&d1={since}&d2={datetime.now(timezone.utc).strftime('%Y%m%d')}"
+    return url
+
+def _fetch_text(url):
+    return _request(url, headers={"User-Agent": "Mozilla/5.0"}).text
+
+def refresh_candles(ticker):
+    """Top up the local candle store from Stooq and return its memory-mapped columns.
+
+    Only bars from the store's watermark on are downloaded; the full history
+    is read back memory-mapped instead of re-parsing the whole CSV.
+    """
     # Note: Stooq's /q/l/ is for latest quote. For historical we need /q/d/
-    url_hist = f"https://stooq.com/q/d/l/?s={symbol}&i=d"
-    
     try:
-        r = requests.get(url_hist, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
-        r.raise_for_status()
-        df = pd.read_csv(io.StringIO(r.text))
-        # Stooq columns: Date,Open,High,Low,Close,Volume
-        # Map to expected names
-        df = df.rename(columns={"Date": "t", "Open": "o", "High": "h", "Low": "l", "Close": "c", "Volume": "v"})
-        return df
+        candle_store.refresh_from_stooq(ticker, _fetch_text, stooq_history_url)
     except Exception as e:
         print(f"⚠️ Stooq Fallback Error: {e}", file=sys.stderr)
+    return candle_store.load(ticker)
+
+def get_historical_candles_stooq(ticker):
+    """Fallback: Fetch historical candles from Stooq CSV (No Key required)."""
+    cols = refresh_candles(ticker)
+    return candle_store.to_frame(cols) if cols is not None else None
+
+def compute_technicals(ticker, cols):
+    """Incremental indicators for stored candles (full recompute on failure)."""
+    if cols is None or len(cols["c"]) == 0:
+        return {}
+    try:
+        return indicator_state.technicals_for(ticker, cols)
+    except Exception as e:
+        print(f"⚠️ Incremental indicators failed for {ticker}, recomputing: {e}", file=sys.stderr)
+        return calculate_technicals(cols)
+
+def compute_backtest(ticker, cols):
+    """Signal backtest over the stored history for market.json (None on failure)."""
+    try:
+        return backtest.for_symbol(cols)
+    except Exception as e:
+        print(f"⚠️ Backtest failed for {ticker}: {e}", file=sys.stderr)
         return None
 
-def main():
-    check_key()
-    if len(sys.argv) < 2:
-        print("Usage: python tools/get_data_finnhub.py <TICKER>")
-        sys.exit(1)
-    
-    ticker = sys.argv[1].upper()
-    print(f"📡 Fetching data for {ticker} via Finnhub + Stooq...")
+def compute_intraday(ticker, timeframes):
+    """Indicators per intraday timeframe, all resampled from the 1-minute store.
 
-    # 1. Current Price (Finnhub Quote - Very Reliable)
-    quote_raw = fetch_json("/quote", {"symbol": ticker})
-    current_price = quote_raw.get('c', 0.0) if quote_raw else 0.0
-    change_percent = quote_raw.get('dp', 0.0) if quote_raw else 0.0
-    print(f"✅ Price Data: ${current_price} ({change_percent}%)")
+    The store is topped up once; a failed download still uses stored bars.
+    """
+    try:
+        intraday_store.refresh(ticker)
+    except Exception as e:
+        print(f"⚠️ Intraday refresh failed for {ticker}: {e}", file=sys.stderr)
+    block = {}
+    for tf in timeframes:
+        tech = intraday_store.technicals(ticker, tf)
+        if tech:
+            block[tf] = tech
+    return block
 
-    # 2. Historical Data (Stooq - for Indicators)
-    df_hist = get_historical_candles_stooq(ticker)
-    tech_indicators = calculate_technicals(df_hist) if df_hist is not None else {}
-    if tech_indicators:
-        print(f"✅ Technicals: RSI={tech_indicators.get('RSI_14')}, SMA50={tech_indicators.get('SMA_50')}")
+def news_window(days=7):
+    """(from, to) dates for /company-news."""
+    now = datetime.now()
+    return (now - timedelta(days=days)).strftime('%Y-%m-%d'), now.strftime('%Y-%m-%d')
 
-    # 3. Basic Financials
-    metrics_raw = fetch_json("/stock/metric", {"symbol": ticker, "metric": "all"})
-    
-    metrics = metrics_raw.get('metric', {}) if metrics_raw else {}
-    print(f"✅ Fundamentals: PE={metrics.get('peTTM')}, Beta={metrics.get('beta')}")
+def refresh_news(ticker, days=7):
+    """Top up the local news store and return its last `days` of articles.
 
-    # 3. News
-    # Get last 7 days news
-    news_start_date = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
-    news_end_date = datetime.now().strftime('%Y-%m-%d')
-    
-    news_raw = fetch_json("/company-news", {
+    /company-news is asked only from the store's watermark on; if the call
+    fails the stored window is still used.
+    """
+    return news_store.refresh(ticker, lambda since: fetch_json("/company-news", {
         "symbol": ticker,
-        "from": news_start_date,
-        "to": news_end_date
-    })
-    
-    news_items = []
-    if news_raw and isinstance(news_raw, list):
-        # Take top 10 relevant news
-        # Simple keyword filter: Title should ideally contain ticker or company name parts
-        # (This is a heuristic, can be relaxed if too strict)
-        relevant_keywords = [ticker, "STOCK", "MARKET", "EARNINGS", "REVENUE", "PROFIT", "CEO"]
-        
-        count = 0
-        for item in news_raw:
-            if count >= 10: break
-            
-            headline = item.get('headline', '').upper()
-            summary = item.get('summary', '').upper()
-            
-            # If explicit Ticker is mentioned in headline, it's high priority.
-            # Otherwise, just include it (Finnhub usually filters by ticker already),
-            # but we skip blank headlines.
-            if not headline: continue
-            
-            news_items.append({
-                "title": item.get('headline'),
-                "source": item.get('source'),
-                "published_at": datetime.fromtimestamp(item.get('datetime')).strftime('%Y-%m-%d %H:%M'),
-                "summary": item.get('summary'),
-                "url": item.get('url')
-            })
-            count += 1
-    print(f"✅ News: Found {len(news_items)} recent articles.")
+        "from": since,
+        "to": news_window(days)[1]
+    }), days=days)
 
-    # -------------------------------------------------------------------------
-    # Persist to Files
-    # -------------------------------------------------------------------------
-    
-    # Market JSON
-    market_data = {
+# -------------------------------------------------------------------------
+# Output Builders (shared with tools/finnhub_batch.py)
+# -------------------------------------------------------------------------
+def build_market_data(ticker, quote_raw, closes, tech_indicators, backtest_block=None, intraday_block=None):
+    current_price = quote_raw.get('c', 0.0) if quote_raw else 0.0
+    market = {
         "symbol": ticker,
         "current_price": current_price,
         "source": "Finnhub + Stooq",
         "indicators": tech_indicators,
-        "raw_candles_last_5": df_hist['c'].tail(5).tolist() if df_hist is not None else []
+        "raw_candles_last_5": closes[-5:].tolist() if closes is not None else []
     }
-    
-    # Financials JSON
-    fund_data = {
+    if backtest_block:
+        market["backtest"] = backtest_block
+    if intraday_block:
+        market["intraday"] = intraday_block
+    return market
+
+def build_fund_data(metrics):
+    return {
         "valuation": {
             "PE_TTM": metrics.get('peTTM'),
             "PE_Forward": metrics.get('peInclExtraTTM'), # Finnhub metric naming varies, using best guess or 'peBasicExclExtraTTM'
@@ -226,26 +194,127 @@ def main():
             "EPS_Growth_5Y": metrics.get('epsGrowth5Y')
         }
     }
-    
-    # News JSON
-    news_data = {
+
+def build_news_data(ticker, news_raw, limit=10):
+    """Top `limit` distinct stories, newest first, plus window sentiment.
+
+    Syndicated copies of a story (near-duplicate headlines) are collapsed
+    into one entry with a "duplicates" count, so the slots go to distinct
+    stories and sentiment is not weighted by how often a wire was reprinted.
+    """
+    articles = [item for item in news_raw if item.get('headline')] if isinstance(news_raw, list) else []
+    stories = news_store.distinct(articles)
+
+    # Score every distinct story in the window (headline + summary) in one batch.
+    scores = sentiment.score_items([item for item, _ in stories], title_key="headline", body_key="summary")
+    news_items = []
+    for (item, duplicates), score in list(zip(stories, scores))[:limit]:
+        entry = {
+            "title": item.get('headline'),
+            "source": item.get('source'),
+            "published_at": datetime.fromtimestamp(item.get('datetime')).strftime('%Y-%m-%d %H:%M'),
+            "summary": item.get('summary'),
+            "url": item.get('url'),
+            "sentiment": round(score["title"], 2),
+        }
+        if score["body"] is not None:
+            entry["summary_sentiment"] = round(score["body"], 2)
+        if duplicates:
+            entry["duplicates"] = duplicates
+        news_items.append(entry)
+    avg_sentiment, sentiment_label = sentiment.aggregate([s["title"] for s in scores])
+    return {
         "count": len(news_items),
+        "article_count": len(articles),
+        "story_count": len(stories),
+        "scored_count": len(scores),
+        "overall_sentiment_score": round(avg_sentiment, 2),
+        "sentiment_label": sentiment_label,
         "top_news": news_items
     }
 
+def write_outputs(out_dir, market_data, fund_data, news_data):
     # Ensure directory exists
-    os.makedirs("agency/data", exist_ok=True)
+    os.makedirs(out_dir, exist_ok=True)
 
-    with open("agency/data/market.json", "w") as f:
+    with open(os.path.join(out_dir, "market.json"), "w") as f:
         json.dump(market_data, f, indent=2)
     
-    with open("agency/data/financials.json", "w") as f:
+    with open(os.path.join(out_dir, "financials.json"), "w") as f:
         json.dump(fund_data, f, indent=2)
         
-    with open("agency/data/news.json", "w") as f:
+    with open(os.path.join(out_dir, "news.json"), "w") as f:
         json.dump(news_data, f, indent=2)
-        
-    print("💾 All data saved to agency/data/")
+
+def main():
+    check_key()
+    parser = argparse.ArgumentParser(description="Fetch quote, candles, fundamentals and news for one ticker")
+    parser.add_argument("ticker", help="Stock Ticker Symbol")
+    parser.add_argument("--out", default="agency/data", help="Directory for market/financials/news JSON")
+    parser.add_argument("--timeframes", default="",
+                        help="Comma-separated intraday timeframes (e.g. 15m,1h) to add indicators for")
+    args = parser.parse_args()
+    timeframes = [tf.strip() for tf in args.timeframes.split(",") if tf.strip()]
+    for tf in timeframes:
+        try:
+            intraday_store.timeframe_minutes(tf)
+        except ValueError as e:
+            parser.error(str(e))
+
+    ticker = args.ticker.upper()
+    print(f"📡 Fetching data for {ticker} via Finnhub + Stooq...")
+
+    # 1. Current Price (Finnhub Quote - Very Reliable)
+    with tracing.span("quote", "step", ticker=ticker):
+        quote_raw = fetch_json("/quote", {"symbol": ticker})
+    current_price = quote_raw.get('c', 0.0) if quote_raw else 0.0
+    change_percent = quote_raw.get('dp', 0.0) if quote_raw else 0.0
+    print(f"✅ Price Data: ${current_price} ({change_percent}%)")
+
+    # 2. Historical Data (Stooq - for Indicators)
+    with tracing.span("candles", "step", ticker=ticker):
+        candles = refresh_candles(ticker)
+    with tracing.span("indicators", "step", ticker=ticker):
+        tech_indicators = compute_technicals(ticker, candles)
+    if tech_indicators:
+        print(f"✅ Technicals: RSI={tech_indicators.get('RSI_14')}, SMA50={tech_indicators.get('SMA_50')}")
+    with tracing.span("backtest", "step", ticker=ticker):
+        backtest_block = compute_backtest(ticker, candles)
+    if backtest_block:
+        active = ", ".join(backtest_block["active_signals"]) or "none active"
+        print(f"✅ Backtest: {backtest_block['bars']} bars, {active}")
+    intraday_block = None
+    if timeframes:
+        with tracing.span("intraday", "step", ticker=ticker):
+            intraday_block = compute_intraday(ticker, timeframes)
+        print(f"✅ Intraday: {', '.join(intraday_block) or 'no bars stored'}")
+
+    # 3. Basic Financials
+    with tracing.span("fundamentals", "step", ticker=ticker):
+        metrics_raw = fetch_json("/stock/metric", {"symbol": ticker, "metric": "all"})
+    metrics = metrics_raw.get('metric', {}) if metrics_raw else {}
+    print(f"✅ Fundamentals: PE={metrics.get('peTTM')}, Beta={metrics.get('beta')}")
+
+    # 3. News (only articles newer than the store's watermark are requested)
+    with tracing.span("news", "step", ticker=ticker) as ev:
+        news_raw = refresh_news(ticker)
+        news_data = build_news_data(ticker, news_raw)
+        ev["articles"] = news_data["article_count"]
+    print(f"✅ News: {news_data['story_count']} distinct stories in {news_data['article_count']} recent articles.")
+
+    # -------------------------------------------------------------------------
+    # Persist to Files
+    # -------------------------------------------------------------------------
+    write_outputs(
+        args.out,
+        build_market_data(ticker, quote_raw, candles["c"] if candles is not None else None, tech_indicators,
+                          backtest_block, intraday_block),
+        build_fund_data(metrics),
+        news_data,
+    )
+    print(f"💾 All data saved to {args.out}/")
+    print(http_cache.summary(), file=sys.stderr)
 
 if __name__ == "__main__":
-    main()
+    with tracing.profiled("get_data_finnhub"):
+        main()
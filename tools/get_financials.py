@@ -1,11 +1,13 @@
 import yfinance as yf
 import sys
 import json
-import time
-import random
-from tools.utils import get_session, exponential_backoff
+from tools import fallback, finviz, http_cache, rate_limit
+from tools.utils import get_session
 
-def _fetch_yf_info(ticker_symbol):
+# Yahoo's answer is richer than the fallback's; give it this long before hedging.
+HEDGE_DELAY = 2.0
+
+def _download_yf_info(ticker_symbol):
     session = get_session()
     ticker = yf.Ticker(ticker_symbol, session=session)
     # ticker.info is the most prone to blocking
@@ -14,28 +16,39 @@ def _fetch_yf_info(ticker_symbol):
         raise ValueError("YF info blocked or empty")
     return info
 
+def _fetch_yf_info(ticker_symbol):
+    return http_cache.cached("yf_info", {"symbol": ticker_symbol},
+                             lambda: rate_limit.call("yahoo", _download_yf_info, ticker_symbol))
+
+def _financials_from_yf(ticker_symbol):
+    info = _fetch_yf_info(ticker_symbol)
+    def gv(k): return info.get(k, "N/A")
+    return {
+        "symbol": ticker_symbol,
+        "valuation": {"Trailing_PE": gv("trailingPE"), "Market_Cap": gv("marketCap")},
+        "financials": {"Revenue_Growth": gv("revenueGrowth")},
+        "source": "Yahoo Finance"
+    }
+
+def _financials_from_finviz(ticker_symbol):
+    # Same cache entry and parser as data_fetcher.get_finviz_data
+    snap = finviz.snapshot(ticker_symbol)
+    return {
+        "symbol": ticker_symbol,
+        "valuation": {"Trailing_PE": snap.get("P/E"), "Market_Cap": snap.get("Market Cap")},
+        "financials": {"Revenue_Growth": finviz.percent_to_ratio(snap.get("Sales Q/Q"))},
+        "source": "Finviz (Fallback)"
+    }
+
 def get_financial_data(ticker_symbol):
-    time.sleep(random.uniform(0.5, 2.0))
+    # Finviz has fewer fields than Yahoo's info, so Yahoo keeps priority while healthy.
     try:
-        info = exponential_backoff(lambda: _fetch_yf_info(ticker_symbol), retries=2)
-        def gv(k): return info.get(k, "N/A")
-        return {
-            "symbol": ticker_symbol,
-            "valuation": {"Trailing_PE": gv("trailingPE"), "Market_Cap": gv("marketCap")},
-            "financials": {"Revenue_Growth": gv("revenueGrowth")},
-            "source": "Yahoo Finance"
-        }
-    except Exception as e:
-        # Finviz fallback
-        try:
-            import requests as req_std
-            url = f"https://finviz.com/quote.ashx?t={ticker_symbol}"
-            h = {"User-Agent": "Mozilla/5.0"}
-            r = req_std.get(url, headers=h, timeout=10)
-            p = r.text.split(">P/E<")[1].split("<b>")[1].split("</b>")[0]
-            return {"symbol": ticker_symbol, "valuation": {"Trailing_PE": p}, "source": "Finviz (Fallback)"}
-        except:
-            return {"error": f"Financials failed: {e}"}
+        return fallback.race("financials", [
+            ("yahoo", lambda: _financials_from_yf(ticker_symbol)),
+            ("finviz", lambda: _financials_from_finviz(ticker_symbol)),
+        ], hedge_delay=HEDGE_DELAY, ordered=True)[1]
+    except fallback.AllSourcesFailed as e:
+        return {"error": f"Financials failed: {e}"}
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
@@ -1,20 +1,21 @@
 import yfinance as yf
 import pandas as pd
+import io
 import sys
 import json
-import time
-import random
-from tools.utils import get_session, exponential_backoff
+import os
+from tools import fallback, http_cache, indicators, rate_limit
+from tools.utils import get_session
+
+# Yahoo's answer is richer than the fallback's; give it this long before hedging.
+HEDGE_DELAY = 2.0
+STOOQ_BASE_URL = os.environ.get("STOOQ_BASE_URL", "https://stooq.com")
 
 def calculate_rsi(data, window=14):
     if len(data) < window: return None
-    delta = data['Close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
+    return indicators.rsi(data['Close'].to_numpy(), window)
 
-def _fetch_yf_history(ticker_symbol):
+def _download_yf_history(ticker_symbol):
     session = get_session()
     ticker = yf.Ticker(ticker_symbol, session=session)
     hist = ticker.history(period="1mo")
@@ -22,37 +23,55 @@ def _fetch_yf_history(ticker_symbol):
         raise ValueError("YF returned empty history")
     return hist
 
+def _fetch_yf_history(ticker_symbol):
+    return http_cache.cached(
+        "yf_history", {"symbol": ticker_symbol, "period": "1mo"},
+        lambda: rate_limit.call("yahoo", _download_yf_history, ticker_symbol),
+        encode=lambda df: df.to_json(orient="split", date_format="iso"),
+        decode=lambda text: pd.read_json(io.StringIO(text), orient="split"),
+    )
+
+def _fetch_stooq_quote_csv(ticker_symbol):
+    import requests as req_std
+    url = f"{STOOQ_BASE_URL}/q/l/?s={ticker_symbol}.US&f=sd2t2ohlc&h&e=csv"
+    r = req_std.get(url, timeout=5)
+    r.raise_for_status()
+    return r.text
+
+def _market_from_yf(ticker_symbol):
+    hist = _fetch_yf_history(ticker_symbol)
+
+    close = hist['Close'].to_numpy()
+    sma_50 = indicators.sma(close, min(len(close), 50))
+    rsi = calculate_rsi(hist)
+
+    def safe_round(val):
+        return round(float(val), 2) if not pd.isna(val) else None
+
+    return {
+        "symbol": ticker_symbol,
+        "current_price": safe_round(close[-1]),
+        "indicators": {"RSI_14": safe_round(rsi[-1] if rsi is not None else None), "SMA_50": safe_round(sma_50[-1])},
+        "source": "Yahoo Finance"
+    }
+
+def _market_from_stooq(ticker_symbol):
+    """Last resort: Stooq quote (price only)."""
+    text = http_cache.cached("stooq_quote", {"symbol": ticker_symbol, "f": "sd2t2ohlc"},
+                             lambda: rate_limit.call("stooq", _fetch_stooq_quote_csv, ticker_symbol))
+    df = pd.read_csv(io.StringIO(text))
+    return {"symbol": ticker_symbol, "current_price": float(df.iloc[0]['Close']), "source": "Stooq (Fallback)"}
+
 def get_market_data(ticker_symbol):
-    # Initial stagger
-    time.sleep(random.uniform(0.1, 1.5))
-    
+    # Stooq has no indicators, so Yahoo keeps priority while healthy; Stooq is
+    # hedged in after HEDGE_DELAY or as soon as Yahoo fails.
     try:
-        hist = exponential_backoff(lambda: _fetch_yf_history(ticker_symbol), retries=2)
-        
-        hist['SMA_50'] = hist['Close'].rolling(window=min(len(hist), 50)).mean()
-        hist['RSI'] = calculate_rsi(hist)
-        latest = hist.iloc[-1]
-        
-        def safe_round(val):
-            return round(float(val), 2) if not pd.isna(val) else None
-
-        return {
-            "symbol": ticker_symbol,
-            "current_price": safe_round(latest['Close']),
-            "indicators": {"RSI_14": safe_round(latest['RSI']), "SMA_50": safe_round(latest['SMA_50'])},
-            "source": "Yahoo Finance"
-        }
-    except Exception as e:
-        # Last resort fallback to Stooq (Minimal price)
-        try:
-            import requests as req_std
-            import io
-            url = f"https://stooq.com/q/l/?s={ticker_symbol}.US&f=sd2t2ohlc&h&e=csv"
-            r = req_std.get(url, timeout=5)
-            df = pd.read_csv(io.StringIO(r.text))
-            return {"symbol": ticker_symbol, "current_price": float(df.iloc[0]['Close']), "source": "Stooq (Fallback)"}
-        except:
-            return {"error": f"Failed to get market data: {e}"}
+        return fallback.race("market", [
+            ("yahoo", lambda: _market_from_yf(ticker_symbol)),
+            ("stooq", lambda: _market_from_stooq(ticker_symbol)),
+        ], hedge_delay=HEDGE_DELAY, ordered=True)[1]
+    except fallback.AllSourcesFailed as e:
+        return {"error": f"Failed to get market data: {e}"}
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
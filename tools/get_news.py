@@ -1,27 +1,35 @@
 from duckduckgo_search import DDGS
-from textblob import TextBlob
 import sys
 import json
 import yfinance as yf
 import requests
 import xml.etree.ElementTree as ET
-from tools.utils import exponential_backoff
+import os
+from tools import fallback, http_cache, rate_limit, sentiment
 
-def _fetch_ddg_news(query):
+# Items fetched (and scored) per source vs. listed in the output
+MAX_ITEMS = 20
+TOP_NEWS = 5
+GOOGLE_NEWS_BASE_URL = os.environ.get("GOOGLE_NEWS_BASE_URL", "https://news.google.com")
+
+def _download_ddg_news(query):
     with DDGS() as ddgs:
-        results_gen = ddgs.text(query, max_results=5, region="wt-wt")
+        results_gen = ddgs.text(query, max_results=MAX_ITEMS, region="wt-wt")
         items = list(results_gen)
         if not items:
             raise ValueError("DDGS returned no items")
         return items
 
-def _fetch_yf_news(ticker_symbol):
+def _fetch_ddg_news(query):
+    return http_cache.cached("news", {"source": "ddg", "q": query}, lambda: rate_limit.call("ddg", _download_ddg_news, query))
+
+def _download_yf_news(ticker_symbol):
     ticker = yf.Ticker(ticker_symbol)
     news = ticker.news
     if not news:
         raise ValueError("YF News returned no items")
     formatted = []
-    for item in news[:5]:
+    for item in news[:MAX_ITEMS]:
         formatted.append({
             "title": item.get('title'),
             "body": item.get('summary', ''), 
@@ -29,14 +37,17 @@ def _fetch_yf_news(ticker_symbol):
         })
     return formatted
 
-def _fetch_google_rss(ticker_symbol):
-    """Fallback: Google News RSS (Very robust)."""
-    url = f"https://news.google.com/rss/search?q={ticker_symbol}+stock&hl=en-US&gl=US&ceid=US:en"
+def _fetch_yf_news(ticker_symbol):
+    return http_cache.cached("news", {"source": "yf", "symbol": ticker_symbol},
+                             lambda: rate_limit.call("yahoo", _download_yf_news, ticker_symbol))
+
+def _download_google_rss(ticker_symbol):
+    url = f"{GOOGLE_NEWS_BASE_URL}/rss/search?q={ticker_symbol}+stock&hl=en-US&gl=US&ceid=US:en"
     resp = requests.get(url, timeout=10)
     resp.raise_for_status()
     
     root = ET.fromstring(resp.content)
-    items = root.findall(".//item")[:5]
+    items = root.findall(".//item")[:MAX_ITEMS]
     
     formatted = []
     for item in items:
@@ -47,52 +58,46 @@ def _fetch_google_rss(ticker_symbol):
         })
     return formatted
 
+def _fetch_google_rss(ticker_symbol):
+    """Fallback: Google News RSS (Very robust)."""
+    return http_cache.cached("news", {"source": "google_rss", "symbol": ticker_symbol},
+                             lambda: rate_limit.call("google_news", _download_google_rss, ticker_symbol))
+
 def get_news_sentiment(ticker_symbol):
-    news_items = []
-    source_used = "DDG"
-    
+    # Sources are raced: the healthiest starts first, the next joins after
+    # fallback.HEDGE_DELAY (or at once if it fails), first non-empty list wins.
+    query = f"{ticker_symbol} stock news"
     try:
-        # 1. DDG
-        query = f"{ticker_symbol} stock news"
-        news_items = exponential_backoff(lambda: _fetch_ddg_news(query), retries=1)
-    except Exception as e1:
-        try:
-            # 2. YF
-            news_items = exponential_backoff(lambda: _fetch_yf_news(ticker_symbol), retries=1)
-            source_used = "YF"
-        except Exception as e2:
-            try:
-                # 3. Google RSS
-                news_items = exponential_backoff(lambda: _fetch_google_rss(ticker_symbol), retries=1)
-                source_used = "GoogleRSS"
-            except Exception as e3:
-                return {"error": f"All sources failed. DDG:{e1} YF:{e2} RSS:{e3}"}
+        source_used, news_items = fallback.race("news", [
+            ("DDG", lambda: _fetch_ddg_news(query)),
+            ("YF", lambda: _fetch_yf_news(ticker_symbol)),
+            ("GoogleRSS", lambda: _fetch_google_rss(ticker_symbol)),
+        ], valid=bool)
+    except fallback.AllSourcesFailed as e:
+        return {"error": f"All sources failed. {e}"}
 
     try:
-        sentiment_scores = []
-        processed_news = []
+        # One batch for every headline and body; the overall score stays headline-based.
+        scores = sentiment.score_items(news_items, title_key="title", body_key="body")
+        avg_sentiment, sentiment_label = sentiment.aggregate([s["title"] for s in scores])
 
-        for item in news_items:
-            title = item.get('title', '')
-            text = title # Focus on title for sentiment
-            
-            blob = TextBlob(text)
-            polarity = blob.sentiment.polarity
-            sentiment_scores.append(polarity)
-            
-            processed_news.append({
-                "title": title,
+        processed_news = []
+        for item, score in list(zip(news_items, scores))[:TOP_NEWS]:
+            entry = {
+                "title": item.get('title', ''),
                 "source": item.get('href', ''),
-                "sentiment": round(polarity, 2)
-            })
+                "sentiment": round(score["title"], 2)
+            }
+            if score["body"] is not None:
+                entry["body_sentiment"] = round(score["body"], 2)
+            processed_news.append(entry)
 
-        avg_sentiment = sum(sentiment_scores) / len(sentiment_scores) if sentiment_scores else 0
-        
         summary = {
             "symbol": ticker_symbol,
             "source": source_used,
             "overall_sentiment_score": round(avg_sentiment, 2),
-            "sentiment_label": "Bullish" if avg_sentiment > 0.1 else ("Bearish" if avg_sentiment < -0.1 else "Neutral"),
+            "sentiment_label": sentiment_label,
+            "scored_count": len(scores),
             "top_news": processed_news
         }
         return summary
@@ -0,0 +1,309 @@
+"""Cross-process response cache (SQLite) shared by every data fetcher.
+
+Entries are keyed by endpoint + params and hold the decoded response as
+text. Each endpoint has a fresh TTL and a stale window after it: a fresh
+entry is returned as-is, a stale one is returned immediately while a
+background thread revalidates it, and anything older is fetched inline.
+If an inline fetch fails, the expired entry is served rather than nothing.
+
+Usage: python tools/http_cache.py [stats|clear [ENDPOINT]]
+"""
+import atexit
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from tools import tracing
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+CACHE_PATH = os.environ.get("AGENCY_HTTP_CACHE", "agency/store/http_cache.sqlite")
+DISABLED = os.environ.get("AGENCY_HTTP_CACHE_DISABLE", "") not in ("", "0")
+MAX_BYTES = int(float(os.environ.get("AGENCY_HTTP_CACHE_MB", "64")) * 2**20)
+MAX_ENTRIES = 20000
+
+# endpoint -> (fresh seconds, stale-while-revalidate seconds after that)
+TTLS = {
+    "/quote": (15, 300),
+    "/stock/metric": (86400, 6 * 86400),
+    "/company-news": (3 * 3600, 21 * 3600),
+    "stooq_quote": (60, 900),
+    "yf_info": (86400, 6 * 86400),
+    "yf_history": (900, 6 * 3600),
+    "finviz": (3600, 23 * 3600),
+    "news": (3 * 3600, 21 * 3600),
+}
+DEFAULT_TTL = (300, 3600)
+
+# Revalidations claim an entry for this long so other processes don't repeat them.
+REVALIDATE_LEASE = 30
+# How long an exiting process waits for in-flight revalidations.
+REVALIDATE_GRACE = 2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    revalidating_until REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS entries_lru ON entries (accessed_at);
+CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, n INTEGER NOT NULL);
+"""
+
+COUNTERS = ("hit", "stale", "miss", "stale_on_error", "revalidated", "evicted")
+STATS = dict.fromkeys(COUNTERS, 0)   # this process only; stats() adds the totals
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_pending = []
+_pending_lock = threading.Lock()
+
+def _trace_counters():
+    lookups = STATS["hit"] + STATS["stale"] + STATS["miss"]
+    if lookups:
+        ratio = (STATS["hit"] + STATS["stale"]) / lookups
+        tracing.counter("http_cache", dict(STATS, hit_ratio=round(ratio, 3)))
+
+tracing.at_exit(_trace_counters)
+
+# -------------------------------------------------------------------------
+# Storage
+# -------------------------------------------------------------------------
+def _conn():
+    """Per-thread connection (sqlite3 connections are not shared across threads)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != CACHE_PATH:
+        parent = os.path.dirname(CACHE_PATH)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        conn = sqlite3.connect(CACHE_PATH, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _local.conn, _local.path = conn, CACHE_PATH
+    return conn
+
+def make_key(endpoint, params):
+    return f"{endpoint}?{json.dumps(params or {}, sort_keys=True, default=str)}"
+
+def ttl_for(endpoint):
+    return TTLS.get(endpoint, DEFAULT_TTL)
+
+def _bump(conn, name):
+    with _stats_lock:
+        STATS[name] += 1
+    conn.execute("INSERT INTO counters (name, n) VALUES (?, 1) "
+                 "ON CONFLICT(name) DO UPDATE SET n = n + 1", (name,))
+
+def _quietly(write, *args):
+    """Run a bookkeeping write; a busy or broken cache only costs a warning.
+
+    The fetched value is good either way, so "database is locked" from a
+    concurrent batch or screener process must not fail the request.
+    """
+    try:
+        return write(*args)
+    except sqlite3.Error as e:
+        print(f"⚠️ Cache write skipped ({e})", file=sys.stderr)
+        return None
+
+def _lookup(conn, key):
+    return conn.execute("SELECT value, fetched_at FROM entries WHERE key = ?", (key,)).fetchone()
+
+def _touch(conn, key, now):
+    conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+
+def _store(conn, key, endpoint, text):
+    now = time.time()
+    conn.execute("INSERT OR REPLACE INTO entries (key, endpoint, value, size, fetched_at, accessed_at) "
+                 "VALUES (?, ?, ?, ?, ?, ?)", (key, endpoint, text, len(text), now, now))
+    _evict(conn)
+
+def _evict(conn):
+    """Drop least-recently-used entries once over MAX_BYTES or MAX_ENTRIES (down to 90%)."""
+    count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+    if total <= MAX_BYTES and count <= MAX_ENTRIES:
+        return
+    drop = []
+    for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+        if total <= MAX_BYTES * 0.9 and count <= MAX_ENTRIES * 0.9:
+            break
+        drop.append((key,))
+        total -= size
+        count -= 1
+    conn.executemany("DELETE FROM entries WHERE key = ?", drop)
+    with _stats_lock:
+        STATS["evicted"] += len(drop)
+    conn.execute("INSERT INTO counters (name, n) VALUES ('evicted', ?) "
+                 "ON CONFLICT(name) DO UPDATE SET n = n + excluded.n", (len(drop),))
+
+# -------------------------------------------------------------------------
+# Revalidation
+# -------------------------------------------------------------------------
+def _claim(conn, key, now):
+    cur = conn.execute("UPDATE entries SET revalidating_until = ? WHERE key = ? AND revalidating_until < ?",
+                       (now + REVALIDATE_LEASE, key, now))
+    return cur.rowcount == 1
+
+def _revalidate(key, endpoint, fetch, encode):
+    try:
+        value = fetch()
+        if value is not None:
+            conn = _conn()
+            _store(conn, key, endpoint, encode(value))
+            _bump(conn, "revalidated")
+    except Exception as e:
+        print(f"⚠️ Cache revalidation failed [{endpoint}]: {e}", file=sys.stderr)
+
+def _revalidate_async(key, endpoint, fetch, encode):
+    thread = threading.Thread(target=_revalidate, args=(key, endpoint, fetch, encode), daemon=True)
+    with _pending_lock:
+        _pending[:] = [t for t in _pending if t.is_alive()]
+        _pending.append(thread)
+    thread.start()
+
+@atexit.register
+def _drain(timeout=REVALIDATE_GRACE):
+    """Give in-flight revalidations a moment to land before the process exits."""
+    deadline = time.monotonic() + timeout
+    with _pending_lock:
+        threads = list(_pending)
+    for t in threads:
+        t.join(max(0.0, deadline - time.monotonic()))
+
+# -------------------------------------------------------------------------
+# Public API
+# -------------------------------------------------------------------------
+def _dumps(value):
+    return json.dumps(value, default=str)
+
+def cached(endpoint, params, fetch, encode=_dumps, decode=json.loads):
+    """fetch() through the cache. `endpoint` picks the TTL; `params` completes the key.
+
+    fetch() should raise (or return None) on failure; failures are never cached.
+    encode/decode convert the value to and from text (JSON by default).
+    """
+    if DISABLED:
+        return fetch()
+    fresh, stale = ttl_for(endpoint)
+    key = make_key(endpoint, params)
+    now = time.time()
+    try:
+        conn = _conn()
+        row = _lookup(conn, key)
+    except sqlite3.Error as e:
+        print(f"⚠️ Cache unavailable ({e}), fetching directly", file=sys.stderr)
+        return fetch()
+
+    if row is not None:
+        text, fetched_at = row
+        age = now - fetched_at
+        if age < fresh + stale:
+            _quietly(_touch, conn, key, now)
+            if age < fresh:
+                _quietly(_bump, conn, "hit")
+            else:
+                _quietly(_bump, conn, "stale")
+                if _quietly(_claim, conn, key, now):
+                    _revalidate_async(key, endpoint, fetch, encode)
+            return decode(text)
+
+    _quietly(_bump, conn, "miss")
+    try:
+        value = fetch()
+    except Exception:
+        if row is None:
+            raise
+        value = None
+    if value is None:
+        if row is not None:
+            print(f"⚠️ {endpoint} fetch failed, serving expired cache entry", file=sys.stderr)
+            _quietly(_bump, conn, "stale_on_error")
+            return decode(row[0])
+        return None
+    _quietly(_store, conn, key, endpoint, encode(value))
+    return value
+
+def get(endpoint, params, decode=json.loads, allow_stale=False):
+    """Cached value if fresh (or within the stale window with allow_stale), else None.
+
+    For callers that do their own fetching (e.g. the async batch client).
+    """
+    if DISABLED:
+        return None
+    fresh, stale = ttl_for(endpoint)
+    key = make_key(endpoint, params)
+    now = time.time()
+    try:
+        conn = _conn()
+        row = _lookup(conn, key)
+    except sqlite3.Error as e:
+        print(f"⚠️ Cache unavailable ({e})", file=sys.stderr)
+        return None
+    limit = fresh + stale if allow_stale else fresh
+    if row is None or now - row[1] >= limit:
+        _quietly(_bump, conn, "miss")
+        return None
+    _quietly(_touch, conn, key, now)
+    _quietly(_bump, conn, "hit" if now - row[1] < fresh else "stale")
+    return decode(row[0])
+
+def put(endpoint, params, value, encode=_dumps):
+    if DISABLED or value is None:
+        return
+    _quietly(lambda: _store(_conn(), make_key(endpoint, params), endpoint, encode(value)))
+
+def stats():
+    """{"process": counters for this process, "total": persisted counters, "entries", "bytes"}."""
+    conn = _conn()
+    total = dict.fromkeys(COUNTERS, 0)
+    total.update(conn.execute("SELECT name, n FROM counters").fetchall())
+    count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+    with _stats_lock:
+        process = dict(STATS)
+    return {"process": process, "total": total, "entries": count, "bytes": size}
+
+def summary():
+    """One-line hit/miss summary for this process."""
+    s = STATS
+    lookups = s["hit"] + s["stale"] + s["miss"]
+    ratio = (s["hit"] + s["stale"]) / lookups if lookups else 0.0
+    return f"💾 Cache: {s['hit']} hit, {s['stale']} stale, {s['miss']} miss ({ratio:.0%} served from cache)"
+
+def clear(endpoint=None):
+    conn = _conn()
+    if endpoint:
+        return conn.execute("DELETE FROM entries WHERE endpoint = ?", (endpoint,)).rowcount
+    return conn.execute("DELETE FROM entries").rowcount
+
+# -------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if cmd == "stats":
+        s = stats()
+        t = s["total"]
+        lookups = t["hit"] + t["stale"] + t["miss"]
+        print(f"{s['entries']} entries, {s['bytes'] / 2**20:.1f} MiB in {CACHE_PATH}")
+        for name in COUNTERS:
+            print(f"  {name:<15}{t[name]:>10}")
+        if lookups:
+            print(f"  {'hit ratio':<15}{(t['hit'] + t['stale']) / lookups:>10.1%}")
+    elif cmd == "clear":
+        n = clear(sys.argv[2] if len(sys.argv) > 2 else None)
+        print(f"🧹 Removed {n} entries")
+    else:
+        print(__doc__.strip().splitlines()[-1], file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+import json
+import math
+import os
+import sys
+from collections import deque
+
+import numpy as np
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+# Per-symbol indicator state, persisted between runs. The state covers every
+# bar except the newest one: the newest bar is only "peeked", because the
+# candle store may still revise it (partial intraday bar).
+STATE_DIR = os.environ.get("AGENCY_INDICATOR_DIR", "agency/store/indicators")
+
+SMA_FAST, SMA_SLOW = 50, 200
+RSI_WINDOW = 14
+BB_WINDOW, BB_K = 20, 2
+EMA_FAST, EMA_SLOW, EMA_SIGNAL = 12, 26, 9
+
+def _isnan(v):
+    return v is None or v != v
+
+def _r(v, nd):
+    return None if _isnan(v) else round(v, nd)
+
+def format_technicals(latest):
+    """The calculate_technicals() dict from the latest-bar values.
+
+    `latest` maps c, SMA_50, SMA_200, RSI_14, BB_Upper, BB_Lower, MACD_Line,
+    MACD_Signal, MACD_Hist to numbers (NaN/None when not yet defined).
+    """
+    # Determine position relative to SMAs
+    sma_50_status = "ABOVE" if latest['c'] > latest['SMA_50'] else "BELOW"
+    if _isnan(latest['SMA_50']): sma_50_status = "N/A"
+
+    return {
+        "RSI_14": _r(latest['RSI_14'], 2),
+        "SMA_50": _r(latest['SMA_50'], 2),
+        "SMA_200": _r(latest['SMA_200'], 2),
+        "SMA_50_Status": sma_50_status,
+        "Bollinger": {
+            "Upper": _r(latest['BB_Upper'], 2),
+            "Lower": _r(latest['BB_Lower'], 2)
+        },
+        "MACD": {
+            "Line": _r(latest['MACD_Line'], 3),
+            "Signal": _r(latest['MACD_Signal'], 3),
+            "Hist": _r(latest['MACD_Hist'], 3)
+        }
+    }
+
+# -------------------------------------------------------------------------
+# Accumulators
+# -------------------------------------------------------------------------
+# These follow pandas' own window kernels step for step (Kahan-compensated
+# rolling mean, Welford rolling variance, adjust=False ewm), so the results
+# match pandas' rolling()/ewm() bit for bit rather than merely to rounding.
+# (Known gap: on windows of one or two distinct closes pandas' variance can
+# differ in the last bits, which only matters at an exact rounding tie.)
+# Each accumulator is a flat list so it can be copied cheaply for a peek and
+# serialized as JSON.
+
+def _signbit(v):
+    return math.copysign(1.0, v) < 0
+
+def mean_new():
+    # nobs, sum_x, compensation_add, compensation_remove, neg_ct, same_ct, prev
+    return [0, 0.0, 0.0, 0.0, 0, 0, None]
+
+def mean_remove(st, val):
+    st[0] -= 1
+    y = -val - st[3]
+    t = st[1] + y
+    st[3] = t - st[1] - y
+    st[1] = t
+    if _signbit(val): st[4] -= 1
+
+def mean_add(st, val):
+    st[0] += 1
+    y = val - st[2]
+    t = st[1] + y
+    st[2] = t - st[1] - y
+    st[1] = t
+    if _signbit(val): st[4] += 1
+    st[5] = st[5] + 1 if val == st[6] else 1
+    st[6] = val
+
+def mean_value(st, window):
+    nobs, sum_x, _, _, neg_ct, same_ct, prev = st
+    if nobs < window:
+        return np.nan
+    if same_ct >= nobs:
+        return prev
+    result = sum_x / nobs
+    if neg_ct == 0 and result < 0: return 0.0
+    if neg_ct == nobs and result > 0: return 0.0
+    return result
+
+def var_new():
+    # nobs, mean_x, ssqdm_x, compensation_add, compensation_remove
+    return [0, 0.0, 0.0, 0.0, 0.0]
+
+def var_remove(st, val):
+    st[0] -= 1
+    if st[0]:
+        prev_mean = st[1] - st[4]
+        y = val - st[4]
+        t = y - st[1]
+        st[4] = t + st[1] - y
+        st[1] -= t / st[0]
+        st[2] -= (val - prev_mean) * (val - st[1])
+    else:
+        st[1] = st[2] = 0.0
+
+def var_add(st, val):
+    st[0] += 1
+    prev_mean = st[1] - st[3]
+    y = val - st[3]
+    t = y - st[1]
+    st[3] = t + st[1] - y
+    st[1] += t / st[0]
+    st[2] += (val - prev_mean) * (val - st[1])
+
+def var_value(st, window, ddof=1):
+    nobs, _, ssqdm_x, _, _ = st
+    if nobs < window or nobs <= ddof:
+        return np.nan
+    return max(ssqdm_x / (nobs - ddof), 0.0)
+
+def ewm_alpha(span):
+    com = (span - 1) / 2
+    return 1.0 / (1.0 + com)
+
+def ewm_step(weighted, cur, alpha):
+    """One adjust=False ewm step; weighted is None before the first value."""
+    if weighted is None:
+        return cur
+    if weighted == cur:
+        return weighted
+    old_wt = 1.0 * (1.0 - alpha)
+    return (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+
+# -------------------------------------------------------------------------
+# Incremental Engine
+# -------------------------------------------------------------------------
+class IndicatorState:
+    """O(1)-per-bar SMA50/200, RSI14, Bollinger 20/2 and MACD 12/26/9.
+
+    Same definitions as calculate_technicals: simple-mean RSI
+    (first delta counts as 0), sample std for Bollinger, adjust=False EMAs.
+    """
+
+    def __init__(self):
+        self.last_t = None
+        self.n = 0
+        self.closes = deque(maxlen=SMA_SLOW)
+        self.gains = deque(maxlen=RSI_WINDOW)
+        self.losses = deque(maxlen=RSI_WINDOW)
+        self.sma_fast = mean_new()
+        self.sma_slow = mean_new()
+        self.bb_mid = mean_new()
+        self.bb_var = var_new()
+        self.rsi_gain = mean_new()
+        self.rsi_loss = mean_new()
+        self.ema_fast = None
+        self.ema_slow = None
+        self.signal = None
+
+    # --- core step ---------------------------------------------------------
+    def _step(self, c):
+        """Accumulators after appending close c, as a dict of fresh copies."""
+        closes = self.closes
+
+        def leaving(window):
+            return closes[-window] if len(closes) >= window else None
+
+        s = {}
+        for key, window in (("sma_fast", SMA_FAST), ("sma_slow", SMA_SLOW), ("bb_mid", BB_WINDOW)):
+            st = list(getattr(self, key))
+            old = leaving(window)
+            if old is not None:
+                mean_remove(st, old)
+            mean_add(st, c)
+            s[key] = st
+
+        st = list(self.bb_var)
+        old = leaving(BB_WINDOW)
+        if old is not None:
+            var_remove(st, old)
+        var_add(st, c)
+        s["bb_var"] = st
+
+        # delta.where(delta > 0, 0) / -delta.where(delta < 0, 0); the first
+        # (NaN) delta becomes 0 and the loss side carries pandas' -0.0.
+        d = c - closes[-1] if closes else 0.0
+        gain = d if d > 0 else 0.0
+        loss = -(d if d < 0 else 0.0)
+        for key, window, val, q in (("rsi_gain", RSI_WINDOW, gain, self.gains),
+                                    ("rsi_loss", RSI_WINDOW, loss, self.losses)):
+            st = list(getattr(self, key))
+            if len(q) >= window:
+                mean_remove(st, q[0])
+            mean_add(st, val)
+            s[key] = st
+        s["gain"], s["loss"] = gain, loss
+
+        s["ema_fast"] = ewm_step(self.ema_fast, c, ewm_alpha(EMA_FAST))
+        s["ema_slow"] = ewm_step(self.ema_slow, c, ewm_alpha(EMA_SLOW))
+        s["signal"] = ewm_step(self.signal, s["ema_fast"] - s["ema_slow"], ewm_alpha(EMA_SIGNAL))
+        s["n"] = self.n + 1
+        return s
+
+    def update(self, t, c):
+        """Commit a new bar."""
+        c = float(c)
+        s = self._step(c)
+        self.closes.append(c)
+        self.gains.append(s.pop("gain"))
+        self.losses.append(s.pop("loss"))
+        for key, val in s.items():
+            setattr(self, key, val)
+        self.last_t = int(t)
+
+    # --- outputs -----------------------------------------------------------
+    def _latest(self, c, s):
+        f = np.float64
+        rsi_gain = f(mean_value(s["rsi_gain"], RSI_WINDOW))
+        rsi_loss = f(mean_value(s["rsi_loss"], RSI_WINDOW))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = 100 - (100 / (1 + rsi_gain / rsi_loss))
+
+        bb_mid = f(mean_value(s["bb_mid"], BB_WINDOW))
+        bb_std = np.sqrt(f(var_value(s["bb_var"], BB_WINDOW)))
+
+        macd = f(s["ema_fast"]) - f(s["ema_slow"])
+        signal = f(s["signal"])
+        return {
+            "c": f(c),
+            "SMA_50": f(mean_value(s["sma_fast"], SMA_FAST)),
+            "SMA_200": f(mean_value(s["sma_slow"], SMA_SLOW)),
+            "RSI_14": rsi,
+            "BB_Upper": bb_mid + (bb_std * BB_K),
+            "BB_Lower": bb_mid - (bb_std * BB_K),
+            "MACD_Line": macd,
+            "MACD_Signal": signal,
+            "MACD_Hist": macd - signal,
+        }
+
+    def peek(self, c):
+        """Latest-bar values as if close c were appended, without committing it."""
+        c = float(c)
+        return self._latest(c, self._step(c))
+
+    def technicals(self, c):
+        return format_technicals(self.peek(c))
+
+    # --- persistence -------------------------------------------------------
+    _FIELDS = ("last_t", "n", "sma_fast", "sma_slow", "bb_mid", "bb_var",
+               "rsi_gain", "rsi_loss", "ema_fast", "ema_slow", "signal")
+
+    def to_dict(self):
+        d = {key: getattr(self, key) for key in self._FIELDS}
+        d.update(closes=list(self.closes), gains=list(self.gains), losses=list(self.losses))
+        return d
+
+    @classmethod
+    def from_dict(cls, d):
+        st = cls()
+        for key in cls._FIELDS:
+            setattr(st, key, d[key])
+        st.closes.extend(d["closes"])
+        st.gains.extend(d["gains"])
+        st.losses.extend(d["losses"])
+        return st
+
+def _state_path(symbol, state_dir=None):
+    return os.path.join(state_dir or STATE_DIR, f"{symbol.upper()}.json")
+
+def load_state(symbol, state_dir=None):
+    try:
+        with open(_state_path(symbol, state_dir), "r") as f:
+            return IndicatorState.from_dict(json.load(f))
+    except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+        return None
+
+def save_state(symbol, state, state_dir=None):
+    path = _state_path(symbol, state_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state.to_dict(), f)
+    os.replace(tmp, path)
+
+# -------------------------------------------------------------------------
+# Store Integration
+# -------------------------------------------------------------------------
+def bootstrap(t, c):
+    """Full recompute: a fresh state fed every bar except the newest."""
+    state = IndicatorState()
+    for i in range(len(c) - 1):
+        state.update(t[i], c[i])
+    return state
+
+def state_for(symbol, cols, state_dir=None):
+    """Persisted state caught up to every stored bar but the newest.
+
+    Applies only the bars after the state's watermark; falls back to a
+    bootstrap when there is no state or it no longer lines up with the
+    stored history (missing bar, or a different close after the store
+    re-downloaded restated history).
+    """
+    t, c = cols["t"], cols["c"]
+    state = load_state(symbol, state_dir)
+    start = None
+    if state is not None and state.last_t is not None and state.closes:
+        i = int(np.searchsorted(t, state.last_t))
+        if i < len(t) - 1 and t[i] == state.last_t and state.closes[-1] == c[i]:
+            start = i + 1
+    if start is None:
+        state = bootstrap(t, c)
+    else:
+        for i in range(start, len(c) - 1):
+            state.update(t[i], c[i])
+
+    try:
+        save_state(symbol, state, state_dir)
+    except OSError as e:
+        print(f"⚠️ Indicator state not saved for {symbol}: {e}", file=sys.stderr)
+    return state
+
+def technicals_for(symbol, cols, state_dir=None):
+    """calculate_technicals() dict for candle-store columns."""
+    if len(cols["c"]) == 0:
+        return {}
+    return state_for(symbol, cols, state_dir).technicals(cols["c"][-1])
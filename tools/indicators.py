@@ -0,0 +1,273 @@
+"""Vectorized NumPy indicator kernels shared by the data tools.
+
+Every kernel takes contiguous float64 data and works along the last axis,
+so the same call handles one series (bars,) or a batch (symbols, bars).
+Outputs have the input's shape, with NaN where the window is not yet full.
+NaN inputs (e.g. left-padding for symbols with shorter histories) only
+poison the windows that contain them.
+
+The kernels share pandas' definitions but not its summation order (pandas
+keeps a running Kahan-compensated sum), so values agree to ~1e-12 relative
+rather than bit for bit: a value rounded to 2-3 decimals can land one unit
+apart at an exact .xx5 tie. tools/indicator_state.py follows pandas'
+accumulators step for step where bit-identical values matter.
+"""
+from functools import lru_cache
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Block length for the blocked EMA recursion (see _ewm_filter).
+_EWM_BLOCK = 64
+# Max floats materialized at once by rolling_std.
+_STD_SLAB = 1 << 14
+
+def as_array(x):
+    return np.ascontiguousarray(x, dtype=np.float64)
+
+def _nan_like(x):
+    return np.full(x.shape, np.nan)
+
+def _rolling_sum(x, window):
+    out = _nan_like(x)
+    if window <= x.shape[-1]:
+        out[..., window - 1:] = sliding_window_view(x, window, axis=-1).sum(axis=-1)
+    return out
+
+# -------------------------------------------------------------------------
+# Moving Averages
+# -------------------------------------------------------------------------
+def sma(x, window):
+    """Simple moving average (pandas rolling(window).mean())."""
+    x = as_array(x)
+    return _rolling_sum(x, window) / window
+
+def rolling_std(x, window, ddof=1):
+    """Rolling sample standard deviation (pandas rolling(window).std())."""
+    x = as_array(x)
+    out = _nan_like(x)
+    if window > x.shape[-1]:
+        return out
+    # Two-pass std per window (no sum-of-squares cancellation), a slab of
+    # window positions at a time so the materialized deviations stay small.
+    view = sliding_window_view(x, window, axis=-1)
+    rows = max(1, x.size // x.shape[-1])
+    step = max(1, _STD_SLAB // (rows * window))
+    dst = out[..., window - 1:]
+    for i in range(0, view.shape[-2], step):
+        dst[..., i:i + step] = view[..., i:i + step, :].std(axis=-1, ddof=ddof)
+    return out
+
+def _rolling_extreme(x, window, fn, neutral):
+    """Van Herk/Gil-Werman: per-block prefix and suffix running extremes, so
+    every window is one fn() of a suffix and a prefix value."""
+    x = as_array(x)
+    n = x.shape[-1]
+    out = _nan_like(x)
+    if window > n or window < 1:
+        return out
+    pad = (-n) % window
+    if pad:
+        x = np.concatenate([x, np.full(x.shape[:-1] + (pad,), neutral)], axis=-1)
+    blocks = x.reshape(x.shape[:-1] + (-1, window))
+    prefix = fn.accumulate(blocks, axis=-1).reshape(x.shape)
+    suffix = fn.accumulate(blocks[..., ::-1], axis=-1)[..., ::-1].reshape(x.shape)
+    out[..., window - 1:] = fn(suffix[..., :n - window + 1], prefix[..., window - 1:n])
+    return out
+
+def rolling_min(x, window):
+    """Rolling minimum (pandas rolling(window).min())."""
+    return _rolling_extreme(x, window, np.minimum, np.inf)
+
+def rolling_max(x, window):
+    """Rolling maximum (pandas rolling(window).max())."""
+    return _rolling_extreme(x, window, np.maximum, -np.inf)
+
+@lru_cache(maxsize=64)
+def _ewm_weights(alpha, B):
+    """(B x B impulse-response matrix, carry-in decay) for one EWM block."""
+    beta = 1.0 - alpha
+    i = np.arange(B)
+    lag = i[None, :] - i[:, None]
+    W = np.where(lag >= 0, alpha * beta ** np.maximum(lag, 0), 0.0)
+    decay = beta ** (i + 1)
+    W.flags.writeable = decay.flags.writeable = False
+    return W, decay
+
+def _ewm_filter(x, alpha, y0):
+    """y[t] = y[t-1] + alpha * (x[t] - y[t-1]) along the last axis, from y0.
+
+    Runs the recursion a block at a time: inside a block the zero-state
+    response is one matrix product. The values carried from block to block
+    follow the same recursion with alpha' = 1 - beta**B, so they are solved
+    by recursing on the (n / B)-long sequence of block ends.
+    """
+    n = x.shape[-1]
+    lead = x.shape[:-1]
+    B = min(_EWM_BLOCK, max(n, 1))
+    pad = (-n) % B
+    if pad:
+        x = np.concatenate([x, np.zeros(lead + (pad,))], axis=-1)
+    blocks = x.reshape(lead + (-1, B))
+
+    W, decay = _ewm_weights(alpha, B)
+    local = blocks @ W
+
+    y0 = np.broadcast_to(np.asarray(y0, dtype=np.float64), lead)
+    if blocks.shape[-2] == 1:
+        carry = y0[..., None]
+    else:
+        # Block-end values obey Y[b] = beta**B * Y[b-1] + local[b, -1].
+        a = 1.0 - decay[-1]
+        ends = _ewm_filter(local[..., :-1, -1] / a, a, y0)
+        carry = np.concatenate([y0[..., None], ends], axis=-1)
+    out = local + carry[..., None] * decay
+    return out.reshape(lead + (-1,))[..., :n]
+
+def _first_valid(x):
+    """(index of first non-NaN per row, that value). Rows of all-NaN get index n."""
+    valid = ~np.isnan(x)
+    idx = np.where(valid.any(axis=-1), valid.argmax(axis=-1), x.shape[-1])
+    first = np.take_along_axis(x, np.minimum(idx, x.shape[-1] - 1)[..., None], axis=-1)[..., 0]
+    return idx, first
+
+def _ffill(x):
+    """Forward-fill NaNs along the last axis (leading NaNs stay NaN)."""
+    mask = np.isnan(x)
+    if not mask.any():
+        return x
+    idx = np.where(~mask, np.arange(x.shape[-1]), 0)
+    np.maximum.accumulate(idx, axis=-1, out=idx)
+    return np.take_along_axis(x, idx, axis=-1)
+
+def ewm(x, alpha):
+    """adjust=False exponential average seeded with the first valid value.
+
+    Leading NaNs stay NaN; interior gaps are forward-filled.
+    """
+    x = as_array(x)
+    if x.shape[-1] == 0:
+        return x.copy()
+    if not np.isnan(x).any():
+        return _ewm_filter(x, alpha, x[..., 0])
+    start, first = _first_valid(x)
+    filled = _ffill(x)
+    # Before the first valid value, hold the series at that value so the
+    # recursion starts exactly at y = x[start].
+    pos = np.arange(x.shape[-1])
+    filled = np.where(pos < start[..., None], first[..., None], filled)
+    y = _ewm_filter(filled, alpha, first)
+    y[pos < start[..., None]] = np.nan
+    return y
+
+def ema(x, span):
+    """pandas ewm(span=span, adjust=False).mean()."""
+    return ewm(x, 2.0 / (span + 1.0))
+
+# -------------------------------------------------------------------------
+# Oscillators / Bands
+# -------------------------------------------------------------------------
+def _gains_losses(x):
+    delta = np.empty_like(x)
+    delta[..., 0] = 0.0  # pandas: diff() NaN -> where(...) fills 0
+    np.subtract(x[..., 1:], x[..., :-1], out=delta[..., 1:])
+    with np.errstate(invalid="ignore"):
+        gains = np.where(delta > 0, delta, 0.0)
+        losses = np.where(delta < 0, -delta, 0.0)
+    nan = np.isnan(delta)
+    gains[nan] = np.nan
+    losses[nan] = np.nan
+    return gains, losses
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+def rsi(x, window=14, method="simple"):
+    """RSI. method="simple" (rolling means, as in calculate_technicals) or
+    "wilder" (Wilder's smoothing seeded with the first window's mean)."""
+    x = as_array(x)
+    gains, losses = _gains_losses(x)
+    if method == "simple":
+        return _rsi_from_averages(sma(gains, window), sma(losses, window))
+    if method == "wilder":
+        return _rsi_from_averages(wilder(gains[..., 1:], window, pad=1), wilder(losses[..., 1:], window, pad=1))
+    raise ValueError(f"Unknown RSI method: {method}")
+
+def wilder(x, window, pad=0):
+    """Wilder's moving average (RMA): SMA seed over the first window, then
+    alpha = 1/window. `pad` NaN columns are prepended to the result."""
+    x = as_array(x)
+    n = x.shape[-1]
+    out = np.full(x.shape[:-1] + (n + pad,), np.nan)
+    if n < window:
+        return out
+    seed = x[..., :window].mean(axis=-1)
+    out[..., pad + window - 1] = seed
+    if n > window:
+        out[..., pad + window:] = _ewm_filter(x[..., window:], 1.0 / window, seed)
+    return out
+
+def bollinger(x, window=20, k=2):
+    """(mid, upper, lower) bands from a rolling mean and sample std."""
+    mid = sma(x, window)
+    std = rolling_std(x, window)
+    return mid, mid + std * k, mid - std * k
+
+def macd(x, fast=12, slow=26, signal=9):
+    """(line, signal, hist) with adjust=False EMAs."""
+    line = ema(x, fast) - ema(x, slow)
+    sig = ema(line, signal)
+    return line, sig, line - sig
+
+def atr(high, low, close, window=14):
+    """Average True Range with Wilder smoothing."""
+    high, low, close = as_array(high), as_array(low), as_array(close)
+    tr = high - low
+    prev = close[..., :-1]
+    tr[..., 1:] = np.fmax(tr[..., 1:], np.fmax(np.abs(high[..., 1:] - prev), np.abs(low[..., 1:] - prev)))
+    return wilder(tr, window)
+
+# -------------------------------------------------------------------------
+# Bundles
+# -------------------------------------------------------------------------
+def technicals(close):
+    """All calculate_technicals() series for close (1-D or 2-D), as a dict."""
+    close = as_array(close)
+    bb_mid, bb_upper, bb_lower = bollinger(close, 20, 2)
+    line, sig, hist = macd(close, 12, 26, 9)
+    return {
+        "c": close,
+        "SMA_50": sma(close, 50),
+        "SMA_200": sma(close, 200),
+        "RSI_14": rsi(close, 14),
+        "BB_Mid": bb_mid,
+        "BB_Upper": bb_upper,
+        "BB_Lower": bb_lower,
+        "MACD_Line": line,
+        "MACD_Signal": sig,
+        "MACD_Hist": hist,
+    }
+
+def latest(close):
+    """Last-bar values of technicals(close) (scalars for 1-D, per-row arrays for 2-D).
+
+    Window indicators only look at their trailing window, so only the EMAs
+    run over the full history.
+    """
+    close = as_array(close)
+    _, bb_upper, bb_lower = bollinger(close[..., -20:], 20, 2)
+    line, sig, hist = macd(close, 12, 26, 9)
+    out = {
+        "c": close[..., -1],
+        "SMA_50": sma(close[..., -50:], 50)[..., -1],
+        "SMA_200": sma(close[..., -200:], 200)[..., -1],
+        "RSI_14": rsi(close[..., -15:], 14)[..., -1],
+        "BB_Upper": bb_upper[..., -1],
+        "BB_Lower": bb_lower[..., -1],
+        "MACD_Line": line[..., -1],
+        "MACD_Signal": sig[..., -1],
+        "MACD_Hist": hist[..., -1],
+    }
+    # 0-d arrays -> NumPy scalars for a single series
+    return {key: val[()] for key, val in out.items()}
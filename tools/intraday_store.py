@@ -0,0 +1,406 @@
+"""Intraday bar store: 1-minute bars on disk, every other timeframe derived.
+
+Layout mirrors tools/candle_store.py, split into one partition per UTC month
+(<dir>/<SYMBOL>/<YYYY-MM>/<col>.bin) with compact columns: minutes since
+the epoch as int32 and float32 prices/volume (24 bytes a bar, half the daily
+store's). Columns are memory-mapped, and load() binary-searches the
+partitions a time range touches, so reading a day of one symbol maps a few
+pages rather than the month, and 200 symbols' worth of history costs only
+the bars actually read.
+
+resample() builds 5m/15m/1h/1d (or any "<n>m"/"<n>h"/"1d") bars from the
+1-minute columns in one vectorized pass (reduceat over bucket boundaries),
+so no timeframe needs its own download. Intraday buckets are aligned to the
+09:30 session open in exchange time (a 4h bar runs 09:30-13:30 ET whatever
+the UTC offset); daily bars follow the exchange's calendar day.
+
+Bars come from Twelve Data (TWELVE_DATA_API_KEY, 1min time series, paged
+back to the watermark) or, without a key, Yahoo (last 7 days of 1m bars).
+
+Usage: python tools/intraday_store.py [refresh TICKER ... | import TICKER FILE.csv |
+       bars TICKER [--tf 15m] [--days 5] | technicals TICKER [--tf 1h] | stats]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sys
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from tools import candle_store, rate_limit
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+STORE_DIR = os.environ.get("AGENCY_INTRADAY_DIR", "agency/store/intraday")
+EXCHANGE_TZ = ZoneInfo("America/New_York")
+SESSION_OPEN_MINUTES = 9 * 60 + 30   # intraday buckets start at the 09:30 exchange-time open
+TWELVE_DATA_URL = os.environ.get("TWELVE_DATA_BASE_URL", "https://api.twelvedata.com")
+TWELVE_DATA_OUTPUTSIZE = 5000        # bars per request (~13 sessions of 1m bars)
+TWELVE_DATA_MAX_PAGES = int(os.environ.get("AGENCY_TWELVE_DATA_MAX_PAGES", "20"))
+
+COLUMNS = {
+    "t": np.dtype("<i4"),   # bar open, minutes since the epoch (UTC)
+    "o": np.dtype("<f4"),
+    "h": np.dtype("<f4"),
+    "l": np.dtype("<f4"),
+    "c": np.dtype("<f4"),
+    "v": np.dtype("<f4"),
+}
+BAR_BYTES = sum(dt.itemsize for dt in COLUMNS.values())
+
+_TIMEFRAME = re.compile(r"^(\d+)(m|h|d)$")
+
+# -------------------------------------------------------------------------
+# Partitions
+# -------------------------------------------------------------------------
+def _symbol_dir(symbol, store_dir=None):
+    return os.path.join(store_dir or STORE_DIR, symbol.upper())
+
+def _months(minutes):
+    """'YYYY-MM' (UTC) of each bar."""
+    return (np.asarray(minutes, dtype=np.int64) * 60).astype("datetime64[s]").astype("datetime64[M]").astype(str)
+
+def partitions(symbol, store_dir=None):
+    """Sorted month keys that hold bars for the symbol."""
+    sdir = _symbol_dir(symbol, store_dir)
+    if not os.path.isdir(sdir):
+        return []
+    return sorted(p for p in os.listdir(sdir) if candle_store._read_meta(os.path.join(sdir, p)).get("count"))
+
+def _map(pdir, count):
+    return {col: np.memmap(os.path.join(pdir, f"{col}.bin"), dtype=dt, mode="r", shape=(count,))
+            for col, dt in COLUMNS.items()}
+
+def _append_partition(pdir, cols):
+    """candle_store.append semantics for one month: newer bars only, a bar
+    at the watermark replaces the stored last one (in place, so live maps
+    of the partition stay valid)."""
+    with candle_store._locked(pdir):
+        meta = candle_store._read_meta(pdir)
+        last_t = meta["last_t"]
+        t = cols["t"]
+        keep = np.ones(len(t), dtype=bool) if last_t is None else t >= last_t
+        if not keep.any():
+            return 0
+        count = meta["count"]
+        if last_t is not None and t[keep][0] == last_t:
+            count -= 1
+        for col, dt in COLUMNS.items():
+            candle_store._write_at(os.path.join(pdir, f"{col}.bin"), count * dt.itemsize,
+                                   np.ascontiguousarray(cols[col][keep], dtype=dt).tobytes())
+        new_count = count + int(keep.sum())
+        candle_store._write_meta(pdir, {"count": new_count, "last_t": int(t[keep][-1])})
+        return new_count - meta["count"]
+
+# -------------------------------------------------------------------------
+# Read / Write
+# -------------------------------------------------------------------------
+def watermark(symbol, store_dir=None):
+    """Unix seconds of the newest stored 1-minute bar, or None."""
+    months = partitions(symbol, store_dir)
+    if not months:
+        return None
+    last = candle_store._read_meta(os.path.join(_symbol_dir(symbol, store_dir), months[-1]))["last_t"]
+    return last * 60
+
+def symbols(store_dir=None):
+    root = store_dir or STORE_DIR
+    if not os.path.isdir(root):
+        return []
+    return sorted(s for s in os.listdir(root) if partitions(s, store_dir))
+
+def append(symbol, columns, store_dir=None):
+    """Append 1-minute bars ({t (unix seconds), o, h, l, c, v}, sorted by t).
+
+    Bars older than a month's stored watermark are ignored. Returns the
+    number of new bars.
+    """
+    t = np.asarray(columns["t"], dtype=np.int64) // 60
+    if len(t) == 0:
+        return 0
+    cols = {"t": t.astype(COLUMNS["t"])}
+    for col in "ohlcv":
+        cols[col] = np.asarray(columns[col], dtype=np.float64)
+    months = _months(t)
+    bounds = np.flatnonzero(months[1:] != months[:-1]) + 1
+    added = 0
+    sdir = _symbol_dir(symbol, store_dir)
+    for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(t)]):
+        added += _append_partition(os.path.join(sdir, months[start]), {k: v[start:end] for k, v in cols.items()})
+    return added
+
+def load(symbol, start=None, end=None, store_dir=None):
+    """1-minute columns for bars with start <= t < end (unix seconds; None = open).
+
+    t comes back as int64 unix seconds, prices/volume as float32. A range
+    inside one month is a zero-copy slice of the memory map; otherwise only
+    the touched slices are copied. None if nothing is stored in the range.
+    """
+    sdir = _symbol_dir(symbol, store_dir)
+    lo = None if start is None else start // 60
+    hi = None if end is None else -(-end // 60)
+    first = None if lo is None else str(_months([lo])[0])
+    last = None if hi is None else str(_months([max(hi - 1, 0)])[0])
+    pieces = []
+    for month in partitions(symbol, store_dir):
+        if (first and month < first) or (last and month > last):
+            continue
+        pdir = os.path.join(sdir, month)
+        with candle_store._locked(pdir, shared=True):
+            cols = _map(pdir, candle_store._read_meta(pdir)["count"])
+        i = 0 if lo is None else int(np.searchsorted(cols["t"], lo, side="left"))
+        j = len(cols["t"]) if hi is None else int(np.searchsorted(cols["t"], hi, side="left"))
+        if j > i:
+            pieces.append({col: arr[i:j] for col, arr in cols.items()})
+    if not pieces:
+        return None
+    if len(pieces) == 1:
+        out = dict(pieces[0])
+    else:
+        out = {col: np.concatenate([p[col] for p in pieces]) for col in COLUMNS}
+    out["t"] = out["t"].astype(np.int64) * 60
+    return out
+
+def disk_usage(symbol=None, store_dir=None):
+    """(bars, bytes) stored for one symbol or the whole store."""
+    bars = 0
+    for sym in [symbol] if symbol else symbols(store_dir):
+        for month in partitions(sym, store_dir):
+            bars += candle_store._read_meta(os.path.join(_symbol_dir(sym, store_dir), month))["count"]
+    return bars, bars * BAR_BYTES
+
+# -------------------------------------------------------------------------
+# Resampling
+# -------------------------------------------------------------------------
+def timeframe_minutes(timeframe):
+    """'15m' -> 15, '1h' -> 60, '1d' -> None (exchange calendar day)."""
+    m = _TIMEFRAME.match(timeframe)
+    if not m:
+        raise ValueError(f"Unknown timeframe: {timeframe} (use e.g. 5m, 15m, 1h, 1d)")
+    n, unit = int(m.group(1)), m.group(2)
+    if unit == "d":
+        if n != 1:
+            raise ValueError("Only 1d daily bars are supported")
+        return None
+    return n * (60 if unit == "h" else 1)
+
+def _exchange_days(t):
+    """Exchange-local calendar day (days since epoch) of each bar.
+
+    UTC offsets are looked up once per run of bars on the same UTC day
+    (once per day for sorted bars), not per bar.
+    """
+    utc_day = t // 86400
+    starts = np.r_[0, np.flatnonzero(utc_day[1:] != utc_day[:-1]) + 1]
+    offsets = np.array([EXCHANGE_TZ.utcoffset(datetime.fromtimestamp(int(d) * 86400 + 43200)).total_seconds()
+                        for d in utc_day[starts]], dtype=np.int64)
+    offset = np.repeat(offsets, np.diff(np.r_[starts, len(t)]))
+    return (t + offset) // 86400, offset
+
+def resample(cols, timeframe):
+    """OHLCV bars of `timeframe` from 1-minute columns (t in unix seconds, sorted).
+
+    Each output bar is stamped with its bucket's open; buckets with no
+    1-minute bars are skipped, not filled. Intraday buckets are counted
+    from each day's 09:30 exchange-time open, so every width (2h, 4h, 45m)
+    starts a bucket at the open.
+    """
+    if cols is None or len(cols["t"]) == 0:
+        return None
+    t = np.asarray(cols["t"], dtype=np.int64)
+    minutes = timeframe_minutes(timeframe)
+    day, offset = _exchange_days(t)
+    if minutes is None:
+        key = day
+    else:
+        since_open = (t + offset) % 86400 - SESSION_OPEN_MINUTES * 60
+        key = t - since_open % (minutes * 60)   # UTC open of the bar's bucket
+    starts = np.r_[0, np.flatnonzero(key[1:] != key[:-1]) + 1]
+    ends = np.r_[starts[1:], len(t)]
+    return {
+        "t": key[starts] * 86400 - offset[starts] if minutes is None else key[starts],
+        "o": np.asarray(cols["o"], dtype=np.float64)[starts],
+        "h": np.maximum.reduceat(np.asarray(cols["h"], dtype=np.float64), starts),
+        "l": np.minimum.reduceat(np.asarray(cols["l"], dtype=np.float64), starts),
+        "c": np.asarray(cols["c"], dtype=np.float64)[ends - 1],
+        "v": np.add.reduceat(np.asarray(cols["v"], dtype=np.float64), starts),
+    }
+
+def bars(symbol, timeframe="1m", start=None, end=None, store_dir=None):
+    """load() + resample(); the 1m timeframe returns the stored bars."""
+    cols = load(symbol, start, end, store_dir)
+    return cols if timeframe == "1m" or cols is None else resample(cols, timeframe)
+
+def technicals(symbol, timeframe, start=None, end=None, store_dir=None):
+    """calculate_technicals() on the symbol's bars of `timeframe` ({} if none stored)."""
+    from tools.get_data_finnhub import calculate_technicals
+    return calculate_technicals(bars(symbol, timeframe, start, end, store_dir))
+
+# -------------------------------------------------------------------------
+# Ingestion
+# -------------------------------------------------------------------------
+def parse_twelvedata(payload):
+    """Twelve Data /time_series JSON -> columns (oldest first)."""
+    values = (payload or {}).get("values") or []
+    cols = {name: [] for name in COLUMNS}
+    for row in values:
+        try:
+            ts = datetime.strptime(row["datetime"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=EXCHANGE_TZ)
+            parsed = {"t": int(ts.timestamp()), "o": float(row["open"]), "h": float(row["high"]),
+                      "l": float(row["low"]), "c": float(row["close"]), "v": float(row.get("volume") or 0)}
+        except (KeyError, ValueError, TypeError):
+            continue
+        for name, val in parsed.items():
+            cols[name].append(val)
+    order = np.argsort(cols["t"], kind="stable")
+    return {name: np.asarray(vals)[order] for name, vals in cols.items()}
+
+def parse_csv(text):
+    """CSV with a unix-seconds `t` column (or ISO `Datetime`) and o/h/l/c/v or Open/High/... columns."""
+    reader = csv.DictReader(io.StringIO(text))
+    cols = {name: [] for name in COLUMNS}
+    names = {"o": "Open", "h": "High", "l": "Low", "c": "Close", "v": "Volume"}
+    for row in reader:
+        try:
+            if row.get("t"):
+                ts = int(float(row["t"]))
+            else:
+                ts = int(datetime.fromisoformat(row["Datetime"]).astimezone(timezone.utc).timestamp())
+            parsed = {"t": ts}
+            for col, alt in names.items():
+                parsed[col] = float(row.get(col) or row.get(alt) or 0)
+        except (KeyError, ValueError, TypeError):
+            continue
+        for name, val in parsed.items():
+            cols[name].append(val)
+    order = np.argsort(cols["t"], kind="stable")
+    return {name: np.asarray(vals)[order] for name, vals in cols.items()}
+
+def _download_twelvedata(symbol, start=None, end=None):
+    import requests
+    params = {"symbol": symbol, "interval": "1min", "outputsize": TWELVE_DATA_OUTPUTSIZE,
+              "timezone": str(EXCHANGE_TZ), "apikey": os.environ["TWELVE_DATA_API_KEY"]}
+    if start:
+        params["start_date"] = datetime.fromtimestamp(start, tz=EXCHANGE_TZ).strftime("%Y-%m-%d %H:%M:%S")
+    if end:
+        params["end_date"] = datetime.fromtimestamp(end, tz=EXCHANGE_TZ).strftime("%Y-%m-%d %H:%M:%S")
+    r = requests.get(f"{TWELVE_DATA_URL}/time_series", params=params, timeout=15)
+    r.raise_for_status()
+    payload = r.json()
+    if payload.get("status") == "error":
+        raise ValueError(payload.get("message", "Twelve Data error"))
+    return payload
+
+def fetch_twelvedata(symbol, since=None):
+    """Twelve Data 1-minute bars newer than `since` as columns (oldest first).
+
+    A request returns only the newest TWELVE_DATA_OUTPUTSIZE bars of the
+    range, so while a page comes back full and still starts after `since`,
+    the next request ends just before it. Without a watermark one page is
+    fetched; past TWELVE_DATA_MAX_PAGES the remaining gap is reported.
+    """
+    pages, end = [], None
+    for _ in range(TWELVE_DATA_MAX_PAGES):
+        page = parse_twelvedata(rate_limit.call("twelvedata", _download_twelvedata, symbol, since, end))
+        if len(page["t"]):
+            pages.append(page)
+        if since is None or len(page["t"]) < TWELVE_DATA_OUTPUTSIZE or page["t"][0] <= since:
+            break
+        end = int(page["t"][0]) - 60
+    else:
+        print(f"⚠️ {symbol}: {TWELVE_DATA_MAX_PAGES} pages did not reach the stored bars; "
+              f"1m bars from {_fmt_time(since)} to {_fmt_time(end)} are missing", file=sys.stderr)
+    if not pages:
+        return parse_twelvedata(None)
+    cols = {name: np.concatenate([p[name] for p in reversed(pages)]) for name in COLUMNS}
+    _, first = np.unique(cols["t"], return_index=True)
+    return {name: vals[first] for name, vals in cols.items()}
+
+def _download_yf(symbol):
+    import yfinance as yf
+    from tools.utils import get_session
+    hist = yf.Ticker(symbol, session=get_session()).history(period="7d", interval="1m")
+    if hist.empty:
+        raise ValueError("YF returned no 1m bars")
+    return {"t": hist.index.asi8 // 10**9, "o": hist["Open"].to_numpy(), "h": hist["High"].to_numpy(),
+            "l": hist["Low"].to_numpy(), "c": hist["Close"].to_numpy(), "v": hist["Volume"].to_numpy()}
+
+def refresh(symbol, store_dir=None):
+    """Fetch 1-minute bars from the watermark on and append them. Returns the count added."""
+    since = watermark(symbol, store_dir)
+    if os.environ.get("TWELVE_DATA_API_KEY"):
+        cols = fetch_twelvedata(symbol, since)
+    else:
+        cols = rate_limit.call("yahoo", _download_yf, symbol)
+    return append(symbol, cols, store_dir)
+
+# -------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------
+def _fmt_time(t):
+    return datetime.fromtimestamp(int(t), tz=EXCHANGE_TZ).strftime("%Y-%m-%d %H:%M")
+
+def main():
+    parser = argparse.ArgumentParser(description="1-minute bar store with derived timeframes")
+    sub = parser.add_subparsers(dest="cmd")
+    p = sub.add_parser("refresh", help="Download new 1-minute bars")
+    p.add_argument("tickers", nargs="+")
+    p = sub.add_parser("import", help="Append 1-minute bars from a CSV file")
+    p.add_argument("ticker")
+    p.add_argument("file")
+    for name in ("bars", "technicals"):
+        p = sub.add_parser(name)
+        p.add_argument("ticker")
+        p.add_argument("--tf", default="15m" if name == "bars" else "1h", help="Timeframe: 1m, 5m, 15m, 1h, 1d, ...")
+        p.add_argument("--days", type=float, help="Only the last N days")
+    sub.add_parser("stats")
+    args = parser.parse_args()
+
+    if args.cmd == "refresh":
+        for ticker in args.tickers:
+            try:
+                print(f"✅ {ticker.upper()}: {refresh(ticker.upper())} new 1m bars")
+            except Exception as e:
+                print(f"❌ {ticker.upper()}: {e}", file=sys.stderr)
+    elif args.cmd == "import":
+        with open(args.file, "r") as f:
+            print(f"✅ {args.ticker.upper()}: {append(args.ticker.upper(), parse_csv(f.read()))} new 1m bars")
+    elif args.cmd in ("bars", "technicals"):
+        ticker = args.ticker.upper()
+        start = None
+        if args.days:
+            last = watermark(ticker)
+            start = None if last is None else int(last - args.days * 86400)
+        try:
+            if args.cmd == "technicals":
+                print(json.dumps(technicals(ticker, args.tf, start), indent=2))
+                return
+            cols = bars(ticker, args.tf, start)
+        except ValueError as e:
+            parser.error(str(e))
+        if cols is None:
+            print(f"⚠️ No intraday bars stored for {ticker}", file=sys.stderr)
+            sys.exit(1)
+        print(f"{'time':<18}{'open':>10}{'high':>10}{'low':>10}{'close':>10}{'volume':>12}")
+        for i in range(len(cols["t"])):
+            print(f"{_fmt_time(cols['t'][i]):<18}{cols['o'][i]:>10.2f}{cols['h'][i]:>10.2f}{cols['l'][i]:>10.2f}"
+                  f"{cols['c'][i]:>10.2f}{cols['v'][i]:>12.0f}")
+    elif args.cmd == "stats":
+        for sym in symbols():
+            n, size = disk_usage(sym)
+            months = partitions(sym)
+            print(f"{sym:<8}{n:>10} bars {size / 2**20:>8.1f} MB  {months[0]} .. {months[-1]}")
+        n, size = disk_usage()
+        print(f"total   {n:>10} bars {size / 2**20:>8.1f} MB")
+    else:
+        print(__doc__.strip().splitlines()[-2], file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import fcntl
+import hashlib
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+# One directory per symbol: articles.json (keyed by Finnhub id, else URL)
+# and meta.json with the newest "published" time, so each refresh only asks
+# /company-news for the days since then.
+STORE_DIR = os.environ.get("AGENCY_NEWS_DIR", "agency/store/news")
+RETENTION_DAYS = 30
+
+# Near-duplicate detection: MinHash over word-bigram shingles, LSH banding to
+# find candidate pairs, exact Jaccard to confirm. 20 bands x 3 rows catches
+# pairs at Jaccard 0.6 with ~99% probability.
+NUM_PERM = 60
+BANDS = 20
+THRESHOLD = 0.6
+
+_rng = np.random.default_rng(0x5EED)
+_PERM_A = _rng.integers(1, 2**63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_PERM_B = _rng.integers(0, 2**63, NUM_PERM, dtype=np.uint64)
+
+def _symbol_dir(symbol, store_dir=None):
+    return os.path.join(store_dir or STORE_DIR, symbol.upper())
+
+@contextmanager
+def _locked(sdir):
+    """Exclusive per-symbol lock so concurrent runs don't lose each other's merges."""
+    os.makedirs(sdir, exist_ok=True)
+    with open(os.path.join(sdir, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def _read_json(path, default):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+def _write_json(path, value):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(value, f)
+    os.replace(tmp, path)
+
+# -------------------------------------------------------------------------
+# Read / Write
+# -------------------------------------------------------------------------
+def article_key(item):
+    if item.get("id") not in (None, "", 0):
+        return f"id:{item['id']}"
+    if item.get("url"):
+        return item["url"]
+    return "h:" + hashlib.sha1(f"{item.get('headline')}|{item.get('datetime')}".encode()).hexdigest()
+
+def watermark(symbol, store_dir=None):
+    """Unix time of the newest stored article, or None if the symbol is empty."""
+    return _read_json(os.path.join(_symbol_dir(symbol, store_dir), "meta.json"), {}).get("last_t")
+
+def load(symbol, since=None, store_dir=None):
+    """Stored articles (published >= since, if given), newest first."""
+    articles = _read_json(os.path.join(_symbol_dir(symbol, store_dir), "articles.json"), [])
+    if since is not None:
+        articles = [a for a in articles if (a.get("datetime") or 0) >= since]
+    return articles
+
+def merge(symbol, items, store_dir=None):
+    """Add articles not stored yet and drop ones past RETENTION_DAYS. Returns the number added."""
+    sdir = _symbol_dir(symbol, store_dir)
+    with _locked(sdir):
+        path = os.path.join(sdir, "articles.json")
+        articles = {article_key(a): a for a in _read_json(path, [])}
+        before = len(articles)
+        for item in items or []:
+            if isinstance(item, dict) and item.get("datetime"):
+                articles.setdefault(article_key(item), item)
+        added = len(articles) - before
+        cutoff = time.time() - RETENTION_DAYS * 86400
+        kept = sorted((a for a in articles.values() if a["datetime"] >= cutoff),
+                      key=lambda a: a["datetime"], reverse=True)
+        _write_json(path, kept)
+        _write_json(os.path.join(sdir, "meta.json"),
+                    {"count": len(kept), "last_t": kept[0]["datetime"] if kept else None})
+        return added
+
+def since_param(last_t, days=7):
+    """/company-news `from` date: the watermark's day (re-fetched, deduped by id),
+    never older than the `days` window."""
+    start = datetime.now(timezone.utc) - timedelta(days=days)
+    if last_t is not None:
+        start = max(start, datetime.fromtimestamp(last_t, tz=timezone.utc))
+    return start.strftime("%Y-%m-%d")
+
+def refresh(symbol, fetch, days=7, store_dir=None):
+    """Fetch only articles since the watermark, merge them, return the `days` window.
+
+    fetch(from_date) -> list of Finnhub news dicts (or None on failure; the
+    stored window is still returned).
+    """
+    items = fetch(since_param(watermark(symbol, store_dir), days))
+    if isinstance(items, list):
+        merge(symbol, items, store_dir)
+    return load(symbol, since=time.time() - days * 86400, store_dir=store_dir)
+
+# -------------------------------------------------------------------------
+# Near-duplicate Collapse
+# -------------------------------------------------------------------------
+_WORD = re.compile(r"[a-z0-9]+")
+
+def shingles(text):
+    """Word bigrams of the lower-cased headline (single words for one-word text)."""
+    words = _WORD.findall((text or "").lower())
+    if len(words) < 2:
+        return set(words)
+    return {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+def _hash32(s):
+    return int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little")
+
+def minhash(shingle_sets):
+    """(n, NUM_PERM) uint64 signatures; empty sets get all-max rows."""
+    sig = np.full((len(shingle_sets), NUM_PERM), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for i, sh in enumerate(shingle_sets):
+        if sh:
+            x = np.fromiter((_hash32(s) for s in sh), dtype=np.uint64, count=len(sh))
+            # Multiply-shift hashing; uint64 wrap-around is intended.
+            sig[i] = ((_PERM_A[:, None] * x[None, :] + _PERM_B[:, None]) >> np.uint64(32)).min(axis=1)
+    return sig
+
+def clusters(texts, threshold=THRESHOLD):
+    """Group indices of near-duplicate texts. Each group is sorted; groups are
+    ordered by their first index."""
+    sets = [shingles(t) for t in texts]
+    sig = minhash(sets)
+    parent = list(range(len(texts)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    rows = NUM_PERM // BANDS
+    for band in range(BANDS):
+        buckets = {}
+        for i, row in enumerate(sig[:, band * rows:(band + 1) * rows]):
+            if sets[i]:
+                buckets.setdefault(row.tobytes(), []).append(i)
+        for members in buckets.values():
+            for x, i in enumerate(members):
+                for j in members[x + 1:]:
+                    a, b = find(i), find(j)
+                    if a != b and len(sets[i] & sets[j]) / len(sets[i] | sets[j]) >= threshold:
+                        parent[max(a, b)] = min(a, b)
+
+    groups = {}
+    for i in range(len(texts)):
+        groups.setdefault(find(i), []).append(i)
+    return sorted(groups.values(), key=lambda g: g[0])
+
+def distinct(items, key="headline", limit=None):
+    """One item per story: [(item, duplicates)] in input order, the first
+    member of each near-duplicate group standing for it."""
+    groups = clusters([item.get(key) or "" for item in items])
+    out = [(items[g[0]], len(g) - 1) for g in groups]
+    return out[:limit] if limit is not None else out
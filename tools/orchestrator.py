@@ -2,9 +2,29 @@ import subprocess
 import sys
 import json
 import argparse
+import importlib
 import os
 from concurrent.futures import ThreadPoolExecutor
 
+from tools import context_builder, data_daemon, tracing
+
+# script -> (module, entry point) for the in-process mode
+ENTRY_POINTS = {
+    "get_market.py": ("tools.get_market", "get_market_data"),
+    "get_financials.py": ("tools.get_financials", "get_financial_data"),
+    "get_news.py": ("tools.get_news", "get_news_sentiment"),
+}
+
+def run_inprocess(script_name, ticker):
+    """Call the script's entry point directly (modules, HTTP session and cache are shared)."""
+    module_name, func_name = ENTRY_POINTS[script_name]
+    try:
+        func = getattr(importlib.import_module(module_name), func_name)
+        # Same JSON round trip as the subprocess mode, so both return identical dicts
+        return json.loads(json.dumps(func(ticker)))
+    except Exception as e:
+        return {"error": f"Failed to run {script_name}: {e}"}
+
 def run_script(script_name, ticker):
     """Run a python script and return its JSON output."""
     try:
@@ -65,41 +85,78 @@ def format_news_report(data):
         lines.append(f"- {title}")
     return "\n".join(lines)
 
-def main():
-    parser = argparse.ArgumentParser(description="TradingAgents Orchestrator")
-    parser.add_argument("ticker", help="Stock Ticker Symbol")
-    parser.add_argument("--mode", default="full", choices=["full", "tech", "fund", "news"], help="Data fetching mode")
-    # Mock flag removed as per instruction
-    args = parser.parse_args()
+def fetch_all(ticker, mode="full", exec_mode="inprocess"):
+    """Run the data tools for `mode` concurrently. Returns {"tech"|"fund"|"news": dict}.
+
+    exec_mode "auto" asks the data daemon first and runs in-process if none is
+    listening or the daemon fails (error reply, timeout, truncated reply);
+    "daemon" requires it.
+    """
+    if exec_mode in ("auto", "daemon"):
+        try:
+            return data_daemon.request(ticker, mode)
+        except (data_daemon.DaemonUnavailable, RuntimeError, OSError, ValueError) as e:
+            if exec_mode == "daemon":
+                raise
+            if not isinstance(e, data_daemon.DaemonUnavailable):
+                print(f"⚠️ Data daemon failed ({e}); fetching in-process", file=sys.stderr)
+            exec_mode = "inprocess"
+    runner = run_inprocess if exec_mode == "inprocess" else run_script
+    scripts = {"tech": "get_market.py", "fund": "get_financials.py", "news": "get_news.py"}
+
+    def traced(script):
+        with tracing.span(script, "tool", ticker=ticker, exec=exec_mode) as ev:
+            result = runner(script, ticker)
+            ev["ok"] = "error" not in result
+            return result
 
-    # Parallel Fetching
     with ThreadPoolExecutor() as executor:
-        futures = {}
-        if args.mode in ["full", "tech"]:
-            futures["tech"] = executor.submit(run_script, "get_market.py", args.ticker)
-        if args.mode in ["full", "fund"]:
-            futures["fund"] = executor.submit(run_script, "get_financials.py", args.ticker)
-        if args.mode in ["full", "news"]:
-            futures["news"] = executor.submit(run_script, "get_news.py", args.ticker)
-
-        results = {k: v.result() for k, v in futures.items()}
-
-    # Output XML-like structure for Strict Context Isolation
-    print(f"<system_context ticker='{args.ticker}'>")
-    
+        futures = {k: executor.submit(traced, script)
+                   for k, script in scripts.items() if mode in ("full", k)}
+        return {k: v.result() for k, v in futures.items()}
+
+def build_context(ticker, results):
+    """XML-like structure for Strict Context Isolation.
+
+    Risk reads the technical block and macro the sentiment block; they are
+    referenced instead of printed a second time.
+    """
+    lines = [f"<system_context ticker='{ticker}'>"]
     if "tech" in results:
-        print(f"  <data_source type='technical'>\n{format_tech_report(results['tech'])}\n  </data_source>")
+        lines.append(f"  <data_source type='technical'>\n{format_tech_report(results['tech'])}\n  </data_source>")
         # Risk mostly uses tech data (volatility)
-        print(f"  <data_source type='risk_metrics'>\n{format_tech_report(results['tech'])}\n  </data_source>")
-        
+        lines.append("  <data_source type='risk_metrics' same_as='technical'/>")
     if "fund" in results:
-        print(f"  <data_source type='fundamental'>\n{format_fund_report(results['fund'])}\n  </data_source>")
-        
+        lines.append(f"  <data_source type='fundamental'>\n{format_fund_report(results['fund'])}\n  </data_source>")
     if "news" in results:
-        print(f"  <data_source type='sentiment'>\n{format_news_report(results['news'])}\n  </data_source>")
-        print(f"  <data_source type='macro'>\n{format_news_report(results['news'])}\n  </data_source>")
+        lines.append(f"  <data_source type='sentiment'>\n{format_news_report(results['news'])}\n  </data_source>")
+        lines.append("  <data_source type='macro' same_as='sentiment'/>")
+    lines.append("</system_context>")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="TradingAgents Orchestrator")
+    parser.add_argument("ticker", help="Stock Ticker Symbol")
+    parser.add_argument("--mode", default="full", choices=["full", "tech", "fund", "news"], help="Data fetching mode")
+    parser.add_argument("--exec", dest="exec_mode", default="auto",
+                        choices=["auto", "daemon", "inprocess", "subprocess"],
+                        help="auto: the data daemon if running, else in-process; subprocess: "
+                             "one isolated interpreter per tool")
+    parser.add_argument("--trace", metavar="DIR", help="Write events.jsonl + trace.json (tools/tracing.py) to DIR")
+    # Mock flag removed as per instruction
+    args = parser.parse_args()
 
-    print("</system_context>")
+    if args.trace:
+        tracing.enable(args.trace)
+    with tracing.span("fetch_all", "run", ticker=args.ticker, mode=args.mode):
+        results = fetch_all(args.ticker, args.mode, args.exec_mode)
+    context = build_context(args.ticker, results)
+    print(context)
+    print(f"🔢 Context: {context_builder.count_tokens(context)} tokens", file=sys.stderr)
+    if args.trace:
+        tracing.run_exit_hooks()
+        print(f"🧵 Trace: {tracing.export(args.trace)}", file=sys.stderr)
 
 if __name__ == "__main__":
-    main()
+    with tracing.profiled("orchestrator"):
+        main()
@@ -0,0 +1,293 @@
+"""Cross-process rate limiter and circuit breaker, one per upstream source.
+
+Each source (finnhub, yahoo, stooq, ...) has a token bucket whose state
+lives in a small JSON file guarded by an fcntl lock, so every tool process
+draws from the same budget. A 429 blocks the source until its Retry-After
+has passed; repeated upstream failures (5xx, timeouts, connection errors,
+not empty or invalid answers) open the source's circuit so callers fail
+fast (and move on to their fallback) instead of waiting on a dead upstream.
+
+Usage: python tools/rate_limit.py [status|reset [SOURCE]]
+"""
+import fcntl
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from tools import tracing
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+STATE_DIR = os.environ.get("AGENCY_RATE_DIR", "agency/store/ratelimit")
+DISABLED = os.environ.get("AGENCY_RATE_LIMIT_DISABLE", "") not in ("", "0")
+
+# source -> (requests/sec, burst)
+LIMITS = {
+    "finnhub": (55 / 60, 5),     # free tier: 60/minute
+    "yahoo": (1.0, 3),
+    "stooq": (2.0, 5),
+    "finviz": (0.5, 2),
+    "ddg": (0.5, 2),
+    "google_news": (1.0, 3),
+    "twelvedata": (8 / 60, 8),   # free tier: 8/minute
+}
+DEFAULT_LIMIT = (1.0, 3)
+
+HOSTS = {
+    "finnhub.io": "finnhub",
+    "stooq.com": "stooq",
+    "finviz.com": "finviz",
+    "news.google.com": "google_news",
+    "duckduckgo.com": "ddg",
+    "twelvedata.com": "twelvedata",
+}
+
+FAIL_THRESHOLD = 3        # consecutive failures that open the circuit
+COOLDOWN = 60             # seconds a circuit stays open before one probe is let through
+PROBE_TIMEOUT = 30        # a probe that never reports back frees the circuit after this
+RETRY_AFTER_DEFAULT = 5   # 429 without a Retry-After header (doubles per repeat)
+RETRY_AFTER_CAP = 120
+MAX_WAIT = 30             # waits longer than this fail fast instead of blocking the run
+
+class RateLimited(Exception):
+    """The source's quota requires a longer wait than MAX_WAIT."""
+
+class CircuitOpen(Exception):
+    """The source failed repeatedly and is being skipped for now."""
+
+# -------------------------------------------------------------------------
+# Shared State
+# -------------------------------------------------------------------------
+def _new_state(burst):
+    return {"tokens": float(burst), "updated": time.time(), "blocked_until": 0.0,
+            "throttles": 0, "failures": 0, "circuit": "closed", "open_until": 0.0}
+
+@contextmanager
+def _state(source):
+    """Locked read-modify-write of one source's state."""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    path = os.path.join(STATE_DIR, f"{source}.json")
+    with open(f"{path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            try:
+                with open(path, "r") as f:
+                    state = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                state = _new_state(LIMITS.get(source, DEFAULT_LIMIT)[1])
+            yield state
+            tmp = f"{path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp, path)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def source_for(url):
+    host = urlparse(url).netloc.lower()
+    for suffix, source in HOSTS.items():
+        if host == suffix or host.endswith("." + suffix):
+            return source
+    return host
+
+# -------------------------------------------------------------------------
+# Limiter / Breaker
+# -------------------------------------------------------------------------
+def _check_circuit(source, state, now):
+    if state["circuit"] == "open":
+        if now < state["open_until"]:
+            raise CircuitOpen(f"{source}: circuit open for {state['open_until'] - now:.0f}s")
+        # Cooldown over: let exactly one caller probe the source.
+        state["circuit"] = "half_open"
+        state["open_until"] = now + PROBE_TIMEOUT
+    elif state["circuit"] == "half_open":
+        if now < state["open_until"]:
+            raise CircuitOpen(f"{source}: recovery probe in flight")
+        state["open_until"] = now + PROBE_TIMEOUT
+
+def acquire(source, limit=None):
+    """Block until `source` may be called. Returns the seconds waited.
+
+    `limit` overrides LIMITS[source] as (requests/sec, burst). Raises
+    CircuitOpen while the source is down, RateLimited when the quota would
+    need more than MAX_WAIT.
+    """
+    if DISABLED:
+        return 0.0
+    rate, burst = limit or LIMITS.get(source, DEFAULT_LIMIT)
+    waited = 0.0
+    while True:
+        with _state(source) as st:
+            now = time.time()
+            if not waited:
+                # Once per call: a probe waiting on a token must not trip over itself.
+                _check_circuit(source, st, now)
+            st["tokens"] = min(burst, st["tokens"] + (now - st["updated"]) * rate)
+            st["updated"] = now
+            if now < st["blocked_until"]:
+                wait = st["blocked_until"] - now
+            elif st["tokens"] >= 1:
+                st["tokens"] -= 1
+                return waited
+            else:
+                wait = (1 - st["tokens"]) / rate
+        if waited + wait > MAX_WAIT:
+            raise RateLimited(f"{source}: quota needs {wait:.0f}s more")
+        time.sleep(wait)
+        waited += wait
+
+def record_success(source):
+    if DISABLED:
+        return
+    with _state(source) as st:
+        st["failures"] = 0
+        st["throttles"] = 0
+        st["circuit"] = "closed"
+
+def record_error(source, exc):
+    """Book an exception from a call: upstream failures count towards the
+    circuit, request-level errors count as an answer. Returns True if throttled."""
+    if not is_upstream_failure(exc):
+        record_success(source)
+        return False
+    throttled = is_throttled(exc)
+    record_failure(source, retry_after(exc) if throttled else None, throttled)
+    return throttled
+
+def record_failure(source, retry_after=None, throttled=False):
+    """Count a failure; a throttled one also blocks the source for Retry-After."""
+    if DISABLED:
+        return
+    with _state(source) as st:
+        now = time.time()
+        if throttled:
+            st["throttles"] += 1
+            if retry_after is None:
+                retry_after = min(RETRY_AFTER_CAP, RETRY_AFTER_DEFAULT * 2 ** (st["throttles"] - 1))
+            st["blocked_until"] = max(st["blocked_until"], now + retry_after)
+        st["failures"] += 1
+        if st["circuit"] == "half_open" or st["failures"] >= FAIL_THRESHOLD:
+            st["circuit"] = "open"
+            st["open_until"] = now + COOLDOWN
+            print(f"⚡ Circuit open for {source} ({st['failures']} failures), skipping it for {COOLDOWN}s",
+                  file=sys.stderr)
+
+# -------------------------------------------------------------------------
+# Error Classification
+# -------------------------------------------------------------------------
+def _response(exc):
+    return getattr(exc, "response", None)
+
+def _status(exc):
+    return getattr(_response(exc), "status_code", None) or getattr(exc, "status", None)
+
+def is_throttled(exc):
+    """429 / quota errors from requests, curl_cffi, aiohttp or yfinance."""
+    if _status(exc) == 429:
+        return True
+    if "ratelimit" in type(exc).__name__.lower():
+        return True
+    msg = str(exc).lower()
+    return any(x in msg for x in ("429", "too many requests", "rate limit"))
+
+def is_upstream_failure(exc):
+    """Throttling, 5xx, timeouts and connection errors: the source itself is
+    unwell. Other errors (4xx, empty or invalid data) are about the request."""
+    if is_throttled(exc):
+        return True
+    status = _status(exc)
+    if isinstance(status, int):
+        return status >= 500
+    if isinstance(exc, ValueError):
+        return False
+    if isinstance(exc, OSError):   # ConnectionError, TimeoutError, requests/aiohttp transport errors
+        return True
+    names = " ".join(c.__name__.lower() for c in type(exc).__mro__)
+    return any(x in names for x in ("timeout", "connection", "curlerror"))
+
+def retry_after(exc):
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), else None."""
+    resp = _response(exc)
+    headers = getattr(resp, "headers", None) or getattr(exc, "headers", None) or {}
+    value = headers.get("Retry-After") if hasattr(headers, "get") else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+# -------------------------------------------------------------------------
+# Public API
+# -------------------------------------------------------------------------
+def _size(result):
+    content = getattr(result, "content", result)
+    return len(content) if isinstance(content, (bytes, str)) else None
+
+def call(source, func, *args, retries=2, **kwargs):
+    """func(*args, **kwargs) under the source's limiter and breaker.
+
+    Only throttled calls are retried (after the Retry-After wait); any other
+    error is re-raised at once so the caller's fallback runs. Only upstream
+    failures (is_upstream_failure) count towards opening the circuit.
+    Traced as an "http" span with the retries, seconds spent waiting and bytes.
+    """
+    with tracing.span(source, "http", call=getattr(func, "__name__", None), retries=0, waited=0.0) as ev:
+        for attempt in range(retries + 1):
+            ev["waited"] = round(ev["waited"] + acquire(source), 3)
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                throttled = record_error(source, e)
+                if not throttled or attempt == retries:
+                    raise
+                ev["retries"] += 1
+                print(f"[Retry {attempt + 1}/{retries}] {source} rate limited: {e}", file=sys.stderr)
+                continue
+            record_success(source)
+            ev["bytes"] = _size(result)
+            return result
+
+def status(source):
+    with _state(source) as st:
+        return dict(st)
+
+def reset(source=None):
+    if not os.path.isdir(STATE_DIR):
+        return
+    for name in os.listdir(STATE_DIR):
+        if name.endswith(".json") and (source is None or name == f"{source}.json"):
+            os.remove(os.path.join(STATE_DIR, name))
+
+# -------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if cmd == "status":
+        sources = sorted(set(LIMITS) | {n[:-5] for n in os.listdir(STATE_DIR) if n.endswith(".json")}
+                         if os.path.isdir(STATE_DIR) else LIMITS)
+        now = time.time()
+        print(f"{'source':<14}{'tokens':>8}{'circuit':>11}{'failures':>10}{'blocked':>10}")
+        for source in sources:
+            st = status(source)
+            blocked = max(0.0, st["blocked_until"] - now)
+            print(f"{source:<14}{st['tokens']:>8.1f}{st['circuit']:>11}{st['failures']:>10}{blocked:>9.0f}s")
+    elif cmd == "reset":
+        reset(sys.argv[2] if len(sys.argv) > 2 else None)
+        print("🧹 Rate limiter state cleared")
+    else:
+        print(__doc__.strip().splitlines()[-1], file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""Vectorized universe screener: triage tickers before the agent pipeline.
+
+Loads the candle store for the whole universe into one (symbols x days)
+array, computes the calculate_technicals indicators for every symbol in a
+single pass, scores each symbol with weighted rules and (optionally)
+dispatches only the top N to the agents.
+"""
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import time
+import warnings
+
+import numpy as np
+
+from tools import batch_run, candle_store, indicators
+from tools.finnhub_batch import read_tickers
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+DAYS = 260              # enough for SMA200 + crossover lookback and 52 weeks
+WEEKS_52 = 252          # trading days used when /stock/metric has no 52w range
+STALE_DAYS = 7          # symbols whose last bar is older than the universe's newest by more are dropped
+METRICS_DIR = "agency/data/batch"   # finnhub_batch output: <dir>/<T>/financials.json
+DISPATCH_CMD = "bash orchestrator.sh {ticker}"   # every run gets its own workspace
+DISPATCH_LOG_DIR = "agency/logs/screener"          # per-ticker output of concurrent dispatches
+
+DEFAULT_WEIGHTS = {
+    "rsi_oversold": 1.0,
+    "rsi_overbought": 1.0,
+    "golden_cross": 1.0,
+    "death_cross": 1.0,
+    "bb_break_upper": 1.0,
+    "bb_break_lower": 1.0,
+    "near_52w_high": 1.0,
+    "near_52w_low": 1.0,
+}
+
+DEFAULT_PARAMS = {
+    "rsi_low": 30.0,
+    "rsi_high": 70.0,
+    "cross_lookback": 5,    # bars in which an SMA50/200 cross still counts
+    "proximity": 0.05,      # within 5% of the 52-week high/low
+}
+
+# -------------------------------------------------------------------------
+# Universe
+# -------------------------------------------------------------------------
+def load_universe(tickers, days=DAYS, store_dir=None, stale_days=STALE_DAYS):
+    """Stack the last `days` bars of each ticker into (symbols x days) arrays.
+
+    Rows are right-aligned on the newest bar; shorter histories are
+    left-padded with NaN. Tickers with no stored candles are skipped, and so
+    are tickers whose last bar is more than `stale_days` older than the
+    universe's newest (delisted, halted or no longer refreshed); None keeps them.
+    Returns (symbols, {"t_last", "c", "h", "l"}).
+    """
+    rows = []
+    for ticker in tickers:
+        cols = candle_store.load(ticker, store_dir)
+        if cols is None:
+            print(f"⚠️ No stored candles for {ticker}, skipping", file=sys.stderr)
+            continue
+        rows.append((ticker, cols))
+    if rows and stale_days is not None:
+        newest = max(int(cols["t"][-1]) for _, cols in rows)
+        stale = [ticker for ticker, cols in rows if newest - int(cols["t"][-1]) > stale_days * 86400]
+        if stale:
+            print(f"⚠️ Stale candles (last bar over {stale_days} days before the newest), skipping: "
+                  f"{', '.join(stale)}", file=sys.stderr)
+            rows = [(ticker, cols) for ticker, cols in rows if ticker not in stale]
+
+    n = len(rows)
+    arrays = {key: np.full((n, days), np.nan) for key in ("c", "h", "l")}
+    t_last = np.zeros(n, dtype=np.int64)
+    for i, (_, cols) in enumerate(rows):
+        k = min(days, len(cols["c"]))
+        for key, arr in arrays.items():
+            arr[i, days - k:] = cols[key][-k:]
+        t_last[i] = cols["t"][-1]
+    arrays["t_last"] = t_last
+    return [ticker for ticker, _ in rows], arrays
+
+def load_52w(symbols, metrics_dir=METRICS_DIR):
+    """52-week high/low per symbol from saved /stock/metric data (NaN if absent)."""
+    high = np.full(len(symbols), np.nan)
+    low = np.full(len(symbols), np.nan)
+    if not metrics_dir:
+        return high, low
+    for i, sym in enumerate(symbols):
+        try:
+            with open(os.path.join(metrics_dir, sym, "financials.json"), "r") as f:
+                fin = json.load(f).get("financials", {})
+        except (OSError, ValueError):
+            continue
+        high[i] = fin.get("52WeekHigh") or np.nan
+        low[i] = fin.get("52WeekLow") or np.nan
+    return high, low
+
+# -------------------------------------------------------------------------
+# Rules
+# -------------------------------------------------------------------------
+# Each rule maps the indicator arrays to a strength in [0, 1] per symbol
+# (0 = did not fire). The score is the weighted sum of strengths.
+
+def _crossed(diff, lookback, up):
+    """Sign change of diff within the last `lookback` bars, still in effect."""
+    recent = diff[:, -(lookback + 1):]
+    prev, cur = recent[:, :-1], recent[:, 1:]
+    with np.errstate(invalid="ignore"):
+        if up:
+            fired = ((prev <= 0) & (cur > 0)).any(axis=1) & (diff[:, -1] > 0)
+        else:
+            fired = ((prev >= 0) & (cur < 0)).any(axis=1) & (diff[:, -1] < 0)
+    return fired.astype(float)
+
+def _near(close, level, proximity, above):
+    """1.0 at (or beyond) the level, 0.5 at the proximity edge, 0 outside."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        dist = (level - close) / level if above else (close - level) / level
+        strength = np.where(dist <= proximity, 1 - 0.5 * np.clip(dist, 0, None) / proximity, 0.0)
+    return np.nan_to_num(strength)
+
+def rule_strengths(tech, high_52w, low_52w, params=None):
+    """{rule: (symbols,) strength} from indicators.technicals() output."""
+    p = dict(DEFAULT_PARAMS, **(params or {}))
+    close = tech["c"][:, -1]
+    rsi = tech["RSI_14"][:, -1]
+    diff = tech["SMA_50"] - tech["SMA_200"]
+    with np.errstate(invalid="ignore"):
+        out = {
+            "rsi_oversold": np.where(rsi < p["rsi_low"], 1 - 0.5 * rsi / p["rsi_low"], 0.0),
+            "rsi_overbought": np.where(rsi > p["rsi_high"], 0.5 + 0.5 * (rsi - p["rsi_high"]) / (100 - p["rsi_high"]), 0.0),
+            "golden_cross": _crossed(diff, int(p["cross_lookback"]), up=True),
+            "death_cross": _crossed(diff, int(p["cross_lookback"]), up=False),
+            "bb_break_upper": (close > tech["BB_Upper"][:, -1]).astype(float),
+            "bb_break_lower": (close < tech["BB_Lower"][:, -1]).astype(float),
+            "near_52w_high": _near(close, high_52w, p["proximity"], above=True),
+            "near_52w_low": _near(close, low_52w, p["proximity"], above=False),
+        }
+    return {name: np.nan_to_num(s) for name, s in out.items()}
+
+def screen(symbols, arrays, high_52w=None, low_52w=None, weights=None, params=None, top=10):
+    """Rank symbols by weighted rule score; returns the top N with score > 0."""
+    weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+    unknown = set(weights) - set(DEFAULT_WEIGHTS)
+    if unknown:
+        raise ValueError(f"Unknown rules: {', '.join(sorted(unknown))}")
+    if not symbols:
+        return []
+
+    tech = indicators.technicals(arrays["c"])
+    # Fall back to the stored candles' 52-week range where /stock/metric is missing.
+    window = slice(-WEEKS_52, None)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN rows
+        candle_high = np.nanmax(arrays["h"][:, window], axis=1)
+        candle_low = np.nanmin(arrays["l"][:, window], axis=1)
+    high = candle_high if high_52w is None else np.where(np.isnan(high_52w), candle_high, high_52w)
+    low = candle_low if low_52w is None else np.where(np.isnan(low_52w), candle_low, low_52w)
+
+    strengths = rule_strengths(tech, high, low, params)
+    score = sum(weights[name] * s for name, s in strengths.items())
+    order = np.argsort(-score, kind="stable")
+
+    results = []
+    for i in order[:top]:
+        if score[i] <= 0:
+            break
+        results.append({
+            "ticker": symbols[i],
+            "score": round(float(score[i]), 3),
+            "close": float(tech["c"][i, -1]),
+            "rsi_14": None if np.isnan(tech["RSI_14"][i, -1]) else round(float(tech["RSI_14"][i, -1]), 2),
+            "rules": [name for name, s in strengths.items() if s[i] > 0 and weights[name]],
+        })
+    return results
+
+# -------------------------------------------------------------------------
+# Dispatch
+# -------------------------------------------------------------------------
+def _run_cmd(ticker, cmd, score=None, log_dir=None):
+    """batch_run runner for a command template; output goes to <log_dir>/<TICKER>.log
+    (or straight through when log_dir is None). The command picks its own
+    workspace, so the result carries the log path under "log" instead."""
+    argv = shlex.split(cmd.format(ticker=ticker))
+    print(f"🚀 [Screener] {ticker} (score {score}): {' '.join(argv)}", flush=True)
+    t0 = time.time()
+    if log_dir is None:
+        path, code = None, subprocess.run(argv).returncode
+    else:
+        os.makedirs(log_dir, exist_ok=True)
+        path = os.path.join(log_dir, f"{ticker}.log")
+        with open(path, "w") as log:
+            code = subprocess.run(argv, stdout=log, stderr=subprocess.STDOUT).returncode
+    return {"ticker": ticker, "workspace": None, "log": path, "ok": code == 0, "seconds": time.time() - t0}
+
+def dispatch(results, cmd=DISPATCH_CMD, workers=batch_run.DEFAULT_WORKERS, log_dir=DISPATCH_LOG_DIR):
+    """Run the agent pipeline for the selected tickers on `workers` concurrent
+    pipelines (tools/batch_run.py). Returns the tickers that failed.
+
+    With one worker the output goes straight to the terminal; otherwise each
+    ticker's output is written to <log_dir>/<TICKER>.log.
+    """
+    scores = {row["ticker"]: row["score"] for row in results}
+    runner = lambda ticker: _run_cmd(ticker, cmd, scores[ticker], None if workers <= 1 else log_dir)
+    runs, _ = batch_run.run_batch(list(scores), workers, runner=runner)
+    return [r["ticker"] for r in runs if not r["ok"]]
+
+def parse_weights(specs):
+    """["rule=weight", ...] -> {rule: weight}."""
+    weights = {}
+    for spec in specs or []:
+        name, _, value = spec.partition("=")
+        weights[name.strip()] = float(value) if value else 1.0
+    return weights
+
+# -------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Rank a ticker universe on stored candles before running the agents")
+    parser.add_argument("tickers", nargs="*", help="Ticker symbols (default: every symbol in the candle store)")
+    parser.add_argument("--file", help="Universe file (one or more tickers per line, # comments)")
+    parser.add_argument("--top", type=int, default=10, help="Number of tickers to select")
+    parser.add_argument("--days", type=int, default=DAYS, help="Bars loaded per symbol")
+    parser.add_argument("--stale-days", type=int, default=STALE_DAYS,
+                        help="Skip symbols whose last bar is this many days older than the newest")
+    parser.add_argument("--metrics-dir", default=METRICS_DIR, help="finnhub_batch output with /stock/metric data ('' to skip)")
+    parser.add_argument("--rule", action="append", metavar="NAME=WEIGHT",
+                        help=f"Rule weight, repeatable (0 disables). Rules: {', '.join(DEFAULT_WEIGHTS)}")
+    parser.add_argument("--rsi-low", type=float, default=DEFAULT_PARAMS["rsi_low"])
+    parser.add_argument("--rsi-high", type=float, default=DEFAULT_PARAMS["rsi_high"])
+    parser.add_argument("--cross-lookback", type=int, default=DEFAULT_PARAMS["cross_lookback"])
+    parser.add_argument("--proximity", type=float, default=DEFAULT_PARAMS["proximity"])
+    parser.add_argument("--json", action="store_true", help="Print the selection as JSON")
+    parser.add_argument("--dispatch", action="store_true", help="Run the agent pipeline for the selected tickers")
+    parser.add_argument("--dispatch-cmd", default=DISPATCH_CMD, help="Command template, {ticker} is substituted")
+    parser.add_argument("--workers", type=int, default=batch_run.DEFAULT_WORKERS,
+                        help=f"Concurrent dispatched pipelines (output in {DISPATCH_LOG_DIR}/ when > 1)")
+    args = parser.parse_args()
+
+    tickers = read_tickers(args.tickers, args.file) or candle_store.symbols()
+    if not tickers:
+        parser.error("no tickers given and the candle store is empty")
+
+    t0 = time.perf_counter()
+    symbols, arrays = load_universe(tickers, args.days, stale_days=args.stale_days)
+    high, low = load_52w(symbols, args.metrics_dir)
+    t1 = time.perf_counter()
+    try:
+        results = screen(symbols, arrays, high, low,
+                         weights=parse_weights(args.rule),
+                         params={"rsi_low": args.rsi_low, "rsi_high": args.rsi_high,
+                                 "cross_lookback": args.cross_lookback, "proximity": args.proximity},
+                         top=args.top)
+    except ValueError as e:
+        parser.error(str(e))
+    t2 = time.perf_counter()
+    print(f"🔎 Screened {len(symbols)} symbols: load {(t1 - t0) * 1e3:.0f} ms, "
+          f"screen {(t2 - t1) * 1e3:.0f} ms", file=sys.stderr)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'#':>3}  {'Ticker':<8}{'Score':>7}{'Close':>11}{'RSI':>8}  Rules")
+        for rank, row in enumerate(results, 1):
+            rsi = "-" if row["rsi_14"] is None else f"{row['rsi_14']:.1f}"
+            print(f"{rank:>3}  {row['ticker']:<8}{row['score']:>7.2f}{row['close']:>11.2f}{rsi:>8}  {', '.join(row['rules'])}")
+
+    if args.dispatch and results:
+        failed = dispatch(results, args.dispatch_cmd, args.workers)
+        if failed:
+            print(f"❌ Pipeline failed for: {', '.join(failed)}", file=sys.stderr)
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Batch sentiment scoring with a persistent memo.
+
+Scores are TextBlob's default (pattern lexicon) polarity, so labels match the
+old per-headline `TextBlob(text).sentiment.polarity` loop exactly. The
+lexicon is loaded once and called directly (no TextBlob object per text),
+duplicate texts in a batch are scored once, and every score is memoized by a
+hash of the normalized text: in memory for the process (the MEMO_MAX most
+recently used, so the data daemon and watch mode stay bounded) and in
+SQLite across runs and tickers. Syndicated headlines are never rescored.
+
+Usage: python tools/sentiment.py [stats|clear]
+"""
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import unicodedata
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+MEMO_PATH = os.environ.get("AGENCY_SENTIMENT_DB", "agency/store/sentiment.sqlite")
+DISABLED = os.environ.get("AGENCY_SENTIMENT_MEMO_DISABLE", "") not in ("", "0")
+MEMO_MAX = int(os.environ.get("AGENCY_SENTIMENT_MEMO_MAX", "50000"))   # in-process scores kept
+# Bump when the scorer changes so old memo entries stop matching.
+SCORER = "textblob-pattern-1"
+
+BULLISH = 0.1
+BEARISH = -0.1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    h TEXT PRIMARY KEY,
+    polarity REAL NOT NULL,
+    subjectivity REAL NOT NULL
+);
+"""
+
+_lexicon = None
+_lexicon_lock = threading.Lock()
+_memo = {}   # hash -> (polarity, subjectivity), least recently used first
+_memo_lock = threading.Lock()
+_local = threading.local()
+STATS = {"scored": 0, "memo_hits": 0}
+
+# -------------------------------------------------------------------------
+# Scoring
+# -------------------------------------------------------------------------
+def lexicon():
+    """TextBlob's English sentiment lexicon (loaded on first use, then shared)."""
+    global _lexicon
+    with _lexicon_lock:
+        if _lexicon is None:
+            from textblob.en import sentiment
+            len(sentiment)   # lazydict: parses the XML lexicon on first access
+            _lexicon = sentiment
+        return _lexicon
+
+def normalize(text):
+    """NFKC + collapsed whitespace. Case is kept: the lexicon's tokenizer and
+    emoticons are case-sensitive, and folding would change some scores."""
+    return " ".join(unicodedata.normalize("NFKC", text or "").split())
+
+def text_hash(norm):
+    return hashlib.sha1(f"{SCORER}\0{norm}".encode()).hexdigest()
+
+def label(polarity):
+    if polarity > BULLISH:
+        return "Bullish"
+    if polarity < BEARISH:
+        return "Bearish"
+    return "Neutral"
+
+# -------------------------------------------------------------------------
+# Memo
+# -------------------------------------------------------------------------
+def _conn():
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != MEMO_PATH:
+        parent = os.path.dirname(MEMO_PATH)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        conn = sqlite3.connect(MEMO_PATH, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _local.conn, _local.path = conn, MEMO_PATH
+    return conn
+
+def _load(hashes):
+    found = {}
+    conn = _conn()
+    hashes = list(hashes)
+    for i in range(0, len(hashes), 500):
+        chunk = hashes[i:i + 500]
+        marks = ",".join("?" * len(chunk))
+        for h, p, s in conn.execute(f"SELECT h, polarity, subjectivity FROM scores WHERE h IN ({marks})", chunk):
+            found[h] = (p, s)
+    return found
+
+def _recall(hashes):
+    """Memoized scores among `hashes`, marked as recently used."""
+    found = {}
+    with _memo_lock:
+        for h in hashes:
+            if h in _memo:
+                found[h] = _memo[h] = _memo.pop(h)
+    return found
+
+def _remember(scores):
+    """Add scores to the in-process memo, dropping the least recently used past MEMO_MAX."""
+    with _memo_lock:
+        for h, ps in scores.items():
+            _memo.pop(h, None)
+            _memo[h] = ps
+        while len(_memo) > MEMO_MAX:
+            del _memo[next(iter(_memo))]
+
+def _save(scores):
+    conn = _conn()
+    conn.execute("BEGIN")
+    conn.executemany("INSERT OR REPLACE INTO scores (h, polarity, subjectivity) VALUES (?, ?, ?)",
+                     [(h, p, s) for h, (p, s) in scores.items()])
+    conn.execute("COMMIT")
+
+# -------------------------------------------------------------------------
+# Public API
+# -------------------------------------------------------------------------
+def score_texts(texts, with_subjectivity=False):
+    """Polarity (-1..1) for every text, in order; empty text scores 0.0.
+
+    with_subjectivity returns (polarity, subjectivity) tuples instead.
+    """
+    norms = [normalize(t) for t in texts]
+    keys = {n: text_hash(n) for n in set(norms) if n}
+
+    known = _recall(keys.values())
+    missing = {h for h in keys.values() if h not in known}
+    if missing and not DISABLED:
+        try:
+            loaded = _load(missing)
+        except sqlite3.Error as e:
+            print(f"⚠️ Sentiment memo unavailable ({e})", file=sys.stderr)
+        else:
+            known.update(loaded)
+            _remember(loaded)
+    hits = len(known)
+
+    fresh = {}
+    if hits < len(keys):
+        score = lexicon()
+        for norm, h in keys.items():
+            if h not in known:
+                polarity, subjectivity = score(norm)
+                fresh[h] = (polarity, subjectivity)
+        known.update(fresh)
+        _remember(fresh)
+        if fresh and not DISABLED:
+            try:
+                _save(fresh)
+            except sqlite3.Error as e:
+                print(f"⚠️ Sentiment memo not saved ({e})", file=sys.stderr)
+    STATS["scored"] += len(fresh)
+    STATS["memo_hits"] += hits
+
+    out = []
+    for n in norms:
+        ps = known[keys[n]] if n else (0.0, 0.0)
+        out.append(ps if with_subjectivity else ps[0])
+    return out
+
+def score_items(items, title_key="title", body_key="summary"):
+    """Headline and body polarity for a list of news dicts, in one batch.
+
+    Returns [{"title": p, "body": p or None}] in item order.
+    """
+    titles = [item.get(title_key) or "" for item in items]
+    bodies = [item.get(body_key) or "" for item in items]
+    scores = score_texts(titles + bodies)
+    n = len(items)
+    return [{"title": scores[i], "body": scores[n + i] if bodies[i].strip() else None}
+            for i in range(n)]
+
+def aggregate(polarities):
+    """(mean polarity, label) over a list of polarities; empty -> (0, "Neutral")."""
+    avg = sum(polarities) / len(polarities) if polarities else 0.0
+    return avg, label(avg)
+
+def clear():
+    with _memo_lock:
+        _memo.clear()
+    return _conn().execute("DELETE FROM scores").rowcount
+
+# -------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if cmd == "stats":
+        (n,) = _conn().execute("SELECT COUNT(*) FROM scores").fetchone()
+        print(f"{n} memoized scores in {MEMO_PATH} ({SCORER})")
+    elif cmd == "clear":
+        print(f"🧹 Removed {clear()} scores")
+    else:
+        print(__doc__.strip().splitlines()[-1], file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""Run tracing: spans and counters as Chrome trace events, one JSON line each.
+
+Tracing is on when AGENCY_TRACE_DIR names a directory (agency_manager sets
+it to <workspace>/trace, and child processes inherit it). Every process
+appends to <dir>/events.jsonl; at the end of a run export() turns that into
+<dir>/trace.json (open in chrome://tracing or ui.perfetto.dev) and folds
+the span durations into a latency histogram kept across runs.
+
+AGENCY_PROFILE=1 additionally runs the tools' main() under cProfile and
+writes <dir>/profile-<name>-<pid>.prof.
+
+Usage: python tools/tracing.py [export TRACE_DIR | hist [CATEGORY] | reset-hist]
+"""
+import atexit
+import cProfile
+import fcntl
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+TRACE_DIR = os.environ.get("AGENCY_TRACE_DIR") or None
+PROFILE = os.environ.get("AGENCY_PROFILE", "") not in ("", "0")
+HISTOGRAM_PATH = os.environ.get("AGENCY_TRACE_HISTOGRAM", "agency/store/trace_histogram.json")
+
+# Histogram bucket upper bounds in ms (doubling), plus an overflow bucket.
+BUCKETS_MS = [1 * 2 ** i for i in range(22)]   # 1 ms .. ~35 min
+
+_write_lock = threading.Lock()
+_exit_hooks = []
+
+def enabled():
+    return TRACE_DIR is not None
+
+def enable(trace_dir):
+    """Trace this process (and, via the environment, its children) into trace_dir."""
+    global TRACE_DIR
+    os.makedirs(trace_dir, exist_ok=True)
+    TRACE_DIR = trace_dir
+    os.environ["AGENCY_TRACE_DIR"] = trace_dir
+
+# -------------------------------------------------------------------------
+# Events
+# -------------------------------------------------------------------------
+def _emit(event):
+    if TRACE_DIR is None:
+        return
+    event.setdefault("pid", os.getpid())
+    event.setdefault("tid", threading.get_native_id())
+    line = json.dumps(event, default=str) + "\n"
+    try:
+        with _write_lock:
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            # O_APPEND: whole-line writes from several processes don't interleave.
+            fd = os.open(os.path.join(TRACE_DIR, "events.jsonl"), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line.encode())
+            finally:
+                os.close(fd)
+    except OSError as e:
+        print(f"⚠️ Trace event dropped ({e})", file=sys.stderr)
+
+def record(name, cat, start, end, **args):
+    """A finished span from wall-clock start/end (seconds)."""
+    _emit({"name": name, "cat": cat, "ph": "X", "ts": int(start * 1e6),
+           "dur": max(0, int((end - start) * 1e6)), "args": args})
+
+@contextmanager
+def span(name, cat="span", **args):
+    """Time a block. The yielded dict is merged into the event's args."""
+    if TRACE_DIR is None:
+        yield args
+        return
+    start = time.time()
+    try:
+        yield args
+    except BaseException as e:
+        args.setdefault("error", repr(e)[:200])
+        raise
+    finally:
+        record(name, cat, start, time.time(), **args)
+
+def counter(name, values):
+    """A Chrome counter event ({series: number})."""
+    _emit({"name": name, "cat": "counter", "ph": "C", "ts": int(time.time() * 1e6), "args": values})
+
+def at_exit(fn):
+    """Run fn() when a traced process exits (e.g. to emit its cache counters)."""
+    _exit_hooks.append(fn)
+
+@atexit.register
+def run_exit_hooks():
+    """Run the at_exit hooks now (once), e.g. right before export() in the same process."""
+    if TRACE_DIR is None:
+        return
+    while _exit_hooks:
+        fn = _exit_hooks.pop(0)
+        try:
+            fn()
+        except Exception as e:
+            print(f"⚠️ Trace exit hook failed ({e})", file=sys.stderr)
+
+@contextmanager
+def profiled(name):
+    """cProfile the block when AGENCY_PROFILE is set (output next to the trace)."""
+    if not PROFILE:
+        yield
+        return
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        out_dir = TRACE_DIR or "."
+        os.makedirs(out_dir, exist_ok=True)
+        path = os.path.join(out_dir, f"profile-{name}-{os.getpid()}.prof")
+        prof.dump_stats(path)
+        print(f"🔬 Profile written to {path}", file=sys.stderr)
+
+# -------------------------------------------------------------------------
+# Export / Histogram
+# -------------------------------------------------------------------------
+def load_events(trace_dir):
+    events = []
+    try:
+        with open(os.path.join(trace_dir, "events.jsonl"), "r") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue   # a line cut short by a killed process
+    except FileNotFoundError:
+        pass
+    return events
+
+def _bucket(ms):
+    for i, bound in enumerate(BUCKETS_MS):
+        if ms <= bound:
+            return i
+    return len(BUCKETS_MS)
+
+def update_histogram(events, path=None):
+    """Fold span durations into {"cat/name": {"count", "sum_ms", "buckets"}} at `path`."""
+    path = path or HISTOGRAM_PATH
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    with open(f"{path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            try:
+                with open(path, "r") as f:
+                    hist = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                hist = {}
+            for e in events:
+                if e.get("ph") != "X":
+                    continue
+                ms = e["dur"] / 1000
+                h = hist.setdefault(f"{e['cat']}/{e['name']}",
+                                    {"count": 0, "sum_ms": 0.0, "buckets": [0] * (len(BUCKETS_MS) + 1)})
+                h["count"] += 1
+                h["sum_ms"] += ms
+                h["buckets"][_bucket(ms)] += 1
+            tmp = f"{path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(hist, f)
+            os.replace(tmp, path)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    return hist
+
+def percentile(h, q):
+    """Upper bound (ms) of the bucket holding the q-th quantile."""
+    target = q * h["count"]
+    seen = 0
+    for i, n in enumerate(h["buckets"]):
+        seen += n
+        if n and seen >= target:
+            return BUCKETS_MS[i] if i < len(BUCKETS_MS) else float("inf")
+    return 0
+
+def export(trace_dir, histogram=True):
+    """Write trace.json (Chrome/Perfetto) from events.jsonl. Returns its path."""
+    events = load_events(trace_dir)
+    events.sort(key=lambda e: e.get("ts", 0))
+    out = os.path.join(trace_dir, "trace.json")
+    with open(out, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    if histogram:
+        update_histogram(events)
+    return out
+
+def summarize(events, cat):
+    """[(name, count, total_s)] for spans of a category, slowest total first."""
+    totals = {}
+    for e in events:
+        if e.get("ph") == "X" and e.get("cat") == cat:
+            n, s = totals.get(e["name"], (0, 0.0))
+            totals[e["name"]] = (n + 1, s + e["dur"] / 1e6)
+    return sorted(((k, n, s) for k, (n, s) in totals.items()), key=lambda x: -x[2])
+
+# -------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "hist"
+    if cmd == "export" and len(sys.argv) > 2:
+        print(f"🧵 {export(sys.argv[2], histogram=False)}")
+    elif cmd == "hist":
+        try:
+            with open(HISTOGRAM_PATH, "r") as f:
+                hist = json.load(f)
+        except FileNotFoundError:
+            hist = {}
+        prefix = sys.argv[2] + "/" if len(sys.argv) > 2 else ""
+        print(f"{'span':<40}{'count':>7}{'mean ms':>10}{'p50 ≤':>9}{'p95 ≤':>9}")
+        for key, h in sorted(hist.items()):
+            if key.startswith(prefix):
+                print(f"{key:<40}{h['count']:>7}{h['sum_ms'] / h['count']:>10.1f}"
+                      f"{percentile(h, 0.5):>9}{percentile(h, 0.95):>9}")
+    elif cmd == "reset-hist":
+        if os.path.exists(HISTOGRAM_PATH):
+            os.remove(HISTOGRAM_PATH)
+        print("🧹 Latency histogram cleared")
+    else:
+        print(__doc__.strip().splitlines()[-1], file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,427 @@
+"""Watch mode: keep a watchlist's indicators live and re-analyse on signals.
+
+Subscribes to Finnhub's trade websocket (or replays a recorded JSONL feed)
+and moves each symbol's indicators in place as trades arrive: the daily
+IndicatorState from the candle store covers every bar but today's, and each
+price is only peeked on top of it (O(1), no history re-read). A frame's
+trades are coalesced to the last price per symbol before peeking.
+
+When a tick moves an indicator across a configured threshold (RSI leaving
+or entering its 30/70 band, close crossing SMA50, a Bollinger band break, a
+MACD cross) the symbol's market.json is rewritten with the live values and
+only the agents it feeds are re-run (agency_manager.py --rerun tech, i.e.
+tech and everything downstream; fund/sent/macro reports are reused). Work
+is therefore proportional to signal events, not to tick rate or polling.
+A symbol's first re-run seeds its workspace with a normal fetch, so the
+live market.json is never overwritten by a REST snapshot, and market.json
+is only rewritten when a re-run starts, never under one in flight.
+
+Replay frames are Finnhub messages ({"type": "trade", "data": [{"s", "p",
+"t" (ms), "v"}]}) one per line, or bare {"s", "p", "t"} ticks; --record
+writes the live feed in that format.
+
+Usage: python tools/watch.py NVDA AAPL [--file watchlist.txt] [--replay FEED.jsonl] [--dry-run]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from tools import agency_manager, candle_store, indicator_state
+from tools.finnhub_batch import read_tickers
+
+load_dotenv()
+
+# -------------------------------------------------------------------------
+# Configuration
+# -------------------------------------------------------------------------
+WATCH_DIR = os.environ.get("AGENCY_WATCH_DIR", "agency/watch")
+FINNHUB_WS_URL = os.environ.get("FINNHUB_WS_URL", "wss://ws.finnhub.io")
+RSI_LOW, RSI_HIGH = 30, 70
+COOLDOWN = 900            # seconds (feed time) between re-runs of one symbol
+MAX_RUNS = 2              # concurrent pipeline re-runs
+RECONNECT_MAX = 60
+
+# Trigger -> agents whose input it changes; each is re-run with everything
+# downstream of it.
+TRIGGERS = {
+    "rsi_band": ("tech",),
+    "sma50_cross": ("tech",),
+    "bb_break": ("tech",),
+    "macd_cross": ("tech",),
+}
+
+def _isnan(v):
+    return v is None or v != v
+
+def zones(latest, rsi_low=RSI_LOW, rsi_high=RSI_HIGH):
+    """Which side of each trigger's thresholds the latest values are on (None = undefined)."""
+    c, rsi, sma, hist = latest["c"], latest["RSI_14"], latest["SMA_50"], latest["MACD_Hist"]
+    upper, lower = latest["BB_Upper"], latest["BB_Lower"]
+    return {
+        "rsi_band": None if _isnan(rsi) else "oversold" if rsi < rsi_low else "overbought" if rsi > rsi_high else "neutral",
+        "sma50_cross": None if _isnan(sma) else "above" if c > sma else "below",
+        "bb_break": None if _isnan(upper) else "upper" if c > upper else "lower" if c < lower else "inside",
+        "macd_cross": None if _isnan(hist) else "bull" if hist > 0 else "bear",
+    }
+
+# -------------------------------------------------------------------------
+# Live State
+# -------------------------------------------------------------------------
+class LiveSymbol:
+    """Daily indicators for one symbol with today's bar driven by ticks."""
+
+    def __init__(self, symbol, state, t, c):
+        self.symbol = symbol
+        self.state = state              # covers every bar but the last one in t/c
+        self.day = int(t[-1]) // 86400
+        self.close = float(c[-1])
+        self.closes = [float(x) for x in c[-5:]]
+        self.zones = {}
+        self.latest = None
+        self.last_run = None
+
+    def tick(self, t, price):
+        """Apply a trade (unix seconds). Returns the peeked latest values, or
+        None for a trade older than the bar being formed."""
+        day = int(t) // 86400
+        if day < self.day:
+            return None
+        if day > self.day:
+            # The bar being formed is final: commit it, start today's.
+            self.state.update(self.day * 86400, self.close)
+            self.day = day
+            self.closes = self.closes[1:] + [price]
+        self.close = price
+        self.closes[-1] = price
+        self.latest = self.state.peek(price)
+        return self.latest
+
+    def crossings(self, rsi_low=RSI_LOW, rsi_high=RSI_HIGH, enabled=TRIGGERS):
+        """Triggers whose zone changed since the previous tick (the first
+        defined zone only sets the baseline)."""
+        fired = []
+        for rule, zone in zones(self.latest, rsi_low, rsi_high).items():
+            if zone is None or rule not in enabled:
+                continue
+            prev = self.zones.get(rule)
+            if prev is not None and prev != zone:
+                fired.append(f"{rule}:{prev}->{zone}")
+            self.zones[rule] = zone
+        return fired
+
+def load_symbol(symbol, store_dir=None, state_dir=None):
+    """LiveSymbol from the candle store (topped up from Stooq when empty) and
+    the persisted indicator state."""
+    cols = candle_store.load(symbol, store_dir)
+    if cols is None or len(cols["c"]) < 2:
+        from tools.get_data_finnhub import refresh_candles
+        cols = refresh_candles(symbol)
+    if cols is None or len(cols["c"]) < 2:
+        return None
+    return LiveSymbol(symbol, indicator_state.state_for(symbol, cols, state_dir), cols["t"], cols["c"])
+
+# -------------------------------------------------------------------------
+# Re-runs
+# -------------------------------------------------------------------------
+def workspace_for(symbol, root=None):
+    return os.path.join(root or WATCH_DIR, symbol)
+
+def snapshot(live, fired):
+    """The live values a trigger saw, for the re-run it starts."""
+    return {"close": live.close, "latest": dict(live.latest), "closes": list(live.closes), "fired": list(fired),
+            "as_of": datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+
+def write_market(symbol, snaps, workspace):
+    """Rewrite <workspace>/data/market.json with the newest live snapshot;
+    live.triggers lists every trigger the re-run covers.
+
+    Blocks from the last full fetch (backtest, intraday) are kept.
+    """
+    from tools.get_data_finnhub import build_market_data
+    path = os.path.join(workspace, "data", "market.json")
+    try:
+        with open(path, "r") as f:
+            market = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        market = {}
+    snap = snaps[-1]
+    fresh = build_market_data(symbol, {"c": snap["close"]}, None,
+                              indicator_state.format_technicals(snap["latest"]))
+    market.update(fresh, raw_candles_last_5=snap["closes"], live={
+        "as_of": snap["as_of"],
+        "triggers": [f for s in snaps for f in s["fired"]],
+    })
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    agency_manager._write_atomic(path, json.dumps(market, indent=2))
+
+def seed_workspace(symbol, workspace, model=agency_manager.DEFAULT_MODEL):
+    """Run the pipeline's fetch step once if the workspace lacks any of its
+    outputs; otherwise --rerun would re-select it and overwrite the live market.json."""
+    fetch = next(n for n in agency_manager.build_graph(symbol, *agency_manager.workspace_dirs(workspace))
+                 if n.name == "fetch")
+    if all(os.path.exists(o) for o in fetch.outputs):
+        return
+    print(f"📥 {symbol}: seeding {workspace}", flush=True)
+    agency_manager.run_node(fetch, model)
+
+def rerun(symbol, workspace, agents, snaps, model=agency_manager.DEFAULT_MODEL):
+    """agency_manager.py --rerun in the symbol's watch workspace on the live
+    market.json; output goes to run.log."""
+    seed_workspace(symbol, workspace, model)
+    write_market(symbol, snaps, workspace)
+    env = os.environ.copy()
+    env["PYTHONPATH"] = f"{os.getcwd()}:{env.get('PYTHONPATH', '')}"
+    cmd = [sys.executable, "tools/agency_manager.py", symbol, "--model", model,
+           "--workspace", workspace, "--rerun", ",".join(agents)]
+    with open(os.path.join(workspace, "run.log"), "a") as log:
+        return subprocess.run(cmd, stdout=log, stderr=subprocess.STDOUT, env=env).returncode == 0
+
+class Dispatcher:
+    """At most one re-run per symbol in flight; triggers that arrive meanwhile
+    are merged into a single follow-up run.
+
+    runner(symbol, workspace, agents, snaps) gets the snapshots of every
+    trigger the run covers, oldest first.
+    """
+
+    def __init__(self, runner, max_runs=MAX_RUNS):
+        self.runner = runner
+        self.pool = ThreadPoolExecutor(max_workers=max(1, max_runs))
+        self.lock = threading.Lock()
+        self.running = set()
+        self.queued = {}
+        self.started = 0
+
+    def submit(self, symbol, workspace, agents, snap=None):
+        snaps = [] if snap is None else [snap]
+        with self.lock:
+            if symbol in self.running:
+                queued_agents, queued_snaps = self.queued.get(symbol, ((), []))
+                self.queued[symbol] = (sorted(set(queued_agents) | set(agents)), queued_snaps + snaps)
+                return False
+            self.running.add(symbol)
+            self.started += 1
+        self.pool.submit(self._run, symbol, workspace, list(agents), snaps)
+        return True
+
+    def _run(self, symbol, workspace, agents, snaps):
+        while True:
+            t0 = time.time()
+            try:
+                ok = self.runner(symbol, workspace, agents, snaps)
+            except Exception as e:
+                print(f"❌ {symbol}: re-run failed: {e}", file=sys.stderr)
+                ok = False
+            print(f"{'✅' if ok else '❌'} {symbol}: re-ran {','.join(agents)} in {time.time() - t0:.1f}s "
+                  f"({workspace})", flush=True)
+            with self.lock:
+                if symbol not in self.queued:
+                    self.running.discard(symbol)
+                    return
+                agents, snaps = self.queued.pop(symbol)
+                self.started += 1
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+# -------------------------------------------------------------------------
+# Watcher
+# -------------------------------------------------------------------------
+class Watcher:
+    def __init__(self, symbols, dispatch, cooldown=COOLDOWN, rsi_low=RSI_LOW, rsi_high=RSI_HIGH,
+                 enabled=TRIGGERS, root=None):
+        self.symbols = symbols          # symbol -> LiveSymbol
+        self.dispatch = dispatch        # (symbol, workspace, agents, snapshot) -> None
+        self.cooldown = cooldown
+        self.rsi_low, self.rsi_high = rsi_low, rsi_high
+        self.enabled = enabled
+        self.root = root
+        self.stats = {"frames": 0, "ticks": 0, "peeks": 0, "triggers": 0, "suppressed": 0}
+
+    def on_frame(self, trades):
+        """Apply one feed frame (list of {"s", "p", "t" ms}). Returns triggered symbols."""
+        stats = self.stats
+        stats["frames"] += 1
+        stats["ticks"] += len(trades)
+        last = {}
+        for tr in trades:
+            last[tr["s"]] = tr
+        fired_symbols = []
+        for sym, tr in last.items():
+            live = self.symbols.get(sym)
+            if live is None or live.tick(tr["t"] / 1000, float(tr["p"])) is None:
+                continue
+            stats["peeks"] += 1
+            fired = live.crossings(self.rsi_low, self.rsi_high, self.enabled)
+            if fired and self.on_trigger(live, fired, tr["t"] / 1000):
+                fired_symbols.append(sym)
+        return fired_symbols
+
+    def on_trigger(self, live, fired, now):
+        if live.last_run is not None and now - live.last_run < self.cooldown:
+            self.stats["suppressed"] += 1
+            return False
+        live.last_run = now
+        self.stats["triggers"] += 1
+        agents = sorted({a for f in fired for a in self.enabled[f.split(":", 1)[0]]})
+        workspace = workspace_for(live.symbol, self.root)
+        print(f"🔔 {live.symbol} @ {live.close:.2f}: {', '.join(fired)} -> re-run {','.join(agents)}", flush=True)
+        self.dispatch(live.symbol, workspace, agents, snapshot(live, fired))
+        return True
+
+# -------------------------------------------------------------------------
+# Feeds
+# -------------------------------------------------------------------------
+def parse_message(line):
+    """Trades in one feed line (Finnhub message or bare tick); [] for pings/errors."""
+    msg = json.loads(line)
+    if "s" in msg:
+        return [msg]
+    if msg.get("type") == "trade":
+        return msg.get("data") or []
+    if msg.get("type") == "error":
+        print(f"⚠️ Feed error: {msg.get('msg')}", file=sys.stderr)
+    return []
+
+def replay(path, speed=0.0):
+    """Yield frames from a recorded feed; speed > 0 paces them at speed x real time."""
+    first_feed = first_wall = None
+    with open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            trades = parse_message(line)
+            if not trades:
+                continue
+            if speed > 0:
+                t = trades[-1]["t"] / 1000
+                if first_feed is None:
+                    first_feed, first_wall = t, time.monotonic()
+                delay = (t - first_feed) / speed - (time.monotonic() - first_wall)
+                if delay > 0:
+                    time.sleep(delay)
+            yield trades
+
+def finnhub_stream(symbols, token, record=None):
+    """Yield frames from Finnhub's trade websocket, reconnecting with backoff."""
+    try:
+        from websockets.sync.client import connect
+    except ImportError:
+        print("❌ Error: the websockets package is required for live watch mode (pip install websockets).",
+              file=sys.stderr)
+        sys.exit(1)
+    backoff = 1
+    out = open(record, "a") if record else None
+    try:
+        while True:
+            try:
+                with connect(f"{FINNHUB_WS_URL}?token={token}") as ws:
+                    for sym in symbols:
+                        ws.send(json.dumps({"type": "subscribe", "symbol": sym}))
+                    print(f"📡 Subscribed to {len(symbols)} symbols", flush=True)
+                    backoff = 1
+                    for line in ws:
+                        trades = parse_message(line)
+                        if trades:
+                            if out:
+                                out.write(line if line.endswith("\n") else line + "\n")
+                            yield trades
+            except (OSError, EOFError) as e:
+                print(f"⚠️ Websocket dropped ({e}); reconnecting in {backoff}s", file=sys.stderr)
+            except Exception as e:
+                if type(e).__module__.split(".")[0] != "websockets":
+                    raise
+                print(f"⚠️ Websocket dropped ({e}); reconnecting in {backoff}s", file=sys.stderr)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX)
+    finally:
+        if out:
+            out.close()
+
+# -------------------------------------------------------------------------
+# Main
+# -------------------------------------------------------------------------
+def print_stats(stats, wall, dispatcher):
+    rate = stats["ticks"] / wall if wall else 0.0
+    print(f"\n⏱️  {stats['ticks']} ticks in {stats['frames']} frames over {wall:.1f}s ({rate:,.0f} ticks/s); "
+          f"{stats['peeks']} indicator updates")
+    print(f"🔔 {stats['triggers']} triggers ({stats['suppressed']} within cooldown), "
+          f"{dispatcher.started} re-runs")
+
+def main():
+    parser = argparse.ArgumentParser(description="Live indicators and event-driven re-analysis for a watchlist")
+    parser.add_argument("tickers", nargs="*", help="Ticker symbols")
+    parser.add_argument("--file", help="Watchlist file (one ticker per line or comma separated)")
+    parser.add_argument("--replay", help="Recorded feed (JSONL) to play instead of the Finnhub websocket")
+    parser.add_argument("--speed", type=float, default=0.0, help="Replay pace (x real time; 0 = as fast as possible)")
+    parser.add_argument("--record", help="Append the live feed to this JSONL file")
+    parser.add_argument("--triggers", default=",".join(TRIGGERS), help=f"Enabled triggers ({', '.join(TRIGGERS)})")
+    parser.add_argument("--rsi-band", default=f"{RSI_LOW},{RSI_HIGH}", help="RSI oversold,overbought levels")
+    parser.add_argument("--cooldown", type=float, default=COOLDOWN, help="Min seconds between re-runs of a symbol")
+    parser.add_argument("--max-runs", type=int, default=MAX_RUNS, help="Concurrent pipeline re-runs")
+    parser.add_argument("--model", default=agency_manager.DEFAULT_MODEL, help="Gemini model alias")
+    parser.add_argument("--root", default=WATCH_DIR, help="Directory for per-symbol watch workspaces")
+    parser.add_argument("--dry-run", action="store_true", help="Report triggers without re-running agents")
+    args = parser.parse_args()
+
+    tickers = read_tickers(args.tickers, args.file)
+    if not tickers:
+        parser.error("no tickers given")
+    enabled = {}
+    for name in (n.strip() for n in args.triggers.split(",") if n.strip()):
+        if name not in TRIGGERS:
+            parser.error(f"unknown trigger: {name}")
+        enabled[name] = TRIGGERS[name]
+    try:
+        rsi_low, rsi_high = (float(x) for x in args.rsi_band.split(","))
+    except ValueError:
+        parser.error("--rsi-band takes two numbers, e.g. 30,70")
+
+    symbols = {}
+    for sym in tickers:
+        live = load_symbol(sym)
+        if live is None:
+            print(f"⚠️ {sym}: no daily history; not watched", file=sys.stderr)
+        else:
+            symbols[sym] = live
+    if not symbols:
+        sys.exit(1)
+    print(f"👀 Watching {len(symbols)} symbols; triggers: {', '.join(enabled)}", flush=True)
+
+    def dry_run(sym, ws, agents, snaps):
+        write_market(sym, snaps, ws)
+        return True
+
+    runner = dry_run if args.dry_run else (lambda sym, ws, agents, snaps: rerun(sym, ws, agents, snaps, args.model))
+    dispatcher = Dispatcher(runner, args.max_runs)
+    watcher = Watcher(symbols, dispatcher.submit, args.cooldown, rsi_low, rsi_high, enabled, args.root)
+
+    if args.replay:
+        feed = replay(args.replay, args.speed)
+    else:
+        token = os.environ.get("FINNHUB_API_KEY")
+        if not token:
+            print("❌ Error: FINNHUB_API_KEY environment variable not set (or use --replay).", file=sys.stderr)
+            sys.exit(1)
+        feed = finnhub_stream(list(symbols), token, args.record)
+
+    t0 = time.perf_counter()
+    try:
+        for trades in feed:
+            watcher.on_frame(trades)
+    except KeyboardInterrupt:
+        pass
+    wall = time.perf_counter() - t0
+    dispatcher.close()
+    print_stats(watcher.stats, wall, dispatcher)
+
+if __name__ == "__main__":
+    main()